@@ -0,0 +1,153 @@
+"""Overhead of the workflow's console tracing.
+
+Runs the same concurrent one-shot campaigns once per trace verbosity and
+reports throughput and CPU time per campaign. ``verbose`` prints every banner
+and JSON payload like the workflow used to on every call; ``sampled`` prints
+``--sample-rate`` of the runs and ``off`` nothing. Output goes to
+``os.devnull`` (or ``--sink``), so the numbers show the formatting and write
+cost, not the speed of a terminal; the characters and ``write`` calls that
+reach stdout are counted as well. The fake LLM answers instantly by default
+so that the console work is not hidden behind network latency.
+
+Example::
+
+    python benchmarks/bench_console_trace.py --campaigns 300 --concurrency 30
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+import common
+
+LEVELS = ("verbose", "sampled", "off")
+
+
+def build_agent(args):
+    from agents.social_media_agent import SocialMediaAgent
+    from services.ai_service import AIService
+    from services.llm_backends import FakeChatModel, FakeLLMConfig
+    from services.telemetry import Telemetry
+
+    llm = FakeChatModel(FakeLLMConfig(
+        seed=args.seed,
+        latency_distribution="fixed",
+        latency_ms=args.latency_ms,
+        tokens_per_second=0
+    ))
+    telemetry = Telemetry()
+    ai_service = AIService(llm=llm, telemetry=telemetry)
+    return SocialMediaAgent(generation_mode=args.generation_mode, ai_service=ai_service, telemetry=telemetry)
+
+
+async def _run(agent, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(request):
+        async with semaphore:
+            return "error" not in await agent.process_request(request)
+
+    return await asyncio.gather(*(one(request) for request in requests))
+
+
+class CountingSink:
+    """File wrapper that counts what the workflow writes to stdout."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.chars = 0
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.chars += len(text)
+        self.writes += 1
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run_level(level: str, agent, requests, args) -> dict:
+    from utils.console_trace import console_trace
+
+    console_trace.set_verbosity(level)
+    console_trace.sample_rate = args.sample_rate
+    with open(args.sink, "w", encoding="utf-8") as stream:
+        sink = CountingSink(stream)
+        with contextlib.redirect_stdout(sink):
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            outcomes = asyncio.run(_run(agent, requests, args.concurrency))
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+    return {
+        "verbosity": level,
+        "campaigns": len(requests),
+        "ok": sum(outcomes),
+        "elapsed": elapsed,
+        "cpu": cpu,
+        "chars": sink.chars,
+        "writes": sink.writes,
+    }
+
+
+def run_all(args) -> list:
+    requests = common.sample_requests(args.campaigns)
+    with common.quiet():
+        agent = build_agent(args)
+    best = {}
+    # Levels are interleaved and the best of --repeats is kept: scheduling noise only ever adds time
+    for level in LEVELS:
+        run_level(level, agent, requests[:min(10, len(requests))], args)  # warm-up
+    for _ in range(args.repeats):
+        for level in LEVELS:
+            run = run_level(level, agent, requests, args)
+            if level not in best or run["cpu"] < best[level]["cpu"]:
+                best[level] = run
+    results = []
+    for level in LEVELS:
+        run = best[level]
+        results.append({
+            "verbosity": level,
+            "campaigns": run["campaigns"],
+            "ok": run["ok"],
+            "campaigns_per_s": run["campaigns"] / run["elapsed"] if run["elapsed"] else 0.0,
+            "cpu_ms_per_campaign": run["cpu"] / run["campaigns"] * 1000,
+            "trace_kb_per_campaign": run["chars"] / run["campaigns"] / 1024,
+            "writes_per_campaign": run["writes"] / run["campaigns"],
+        })
+    baseline = results[0]["cpu_ms_per_campaign"]
+    for result in results:
+        result["cpu_vs_verbose"] = result["cpu_ms_per_campaign"] / baseline if baseline else 0.0
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--generation-mode", choices=["single", "fanout", "fused"], default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed fake LLM latency")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="Share of runs printed in sampled mode")
+    parser.add_argument("--sink", default=os.devnull, help="Where the trace output is written")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_all(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        common.print_table("Console trace overhead (fake LLM backend, output to sink)", results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
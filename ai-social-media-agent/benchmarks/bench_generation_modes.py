@@ -0,0 +1,129 @@
+"""Latency, cost and output quality of the generation modes.
+
+Runs the same one-shot campaigns in the ``single`` (analysis, then all posts),
+``fanout`` (analysis, then one call per platform) and ``fused`` (analysis and
+posts from one call) modes and reports latency percentiles, LLM calls and
+tokens per campaign next to simple quality checks of the final posts: the
+share within the platform's character and hashtag limits, the share of the
+campaign message's content words the posts carry, and fallbacks.
+
+The fake backend (default) makes latency and token counts comparable; the
+quality columns only become meaningful against a real model, e.g. with
+``LLM_BACKEND=groq`` and a small ``--campaigns``.
+
+Example::
+
+    python benchmarks/bench_generation_modes.py --campaigns 100 --concurrency 10 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+
+import common
+
+MODES = ("single", "fanout", "fused")
+
+_WORD = re.compile(r"\w{4,}")
+
+
+def build_agent(args, mode: str):
+    from agents.social_media_agent import SocialMediaAgent
+    from config.settings import settings
+    from services.ai_service import AIService
+    from services.llm_backends import FakeChatModel, FakeLLMConfig
+    from services.telemetry import Telemetry
+
+    llm = None
+    if settings.llm_backend == "fake":
+        llm = FakeChatModel(FakeLLMConfig(
+            seed=args.seed,
+            latency_distribution=args.latency_distribution,
+            latency_ms=args.latency_ms,
+            latency_spread=args.latency_spread,
+            tokens_per_second=args.tokens_per_second,
+            malformed_json_rate=args.malformed_rate
+        ))
+    telemetry = Telemetry()
+    with common.quiet():
+        ai_service = AIService(llm=llm, telemetry=telemetry)
+    return SocialMediaAgent(generation_mode=mode, ai_service=ai_service, telemetry=telemetry)
+
+
+def post_quality(request, result: dict) -> tuple:
+    """Share of posts within the platform limits, and share of the message's content words they carry."""
+    from config.settings import settings
+
+    within = coverage = 0.0
+    message_words = {word.lower() for word in _WORD.findall(request.campaign_message)}
+    for platform, post in result.items():
+        limits = settings.platform_limits[platform]
+        within += len(post["text"]) <= limits["max_chars"] and len(post["hashtags"]) <= limits["hashtag_limit"]
+        post_words = {word.lower() for word in _WORD.findall(post["text"])}
+        coverage += len(message_words & post_words) / len(message_words) if message_words else 1.0
+    return within / len(result), coverage / len(result)
+
+
+async def run(args, mode: str) -> dict:
+    agent = build_agent(args, mode)
+    requests = common.sample_requests(args.campaigns)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(request):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await agent.process_request(request)
+            return time.perf_counter() - started, request, result
+
+    started = time.perf_counter()
+    with common.quiet():
+        outcomes = await asyncio.gather(*(one(request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    completed = [(request, result) for _, request, result in outcomes if "error" not in result]
+    qualities = [post_quality(request, result) for request, result in completed]
+    tokens = agent.ai_service.token_accounting.stats().values()
+    return {
+        "mode": mode,
+        "campaigns": args.campaigns,
+        "ok": len(completed),
+        **common.latency_summary([latency for latency, _, _ in outcomes]),
+        "campaigns_per_s": args.campaigns / elapsed if elapsed else 0.0,
+        "llm_calls_per_campaign": sum(t["calls"] for t in tokens) / args.campaigns,
+        "prompt_tokens_per_campaign": sum(t["prompt_tokens"] for t in tokens) / args.campaigns,
+        "completion_tokens_per_campaign": sum(t["completion_tokens"] for t in tokens) / args.campaigns,
+        "within_limits": sum(within for within, _ in qualities) / len(qualities) if qualities else 0.0,
+        "message_coverage": sum(coverage for _, coverage in qualities) / len(qualities) if qualities else 0.0,
+        "fallbacks": agent.ai_service.fallbacks,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--campaigns", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = [asyncio.run(run(args, mode)) for mode in args.modes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        common.print_table("Generation modes (one-shot campaigns)", results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Latency effect of the audience/tone insight store.
+
+Runs the same one-shot campaigns (a few audiences and tones, repeated) with
+the insight store disabled and enabled, and reports latency percentiles,
+LLM calls per campaign and how the context analyses were decided: run
+``fresh``, ``reused`` from the store, or overlapped with speculative
+generation (``speculation_accepted`` / ``speculation_discarded``).
+
+Example::
+
+    python benchmarks/bench_insights.py --campaigns 200 --concurrency 10 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import common
+
+DECISIONS = ("fresh", "reused", "speculation_accepted", "speculation_discarded")
+
+
+def build_agent(args, insights: bool):
+    from agents.social_media_agent import SocialMediaAgent
+    from services.ai_service import AIService
+    from services.insight_store import InsightStore
+    from services.llm_backends import FakeChatModel, FakeLLMConfig
+    from services.telemetry import Telemetry
+
+    llm = FakeChatModel(FakeLLMConfig(
+        seed=args.seed,
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second
+    ))
+    telemetry = Telemetry()
+    with common.quiet():
+        ai_service = AIService(llm=llm, telemetry=telemetry)
+    store = InsightStore(reuse_confidence=args.reuse_confidence) if insights else None
+    agent = SocialMediaAgent(generation_mode=args.generation_mode, ai_service=ai_service,
+                             telemetry=telemetry, insight_store=store)
+    return agent, llm
+
+
+async def run(args, insights: bool) -> dict:
+    agent, llm = build_agent(args, insights)
+    requests = common.sample_requests(args.campaigns)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(request):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await agent.process_request(request)
+            return time.perf_counter() - started, "error" not in result
+
+    started = time.perf_counter()
+    with common.quiet():
+        outcomes = await asyncio.gather(*(one(request) for request in requests))
+    elapsed = time.perf_counter() - started
+
+    analyses = agent.ai_service.token_accounting.stats().get("analyze_context", {}).get("calls", 0)
+    row = {
+        "insights": "on" if insights else "off",
+        "campaigns": args.campaigns,
+        "ok": sum(1 for _, ok in outcomes if ok),
+        **common.latency_summary([latency for latency, _ in outcomes]),
+        "campaigns_per_s": args.campaigns / elapsed if elapsed else 0.0,
+        "llm_calls_per_campaign": llm.calls / args.campaigns,
+        "analyses_per_campaign": analyses / args.campaigns,
+    }
+    for decision in DECISIONS:
+        row[decision] = int(agent.telemetry.context_insights.value(decision=decision))
+    return row
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaigns", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--generation-mode", choices=["single", "fanout", "fused"], default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--reuse-confidence", type=float, default=0.75)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = [asyncio.run(run(args, insights)) for insights in (False, True)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        common.print_table("Insight store (fake LLM backend, repeated audiences)", results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
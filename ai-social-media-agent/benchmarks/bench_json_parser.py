@@ -0,0 +1,147 @@
+"""Parse success rate and parse time of LLM responses.
+
+Compares the old extraction (``content.find('{')``/``rfind('}')`` followed by
+``json.loads``) with ``utils.json_parser`` on a corpus of post-generation
+responses. The default corpus is synthetic: well-formed answers plus the
+defects seen in practice (prose, code fences, trailing or missing commas,
+Python literals, unescaped quotes, raw newlines, truncation). A recorded
+corpus can be given as JSONL with one ``{"text": ...}`` object per line.
+
+Example::
+
+    python benchmarks/bench_json_parser.py --size 2000
+    python benchmarks/bench_json_parser.py --corpus captured_responses.jsonl
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from collections import defaultdict
+
+import common
+
+
+def _post_document(request, rng):
+    hashtag = "#" + request.campaign_message.split()[1].lower()
+    text = f"{request.campaign_message} Ne maradj le róla, {request.target_audience}!"
+    return {
+        "facebook": {"text": text + " Kövess minket további hírekért!", "hashtags": [hashtag, "#akció"]},
+        "instagram": {"text": text, "hashtags": [hashtag, "#újdonság", "#akció"],
+                      "image_suggestions": ["Termékfotó", "Lifestyle kép"]},
+        "linkedin": {"text": text + " Csatlakozz szakmai közösségünkhöz.", "hashtags": [hashtag]},
+        "x": {"text": text[:200], "hashtags": [hashtag]},
+    }
+
+
+def _truncate(text, rng):
+    return text[:rng.randint(len(text) // 2, len(text) - 2)]
+
+
+DEFECTS = {
+    "clean": lambda text, rng: text,
+    "prose": lambda text, rng: f"Íme a kért posztok:\n{text}\nRemélem, tetszenek!",
+    "code_fence": lambda text, rng: f"```json\n{text}\n```",
+    "trailing_comma": lambda text, rng: re.sub(r'\]\n(\s*)}', '],\n\\1}', text),
+    "missing_comma": lambda text, rng: text.replace('",\n', '"\n', 1),
+    "python_literals": lambda text, rng: text.replace('"', "'").replace("{\n", "{'draft': False,\n", 1),
+    "unescaped_quote": lambda text, rng: text.replace("Ne maradj le róla", 'Ne maradj le a "nagy" akcióról', 1),
+    "raw_newline": lambda text, rng: text.replace(" Kövess", "\nKövess", 1),
+    "truncated": _truncate,
+    "truncated_fence": lambda text, rng: _truncate(f"```json\n{text}\n```", rng),
+}
+
+
+def build_corpus(size, seed):
+    rng = random.Random(seed)
+    requests = common.sample_requests(size)
+    corpus = []
+    for index, request in enumerate(requests):
+        defect = list(DEFECTS)[index % len(DEFECTS)]
+        text = json.dumps(_post_document(request, rng), ensure_ascii=False, indent=2)
+        corpus.append((defect, DEFECTS[defect](text, rng)))
+    return corpus
+
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [("recorded", json.loads(line)["text"]) for line in f if line.strip()]
+
+
+def legacy_parse(content):
+    json_start = content.find('{')
+    json_end = content.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        raise json.JSONDecodeError("No JSON found in response", content, 0)
+    return json.loads(content[json_start:json_end])
+
+
+def current_parse(content):
+    from utils.json_parser import parse_json_response
+    return parse_json_response(content).data
+
+
+def measure(parser, corpus, repeat):
+    from utils.json_parser import recover_platform_posts
+
+    by_defect = defaultdict(lambda: {"parsed": 0, "complete": 0, "total": 0, "seconds": 0.0})
+    timings = []
+    for defect, text in corpus:
+        bucket = by_defect[defect]
+        bucket["total"] += 1
+        started = time.perf_counter()
+        for _ in range(repeat):
+            try:
+                data = parser(text)
+            except json.JSONDecodeError:
+                data = None
+        timings.append((time.perf_counter() - started) / repeat)
+        bucket["seconds"] += timings[-1]
+        if isinstance(data, dict):
+            posts, missing = recover_platform_posts(data)
+            bucket["parsed"] += bool(posts)
+            bucket["complete"] += not missing
+    return by_defect, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="Synthetic corpus size")
+    parser.add_argument("--corpus", help="JSONL file of recorded responses ({\"text\": ...} per line)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per response when timing")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.size, args.seed)
+    summary, per_defect = [], []
+    for name, parse in (("legacy find/rfind", legacy_parse), ("json_parser", current_parse)):
+        by_defect, timings = measure(parse, corpus, args.repeat)
+        total = len(corpus)
+        parsed = sum(bucket["parsed"] for bucket in by_defect.values())
+        complete = sum(bucket["complete"] for bucket in by_defect.values())
+        summary.append({
+            "parser": name,
+            "responses": total,
+            "usable_pct": 100 * parsed / total,
+            "all_platforms_pct": 100 * complete / total,
+            "mean_us": sum(timings) / total * 1e6,
+            "p95_us": common.percentile(timings, 95) * 1e6,
+            "p99_us": common.percentile(timings, 99) * 1e6,
+        })
+        for defect, bucket in by_defect.items():
+            per_defect.append({
+                "parser": name,
+                "defect": defect,
+                "usable_pct": 100 * bucket["parsed"] / bucket["total"],
+                "all_platforms_pct": 100 * bucket["complete"] / bucket["total"],
+                "mean_us": bucket["seconds"] / bucket["total"] * 1e6,
+            })
+
+    common.print_table("JSON extraction: success rate and parse time", summary)
+    common.print_table("By defect", per_defect)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
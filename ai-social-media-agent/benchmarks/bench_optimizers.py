@@ -0,0 +1,101 @@
+"""Throughput of the platform optimizers (the optimize_posts workflow stage).
+
+Runs ``PlatformOptimizer.optimize_many`` for each platform on a synthetic
+corpus of generated posts: emojis, a link in the text, duplicated and
+malformed hashtags, one-block texts to lay out and some posts over the
+platform limits. Every post is optimized ``--repeat`` times and the best
+run is reported, so the numbers show the CPU cost of the stage rather than
+scheduling noise. The stage needs no LLM call; the target is at least
+10,000 posts per second per platform on one core, and the run fails when a
+platform stays below ``--min-posts-per-s``.
+
+Example::
+
+    python benchmarks/bench_optimizers.py --size 2000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+
+import common
+
+_SENTENCES = [
+    "Ne maradj le róla!", "Ez az ajánlat csak rövid ideig érvényes.", "Csatlakozz a közösségünkhöz! 🙌",
+    "Kérdésed van? Írj nekünk bátran.", "Oszd meg azokkal, akiket érdekelhet! 🎉", "Kövess minket további hírekért.",
+]
+_EMOJIS = ["🎮", "🔥", "🚀", "😎", "👍🏽", "🇭🇺"]
+_HASHTAGS = ["#akció", "#újdonság", "# tech news", "#Akció", "#2024", "kedvezmény", "#gaming", "#laptop"]
+
+
+def build_corpus(size, seed):
+    """Generated posts with the defects the optimizers fix; one in ten is far over every limit."""
+    rng = random.Random(seed)
+    corpus = []
+    for index, request in enumerate(common.sample_requests(size)):
+        sentences = [request.campaign_message + " " + rng.choice(_EMOJIS)]
+        sentences += rng.sample(_SENTENCES, rng.randint(2, 5))
+        sentences.insert(rng.randint(1, len(sentences)), f"Nézd meg itt: https://shop.example.hu/termek/{index}.")
+        if index % 10 == 0:
+            sentences *= 4
+        corpus.append({"text": " ".join(sentences), "hashtags": rng.sample(_HASHTAGS, rng.randint(2, 7)),
+                       "use_emojis": request.use_emojis})
+    return corpus
+
+
+def measure(optimizer, corpus, repeat):
+    by_emojis = {flag: [{"text": post["text"], "hashtags": post["hashtags"]} for post in corpus
+                        if post["use_emojis"] == flag] for flag in (True, False)}
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for use_emojis, posts in by_emojis.items():
+            optimizer.optimize_many(posts, use_emojis)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000, help="Posts per platform")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs over the corpus; the fastest is reported")
+    parser.add_argument("--min-posts-per-s", type=float, default=10000,
+                        help="Fail when a platform is slower than this (0: report only)")
+    args = parser.parse_args(argv)
+
+    from agents.platform_optimizers import build_optimizers
+    from services.post_constraints import published_length
+
+    corpus = build_corpus(args.size, args.seed)
+    results, total_seconds = [], 0.0
+    for platform, optimizer in build_optimizers().items():
+        seconds = measure(optimizer, corpus, args.repeat)
+        total_seconds += seconds
+        optimized = [optimizer.optimize(post, post["use_emojis"]) for post in corpus]
+        results.append({
+            "platform": platform,
+            "posts": len(corpus),
+            "posts_per_s": len(corpus) / seconds,
+            "us_per_post": seconds / len(corpus) * 1e6,
+            "within_limits_pct": 100 * sum(published_length(platform, post) <= optimizer.limits["max_chars"]
+                                           for post in optimized) / len(corpus),
+        })
+    results.append({
+        "platform": "all",
+        "posts": len(corpus) * len(results),
+        "posts_per_s": len(corpus) * len(results) / total_seconds,
+        "us_per_post": total_seconds / (len(corpus) * len(results)) * 1e6,
+        "within_limits_pct": sum(row["within_limits_pct"] for row in results) / len(results),
+    })
+
+    common.print_table("Platform optimizers: throughput on one core", results)
+    slow = [f"{row['platform']} ({row['posts_per_s']:.0f})" for row in results[:-1]
+            if row["posts_per_s"] < args.min_posts_per_s]
+    if slow:
+        raise SystemExit(f"Below {args.min_posts_per_s:.0f} posts/s: {', '.join(slow)}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Batch throughput in one event loop versus several worker processes.
+
+Runs the same campaigns with ``SocialMediaAgent.process_batch`` in this
+process and with ``process_batch_in_processes`` for each ``--processes``
+count, on the fake LLM backend. With little simulated LLM latency the run is
+bound by the CPU work per campaign (prompt building, JSON parsing, pydantic
+validation), which is what extra processes spread over the cores; process
+start-up is included in the wall time. Set ``--rpm`` to check that the
+processes together stay within one shared rate limit.
+
+Example::
+
+    python benchmarks/bench_processes.py --campaigns 400 --processes 2 4 8 --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import common
+
+
+def run_in_process(requests, args) -> list:
+    from agents.factory import close_shared_instances, get_agent
+
+    async def run():
+        try:
+            with common.quiet(not args.verbose):
+                return await get_agent(args.generation_mode).process_batch(requests, max_concurrency=args.concurrency)
+        finally:
+            await close_shared_instances()
+
+    return asyncio.run(run())
+
+
+def run_in_processes(requests, processes: int, args):
+    from agents.process_pool import process_batch_in_processes
+
+    with common.quiet(not args.verbose):
+        return process_batch_in_processes(requests, processes, args.concurrency, args.generation_mode)
+
+
+def measure(label: str, processes: int, runner, campaigns: int) -> dict:
+    started, cpu_started = time.perf_counter(), os.times()
+    results = runner()
+    elapsed, cpu = time.perf_counter() - started, os.times()
+    # Children's CPU time is counted once they have been joined
+    cpu_seconds = sum(cpu[:4]) - sum(cpu_started[:4])
+    return {
+        "mode": label,
+        "processes": processes,
+        "campaigns": campaigns,
+        "ok": sum(1 for item in results if item["status"] == "success"),
+        "wall_s": elapsed,
+        "campaigns_per_s": campaigns / elapsed if elapsed else 0.0,
+        "cpu_s": cpu_seconds,
+        "cpu_ms_per_campaign": cpu_seconds / campaigns * 1000,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--campaigns", type=int, default=200)
+    parser.add_argument("--processes", type=int, nargs="+", default=[2, os.cpu_count() or 1])
+    parser.add_argument("--concurrency", type=int, default=20, help="Campaigns in flight per process")
+    parser.add_argument("--generation-mode", choices=["single", "fanout", "fused"], default=None)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Median time to first token")
+    parser.add_argument("--rpm", type=float, default=0, help="Requests per minute shared by all processes (0: unlimited)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the workflow's console output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Worker processes are spawned and read their configuration from the environment
+    os.environ.update({
+        "FAKE_LLM_LATENCY_DISTRIBUTION": "fixed",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": "0",
+        "RATE_LIMIT_RPM": str(args.rpm),
+        "SEMANTIC_CACHE_ENABLED": "false",
+    })
+    requests = common.sample_requests(args.campaigns)
+    results = [measure("event loop", 1, lambda: run_in_process(requests, args), args.campaigns)]
+    for processes in sorted(set(args.processes)):
+        results.append(measure("processes", processes, lambda: run_in_processes(requests, processes, args),
+                               args.campaigns))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        common.print_table(f"Batch throughput ({os.cpu_count()} CPUs, fake LLM backend)", results)
+    return results
+
+
+if __name__ == "__main__":
+    main()
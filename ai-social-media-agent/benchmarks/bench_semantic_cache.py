@@ -0,0 +1,141 @@
+"""Lookup cost and hit rate of the semantic cache at scale.
+
+Fills a ``SemanticCache`` with synthetic campaigns (products, offers,
+audiences, tones and discounts combined) and then queries it with reworded
+copies of cached campaigns and with unseen ones. Reports the insert and
+lookup cost (embedding + nearest-neighbour search, and the search alone),
+the memory of the vector index and the hit/seed/miss mix. An exact-match
+cache would miss every reworded query.
+
+Example::
+
+    python benchmarks/bench_semantic_cache.py --entries 100000 --queries 2000
+"""
+
+import argparse
+import json
+import random
+import time
+
+import common
+
+_PRODUCTS = ["gaming laptop", "okosóra", "kávéfőző", "futócipő", "e-book olvasó", "fülhallgató", "gaming egér",
+             "porszívó", "hátizsák", "sátor", "kerékpár", "napszemüveg", "mechanikus billentyűzet", "monitor",
+             "robotporszívó", "táblagép", "akciókamera", "hangszóró", "kerti grill", "jógamatrac"]
+_TEMPLATES = [
+    "Új {product} kollekciónk most {discount}% kedvezménnyel kapható!",
+    "Ismerd meg az új {product} modellünket, most {discount}% kedvezménnyel!",
+    "Itt az új {product}: rendeld meg ma {discount}% kedvezménnyel és ingyenes szállítással!",
+    "Limitált kiadású {product} érkezett, az első napokban {discount}% engedménnyel.",
+]
+# Rewordings of the first template: same campaign, different words or order
+_REWORDINGS = [
+    "Most {discount}% kedvezménnyel kapható az új {product} kollekciónk!",
+    "új {product} kollekciónk most {discount}% kedvezménnyel kapható",
+    "Új {product} kollekciónk most {discount}% kedvezménnyel kapható!!",
+]
+_AUDIENCES = ["25-35 éves hobby gamerek", "fiatal szakemberek", "egyetemisták", "kisgyermekes szülők",
+              "nyugdíjasok", "sportolók", "kreatív szabadúszók", "kisvállalkozók"]
+_TONES = ["professional", "friendly", "casual", "humorous", "formal"]
+_POSTS = {"x": {"text": "Minta poszt", "hashtags": ["#minta"]}}
+
+
+def synthetic_campaigns(count: int, rng: random.Random):
+    campaigns = []
+    for _ in range(count):
+        campaigns.append({
+            "product": rng.choice(_PRODUCTS),
+            "template": rng.randrange(len(_TEMPLATES)),
+            "discount": rng.randrange(5, 60),
+            "audience": rng.choice(_AUDIENCES),
+            "tone": rng.choice(_TONES),
+            "use_emojis": rng.random() < 0.5,
+        })
+    return campaigns
+
+
+def message(campaign, template=None) -> str:
+    return (template or _TEMPLATES[campaign["template"]]).format(**campaign)
+
+
+def run(args) -> dict:
+    from services.semantic_cache import SemanticCache, campaign_group, embed_campaign
+
+    rng = random.Random(args.seed)
+    cache = SemanticCache(threshold=args.threshold, seed_threshold=args.seed_threshold,
+                          max_entries=args.entries, dimensions=args.dimensions)
+    campaigns = synthetic_campaigns(args.entries, rng)
+
+    started = time.perf_counter()
+    for campaign in campaigns:
+        cache.add(message(campaign), campaign["audience"], campaign["tone"], campaign["use_emojis"], _POSTS)
+    insert_seconds = time.perf_counter() - started
+
+    # Half the queries reword a cached campaign (first template), half are unseen products
+    queries = []
+    for index in range(args.queries):
+        if index % 2 == 0:
+            campaign = dict(rng.choice(campaigns), template=0)
+            cache.add(message(campaign), campaign["audience"], campaign["tone"], campaign["use_emojis"], _POSTS)
+            queries.append((message(campaign, rng.choice(_REWORDINGS)), campaign))
+        else:
+            campaign = dict(rng.choice(campaigns), product=f"új termék {index}")
+            queries.append((message(campaign), campaign))
+
+    hits_before, seeds_before, misses_before = cache.hits, cache.seeds, cache.misses
+    lookup_times, search_times = [], []
+    for text, campaign in queries:
+        started = time.perf_counter()
+        cache.lookup(text, campaign["audience"], campaign["tone"], campaign["use_emojis"])
+        lookup_times.append(time.perf_counter() - started)
+
+        vector = embed_campaign(cache.embedder, text, campaign["audience"])
+        group = campaign_group(text, campaign["tone"], campaign["use_emojis"])
+        started = time.perf_counter()
+        cache.index.search(vector, group)
+        search_times.append(time.perf_counter() - started)
+
+    index = cache.index
+    index_bytes = sum(array.nbytes for array in (index._vectors, index._groups, index._expires,
+                                                 index._last_used, index._live))
+    lookup = common.latency_summary(lookup_times)
+    search = common.latency_summary(search_times)
+    return {
+        "entries": len(cache.index),
+        "dimensions": args.dimensions,
+        "insert_us": insert_seconds / args.entries * 1e6,
+        "lookup_p50_ms": lookup["p50_ms"],
+        "lookup_p95_ms": lookup["p95_ms"],
+        "lookup_p99_ms": lookup["p99_ms"],
+        "search_p50_ms": search["p50_ms"],
+        "index_mb": index_bytes / 2**20,
+        "reworded_hit_rate": (cache.hits - hits_before) / (len(queries) / 2),
+        "seeds": cache.seeds - seeds_before,
+        "misses": cache.misses - misses_before,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--threshold", type=float, default=0.93)
+    parser.add_argument("--seed-threshold", type=float, default=0.85)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        common.print_table("Semantic cache (synthetic campaigns)", [result])
+    return result
+
+
+if __name__ == "__main__":
+    main()
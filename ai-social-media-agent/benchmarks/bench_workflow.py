@@ -0,0 +1,155 @@
+"""End-to-end workflow benchmark on the fake LLM backend.
+
+Drives complete campaigns through the LangGraph workflow and reports latency
+percentiles, throughput and memory per campaign, followed by a per-node and
+per-LLM-call latency breakdown from the workflow telemetry. Two scenarios:
+
+* ``oneshot`` - ``SocialMediaAgent.process_request`` (analysis + generation)
+* ``session`` - ``WorkflowRunner``: run until feedback, one refinement, finalize
+
+Example::
+
+    python benchmarks/bench_workflow.py --campaigns 200 --concurrency 20 \\
+        --latency-ms 150 --error-rate 0.02 --malformed-rate 0.05
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+import common
+
+
+async def _timed(semaphore, coro_factory, request):
+    async with semaphore:
+        started = time.perf_counter()
+        result = await coro_factory(request)
+        return time.perf_counter() - started, result
+
+
+async def _oneshot(agent, request):
+    result = await agent.process_request(request)
+    return "error" not in result
+
+
+async def _session(agent, request):
+    runner = await agent.process_with_feedback(request)
+    ready = await runner.run_until_feedback()
+    if ready.get("status") != "awaiting_feedback":
+        return False
+    refined = await runner.provide_feedback("Legyen rövidebb és személyesebb")
+    if refined.get("status") == "error":
+        return False
+    final = await runner.finalize()
+    return final.get("status") == "completed"
+
+
+SCENARIOS = {"oneshot": _oneshot, "session": _session}
+
+
+def build_agent(args):
+    from agents.social_media_agent import SocialMediaAgent
+    from services.ai_service import AIService
+    from services.llm_backends import FakeChatModel, FakeLLMConfig
+    from services.rate_limiter import RateLimiter
+    from services.telemetry import Telemetry
+
+    llm = FakeChatModel(FakeLLMConfig(
+        seed=args.seed,
+        latency_distribution=args.latency_distribution,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        malformed_json_rate=args.malformed_rate
+    ))
+    limiter = RateLimiter(args.rpm, args.tpm) if args.rpm or args.tpm else None
+    # A fresh registry per scenario, so the breakdown only covers this run
+    telemetry = Telemetry()
+    with common.quiet(not args.verbose):
+        ai_service = AIService(llm=llm, rate_limiter=limiter, telemetry=telemetry)
+        agent = SocialMediaAgent(generation_mode=args.generation_mode, ai_service=ai_service, telemetry=telemetry)
+    return agent, llm
+
+
+async def run_scenario(name: str, args) -> tuple:
+    agent, llm = build_agent(args)
+    requests = common.sample_requests(args.campaigns)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    scenario = SCENARIOS[name]
+
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    with common.quiet(not args.verbose):
+        outcomes = await asyncio.gather(*(
+            _timed(semaphore, lambda request: scenario(agent, request), request) for request in requests
+        ))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = [latency for latency, _ in outcomes]
+    tokens = agent.ai_service.token_accounting.stats().values()
+    succeeded = sum(1 for _, ok in outcomes if ok)
+    in_flight = min(args.concurrency, args.campaigns)
+    return {
+        "scenario": name,
+        "mode": agent.generation_mode,
+        "campaigns": args.campaigns,
+        "ok": succeeded,
+        **common.latency_summary(latencies),
+        "campaigns_per_s": args.campaigns / elapsed if elapsed else 0.0,
+        "llm_calls": llm.calls,
+        "llm_errors": llm.errors,
+        "malformed": llm.malformed,
+        "retries": agent.ai_service.retries,
+        "fallbacks": agent.ai_service.fallbacks,
+        "prompt_tokens_per_campaign": sum(t["prompt_tokens"] for t in tokens) / args.campaigns,
+        "completion_tokens_per_campaign": sum(t["completion_tokens"] for t in tokens) / args.campaigns,
+        "peak_kb_per_campaign": (peak - baseline) / in_flight / 1024,
+        "retained_kb_per_campaign": max(retained - baseline, 0) / args.campaigns / 1024,
+    }, agent.telemetry.latency_summary()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--campaigns", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--generation-mode", choices=["single", "fanout", "fused"], default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Median time to first token")
+    parser.add_argument("--latency-spread", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=float, default=0, help="Requests per minute limit (0: unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="Tokens per minute limit (0: unlimited)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the workflow's console output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    runs = [asyncio.run(run_scenario(name, args)) for name in names]
+    results = [result for result, _ in runs]
+    if args.json:
+        print(json.dumps([{**result, "breakdown": breakdown} for result, breakdown in runs], indent=2))
+    else:
+        common.print_table("Workflow benchmark (fake LLM backend)", results)
+        for result, breakdown in runs:
+            common.print_table(f"Latency breakdown: {result['scenario']} (histogram estimates)", breakdown)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Shared helpers for the offline benchmarks.
+
+The benchmarks run against the deterministic fake LLM backend, so they need
+no API key and give repeatable numbers. Import this module before anything
+from src/: it puts src/ on the import path and selects the fake backend and
+in-memory checkpoints, with caching, the insight store and rate limits
+off, unless the environment says otherwise.
+"""
+
+import contextlib
+import io
+import math
+import os
+import statistics
+import sys
+from typing import Dict, Iterator, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("INSIGHT_STORE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_RPM", "0")
+os.environ.setdefault("RATE_LIMIT_TPM", "0")
+
+_PRODUCTS = ["gaming laptop", "okosóra", "kávéfőző", "futócipő", "e-book olvasó", "vezeték nélküli fülhallgató"]
+_OFFERS = ["20% kedvezménnyel", "ingyenes szállítással", "limitált kiadásban", "2 az 1-ben akcióval"]
+_AUDIENCES = ["25-35 éves hobby gamerek", "fiatal szakemberek", "egyetemisták", "kisgyermekes szülők"]
+_TONES = ["professional", "friendly", "casual", "humorous", "formal"]
+
+
+def sample_requests(count: int) -> List:
+    """Build ``count`` distinct, reproducible campaign requests."""
+    from models.request_models import SocialMediaRequest, ToneType
+
+    requests = []
+    for index in range(count):
+        product = _PRODUCTS[index % len(_PRODUCTS)]
+        offer = _OFFERS[(index // len(_PRODUCTS)) % len(_OFFERS)]
+        requests.append(SocialMediaRequest(
+            campaign_message=f"Új {product} kollekciónk most {offer} kapható! (#{index + 1})",
+            target_audience=_AUDIENCES[index % len(_AUDIENCES)],
+            tone=ToneType(_TONES[index % len(_TONES)]),
+            use_emojis=index % 2 == 0
+        ))
+    return requests
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of latencies given in seconds, reported in milliseconds."""
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": (statistics.fmean(latencies) if latencies else 0.0) * 1000,
+        "max_ms": (max(latencies) if latencies else 0.0) * 1000,
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True) -> Iterator[None]:
+    """Swallow the workflow's console output while measuring."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def print_table(title: str, rows: List[Dict[str, object]]):
+    """Print a list of flat dicts as an aligned text table."""
+    print(f"\n{title}")
+    if not rows:
+        print("  (no results)")
+        return
+    columns = list(rows[0].keys())
+    cells = [[_format(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  " + "  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  " + "  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.1f}" if abs(value) >= 10 else f"{value:.3f}"
+    return str(value)
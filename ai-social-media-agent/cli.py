@@ -8,27 +8,217 @@ import asyncio
 import json
 import argparse
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from src.models.request_models import SocialMediaRequest, ToneType
-from src.agents.social_media_agent import SocialMediaAgent
+# Add src directory to Python path so the package imports match src/app.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from models.request_models import SocialMediaRequest, ToneType
+from agents.factory import close_shared_instances, get_agent
+from agents.social_media_agent import GENERATION_MODES
+from config.settings import settings
+from services.telemetry import default_telemetry
+from utils.console_trace import console_trace
 
 def check_environment():
     """Check if required environment variables are set."""
-    if not os.getenv("GROQ_API_KEY"):
+    if os.getenv("LLM_BACKEND", "groq").lower() == "groq" and not os.getenv("GROQ_API_KEY"):
         print("Error: GROQ_API_KEY environment variable is required")
         print("Get your free API key from: https://console.groq.com/")
         return False
     return True
 
+def load_batch_requests(path):
+    """Read a JSONL campaign file.
+    
+    Returns a list with one entry per non-empty line: either a SocialMediaRequest
+    or the error message explaining why the line could not be parsed.
+    """
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(SocialMediaRequest(**json.loads(line)))
+            except Exception as e:
+                entries.append(f"Invalid request on line {line_number}: {e}")
+    return entries
+
+async def stream_single_request(agent, request):
+    """Print each platform's post text as it streams in and return the final result."""
+    current_platform = None
+    result = {"error": "No result generated"}
+    
+    async for event in agent.stream_request(request):
+        if event["type"] == "post_delta":
+            if event["platform"] != current_platform:
+                current_platform = event["platform"]
+                print(f"\n\n📱 {current_platform.upper()}:", flush=True)
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "result":
+            result = event["result"]
+    
+    print()
+    return result
+
+async def run_batch(args):
+    """Process a JSONL file of campaigns through one shared agent."""
+    entries = load_batch_requests(args.input)
+    valid = [(i, entry) for i, entry in enumerate(entries) if isinstance(entry, SocialMediaRequest)]
+    
+    print(f"📦 Loaded {len(entries)} campaigns from {args.input} ({len(valid)} valid)")
+    print(f"⏳ Processing with concurrency {args.concurrency}...")
+    
+    if args.processes > 1:
+        from agents.process_pool import process_batch_in_processes
+        print(f"🧵 Using {args.processes} worker processes ({args.concurrency} campaigns each)")
+        batch_results = await asyncio.to_thread(process_batch_in_processes, [request for _, request in valid],
+                                                args.processes, args.concurrency)
+    else:
+        agent = get_agent()
+        batch_results = await agent.process_batch([request for _, request in valid], max_concurrency=args.concurrency)
+    
+    results = [
+        {"index": i, "status": "error", "error": entry} if isinstance(entry, str) else None
+        for i, entry in enumerate(entries)
+    ]
+    for (i, _), item in zip(valid, batch_results):
+        results[i] = {**item, "index": i}
+    
+    succeeded = sum(1 for item in results if item["status"] == "success")
+    print(f"\n✅ {succeeded}/{len(results)} campaigns succeeded")
+    for item in results:
+        if item["status"] == "error":
+            print(f"❌ Campaign {item['index']}: {item['error']}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for item in results:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        print(f"\n💾 Results saved to: {args.output}")
+    else:
+        for item in results:
+            print(json.dumps(item, ensure_ascii=False))
+    
+    return 0 if succeeded == len(results) else 1
+
+async def run_jobs(args):
+    """Submit campaigns to the durable job queue, inspect jobs or run workers."""
+    from agents.job_worker import run_worker_processes, serve_worker
+    from services.job_queue import build_job_queue
+    
+    if args.jobs_command == 'work':
+        print(f"👷 Starting {args.workers} worker process(es) on {settings.job_queue_path}", file=sys.stderr)
+        if args.workers > 1:
+            # Each spawned process runs its own event loop; this one only waits for them
+            outcomes = await asyncio.to_thread(run_worker_processes, args.workers, args.concurrency, args.drain)
+        else:
+            outcomes = await serve_worker(concurrency=args.concurrency, drain=args.drain)
+        print(f"👷 Workers stopped: {json.dumps(outcomes)}")
+        return 0
+    
+    queue = build_job_queue()
+    try:
+        if args.jobs_command == 'submit':
+            entries = load_batch_requests(args.file)
+            invalid = [entry for entry in entries if isinstance(entry, str)]
+            for error in invalid:
+                print(f"❌ {error}")
+            if invalid:
+                return 1
+            job_ids = queue.submit_many([entry.model_dump(mode='json') for entry in entries], tenant=args.tenant,
+                                        priority=args.priority, generation_mode=args.mode,
+                                        max_attempts=args.max_attempts)
+            print(f"📥 Queued {len(job_ids)} jobs for tenant {args.tenant} (priority {args.priority})", file=sys.stderr)
+            for job_id in job_ids:
+                print(job_id)
+            return 0
+        
+        if args.jobs_command in ('status', 'result'):
+            job = queue.get(args.job_id)
+            while args.jobs_command == 'result' and args.wait and job and job.status in ('queued', 'running'):
+                await asyncio.sleep(settings.job_poll_interval)
+                job = queue.get(args.job_id)
+            if job is None:
+                print(f"❌ Unknown job: {args.job_id}")
+                return 1
+            if args.jobs_command == 'status':
+                print(json.dumps(job.to_dict(include_result=False), indent=2, ensure_ascii=False))
+                return 0
+            if job.status != 'succeeded':
+                print(f"❌ Job {job.id} is {job.status}" + (f": {job.error}" if job.error else ""))
+                return 1
+            print(json.dumps(job.result, indent=2, ensure_ascii=False))
+            return 0
+        
+        if args.jobs_command == 'list':
+            for job in queue.list(status=args.status, tenant=args.tenant, limit=args.limit):
+                print(json.dumps(job.to_dict(include_result=False), ensure_ascii=False))
+            return 0
+        
+        if args.jobs_command == 'stats':
+            print(json.dumps(queue.stats(), indent=2, ensure_ascii=False))
+            return 0
+        
+        if args.jobs_command == 'requeue':
+            count = queue.requeue(args.job_id, status=args.status)
+            print(f"🔁 Requeued {count} jobs")
+            return 0 if count else 1
+        
+        if args.jobs_command == 'cancel':
+            if not queue.cancel(args.job_id):
+                print(f"❌ Job {args.job_id} is not queued")
+                return 1
+            print(f"🛑 Cancelled {args.job_id}")
+            return 0
+    finally:
+        queue.close()
+
+def add_jobs_parser(subparsers):
+    jobs = subparsers.add_parser('jobs', help='Durable job queue: submit campaigns, check results, run workers')
+    commands = jobs.add_subparsers(dest='jobs_command', required=True)
+    
+    submit = commands.add_parser('submit', help='Queue every campaign of a JSONL file as a job')
+    submit.add_argument('file', help='JSONL file of campaigns')
+    submit.add_argument('--tenant', default='default', help='Tenant the jobs are scheduled fairly for')
+    submit.add_argument('--priority', type=int, default=0, help='Higher priorities run first')
+    submit.add_argument('--max-attempts', type=int, help=f'Attempts before a job is dead-lettered (default {settings.job_max_attempts})')
+    submit.add_argument('--mode', choices=GENERATION_MODES, help='Generation mode (default: GENERATION_MODE)')
+    
+    status = commands.add_parser('status', help='Show the state of a job')
+    status.add_argument('job_id')
+    result = commands.add_parser('result', help='Print the posts of a finished job')
+    result.add_argument('job_id')
+    result.add_argument('--wait', action='store_true', help='Wait until the job has finished')
+    
+    listing = commands.add_parser('list', help='List recent jobs')
+    listing.add_argument('--status', choices=['queued', 'running', 'succeeded', 'dead', 'cancelled'])
+    listing.add_argument('--tenant')
+    listing.add_argument('--limit', type=int, default=20)
+    commands.add_parser('stats', help='Job counts by status and tenant')
+    
+    requeue = commands.add_parser('requeue', help='Queue dead-lettered jobs again')
+    requeue.add_argument('job_id', nargs='?', help='One job (default: all dead jobs)')
+    requeue.add_argument('--status', choices=['dead', 'cancelled'], default='dead')
+    cancel = commands.add_parser('cancel', help='Cancel a job that has not started')
+    cancel.add_argument('job_id')
+    
+    work = commands.add_parser('work', help='Run workers until interrupted')
+    work.add_argument('--workers', '-w', type=int, default=1, help='Worker processes')
+    work.add_argument('--concurrency', '-c', type=int, help=f'Jobs per process (default {settings.job_worker_concurrency})')
+    work.add_argument('--drain', action='store_true', help='Stop once no job is queued or running')
+
 async def main():
     parser = argparse.ArgumentParser(description='AI Social Media Agent CLI')
-    parser.add_argument('--message', '-m', required=True, 
+    parser.add_argument('--message', '-m',
                        help='Campaign message (1-2 sentences)')
-    parser.add_argument('--audience', '-a', required=True,
+    parser.add_argument('--audience', '-a',
                        help='Target audience description')
     parser.add_argument('--tone', '-t', 
                        choices=[tone.value for tone in ToneType],
@@ -37,14 +227,45 @@ async def main():
     parser.add_argument('--no-emojis', action='store_true',
                        help='Disable emoji usage')
     parser.add_argument('--output', '-o', 
-                       help='Output file for JSON result')
+                       help='Output file for JSON result (JSONL in batch mode)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Print post text progressively while it is generated')
+    parser.add_argument('--input', '-i',
+                       help='JSONL file of campaigns to process as a batch')
+    parser.add_argument('--concurrency', '-c', type=int, default=5,
+                       help='Maximum number of campaigns processed concurrently in batch mode')
+    parser.add_argument('--processes', '-p', type=int, default=1,
+                       help='Worker processes for batch mode, each running --concurrency campaigns (default 1)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Print every workflow step, prompt and LLM response (also in batch mode)')
+    add_jobs_parser(parser.add_subparsers(dest='command'))
     
     args = parser.parse_args()
     
+    if args.command == 'jobs':
+        if args.verbose:
+            console_trace.set_verbosity("verbose")
+        if args.jobs_command == 'work' and not check_environment():
+            return 1
+        return await run_jobs(args)
+    
+    if not args.input and (not args.message or not args.audience):
+        parser.error('--message and --audience are required unless --input is given')
+    
+    if args.verbose:
+        console_trace.set_verbosity("verbose")
+    
     # Check environment variables
     if not check_environment():
         return 1
     
+    if args.input:
+        try:
+            return await run_batch(args)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
     try:
         # Create request
         request = SocialMediaRequest(
@@ -60,8 +281,11 @@ async def main():
         print("⏳ Processing...")
         
         # Initialize agent and process
-        agent = SocialMediaAgent()
-        result = await agent.process_request(request)
+        agent = get_agent()
+        if args.stream:
+            result = await stream_single_request(agent, request)
+        else:
+            result = await agent.process_request(request)
         
         if "error" in result:
             print(f"❌ Error: {result['error']}")
@@ -86,5 +310,20 @@ async def main():
         print(f"❌ Error: {e}")
         return 1
 
+def export_metrics():
+    """Write the run's metrics in Prometheus text format when TELEMETRY_METRICS_PATH is set."""
+    if settings.telemetry_metrics_path:
+        with open(settings.telemetry_metrics_path, 'w', encoding='utf-8') as f:
+            f.write(default_telemetry().registry.render())
+        print(f"📈 Metrics saved to: {settings.telemetry_metrics_path}")
+
+async def run_cli():
+    try:
+        return await main()
+    finally:
+        export_metrics()
+        await close_shared_instances()
+
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
\ No newline at end of file
+    exit_code = asyncio.run(run_cli())
+    sys.exit(exit_code)
\ No newline at end of file
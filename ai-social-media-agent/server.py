@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+HTTP API server for the AI Social Media Agent
+Serves the ASGI app from src/api with uvicorn
+"""
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src directory to Python path so the package imports match src/app.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+import uvicorn
+
+from api.server import create_app
+from config.settings import settings
+from cli import check_environment
+
+def main():
+    parser = argparse.ArgumentParser(description='AI Social Media Agent HTTP API')
+    parser.add_argument('--host', default=settings.api_host,
+                       help='Interface to listen on')
+    parser.add_argument('--port', '-p', type=int, default=settings.api_port,
+                       help='Port to listen on')
+    args = parser.parse_args()
+    
+    if not check_environment():
+        return 1
+    
+    # One process, one event loop: the shared agents and connection pool are bound to it.
+    # Scale out with more processes behind the load balancer.
+    uvicorn.run(
+        create_app(),
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=settings.api_shutdown_timeout,
+        log_level="info"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Application types stored in WorkflowState that checkpoints may deserialize
+CHECKPOINT_MODEL_TYPES = [
+    ("models.request_models", "ToneType"),
+    ("models.request_models", "SocialMediaRequest"),
+    ("models.request_models", "PlatformPost"),
+    ("models.request_models", "SocialMediaResponse"),
+    ("models.request_models", "WorkflowState"),
+]
+
+
+def make_checkpoint_serializer() -> JsonPlusSerializer:
+    """Serializer that is allowed to restore the workflow's pydantic models."""
+    return JsonPlusSerializer(allowed_msgpack_modules=CHECKPOINT_MODEL_TYPES)
+
+
+class CheckpointStore(ABC):
+    """Durable append-only log of serialized checkpoint records per workflow thread.
+
+    Savers only ever add the records of a new checkpoint or write, so the
+    cost of a put does not grow with the length of the session, and a
+    reader catches up by fetching the records after its last ``position``.
+    """
+
+    @abstractmethod
+    def load(self, thread_id: str, position: int = 0) -> Tuple[List[str], int]:
+        """Return the thread's records after ``position`` and the position to continue from."""
+
+    @abstractmethod
+    def append(self, thread_id: str, records: List[str]) -> None:
+        """Add records to the thread's log."""
+
+    @abstractmethod
+    def delete(self, thread_id: str) -> None:
+        """Forget the thread."""
+
+    @abstractmethod
+    def list_threads(self) -> List[str]:
+        """Return every stored thread ID."""
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoint store in a single SQLite file, shareable by workers on the same host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode, so writers take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workflow_checkpoint_records ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, thread_id TEXT NOT NULL, record TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS workflow_checkpoint_records_thread ON workflow_checkpoint_records (thread_id, seq)"
+        )
+
+    def load(self, thread_id: str, position: int = 0) -> Tuple[List[str], int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, record FROM workflow_checkpoint_records WHERE thread_id = ? AND seq > ? ORDER BY seq",
+                (thread_id, position)
+            ).fetchall()
+        return [row[1] for row in rows], rows[-1][0] if rows else position
+
+    def append(self, thread_id: str, records: List[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO workflow_checkpoint_records (thread_id, record, created_at) VALUES (?, ?, ?)",
+                    [(thread_id, record, now) for record in records]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM workflow_checkpoint_records WHERE thread_id = ?", (thread_id,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_threads(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id FROM workflow_checkpoint_records GROUP BY thread_id ORDER BY MAX(seq)"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class JSONFileCheckpointStore(CheckpointStore):
+    """Checkpoint store with one JSON-lines file per thread in a directory.
+
+    Records are appended with a single write in append mode, and positions
+    are byte offsets, so readers only parse what was added since their
+    last visit and never see a half-written line.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, thread_id: str) -> str:
+        if not thread_id or os.sep in thread_id or thread_id.startswith("."):
+            raise ValueError(f"Invalid thread ID for file storage: {thread_id!r}")
+        return os.path.join(self.directory, f"{thread_id}.jsonl")
+
+    def load(self, thread_id: str, position: int = 0) -> Tuple[List[str], int]:
+        try:
+            with open(self._path(thread_id), "rb") as f:
+                f.seek(position)
+                data = f.read()
+        except FileNotFoundError:
+            return [], position
+        complete = data[:data.rfind(b"\n") + 1]
+        return complete.decode("utf-8").splitlines(), position + len(complete)
+
+    def append(self, thread_id: str, records: List[str]) -> None:
+        with open(self._path(thread_id), "a", encoding="utf-8") as f:
+            f.write("".join(f"{record}\n" for record in records))
+
+    def delete(self, thread_id: str) -> None:
+        try:
+            os.remove(self._path(thread_id))
+        except FileNotFoundError:
+            pass
+
+    def list_threads(self) -> List[str]:
+        return sorted(name[:-len(".jsonl")] for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+
+def _encode_typed(value) -> List[str]:
+    type_name, data = value
+    return [type_name, base64.b64encode(data).decode("ascii")]
+
+
+def _decode_typed(value) -> tuple:
+    type_name, data = value
+    return (type_name, base64.b64decode(data))
+
+
+class PersistentCheckpointSaver(InMemorySaver):
+    """LangGraph checkpointer that writes every checkpoint through to a CheckpointStore.
+
+    The in-memory structures of InMemorySaver act as a working copy: each
+    operation first applies the records other processes sharing the store
+    have added since, and every put appends only its own new records.
+    """
+
+    def __init__(self, store: CheckpointStore):
+        super().__init__(serde=make_checkpoint_serializer())
+        self.store = store
+        self._thread_lock = threading.RLock()
+        # Store position up to which each thread's records are applied to the working copy
+        self._positions: Dict[str, int] = {}
+
+    # Records of one thread's slice of the in-memory structures
+
+    def _catch_up(self, thread_id: str):
+        records, self._positions[thread_id] = self.store.load(thread_id, self._positions.get(thread_id, 0))
+        for record in records:
+            kind, *fields = json.loads(record)
+            if kind == "checkpoint":
+                checkpoint_ns, checkpoint_id, checkpoint, metadata, parent_id = fields
+                self.storage[thread_id][checkpoint_ns][checkpoint_id] = (
+                    _decode_typed(checkpoint), _decode_typed(metadata), parent_id
+                )
+            elif kind == "write":
+                checkpoint_ns, checkpoint_id, task_id, idx, channel, value, task_path = fields
+                self.writes[(thread_id, checkpoint_ns, checkpoint_id)][(task_id, idx)] = (
+                    task_id, channel, _decode_typed(value), task_path
+                )
+            elif kind == "blob":
+                checkpoint_ns, channel, version, value = fields
+                self.blobs[(thread_id, checkpoint_ns, channel, version)] = _decode_typed(value)
+
+    # BaseCheckpointSaver interface
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._thread_lock:
+            self._catch_up(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        thread_ids = [config["configurable"]["thread_id"]] if config else self.store.list_threads()
+        with self._thread_lock:
+            for thread_id in thread_ids:
+                self._catch_up(thread_id)
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    def get_delta_channel_history(self, *, config, channels):
+        with self._thread_lock:
+            self._catch_up(config["configurable"]["thread_id"])
+            return super().get_delta_channel_history(config=config, channels=channels)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._thread_lock:
+            self._catch_up(thread_id)
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            records = [
+                json.dumps(["blob", checkpoint_ns, channel, version,
+                            _encode_typed(self.blobs[(thread_id, checkpoint_ns, channel, version)])])
+                for channel, version in new_versions.items()
+            ]
+            saved, saved_metadata, parent_id = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            records.append(json.dumps(["checkpoint", checkpoint_ns, checkpoint["id"], _encode_typed(saved),
+                                       _encode_typed(saved_metadata), parent_id]))
+            self.store.append(thread_id, records)
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._thread_lock:
+            self._catch_up(thread_id)
+            super().put_writes(config, writes, task_id, task_path)
+            records = [
+                json.dumps(["write", checkpoint_ns, checkpoint_id, write_task, idx, channel, _encode_typed(value),
+                            write_path])
+                for (write_task, idx), (_, channel, value, write_path)
+                in self.writes[(thread_id, checkpoint_ns, checkpoint_id)].items()
+                if write_task == task_id
+            ]
+            if records:
+                self.store.append(thread_id, records)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._thread_lock:
+            super().delete_thread(thread_id)
+            self._positions.pop(thread_id, None)
+            self.store.delete(thread_id)
+
+    def list_threads(self) -> List[str]:
+        """Return the IDs of every persisted workflow session."""
+        return self.store.list_threads()
+
+
+def build_checkpointer(backend: Optional[str] = None, path: Optional[str] = None) -> InMemorySaver:
+    """Create the checkpointer configured in settings (or by the arguments).
+
+    Backends: ``sqlite`` (default), ``json`` (one file per session) and
+    ``memory`` (not persistent, for tests and one-shot runs).
+    """
+    backend = (backend or settings.checkpoint_backend).lower()
+    path = path or settings.checkpoint_path
+
+    if backend == "sqlite":
+        logger.info(f"Persisting workflow checkpoints to SQLite: {path}")
+        return PersistentCheckpointSaver(SQLiteCheckpointStore(path))
+    if backend == "json":
+        logger.info(f"Persisting workflow checkpoints as JSON files in: {path}")
+        return PersistentCheckpointSaver(JSONFileCheckpointStore(path))
+    if backend == "memory":
+        return InMemorySaver(serde=make_checkpoint_serializer())
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
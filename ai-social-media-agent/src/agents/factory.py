@@ -0,0 +1,82 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from agents.checkpointing import build_checkpointer
+from agents.social_media_agent import SocialMediaAgent
+from config.settings import settings
+from services.ai_service import AIService
+from services.insight_store import InsightStore, build_insight_store
+
+logger = logging.getLogger(__name__)
+
+# Process-wide instances. The pooled HTTP client binds its connections to the
+# event loop that first uses them, so all calls should be driven from one
+# long-lived loop (utils.event_loop.BackgroundEventLoop in the Streamlit app,
+# a single asyncio.run in the CLI).
+_lock = threading.Lock()
+_http_async_client: Optional[httpx.AsyncClient] = None
+_ai_service: Optional[AIService] = None
+_checkpointer = None
+_insight_store: Optional[InsightStore] = None
+_agents: Dict[str, SocialMediaAgent] = {}
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """Shared keep-alive connection pool for LLM API calls."""
+    global _http_async_client
+    with _lock:
+        if _http_async_client is None:
+            _http_async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry
+                )
+            )
+            logger.info(f"Created shared HTTP pool (max {settings.http_max_connections} connections)")
+        return _http_async_client
+
+
+def get_ai_service() -> AIService:
+    """Shared AIService: one LLM client, one response cache, one connection pool."""
+    global _ai_service
+    client = get_http_async_client()
+    with _lock:
+        if _ai_service is None:
+            _ai_service = AIService(http_async_client=client)
+        return _ai_service
+
+
+def get_agent(generation_mode: Optional[str] = None) -> SocialMediaAgent:
+    """Shared agent per generation mode, so the LangGraph workflow is compiled once."""
+    global _checkpointer, _insight_store
+    mode = generation_mode or settings.generation_mode
+    ai_service = get_ai_service()
+    with _lock:
+        if mode not in _agents:
+            if _checkpointer is None:
+                _checkpointer = build_checkpointer()
+            # Audience insights do not depend on the generation mode
+            if _insight_store is None:
+                _insight_store = build_insight_store()
+            _agents[mode] = SocialMediaAgent(generation_mode=mode, checkpointer=_checkpointer,
+                                             ai_service=ai_service, insight_store=_insight_store)
+            logger.info(f"Compiled shared {mode} workflow")
+        return _agents[mode]
+
+
+async def close_shared_instances():
+    """Close the connection pool and forget all shared instances."""
+    global _http_async_client, _ai_service, _checkpointer, _insight_store
+    with _lock:
+        client = _http_async_client
+        _http_async_client = None
+        _ai_service = None
+        _checkpointer = None
+        _insight_store = None
+        _agents.clear()
+    if client is not None:
+        await client.aclose()
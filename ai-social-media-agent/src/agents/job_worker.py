@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from agents.factory import close_shared_instances, get_agent
+from agents.process_pool import shared_rate_limits, spawn_context, use_shared_rate_limits
+from agents.social_media_agent import SocialMediaAgent
+from config.settings import settings
+from models.request_models import SocialMediaRequest
+from services.job_queue import Job, JobQueue, build_job_queue
+from services.telemetry import Telemetry, default_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Runs queued campaigns through the workflow, ``concurrency`` at a time.
+
+    The worker claims a job whenever it has a free slot, renews the job's
+    lease while the workflow runs and records the result. A workflow error
+    is a failed attempt that the queue retries or dead-letters; a job that
+    can never succeed (invalid request or generation mode) is dead-lettered
+    at once. Several workers, in one process or many, can share a queue.
+    """
+
+    def __init__(self, queue: JobQueue,
+                 agent_for: Optional[Callable[[Optional[str]], SocialMediaAgent]] = None,
+                 concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None,
+                 worker_id: Optional[str] = None,
+                 telemetry: Optional[Telemetry] = None):
+        self.queue = queue
+        self.agent_for = agent_for or get_agent
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.poll_interval = settings.job_poll_interval if poll_interval is None else poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.telemetry = telemetry or default_telemetry()
+        self.outcomes: Dict[str, int] = {"succeeded": 0, "retried": 0, "dead": 0, "lost": 0}
+
+    async def run(self, stop: Optional[asyncio.Event] = None, drain: bool = False) -> Dict[str, int]:
+        """Process jobs until ``stop`` is set, or with ``drain`` until no job is queued or running.
+
+        Jobs that are already running when the worker stops are finished
+        first; nothing new is claimed. Returns the attempt outcomes.
+        """
+        stop = stop or asyncio.Event()
+        active: set = set()
+        while not stop.is_set():
+            if len(active) >= self.concurrency:
+                await self._wait(active, stop, None)
+                continue
+            job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+            if job is not None:
+                task = asyncio.create_task(self._process(job))
+                active.add(task)
+                task.add_done_callback(active.discard)
+                continue
+            if drain and not active and await asyncio.to_thread(self.queue.pending) == 0:
+                break
+            await self._wait(active, stop, self.poll_interval)
+        if active:
+            await asyncio.gather(*active)
+        return dict(self.outcomes)
+
+    @staticmethod
+    async def _wait(active: set, stop: asyncio.Event, timeout: Optional[float]):
+        """Sleep until a running job finishes, ``stop`` is set or ``timeout`` passes."""
+        stopped = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.wait({*active, stopped}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopped.cancel()
+
+    async def _process(self, job: Job):
+        started = time.perf_counter()
+        try:
+            agent = self.agent_for(job.generation_mode)
+            request = SocialMediaRequest(**job.request)
+        except (ValidationError, ValueError, TypeError) as e:
+            outcome = await self._fail(job, f"Invalid job: {e}", retryable=False)
+        else:
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                result = await agent.process_request(request)
+            except Exception as e:
+                result = {"error": str(e)}
+            finally:
+                heartbeat.cancel()
+            if "error" in result:
+                outcome = await self._fail(job, str(result["error"]), retryable=True)
+            elif await asyncio.to_thread(self.queue.complete, job.id, self.worker_id, result):
+                outcome = "succeeded"
+            else:
+                outcome = "lost"
+        if outcome == "lost":
+            logger.warning(f"Job {job.id} was reclaimed by another worker before it finished here")
+        self.outcomes[outcome] += 1
+        self.telemetry.jobs.inc(outcome=outcome)
+        self.telemetry.job_duration.observe(time.perf_counter() - started, outcome=outcome)
+
+    async def _fail(self, job: Job, error: str, retryable: bool) -> str:
+        status = await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, error, retryable)
+        if status is None:
+            return "lost"
+        return "retried" if status == "queued" else "dead"
+
+    async def _heartbeat(self, job: Job):
+        interval = max(self.queue.lease_seconds / 3, 0.05)
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.heartbeat, job.id, self.worker_id):
+                return
+
+
+async def serve_worker(queue_path: Optional[str] = None, concurrency: Optional[int] = None,
+                       drain: bool = False) -> Dict[str, int]:
+    """Run a worker on the shared agents until SIGINT/SIGTERM or, with ``drain``, until the queue is empty."""
+    queue = build_job_queue(queue_path)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    handled = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+            handled.append(signum)
+        except (NotImplementedError, RuntimeError):
+            pass
+    worker = JobWorker(queue, concurrency=concurrency)
+    logger.info(f"Worker {worker.worker_id} started ({worker.concurrency} concurrent jobs)")
+    try:
+        return await worker.run(stop, drain=drain)
+    finally:
+        for signum in handled:
+            loop.remove_signal_handler(signum)
+        await close_shared_instances()
+        queue.close()
+
+
+def _process_main(queue_path: Optional[str], concurrency: Optional[int], drain: bool, rate_limit_path: str, outcomes):
+    use_shared_rate_limits(rate_limit_path)
+    outcomes.put(asyncio.run(serve_worker(queue_path, concurrency, drain)))
+
+
+def run_worker_processes(processes: int = 1, concurrency: Optional[int] = None, drain: bool = False,
+                         queue_path: Optional[str] = None) -> Dict[str, int]:
+    """Run ``processes`` worker processes on the queue, wait for them and return their summed outcomes.
+
+    A single worker runs in this process. Each spawned process has its own
+    event loop, agents and connection pool; they share the queue file and,
+    through ``shared_rate_limits``, the LLM rate limits.
+    """
+    if processes <= 1:
+        return asyncio.run(serve_worker(queue_path, concurrency, drain))
+    context = spawn_context()
+    results = context.SimpleQueue()
+    with shared_rate_limits() as rate_limit_path:
+        children: List[multiprocessing.Process] = [
+            context.Process(target=_process_main, name=f"job-worker-{i}",
+                            args=(queue_path, concurrency, drain, rate_limit_path, results))
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            # The workers got the interrupt too and finish their running jobs
+            for child in children:
+                child.join()
+    totals: Dict[str, int] = {}
+    while not results.empty():
+        for outcome, count in results.get().items():
+            totals[outcome] = totals.get(outcome, 0) + count
+    failed = [child.name for child in children if child.exitcode != 0]
+    if failed:
+        logger.error(f"Worker processes exited with an error: {', '.join(failed)}")
+    return totals
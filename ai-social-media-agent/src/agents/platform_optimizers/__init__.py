@@ -1,3 +1,23 @@
-# Contents of /ai-social-media-agent/ai-social-media-agent/src/agents/platform_optimizers/__init__.py
+from typing import Dict, Optional
 
-# This file is intentionally left blank.
\ No newline at end of file
+from agents.platform_optimizers.base import PlatformOptimizer
+from agents.platform_optimizers.facebook_optimizer import FacebookOptimizer
+from agents.platform_optimizers.instagram_optimizer import InstagramOptimizer
+from agents.platform_optimizers.linkedin_optimizer import LinkedInOptimizer
+from agents.platform_optimizers.x_optimizer import XOptimizer
+
+OPTIMIZERS = {
+    optimizer.platform: optimizer
+    for optimizer in (FacebookOptimizer, InstagramOptimizer, LinkedInOptimizer, XOptimizer)
+}
+
+
+def build_optimizers(limits: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, PlatformOptimizer]:
+    """One optimizer per platform, using ``limits`` or settings.platform_limits."""
+    return {platform: optimizer(limits[platform] if limits else None) for platform, optimizer in OPTIMIZERS.items()}
+
+
+__all__ = [
+    "OPTIMIZERS", "PlatformOptimizer", "FacebookOptimizer", "InstagramOptimizer", "LinkedInOptimizer",
+    "XOptimizer", "build_optimizers"
+]
@@ -0,0 +1,141 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import settings
+from services.post_constraints import (EMOJI_PATTERN, URL_PATTERN, enforce_post, may_contain_emoji, may_contain_url,
+                                      text_length)
+
+# A sentence ends at its punctuation and the emojis after it ("Csatlakozz! 🙌 Kérdésed van?")
+_SENTENCE_END = re.compile(rf"([.!?…](?:[ \t]*(?:{EMOJI_PATTERN.pattern}))*)\s+(?=[A-ZÁÉÍÓÖŐÚÜŰ0-9\"„])")
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_URL_TRAILING_PUNCTUATION = ".,;:!?)»\"'"
+# The note that introduces the links of a "bio" platform, once extract_links has taken the links after it
+_BIO_NOTE = re.compile(r"\s*(?:🔗\s*)?Link a bióban\s*$")
+
+
+def _collapse_spaces(line: str) -> str:
+    """``line`` with each run of spaces and tabs replaced by one space (str.replace beats a regex here)."""
+    line = line.replace("\t", " ")
+    while "  " in line:
+        line = line.replace("  ", " ")
+    return line
+
+
+class PlatformOptimizer:
+    """Deterministic last pass over a generated post for one platform.
+
+    ``optimize`` applies the platform's emoji policy, line-break layout and
+    link placement, then formats the hashtags and fits the result to the
+    platform limits with services.post_constraints.enforce_post. Pure string work (a few regex passes), so it runs in the
+    workflow without an LLM call; running it twice gives the same post.
+    Subclasses only set the class attributes below.
+    """
+
+    platform: str = ""
+    # Emojis kept when they are wanted (None: no cap); all are removed when they are not
+    max_emojis: Optional[int] = None
+    # Sentences per paragraph when a one-block text is laid out (None: everything on one line)
+    paragraph_sentences: Optional[int] = 2
+    # Texts with fewer sentences are left as one paragraph
+    layout_min_sentences: int = 4
+    # Where links go: "end" (own line at the end, or the end of the line), or "bio" (a
+    # "Link a bióban: <links>" line at the end) for platforms without clickable links in posts
+    link_placement: str = "end"
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self.limits = limits or settings.platform_limits[self.platform]
+
+    def optimize(self, post: Dict[str, Any], use_emojis: bool = True) -> Dict[str, Any]:
+        """The optimized copy of ``post``; keys other than text and hashtags are kept."""
+        text, links = self.extract_links(str(post.get("text") or ""))
+        if links and self.link_placement == "bio" and "Link a bióban" in text:
+            # An already optimized caption carries the note; link_suffix adds it again with the links
+            text = _BIO_NOTE.sub("", text)
+        text = self.apply_emoji_policy(text, use_emojis)
+        text = self.layout(text)
+        suffix = self.link_suffix(links, use_emojis)
+        # The links are appended after the limits are applied, so truncation never cuts them off
+        limits = {**self.limits, "max_chars": self.limits["max_chars"] - text_length(self.platform, suffix)}
+        # enforce_post also normalizes, de-duplicates, ranks and trims the hashtags
+        optimized = enforce_post(self.platform, {**post, "text": text, "hashtags": post.get("hashtags") or []},
+                                 {self.platform: limits}, force=True).post
+        optimized["text"] = optimized["text"].rstrip() + suffix
+        return optimized
+
+    def optimize_many(self, posts: Iterable[Dict[str, Any]], use_emojis: bool = True) -> List[Dict[str, Any]]:
+        """optimize for a batch of posts of this platform."""
+        optimize = self.optimize
+        return [optimize(post, use_emojis) for post in posts]
+
+    @staticmethod
+    def extract_links(text: str) -> Tuple[str, List[str]]:
+        """The text without its URLs, and the distinct URLs in order of appearance."""
+        links: List[str] = []
+        if not may_contain_url(text):
+            return text, links
+
+        def take(match: re.Match) -> str:
+            url = match.group(0)
+            trailing = len(url) - len(url.rstrip(_URL_TRAILING_PUNCTUATION))
+            url, rest = (url[:-trailing], url[-trailing:]) if trailing else (url, "")
+            if url not in links:
+                links.append(url)
+            return "\x00" + rest
+
+        stripped = URL_PATTERN.sub(take, text)
+        if not links:
+            return text, links
+        # Drop the colon or dash that introduced each link too ("Nézd meg itt: <link>." -> "Nézd meg itt.")
+        parts = stripped.split("\x00")
+        return "".join([part.rstrip(" \t").rstrip(":–-").rstrip(" \t") for part in parts[:-1]] + parts[-1:]), links
+
+    def apply_emoji_policy(self, text: str, use_emojis: bool) -> str:
+        """Remove every emoji when they are not wanted, otherwise the ones over ``max_emojis``."""
+        if not may_contain_emoji(text):
+            return text
+        if not use_emojis:
+            return EMOJI_PATTERN.sub("", text)
+        if self.max_emojis is None:
+            return text
+        extra = list(EMOJI_PATTERN.finditer(text))[self.max_emojis:]
+        if not extra:
+            return text
+        # Splice out the emojis past the cap (cheaper than a sub callback for every emoji)
+        kept = [text[:extra[0].start()]]
+        kept += [text[before.end():after.start()] for before, after in zip(extra, extra[1:])]
+        kept.append(text[extra[-1].end():])
+        return "".join(kept)
+
+    def layout(self, text: str) -> str:
+        """Normalize spacing and line breaks, and split a long one-block text into short paragraphs.
+
+        Paragraphs the model wrote are kept; only a text without any line
+        break and with at least ``layout_min_sentences`` sentences is split.
+        """
+        lines = [(_collapse_spaces(line) if "  " in line or "\t" in line else line).strip()
+                 for line in text.strip().splitlines()]
+        if self.paragraph_sentences is None:
+            return " ".join(line for line in lines if line)
+        text = "\n".join(lines)
+        paragraphs = [paragraph for paragraph in _PARAGRAPH_SPLIT.split(text) if paragraph]
+        # Each sentence but the last ends in punctuation, so with too few marks there is nothing to split
+        if (len(paragraphs) == 1 and "\n" not in paragraphs[0]
+                and sum(map(paragraphs[0].count, ".!?…")) + 1 >= self.layout_min_sentences):
+            # split returns the text between the breaks and the punctuation that ends each sentence
+            parts = _SENTENCE_END.split(paragraphs[0])
+            sentences = [parts[index] + parts[index + 1] for index in range(0, len(parts) - 1, 2)] + parts[-1:]
+            if len(sentences) >= self.layout_min_sentences:
+                size = self.paragraph_sentences
+                paragraphs = [" ".join(sentences[index:index + size]) for index in range(0, len(sentences), size)]
+        return "\n\n".join(paragraphs)
+
+    def link_suffix(self, links: List[str], use_emojis: bool) -> str:
+        """What follows the text so the links end up where the platform wants them."""
+        if not links:
+            return ""
+        if self.link_placement == "bio":
+            # The links stay in the caption, unchanged, for whoever publishes it to put in the bio
+            return "\n\n" + ("🔗 Link a bióban: " if use_emojis else "Link a bióban: ") + " ".join(links)
+        if self.paragraph_sentences is None:
+            return " " + " ".join(links)
+        return "\n\n" + "\n".join(links)
@@ -1,22 +1,8 @@
-class FacebookOptimizer:
-    def __init__(self, campaign_message, target_audience, tone, use_emoji):
-        self.campaign_message = campaign_message
-        self.target_audience = target_audience
-        self.tone = tone
-        self.use_emoji = use_emoji
+from agents.platform_optimizers.base import PlatformOptimizer
 
-    def optimize(self):
-        optimized_text = self._generate_optimized_text()
-        hashtags = self._generate_hashtags()
-        return {
-            "text": optimized_text,
-            "hashtags": hashtags
-        }
 
-    def _generate_optimized_text(self):
-        # Implement logic to generate optimized text based on the campaign message, tone, and audience
-        return f"{self.campaign_message} - tailored for {self.target_audience}."
+class FacebookOptimizer(PlatformOptimizer):
+    """Facebook: short paragraphs, links on their own line at the end."""
 
-    def _generate_hashtags(self):
-        # Implement logic to generate relevant hashtags
-        return ["#example", "#FacebookMarketing"]
\ No newline at end of file
+    platform = "facebook"
+    paragraph_sentences = 2
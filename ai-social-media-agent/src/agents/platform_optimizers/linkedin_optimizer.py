@@ -1,13 +1,10 @@
-class LinkedInOptimizer:
-    def __init__(self):
-        pass
+from agents.platform_optimizers.base import PlatformOptimizer
 
-    def optimize(self, campaign_message, target_audience, tone):
-        optimized_message = self._generate_linkedin_post(campaign_message, target_audience, tone)
-        return optimized_message
 
-    def _generate_linkedin_post(self, campaign_message, target_audience, tone):
-        # Here you would implement the logic to generate a LinkedIn post
-        # based on the campaign message, target audience, and tone.
-        # This is a placeholder implementation.
-        return f"{campaign_message} - Targeting: {target_audience} | Tone: {tone}"
\ No newline at end of file
+class LinkedInOptimizer(PlatformOptimizer):
+    """LinkedIn: professional tone with few emojis, one idea per paragraph for the feed preview."""
+
+    platform = "linkedin"
+    max_emojis = 3
+    paragraph_sentences = 1
+    layout_min_sentences = 3
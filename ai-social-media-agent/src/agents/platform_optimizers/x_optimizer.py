@@ -1,19 +1,9 @@
-class XOptimizer:
-    def __init__(self):
-        pass
+from agents.platform_optimizers.base import PlatformOptimizer
 
-    def optimize(self, message, hashtags):
-        optimized_message = self._format_message(message)
-        optimized_hashtags = self._format_hashtags(hashtags)
-        return {
-            "text": optimized_message,
-            "hashtags": optimized_hashtags
-        }
 
-    def _format_message(self, message):
-        # Implement any specific formatting rules for platform X
-        return message
+class XOptimizer(PlatformOptimizer):
+    """X: one line, at most two emojis, links at the end where they cost 23 characters each."""
 
-    def _format_hashtags(self, hashtags):
-        # Implement any specific rules for hashtags on platform X
-        return " ".join(hashtags)
\ No newline at end of file
+    platform = "x"
+    max_emojis = 2
+    paragraph_sentences = None
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+
+from agents.factory import close_shared_instances, get_agent
+from config.settings import settings
+from models.request_models import SocialMediaRequest
+from utils.console_trace import console_trace
+
+logger = logging.getLogger(__name__)
+
+WORKER_EXITED = "Worker process exited before finishing this campaign"
+
+
+@contextlib.contextmanager
+def shared_rate_limits() -> Iterator[str]:
+    """Path of the SQLite file worker processes share their LLM rate limits through.
+
+    RATE_LIMIT_SHARED_PATH when set (so separate runs on the host share it
+    too), otherwise a temporary file that lives as long as the block.
+    """
+    if settings.rate_limit_shared_path:
+        yield settings.rate_limit_shared_path
+        return
+    with tempfile.TemporaryDirectory(prefix="rate-limits-") as directory:
+        yield os.path.join(directory, "rate_limits.sqlite")
+
+
+def use_shared_rate_limits(path: str):
+    """Make the agents created in this (worker) process draw from the shared rate limit file."""
+    settings.rate_limit_shared_path = path
+
+
+def spawn_context():
+    # Spawn, so no worker inherits another process's event loop, connections or SQLite handles
+    return multiprocessing.get_context("spawn")
+
+
+async def _consume(tasks, results, max_concurrency: int, generation_mode: Optional[str]):
+    """Run campaigns from ``tasks`` until its sentinel, ``max_concurrency`` at a time, posting each result."""
+    agent = get_agent(generation_mode)
+    # One thread waits on the inter-process queue; the campaigns themselves stay on the event loop
+    ready: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def feed():
+        while (item := await asyncio.to_thread(tasks.get)) is not None:
+            await ready.put(item)
+        for _ in range(max_concurrency):
+            await ready.put(None)
+
+    async def run():
+        while (item := await ready.get()) is not None:
+            index, request = item
+            try:
+                result = await agent.process_request(request)
+            except Exception as e:
+                result = {"error": str(e)}
+            if "error" in result:
+                results.put({"index": index, "status": "error", "error": result["error"]})
+            else:
+                results.put({"index": index, "status": "success", "result": result})
+
+    with console_trace.batch():
+        await asyncio.gather(feed(), *(run() for _ in range(max_concurrency)))
+
+
+async def _serve_batch(tasks, results, max_concurrency: int, generation_mode: Optional[str]):
+    try:
+        await _consume(tasks, results, max_concurrency, generation_mode)
+    finally:
+        await close_shared_instances()
+
+
+def _batch_process_main(tasks, results, max_concurrency: int, generation_mode: Optional[str], rate_limit_path: str):
+    use_shared_rate_limits(rate_limit_path)
+    asyncio.run(_serve_batch(tasks, results, max_concurrency, generation_mode))
+
+
+def process_batch_in_processes(requests: List[SocialMediaRequest], processes: int, max_concurrency: int = 5,
+                               generation_mode: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Process a batch in ``processes`` worker processes, each with its own event loop.
+
+    Like ``SocialMediaAgent.process_batch``, but parsing, validation and
+    prompt building run on all cores: every process runs up to
+    ``max_concurrency`` campaigns and pulls the next one from a shared queue
+    when one finishes, so slow campaigns do not leave a process idle. The
+    processes share the LLM rate limits through a SQLite file. Results come
+    back to this process in input order, with the same per-item status as
+    ``process_batch``; a campaign whose process died is reported as an error.
+    """
+    if processes < 1 or max_concurrency < 1:
+        raise ValueError("processes and max_concurrency must be at least 1")
+    processes = min(processes, max(len(requests), 1))
+    context = spawn_context()
+    tasks, results = context.Queue(), context.Queue()
+    for item in enumerate(requests):
+        tasks.put(item)
+    for _ in range(processes):
+        tasks.put(None)
+
+    collected: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+    logger.info(f"Processing batch of {len(requests)} requests in {processes} processes "
+                f"(max_concurrency={max_concurrency} each)")
+    with shared_rate_limits() as rate_limit_path:
+        children = [
+            context.Process(target=_batch_process_main, name=f"batch-worker-{i}",
+                            args=(tasks, results, max_concurrency, generation_mode, rate_limit_path))
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+        remaining = len(requests)
+        while remaining:
+            try:
+                item = results.get(timeout=0.5)
+            except queue.Empty:
+                if any(child.is_alive() for child in children):
+                    continue
+                # Everyone has exited: take what is still in the pipe, the rest is lost
+                try:
+                    item = results.get(timeout=0.5)
+                except queue.Empty:
+                    break
+            collected[item["index"]] = item
+            remaining -= 1
+        for child in children:
+            child.join()
+    # Campaigns left behind by crashed workers must not keep this process from exiting
+    tasks.cancel_join_thread()
+
+    failed = [child.name for child in children if child.exitcode != 0]
+    if failed:
+        logger.error(f"Batch worker processes exited with an error: {', '.join(failed)}")
+    return [item or {"index": index, "status": "error", "error": WORKER_EXITED}
+            for index, item in enumerate(collected)]
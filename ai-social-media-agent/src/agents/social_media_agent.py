@@ -1,66 +1,234 @@
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any
+from langgraph.config import get_config, get_stream_writer
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.errors import GraphInterrupt
+from langgraph.types import Command, interrupt
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
 import asyncio
+import contextlib
+import functools
 import logging
-from models.request_models import WorkflowState, SocialMediaRequest, SocialMediaResponse, PlatformPost
+import time
+import uuid
+from collections import OrderedDict
+from agents.platform_optimizers import PlatformOptimizer, build_optimizers
+from models.request_models import WorkflowState, SocialMediaRequest, SocialMediaResponse, PlatformPost, PLATFORMS, normalize_platforms
 from services.ai_service import AIService
+from services.content_generator import ContentGenerator
+from services.deadline import deadline_in, deadline_scope, remaining, without_deadline
+from services.insight_store import InsightStore, build_insight_store
+from services.post_constraints import enforce_post, enforce_posts
+from services.telemetry import Telemetry, current_span, default_telemetry
+from agents.checkpointing import build_checkpointer, make_checkpoint_serializer
+from config.settings import settings
+from utils.console_trace import console_trace, trace, traced_run, tracing
 
 logger = logging.getLogger(__name__)
 
+GENERATION_MODES = ("single", "fanout", "fused")
+
+# Resume values accepted by the await_feedback interrupt
+REFINE_ACTION = "refine"
+FINALIZE_ACTION = "finalize"
+
+def check_generation_mode(generation_mode: Optional[str]):
+    """Raise ValueError unless ``generation_mode`` (default: GENERATION_MODE) is a known mode."""
+    mode = generation_mode or settings.generation_mode
+    if mode not in GENERATION_MODES:
+        raise ValueError(f"Unknown generation mode: {mode}")
+
+
+class PendingUpgrades(OrderedDict):
+    """LLM generations still running for sessions that were shown local posts, by thread_id.
+    
+    upgrade, discard_upgrade and the end of the workflow remove a session's
+    entry; for abandoned sessions, entries older than ``ttl_seconds`` and
+    the oldest beyond ``max_entries`` are cancelled whenever one is added.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._added: Dict[str, float] = {}
+    
+    def add(self, thread_id: str, task: "asyncio.Task"):
+        """Register ``task`` for ``thread_id``, cancelling the one it replaces and any expired ones."""
+        self.discard(thread_id)
+        now = self._clock()
+        while self:
+            oldest = next(iter(self))
+            if len(self) < self.max_entries and now - self._added[oldest] <= self.ttl_seconds:
+                break
+            self.discard(oldest)
+        self[thread_id] = task
+        self._added[thread_id] = now
+    
+    def discard(self, thread_id: str) -> Optional["asyncio.Task"]:
+        """Remove and cancel the session's generation; returns it, or None if there was none."""
+        task = self.pop(thread_id, None)
+        if task is not None:
+            task.cancel()
+        return task
+    
+    def pop(self, thread_id, *default):
+        self._added.pop(thread_id, None)
+        return super().pop(thread_id, *default)
+    
+    def __delitem__(self, thread_id):
+        self._added.pop(thread_id, None)
+        super().__delitem__(thread_id)
+
+
+def run_config(thread_id: str, request: Optional[SocialMediaRequest]) -> Dict[str, Any]:
+    """LangGraph config for one run or feedback round of a session.
+    
+    Carries the request deadline (the request's ``deadline_seconds``, else
+    REQUEST_DEADLINE_SECONDS) as an absolute time, so it also holds across
+    the two invocations of a one-shot run.
+    """
+    seconds = request.deadline_seconds if request is not None and request.deadline_seconds else None
+    return {"configurable": {"thread_id": thread_id,
+                             "request_deadline": deadline_in(seconds or settings.request_deadline_seconds)}}
+
 class SocialMediaAgent:
-    def __init__(self):
-        self.ai_service = AIService()
-        self.workflow = self._create_workflow()
+    def __init__(self, generation_mode: Optional[str] = None,
+                 checkpointer: Optional[BaseCheckpointSaver] = None,
+                 ai_service: Optional[AIService] = None,
+                 telemetry: Optional[Telemetry] = None,
+                 insight_store: Optional[InsightStore] = None,
+                 optimizers: Optional[Dict[str, PlatformOptimizer]] = None):
+        self.generation_mode = generation_mode or settings.generation_mode
+        check_generation_mode(self.generation_mode)
+        if self.generation_mode == "fanout" and settings.local_posts_budget_ms:
+            # Local posts stand in for one generation node's answer, and fanout has one per platform
+            logger.warning("LOCAL_POSTS_BUDGET_MS does not apply to the fanout generation mode; "
+                           "its sessions wait for the LLM's posts")
+        
+        # Long-lived processes should pass the shared service from agents.factory
+        self.ai_service = ai_service or AIService()
+        self.telemetry = telemetry or default_telemetry()
+        # Audience/tone insights shared across campaigns; None when INSIGHT_STORE_ENABLED is false
+        self.insight_store = insight_store if insight_store is not None else build_insight_store()
+        # Deterministic per-platform pass over every post before it is shown
+        self.optimizers = optimizers or build_optimizers()
+        # LLM generations still running for sessions that were shown local posts, by thread_id
+        self.pending_upgrades = PendingUpgrades(settings.local_posts_max_pending,
+                                                settings.local_posts_upgrade_ttl_seconds)
+        
+        # Interactive sessions are checkpointed durably so they survive restarts
+        self.checkpointer = checkpointer if checkpointer is not None else build_checkpointer()
+        self.workflow = self._create_workflow(self.checkpointer)
+        
+        # One-shot runs never resume, so their checkpoints stay in memory and are dropped afterwards
+        self._oneshot_checkpointer = InMemorySaver(serde=make_checkpoint_serializer())
+        self.oneshot_workflow = self._create_workflow(self._oneshot_checkpointer)
     
-    def _create_workflow(self) -> StateGraph:
+    def _create_workflow(self, checkpointer: Optional[BaseCheckpointSaver] = None) -> StateGraph:
         """Create the LangGraph workflow with all nodes and edges."""
         
         workflow = StateGraph(WorkflowState)
         
         # Add nodes
-        workflow.add_node("context_analysis", self._context_analysis_node)
-        workflow.add_node("generate_posts", self._generate_posts_node)
-        workflow.add_node("await_feedback", self._await_feedback_node)
-        workflow.add_node("refine_posts", self._refine_posts_node)
-        workflow.add_node("finalize", self._finalize_node)
+        workflow.add_node("optimize_posts", self._instrumented("optimize_posts", self._optimize_posts_node))
+        workflow.add_node("await_feedback", self._instrumented("await_feedback", self._await_feedback_node))
+        workflow.add_node("refine_posts", self._instrumented("refine_posts", self._refine_posts_node))
+        workflow.add_node("finalize", self._instrumented("finalize", self._finalize_node))
         
         # Add edges
-        workflow.set_entry_point("context_analysis")
-        workflow.add_edge("context_analysis", "generate_posts")
-        workflow.add_edge("generate_posts", "await_feedback")
+        if self.generation_mode == "fused":
+            # One LLM call returns both the context analysis and the posts
+            workflow.add_node("analyze_and_generate",
+                              self._instrumented("analyze_and_generate", self._analyze_and_generate_node))
+            workflow.set_entry_point("analyze_and_generate")
+            workflow.add_edge("analyze_and_generate", "optimize_posts")
+        else:
+            workflow.add_node("context_analysis", self._instrumented("context_analysis", self._context_analysis_node))
+            workflow.set_entry_point("context_analysis")
         
-        # Conditional edge for feedback processing
+        if self.generation_mode == "fanout":
+            # One node per platform running concurrently, joined before feedback
+            platform_nodes = [f"generate_{platform}" for platform in PLATFORMS]
+            for platform, node_name in zip(PLATFORMS, platform_nodes):
+                workflow.add_node(node_name, self._instrumented(node_name, self._make_platform_node(platform)))
+                workflow.add_edge("context_analysis", node_name)
+            workflow.add_node("join_posts", self._instrumented("join_posts", self._join_posts_node))
+            workflow.add_edge(platform_nodes, "join_posts")
+            workflow.add_edge("join_posts", "optimize_posts")
+        elif self.generation_mode == "single":
+            workflow.add_node("generate_posts", self._instrumented("generate_posts", self._generate_posts_node))
+            workflow.add_edge("context_analysis", "generate_posts")
+            workflow.add_edge("generate_posts", "optimize_posts")
+        
+        # Generated and refined posts alike are optimized before they are shown or finalized
+        workflow.add_edge("refine_posts", "optimize_posts")
         workflow.add_conditional_edges(
-            "await_feedback",
-            self._should_refine,
+            "optimize_posts",
+            self._check_iteration_limit,
             {
-                "refine": "refine_posts",
+                "continue": "await_feedback",
                 "finalize": "finalize"
             }
         )
         
+        # Conditional edge for feedback processing
         workflow.add_conditional_edges(
-            "refine_posts",
-            self._check_iteration_limit,
+            "await_feedback",
+            self._should_refine,
             {
-                "continue": "await_feedback",
+                "refine": "refine_posts",
                 "finalize": "finalize"
             }
         )
         
         workflow.add_edge("finalize", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
+    
+    def _instrumented(self, name: str, node: Callable[[WorkflowState], Awaitable[Dict[str, Any]]]):
+        """Wrap a node so each run becomes a span and a workflow_node_duration_seconds sample.
+        
+        The node also runs under the request deadline from the run config (see run_config).
+        """
+        telemetry = self.telemetry
+        
+        @functools.wraps(node)
+        async def instrumented_node(state: WorkflowState) -> Dict[str, Any]:
+            started = time.perf_counter()
+            status = "error"
+            deadline = get_config()["configurable"].get("request_deadline")
+            with telemetry.span(f"node.{name}", {"workflow.node": name,
+                                                 "workflow.iteration": state.iteration_count}) as span, \
+                    deadline_scope(deadline) as left:
+                if left is not None:
+                    span.set_attribute("workflow.deadline_remaining_ms", round(left * 1000, 1))
+                try:
+                    update = await node(state)
+                    status = "ok"
+                    return update
+                except GraphInterrupt:
+                    # Pausing for feedback is the normal way out of await_feedback
+                    status = "interrupted"
+                    span.set_status("OK")
+                    raise
+                finally:
+                    span.set_attribute("workflow.node_status", status)
+                    telemetry.node_duration.observe(time.perf_counter() - started, node=name, status=status)
+        
+        return instrumented_node
     
     async def _context_analysis_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 1: Analyze campaign context and generate initial ideas."""
-        print("\n" + "="*80)
-        print("🧠 STEP 1: CONTEXT ANALYSIS NODE")
-        print("="*80)
-        print(f"📝 Campaign Message: {state.request.campaign_message}")
-        print(f"👥 Target Audience: {state.request.target_audience}")
-        print(f"🎭 Tone: {state.request.tone.value}")
-        print(f"😀 Use Emojis: {state.request.use_emojis}")
+        if tracing():
+            trace("\n" + "="*80)
+            trace("🧠 STEP 1: CONTEXT ANALYSIS NODE")
+            trace("="*80)
+            trace(f"📝 Campaign Message: {state.request.campaign_message}")
+            trace(f"👥 Target Audience: {state.request.target_audience}")
+            trace(f"🎭 Tone: {state.request.tone.value}")
+            trace(f"😀 Use Emojis: {state.request.use_emojis}")
         
         logger.info("Starting context analysis...")
         
@@ -68,41 +236,49 @@ class SocialMediaAgent:
             raise ValueError("No request found in state")
         
         try:
-            print("\n🤖 Calling AI Service for context analysis...")
-            print("⏳ Analyzing campaign context and generating initial ideas...")
+            if tracing():
+                trace("\n🤖 Calling AI Service for context analysis...")
+                trace("⏳ Analyzing campaign context and generating initial ideas...")
             
-            context = await self.ai_service.analyze_context(
-                state.request.campaign_message,
-                state.request.target_audience,
-                state.request.tone.value
-            )
+            if self.insight_store is None:
+                context = await self.ai_service.analyze_context(
+                    state.request.campaign_message,
+                    state.request.target_audience,
+                    state.request.tone.value
+                )
+                insight_update = {}
+            else:
+                context, insight_update = await self._analyze_with_insights(state)
             
-            print("\n✅ CONTEXT ANALYSIS RESPONSE:")
-            print("-" * 40)
-            if "key_messages" in context:
-                print(f"🎯 Key Messages: {context['key_messages']}")
-            if "audience_insights" in context:
-                print(f"👤 Audience Insights: {context['audience_insights']}")
-            if "platform_strategies" in context:
-                print(f"📱 Platform Strategies:")
-                for platform, strategy in context['platform_strategies'].items():
-                    print(f"   • {platform.upper()}: {strategy}")
-            if "creative_directions" in context:
-                print(f"💡 Creative Directions: {context['creative_directions']}")
-            print("-" * 40)
+            if tracing():
+                trace("\n✅ CONTEXT ANALYSIS RESPONSE:")
+                trace("-" * 40)
+                if "key_messages" in context:
+                    trace(f"🎯 Key Messages: {context['key_messages']}")
+                if "audience_insights" in context:
+                    trace(f"👤 Audience Insights: {context['audience_insights']}")
+                if "platform_strategies" in context:
+                    trace(f"📱 Platform Strategies:")
+                    for platform, strategy in context['platform_strategies'].items():
+                        trace(f"   • {platform.upper()}: {strategy}")
+                if "creative_directions" in context:
+                    trace(f"💡 Creative Directions: {context['creative_directions']}")
+                trace("-" * 40)
             
             # Extract creative_ideas from the context
             creative_ideas = context.get("creative_directions", [])
             
-            print(f"\n📋 Extracted Creative Ideas: {creative_ideas}")
-            print("✅ Context analysis completed successfully!")
+            if tracing():
+                trace(f"\n📋 Extracted Creative Ideas: {creative_ideas}")
+                trace("✅ Context analysis completed successfully!")
             
             return {
                 "campaign_context": context,
-                "creative_ideas": creative_ideas
+                "creative_ideas": creative_ideas,
+                **insight_update
             }
         except Exception as e:
-            print(f"\n❌ CONTEXT ANALYSIS ERROR: {e}")
+            trace(f"\n❌ CONTEXT ANALYSIS ERROR: {e}")
             logger.error(f"Context analysis failed: {e}")
             # Return default structures that match the expected types
             fallback_context = {
@@ -116,169 +292,554 @@ class SocialMediaAgent:
                 },
                 "creative_directions": ["Kreatív megközelítés"]
             }
-            print(f"🔄 Using fallback context: {fallback_context}")
+            trace(f"🔄 Using fallback context: {fallback_context}")
             return {
                 "campaign_context": fallback_context,
                 "creative_ideas": ["Kreatív megközelítés"]
             }
     
+    async def _analyze_with_insights(self, state: WorkflowState) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Context analysis backed by the insight store.
+        
+        A trusted stored insight replaces the analysis call. A less trusted one
+        is used to generate the posts while a fresh analysis runs, so the
+        analysis is no longer a serial hop in front of generation when it agrees.
+        Returns the context and the extra state update.
+        """
+        request = state.request
+        insight = self.insight_store.lookup(request.target_audience, request.tone.value)
+        update: Dict[str, Any] = {}
+        
+        if insight is None or state.stream_posts:
+            # Streamed text of a discarded speculation could not be taken back
+            context, _, _ = await self._fresh_analysis(request)
+            decision = "fresh"
+        elif self.insight_store.is_trusted(insight):
+            self.insight_store.record_reuse(request.target_audience, request.tone.value)
+            context = insight.context_for(request.campaign_message)
+            decision = "reused"
+        else:
+            context, posts = await self._speculate(state, insight.context_for(request.campaign_message))
+            decision = "speculation_accepted" if posts else "speculation_discarded"
+            update["speculative_posts"] = posts
+        
+        trace(f"🗂️ Insight store decision for '{request.target_audience}' ({request.tone.value}): {decision}")
+        self.telemetry.context_insights.inc(decision=decision)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("workflow.insight_decision", decision)
+        return context, {"insight_decision": decision, **update}
+    
+    async def _fresh_analysis(self, request: SocialMediaRequest) -> Tuple[Dict[str, Any], Optional[float], bool]:
+        """Run the analysis and fold it into the insight store.
+        
+        Returns the context, its similarity to the stored insight (None if there
+        was none) and whether the AI service fell back to its default context,
+        which is never stored.
+        """
+        with self.telemetry.span("insights.analysis") as span:
+            context = await self.ai_service.analyze_context(
+                request.campaign_message,
+                request.target_audience,
+                request.tone.value
+            )
+        fell_back = bool(span.attributes.get("llm.fallback"))
+        similarity = None
+        if not fell_back:
+            similarity = self.insight_store.observe(request.target_audience, request.tone.value,
+                                                    request.campaign_message, context)
+        return context, similarity, fell_back
+    
+    async def _speculate(self, state: WorkflowState,
+                         stored_context: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """Generate posts from the stored context while a fresh analysis runs.
+        
+        The posts are kept when the fresh analysis agrees with the stored one (or
+        failed, leaving the stored one as the better context); otherwise the
+        generation is cancelled and the posts are generated again afterwards.
+        Only kept posts reach the semantic cache.
+        """
+        generation = asyncio.create_task(self._speculative_generation(state, stored_context))
+        try:
+            context, similarity, fell_back = await self._fresh_analysis(state.request)
+        except BaseException:
+            generation.cancel()
+            raise
+        
+        if fell_back:
+            context = stored_context
+        elif similarity is None or similarity < self.insight_store.agreement_threshold:
+            generation.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await generation
+            return context, None
+        posts = await generation
+        if posts and self.generation_mode != "fanout":
+            request = state.request
+            self.ai_service.remember_posts(request.campaign_message, request.target_audience,
+                                           request.tone.value, request.use_emojis, posts)
+        return context, posts
+    
+    async def _speculative_generation(self, state: WorkflowState, context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Raw posts for every platform, or None if generation failed or fell back."""
+        request = state.request
+        with self.telemetry.span("insights.speculative_generation") as span:
+            try:
+                if self.generation_mode == "fanout":
+                    results = await asyncio.gather(*(
+                        self.ai_service.generate_single_platform_post(
+                            platform, context, request.campaign_message, request.target_audience,
+                            request.tone.value, request.use_emojis
+                        )
+                        for platform in PLATFORMS
+                    ))
+                    posts = dict(zip(PLATFORMS, results))
+                else:
+                    posts = await self.ai_service.generate_platform_posts(
+                        context, request.campaign_message, request.target_audience,
+                        request.tone.value, request.use_emojis, remember=False
+                    )
+            except Exception as e:
+                logger.warning(f"Speculative post generation failed: {e}")
+                return None
+        return None if span.attributes.get("llm.fallback") else posts
+    
     async def _generate_posts_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 2: Generate platform-specific posts."""
-        print("\n" + "="*80)
-        print("📝 STEP 2: GENERATE POSTS NODE")
-        print("="*80)
-        print("🎯 Using context analysis results to generate platform-specific posts...")
+        if tracing():
+            trace("\n" + "="*80)
+            trace("📝 STEP 2: GENERATE POSTS NODE")
+            trace("="*80)
+            trace("🎯 Using context analysis results to generate platform-specific posts...")
         
         logger.info("Generating platform posts...")
         
         try:
-            print("\n🤖 Calling AI Service for post generation...")
-            print("📱 Generating posts for: Facebook, Instagram, LinkedIn, X...")
-            
-            posts_data = await self.ai_service.generate_platform_posts(
-                state.campaign_context,
-                state.request.campaign_message,
-                state.request.target_audience,
-                state.request.tone.value,
-                state.request.use_emojis
-            )
+            served = asyncio.Event()
+            on_delta = self._post_delta_writer(state, served)
             
-            print("\n✅ RAW AI RESPONSE:")
-            print("-" * 40)
-            for platform, data in posts_data.items():
-                print(f"📱 {platform.upper()}:")
-                if isinstance(data, dict):
-                    if "text" in data:
-                        print(f"   Text: {data['text'][:100]}{'...' if len(data['text']) > 100 else ''}")
-                    if "hashtags" in data:
-                        print(f"   Hashtags: {data['hashtags']}")
-                    if "image_suggestions" in data:
-                        print(f"   Images: {data['image_suggestions']}")
-                print()
-            print("-" * 40)
-            
-            # Convert to structured format
-            print("🔄 Converting to structured format...")
-            generated_posts = self._convert_to_response_format(posts_data)
-            
-            print("\n📊 STRUCTURED POSTS:")
-            print("-" * 40)
-            print(f"📘 Facebook: {generated_posts.facebook.text[:80]}{'...' if len(generated_posts.facebook.text) > 80 else ''}")
-            print(f"   Hashtags: {generated_posts.facebook.hashtags}")
-            print(f"📷 Instagram: {generated_posts.instagram.text[:80]}{'...' if len(generated_posts.instagram.text) > 80 else ''}")
-            print(f"   Hashtags: {generated_posts.instagram.hashtags}")
-            print(f"   Images: {generated_posts.instagram.image_suggestions}")
-            print(f"💼 LinkedIn: {generated_posts.linkedin.text[:80]}{'...' if len(generated_posts.linkedin.text) > 80 else ''}")
-            print(f"   Hashtags: {generated_posts.linkedin.hashtags}")
-            print(f"🐦 X: {generated_posts.x.text[:80]}{'...' if len(generated_posts.x.text) > 80 else ''}")
-            print(f"   Hashtags: {generated_posts.x.hashtags}")
-            print("-" * 40)
-            print("✅ Post generation completed successfully!")
+            async def generate() -> Dict[str, Any]:
+                if tracing():
+                    trace("\n🤖 Calling AI Service for post generation...")
+                    trace("📱 Generating posts for: Facebook, Instagram, LinkedIn, X...")
             
-            return {
-                "generated_posts": generated_posts
-            }
+                if state.speculative_posts:
+                    trace("♻️ Using the posts generated speculatively during context analysis")
+                    posts_data = state.speculative_posts
+                else:
+                    posts_data = await self.ai_service.generate_platform_posts(
+                        state.campaign_context,
+                        state.request.campaign_message,
+                        state.request.target_audience,
+                        state.request.tone.value,
+                        state.request.use_emojis,
+                        on_delta=on_delta
+                    )
+            
+                if tracing():
+                    trace("\n✅ RAW AI RESPONSE:")
+                    trace("-" * 40)
+                    self._trace_posts(posts_data, posts_data)
+                    trace("-" * 40)
+            
+                posts_data = await self._enforce_limits(posts_data)
+            
+                # Convert to structured format
+                trace("🔄 Converting to structured format...")
+                generated_posts = self._convert_to_response_format(posts_data)
+            
+                if tracing():
+                    trace("\n📊 STRUCTURED POSTS:")
+                    trace("-" * 40)
+                    trace(f"📘 Facebook: {generated_posts.facebook.text[:80]}{'...' if len(generated_posts.facebook.text) > 80 else ''}")
+                    trace(f"   Hashtags: {generated_posts.facebook.hashtags}")
+                    trace(f"📷 Instagram: {generated_posts.instagram.text[:80]}{'...' if len(generated_posts.instagram.text) > 80 else ''}")
+                    trace(f"   Hashtags: {generated_posts.instagram.hashtags}")
+                    trace(f"   Images: {generated_posts.instagram.image_suggestions}")
+                    trace(f"💼 LinkedIn: {generated_posts.linkedin.text[:80]}{'...' if len(generated_posts.linkedin.text) > 80 else ''}")
+                    trace(f"   Hashtags: {generated_posts.linkedin.hashtags}")
+                    trace(f"🐦 X: {generated_posts.x.text[:80]}{'...' if len(generated_posts.x.text) > 80 else ''}")
+                    trace(f"   Hashtags: {generated_posts.x.hashtags}")
+                    trace("-" * 40)
+                    trace("✅ Post generation completed successfully!")
+            
+                return {
+                    "generated_posts": generated_posts,
+                    "post_variants": self._extract_variants(posts_data)
+                }
+            
+            return await self._within_local_budget(state, generate(), served)
         except Exception as e:
-            print(f"\n❌ POST GENERATION ERROR: {e}")
+            trace(f"\n❌ POST GENERATION ERROR: {e}")
             logger.error(f"Post generation failed: {e}")
             return {"generated_posts": None}
     
+    async def _analyze_and_generate_node(self, state: WorkflowState) -> Dict[str, Any]:
+        """Fused mode: context analysis and platform posts from one LLM call.
+        
+        Fills the same state as context_analysis followed by generate_posts. With
+        the insight store, a trusted stored insight is reused and only the posts
+        are generated; otherwise the fused analysis is folded into the store.
+        """
+        if tracing():
+            trace("\n" + "="*80)
+            trace("🧠📝 STEP 1+2: ANALYZE AND GENERATE NODE (FUSED)")
+            trace("="*80)
+            trace(f"📝 Campaign Message: {state.request.campaign_message}")
+            trace(f"👥 Target Audience: {state.request.target_audience}")
+            trace(f"🎭 Tone: {state.request.tone.value}")
+            trace(f"😀 Use Emojis: {state.request.use_emojis}")
+        
+        logger.info("Analyzing context and generating posts in one call...")
+        
+        if not state.request:
+            raise ValueError("No request found in state")
+        
+        request = state.request
+        served = asyncio.Event()
+        on_delta = self._post_delta_writer(state, served)
+        update: Dict[str, Any] = {}
+        insight = None
+        if self.insight_store is not None:
+            insight = self.insight_store.lookup(request.target_audience, request.tone.value)
+        
+        try:
+            async def generate() -> Dict[str, Any]:
+                if insight is not None and self.insight_store.is_trusted(insight):
+                    self.insight_store.record_reuse(request.target_audience, request.tone.value)
+                    context = insight.context_for(request.campaign_message)
+                    posts_data = await self.ai_service.generate_platform_posts(
+                        context, request.campaign_message, request.target_audience,
+                        request.tone.value, request.use_emojis, on_delta=on_delta
+                    )
+                    decision = "reused"
+                else:
+                    with self.telemetry.span("insights.analysis") as span:
+                        context, posts_data = await self.ai_service.analyze_and_generate_posts(
+                            request.campaign_message, request.target_audience,
+                            request.tone.value, request.use_emojis, on_delta=on_delta
+                        )
+                    if self.insight_store is not None and not span.attributes.get("llm.fallback"):
+                        self.insight_store.observe(request.target_audience, request.tone.value,
+                                                   request.campaign_message, context)
+                    decision = "fresh"
+            
+                if self.insight_store is not None:
+                    trace(f"🗂️ Insight store decision for '{request.target_audience}' ({request.tone.value}): {decision}")
+                    self.telemetry.context_insights.inc(decision=decision)
+                    span = current_span()
+                    if span is not None:
+                        span.set_attribute("workflow.insight_decision", decision)
+                    update["insight_decision"] = decision
+            
+                if tracing():
+                    trace("\n✅ CONTEXT ANALYSIS AND RAW POSTS:")
+                    trace("-" * 40)
+                    trace(f"🎯 Key Messages: {context.get('key_messages')}")
+                    trace(f"💡 Creative Directions: {context.get('creative_directions')}")
+                    self._trace_posts(posts_data, posts_data)
+                    trace("-" * 40)
+            
+                posts_data = await self._enforce_limits(posts_data)
+                return {
+                    "campaign_context": context,
+                    "creative_ideas": context.get("creative_directions", []),
+                    "generated_posts": self._convert_to_response_format(posts_data),
+                    "post_variants": self._extract_variants(posts_data),
+                    **update
+                }
+            
+            return await self._within_local_budget(state, generate(), served,
+                                                   self._fallback_context_update(request.target_audience))
+        except Exception as e:
+            trace(f"\n❌ ANALYZE AND GENERATE ERROR: {e}")
+            logger.error(f"Fused analysis and generation failed: {e}")
+            return {**self._fallback_context_update(request.target_audience), "generated_posts": None}
+    
+    def _fallback_context_update(self, target_audience: str) -> Dict[str, Any]:
+        """State update with the generic context analysis, for when the fused call yields none."""
+        context = self.ai_service.fallback_context(target_audience)
+        return {"campaign_context": context, "creative_ideas": context["creative_directions"]}
+    
+    @staticmethod
+    def _trace_posts(posts_data: Dict[str, Any], platforms, suffix: str = ""):
+        """Trace a preview of each platform's post."""
+        for platform in platforms:
+            data = posts_data.get(platform)
+            trace(f"📱 {platform.upper()}{suffix}:")
+            if isinstance(data, dict):
+                if "text" in data:
+                    trace(f"   Text: {data['text'][:100]}{'...' if len(data['text']) > 100 else ''}")
+                if "hashtags" in data:
+                    trace(f"   Hashtags: {data['hashtags']}")
+                if "image_suggestions" in data:
+                    trace(f"   Images: {data['image_suggestions']}")
+            trace()
+    
+    def _post_delta_writer(self, state: WorkflowState,
+                           served: Optional[asyncio.Event] = None) -> Optional[Callable[[str, str], None]]:
+        """Forward streamed post text to the graph's custom stream when streaming was requested.
+        
+        Once ``served`` is set (local posts were shown instead) the rest of the text is not forwarded.
+        """
+        if not state.stream_posts:
+            return None
+        writer = get_stream_writer()
+        
+        def write_delta(platform: str, text: str):
+            if served is None or not served.is_set():
+                writer({"type": "post_delta", "platform": platform, "text": text})
+        
+        return write_delta
+    
+    async def _within_local_budget(self, state: WorkflowState, generation: Awaitable[Dict[str, Any]],
+                                   served: asyncio.Event, local: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The generation node's update, or local template posts if the LLM misses the session's budget.
+        
+        Without a budget (one-shot runs, LOCAL_POSTS_BUDGET_MS=0) this just
+        awaits ``generation``. Otherwise, when the budget or the request
+        deadline runs out, the node returns ContentGenerator posts (plus
+        ``local``) at once and the LLM call goes on in the background; its
+        result waits in ``pending_upgrades`` for WorkflowRunner.upgrade.
+        """
+        budget_ms = state.local_posts_budget_ms
+        if not budget_ms:
+            return await generation
+        # The LLM answer may arrive after the request deadline, as an upgrade of the posts served in time
+        task = asyncio.get_running_loop().create_task(generation, context=without_deadline())
+        timeout = budget_ms / 1000
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, max(left, 0.0))
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+        if done:
+            return task.result()
+        
+        served.set()
+        request = state.request
+        trace(f"⏱️ No LLM answer within {budget_ms} ms, showing local template posts until it arrives")
+        posts_data = ContentGenerator(request.campaign_message, request.target_audience, request.tone.value,
+                                      request.use_emojis).generate_content()
+        thread_id = get_config()["configurable"]["thread_id"]
+        self.pending_upgrades.add(thread_id, asyncio.ensure_future(self._upgraded_posts(state, task)))
+        self.telemetry.local_posts.inc(outcome="served")
+        span = current_span()
+        if span is not None:
+            span.set_attribute("workflow.local_posts", True)
+        return {**(local or {}), "generated_posts": self._convert_to_response_format(posts_data),
+                "post_variants": None, "local_posts": True}
+    
+    async def _upgraded_posts(self, state: WorkflowState, generation: "asyncio.Task") -> Dict[str, Any]:
+        """The state update that replaces local posts: the node's LLM result after the optimize_posts pass."""
+        update = await generation
+        if update.get("generated_posts") is None:
+            raise ValueError("No posts generated")
+        update.update(await self._optimize_posts_node(state.model_copy(update=update)))
+        return {**update, "local_posts": False, "selected_variants": {}}
+    
+    def _make_platform_node(self, platform: str):
+        """Create the fan-out node that generates the post for a single platform."""
+        
+        async def generate_platform_node(state: WorkflowState) -> Dict[str, Any]:
+            trace(f"\n📝 FAN-OUT: GENERATING {platform.upper()} POST")
+            if state.speculative_posts and platform in state.speculative_posts:
+                return {"platform_posts": {platform: state.speculative_posts[platform]}}
+            logger.info(f"Generating {platform} post...")
+            
+            try:
+                post_data = await self.ai_service.generate_single_platform_post(
+                    platform,
+                    state.campaign_context,
+                    state.request.campaign_message,
+                    state.request.target_audience,
+                    state.request.tone.value,
+                    state.request.use_emojis,
+                    on_delta=self._post_delta_writer(state)
+                )
+            except Exception as e:
+                trace(f"\n❌ {platform.upper()} GENERATION ERROR: {e}")
+                logger.error(f"{platform} post generation failed: {e}")
+                post_data = self.ai_service._generate_fallback_posts(
+                    state.request.campaign_message,
+                    state.request.target_audience,
+                    state.request.tone.value,
+                    state.request.use_emojis
+                )[platform]
+            
+            return {"platform_posts": {platform: post_data}}
+        
+        generate_platform_node.__name__ = f"generate_{platform}_node"
+        return generate_platform_node
+    
+    async def _join_posts_node(self, state: WorkflowState) -> Dict[str, Any]:
+        """Join the per-platform fan-out results into one structured response."""
+        if tracing():
+            trace("\n🔗 FAN-OUT: JOINING PLATFORM POSTS")
+            trace(f"📱 Platforms received: {sorted(state.platform_posts)}")
+        
+        logger.info("Joining platform posts...")
+        
+        posts_data = await self._enforce_limits(state.platform_posts)
+        return {"generated_posts": self._convert_to_response_format(posts_data),
+                "post_variants": self._extract_variants(posts_data)}
+    
+    async def _optimize_posts_node(self, state: WorkflowState) -> Dict[str, Any]:
+        """Apply the platform optimizers to the current posts; no LLM call.
+        
+        Emoji policy, line breaks, link placement and hashtags are settled here
+        for every platform, so what the user reviews is what gets published.
+        The optimizers are idempotent, so posts a refinement round left alone
+        come out unchanged.
+        """
+        field = "refined_posts" if state.refined_posts else "generated_posts"
+        current_posts = getattr(state, field)
+        if current_posts is None:
+            return {}
+        
+        logger.info("Optimizing posts for their platforms...")
+        posts_data = self._convert_from_response_format(current_posts)
+        use_emojis = state.request.use_emojis
+        optimized = {platform: self.optimizers[platform].optimize(post, use_emojis)
+                     for platform, post in posts_data.items()}
+        changed = [platform for platform in PLATFORMS if optimized[platform] != posts_data[platform]]
+        if changed:
+            trace(f"🧹 Optimized for their platforms: {', '.join(changed)}")
+        update: Dict[str, Any] = {field: self._convert_to_response_format(optimized)}
+        if state.post_variants:
+            # Variants go through the same limits and optimizer as the posts, so a switch shows what was ranked
+            update["post_variants"] = {
+                platform: [self.optimizers[platform].optimize(enforce_post(platform, variant, force=True).post,
+                                                              use_emojis)
+                           for variant in variants]
+                for platform, variants in state.post_variants.items()
+            }
+        return update
+    
     async def _await_feedback_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 3: Present posts and await user feedback."""
-        print("\n" + "="*80)
-        print("⏸️ STEP 3: AWAIT FEEDBACK NODE")
-        print("="*80)
-        print("🔄 Posts generated and ready for user review...")
-        print("📋 Current workflow state:")
-        print(f"   • Posts generated: {state.generated_posts is not None}")
-        print(f"   • Iteration count: {state.iteration_count}")
-        print(f"   • Max iterations: {state.max_iterations}")
-        print("⏳ Waiting for user feedback...")
+        if tracing():
+            trace("\n" + "="*80)
+            trace("⏸️ STEP 3: AWAIT FEEDBACK NODE")
+            trace("="*80)
+            trace("🔄 Posts generated and ready for user review...")
+            trace("📋 Current workflow state:")
+            trace(f"   • Posts generated: {state.generated_posts is not None}")
+            trace(f"   • Iteration count: {state.iteration_count}")
+            trace(f"   • Max iterations: {state.max_iterations}")
+            trace("⏳ Waiting for user feedback...")
         
         logger.info("Awaiting user feedback...")
         
-        # This node doesn't modify state, just signals readiness for feedback
-        # The actual feedback will be injected externally via update_state
-        return {"needs_refinement": False}  # Default to no refinement needed
+        # Pause the graph here; the run resumes at this node with the user's decision,
+        # so a feedback round only executes refine_posts and never the earlier nodes.
+        decision = interrupt({
+            "posts": state.refined_posts or state.generated_posts,
+            "iteration_count": state.iteration_count,
+            "max_iterations": state.max_iterations
+        })
+        
+        if decision.get("action") == REFINE_ACTION and decision.get("feedback"):
+            trace(f"📩 Feedback received: {decision['feedback']}")
+            platforms = decision.get("platforms")
+            if platforms:
+                trace(f"🎯 Refining only: {', '.join(platforms)}")
+            return {"user_feedback": decision["feedback"], "refine_platforms": platforms, "needs_refinement": True}
+        
+        trace("🏁 Finalize requested")
+        return {"needs_refinement": False}
     
     async def _refine_posts_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 4: Refine posts based on feedback."""
-        print("\n" + "="*80)
-        print("🔧 STEP 4: REFINE POSTS NODE")
-        print("="*80)
-        print(f"📝 User Feedback Received: {state.user_feedback}")
-        print(f"🔄 Iteration: {state.iteration_count + 1}/{state.max_iterations}")
+        if tracing():
+            trace("\n" + "="*80)
+            trace("🔧 STEP 4: REFINE POSTS NODE")
+            trace("="*80)
+            trace(f"📝 User Feedback Received: {state.user_feedback}")
+            trace(f"🔄 Iteration: {state.iteration_count + 1}/{state.max_iterations}")
         
         logger.info("Refining posts based on feedback...")
         
+        # Each round builds on the latest version of the posts
+        current_posts = state.refined_posts or state.generated_posts
+        
         if not state.user_feedback:
-            print("⚠️ No feedback provided, using current posts...")
-            return {"refined_posts": state.generated_posts}
+            trace("⚠️ No feedback provided, using current posts...")
+            return {"refined_posts": current_posts}
         
         try:
-            print("\n🤖 Calling AI Service for post refinement...")
-            print("🎯 Applying user feedback to improve posts...")
+            if tracing():
+                trace("\n🤖 Calling AI Service for post refinement...")
+                trace("🎯 Applying user feedback to improve posts...")
             
             # Convert current posts back to dict format for AI service
-            current_posts_dict = self._convert_from_response_format(state.generated_posts)
+            current_posts_dict = self._convert_from_response_format(current_posts)
             
-            print("\n📤 SENDING TO AI:")
-            print(f"   Current posts: {len(str(current_posts_dict))} characters")
-            print(f"   Feedback: {state.user_feedback}")
+            if tracing():
+                trace("\n📤 SENDING TO AI:")
+                trace(f"   Current posts: {len(str(current_posts_dict))} characters")
+                trace(f"   Platforms: {', '.join(state.refine_platforms or PLATFORMS)}")
+                trace(f"   Feedback: {state.user_feedback}")
             
+            # Only the platforms the feedback targets are sent; the rest come back unchanged
             refined_data = await self.ai_service.refine_posts(
                 current_posts_dict,
-                state.user_feedback
+                state.user_feedback,
+                platforms=state.refine_platforms
             )
             
-            print("\n✅ REFINEMENT RESPONSE:")
-            print("-" * 40)
-            for platform, data in refined_data.items():
-                print(f"📱 {platform.upper()} (refined):")
-                if isinstance(data, dict):
-                    if "text" in data:
-                        print(f"   Text: {data['text'][:100]}{'...' if len(data['text']) > 100 else ''}")
-                    if "hashtags" in data:
-                        print(f"   Hashtags: {data['hashtags']}")
-                    if "image_suggestions" in data:
-                        print(f"   Images: {data['image_suggestions']}")
-                print()
-            print("-" * 40)
+            if tracing():
+                trace("\n✅ REFINEMENT RESPONSE:")
+                trace("-" * 40)
+                self._trace_posts(refined_data, state.refine_platforms or PLATFORMS, " (refined)")
+                trace("-" * 40)
             
+            refined_data = await self._enforce_limits(refined_data, state.refine_platforms or PLATFORMS)
             refined_posts = self._convert_to_response_format(refined_data)
+            # The alternatives of a refined post no longer match it
+            refined = state.refine_platforms or PLATFORMS
+            post_variants = {platform: variants for platform, variants in (state.post_variants or {}).items()
+                             if platform not in refined}
             
-            print("✅ Post refinement completed successfully!")
-            print(f"🔄 Next iteration count: {state.iteration_count + 1}")
+            if tracing():
+                trace("✅ Post refinement completed successfully!")
+                trace(f"🔄 Next iteration count: {state.iteration_count + 1}")
             
             return {
                 "refined_posts": refined_posts,
+                "post_variants": post_variants or None,
+                "selected_variants": {platform: index for platform, index in state.selected_variants.items()
+                                      if platform in post_variants},
                 "iteration_count": state.iteration_count + 1,
                 "needs_refinement": False,
-                "user_feedback": None  # Clear feedback after processing
+                "user_feedback": None,  # Clear feedback after processing
+                "refine_platforms": None
             }
         except Exception as e:
-            print(f"\n❌ REFINEMENT ERROR: {e}")
+            trace(f"\n❌ REFINEMENT ERROR: {e}")
             logger.error(f"Post refinement failed: {e}")
-            print("🔄 Using original posts due to error...")
-            return {"refined_posts": state.generated_posts}
+            trace("🔄 Keeping current posts due to error...")
+            return {"refined_posts": current_posts, "needs_refinement": False, "user_feedback": None,
+                    "refine_platforms": None}
     
     async def _finalize_node(self, state: WorkflowState) -> Dict[str, Any]:
         """Node 5: Finalize and format output."""
-        print("\n" + "="*80)
-        print("🏁 STEP 5: FINALIZE NODE")
-        print("="*80)
-        print("📋 Preparing final output...")
+        if tracing():
+            trace("\n" + "="*80)
+            trace("🏁 STEP 5: FINALIZE NODE")
+            trace("="*80)
+            trace("📋 Preparing final output...")
         
         logger.info("Finalizing results...")
         
         final_posts = state.refined_posts or state.generated_posts
         
         if not final_posts:
-            print("❌ No posts available for finalization!")
+            trace("❌ No posts available for finalization!")
             return {"final_result": {"error": "No posts generated"}}
         
-        print(f"✅ Using {'refined' if state.refined_posts else 'original'} posts for final output")
-        print(f"📊 Total iterations performed: {state.iteration_count}")
+        if tracing():
+            trace(f"✅ Using {'refined' if state.refined_posts else 'original'} posts for final output")
+            trace(f"📊 Total iterations performed: {state.iteration_count}")
         
         # Convert to final JSON format
         final_result = {
@@ -301,34 +862,75 @@ class SocialMediaAgent:
             }
         }
         
-        print("\n📄 FINAL JSON OUTPUT:")
-        print("-" * 40)
+        if tracing():
+            trace("\n📄 FINAL JSON OUTPUT:")
+            trace("-" * 40)
         import json
-        print(json.dumps(final_result, indent=2, ensure_ascii=False))
-        print("-" * 40)
-        print("🎉 Finalization completed successfully!")
+        if tracing():
+            trace(json.dumps(final_result, indent=2, ensure_ascii=False))
+            trace("-" * 40)
+            trace("🎉 Finalization completed successfully!")
         
         return {"final_result": final_result}
     
     def _should_refine(self, state: WorkflowState) -> str:
         """Conditional logic to determine if refinement is needed."""
         decision = "refine" if state.needs_refinement else "finalize"
-        print(f"\n🤔 DECISION POINT: Should refine? {state.needs_refinement} -> {decision}")
+        trace(f"\n🤔 DECISION POINT: Should refine? {state.needs_refinement} -> {decision}")
         return decision
     
     def _check_iteration_limit(self, state: WorkflowState) -> str:
         """Check if we should continue refining or finalize."""
-        if state.iteration_count >= state.max_iterations:
+        # The first round of posts is always shown for feedback
+        if state.iteration_count and state.iteration_count >= state.max_iterations:
             decision = "finalize"
-            print(f"\n🛑 ITERATION LIMIT REACHED: {state.iteration_count}/{state.max_iterations} -> {decision}")
+            trace(f"\n🛑 ITERATION LIMIT REACHED: {state.iteration_count}/{state.max_iterations} -> {decision}")
         else:
             decision = "continue"
-            print(f"\n🔄 CONTINUING: {state.iteration_count}/{state.max_iterations} -> {decision}")
+            trace(f"\n🔄 CONTINUING: {state.iteration_count}/{state.max_iterations} -> {decision}")
         return decision
     
+    async def _enforce_limits(self, posts_data: Dict[str, Any], platforms: List[str] = PLATFORMS) -> Dict[str, Any]:
+        """Fit the posts to the platform limits, calling the LLM only for what cannot be repaired locally.
+        
+        Hashtag clean-up and small cuts happen in place (services.post_constraints).
+        A post that would lose too much of its text gets one refine_posts round
+        with the violations as feedback, and the rewrite is then forced within
+        the limits, so the result always fits.
+        """
+        results = enforce_posts(posts_data, platforms)
+        posts = {**posts_data, **{platform: result.post for platform, result in results.items()}}
+        for platform, result in results.items():
+            if result.repairs and result.ok:
+                trace(f"🛠️ {platform} post repaired locally: {', '.join(result.repairs)}")
+                self.telemetry.post_repairs.inc(platform=platform, method="local")
+        
+        failed = {platform: result.violations for platform, result in results.items() if not result.ok}
+        if not failed:
+            return posts
+        trace(f"✂️ Asking the LLM to shorten: {', '.join(failed)}")
+        logger.info(f"Posts could not be fitted to the platform limits locally: {failed}")
+        feedback = "Tartsd be a platform korlátait: " + "; ".join(
+            f"{platform}: {', '.join(violations)}" for platform, violations in failed.items())
+        current = {platform: {key: value for key, value in post.items() if key != "variants"}
+                   for platform, post in posts.items() if isinstance(post, dict)}
+        rewritten = await self.ai_service.refine_posts(current, feedback, platforms=list(failed))
+        for platform in failed:
+            # The stored variants were alternatives to the post that has just been rewritten
+            posts[platform] = enforce_post(platform, rewritten.get(platform, current[platform]), force=True).post
+            self.telemetry.post_repairs.inc(platform=platform, method="llm")
+        return posts
+    
+    @staticmethod
+    def _extract_variants(posts_data: Dict[str, Any]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """The ranked variants the AI service attached to the posts, per platform (None without any)."""
+        variants = {platform: post["variants"] for platform, post in posts_data.items()
+                    if isinstance(post, dict) and post.get("variants")}
+        return variants or None
+    
     def _convert_to_response_format(self, posts_data: Dict) -> SocialMediaResponse:
         """Convert AI service response to structured format."""
-        print("\n🔄 Converting AI response to structured format...")
+        trace("\n🔄 Converting AI response to structured format...")
         try:
             # Handle both variation format and direct format
             facebook_data = posts_data.get("facebook", {})
@@ -366,10 +968,10 @@ class SocialMediaAgent:
                     hashtags=x_data.get("hashtags", [])
                 )
             )
-            print("✅ Conversion successful!")
+            trace("✅ Conversion successful!")
             return response
         except Exception as e:
-            print(f"❌ Conversion error: {e}")
+            trace(f"❌ Conversion error: {e}")
             logger.error(f"Error converting to response format: {e}")
             # Return empty response on error
             return SocialMediaResponse(
@@ -381,7 +983,7 @@ class SocialMediaAgent:
     
     def _convert_from_response_format(self, response: SocialMediaResponse) -> Dict:
         """Convert structured format back to dict for AI service."""
-        print("🔄 Converting structured format back to dict for AI service...")
+        trace("🔄 Converting structured format back to dict for AI service...")
         return {
             "facebook": {
                 "text": response.facebook.text,
@@ -402,128 +1004,461 @@ class SocialMediaAgent:
             }
         }
     
+    @traced_run()
     async def process_request(self, request: SocialMediaRequest) -> Dict[str, Any]:
         """Process a complete request through the workflow."""
-        print("\n" + "🚀" + "="*78 + "🚀")
-        print("🤖 STARTING COMPLETE WORKFLOW PROCESSING")
-        print("🚀" + "="*78 + "🚀")
+        if tracing():
+            trace("\n" + "🚀" + "="*78 + "🚀")
+            trace("🤖 STARTING COMPLETE WORKFLOW PROCESSING")
+            trace("🚀" + "="*78 + "🚀")
         
         initial_state = WorkflowState(request=request)
+        config = run_config(f"oneshot-{uuid.uuid4().hex}", request)
         
         try:
-            # Run the workflow
-            result = await self.workflow.ainvoke(initial_state)
+            # Run the workflow; one-shot runs take the generated posts as final at the feedback pause
+            with self.telemetry.span("workflow.process_request", {"workflow.mode": self.generation_mode}):
+                await self.oneshot_workflow.ainvoke(initial_state, config=config)
+                result = await self.oneshot_workflow.ainvoke(Command(resume={"action": FINALIZE_ACTION}), config=config)
             
-            print("\n" + "✅" + "="*78 + "✅")
-            print("🎉 WORKFLOW COMPLETED SUCCESSFULLY")
-            print("✅" + "="*78 + "✅")
+            if tracing():
+                trace("\n" + "✅" + "="*78 + "✅")
+                trace("🎉 WORKFLOW COMPLETED SUCCESSFULLY")
+                trace("✅" + "="*78 + "✅")
             
             return result.get("final_result", {"error": "No result generated"})
         except Exception as e:
-            print(f"\n❌ WORKFLOW EXECUTION FAILED: {e}")
+            trace(f"\n❌ WORKFLOW EXECUTION FAILED: {e}")
             logger.error(f"Workflow execution failed: {e}")
             return {"error": str(e)}
+        finally:
+            self._oneshot_checkpointer.delete_thread(config["configurable"]["thread_id"])
+    
+    async def process_batch(self, requests: List[SocialMediaRequest], max_concurrency: int = 5) -> List[Dict[str, Any]]:
+        """Process many requests concurrently through the shared workflow and AI service.
+        
+        Results are returned in input order, one entry per request with its own
+        success or error status, so a single failing campaign never aborts the batch.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        trace(f"\n📦 STARTING BATCH: {len(requests)} requests, max concurrency {max_concurrency}")
+        logger.info(f"Processing batch of {len(requests)} requests (max_concurrency={max_concurrency})")
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run_one(index: int, request: SocialMediaRequest) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.process_request(request)
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {e}")
+                    return {"index": index, "status": "error", "error": str(e)}
+            if "error" in result:
+                return {"index": index, "status": "error", "error": result["error"]}
+            return {"index": index, "status": "success", "result": result}
+        
+        # Per-campaign console output would serialize the batch on stdout
+        with console_trace.batch():
+            results = await asyncio.gather(*(run_one(i, request) for i, request in enumerate(requests)))
+        
+        succeeded = sum(1 for item in results if item["status"] == "success")
+        trace(f"📦 BATCH COMPLETED: {succeeded}/{len(results)} succeeded")
+        logger.info(f"Batch completed: {succeeded}/{len(results)} succeeded")
+        return list(results)
+    
+    async def stream_request(self, request: SocialMediaRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Process a request while streaming post text as it is generated.
+        
+        Yields ``{"type": "post_delta", "platform": ..., "text": ...}`` events during
+        generation and a final ``{"type": "result", "result": ...}`` event.
+        """
+        if tracing():
+            trace("\n" + "📡" + "="*78 + "📡")
+            trace("🤖 STARTING STREAMING WORKFLOW PROCESSING")
+            trace("📡" + "="*78 + "📡")
+        
+        initial_state = WorkflowState(request=request, stream_posts=True)
+        config = run_config(f"oneshot-{uuid.uuid4().hex}", request)
+        final_values: Dict[str, Any] = {}
+        
+        try:
+            async for mode, chunk in self.oneshot_workflow.astream(initial_state, config=config,
+                                                                   stream_mode=["custom", "values"]):
+                if mode == "custom":
+                    yield chunk
+            final_values = await self.oneshot_workflow.ainvoke(Command(resume={"action": FINALIZE_ACTION}), config=config)
+        except Exception as e:
+            trace(f"\n❌ STREAMING WORKFLOW FAILED: {e}")
+            logger.error(f"Streaming workflow execution failed: {e}")
+            yield {"type": "result", "result": {"error": str(e)}}
+            return
+        finally:
+            self._oneshot_checkpointer.delete_thread(config["configurable"]["thread_id"])
+        
+        yield {"type": "result", "result": final_values.get("final_result", {"error": "No result generated"})}
     
     async def process_with_feedback(self, request: SocialMediaRequest) -> 'WorkflowRunner':
         """Start workflow and return a runner for feedback interaction."""
-        print("\n" + "🔄" + "="*78 + "🔄")
-        print("🤖 STARTING INTERACTIVE WORKFLOW WITH FEEDBACK")
-        print("🔄" + "="*78 + "🔄")
-        return WorkflowRunner(self.workflow, request)
+        if tracing():
+            trace("\n" + "🔄" + "="*78 + "🔄")
+            trace("🤖 STARTING INTERACTIVE WORKFLOW WITH FEEDBACK")
+            trace("🔄" + "="*78 + "🔄")
+        return WorkflowRunner(self.workflow, request, telemetry=self.telemetry, optimizers=self.optimizers,
+                              pending_upgrades=self.pending_upgrades)
+    
+    async def resume_session(self, thread_id: str) -> 'WorkflowRunner':
+        """Reattach to a checkpointed interactive session, e.g. after a restart or on another worker."""
+        trace(f"\n♻️ RESUMING SESSION {thread_id}")
+        return await WorkflowRunner.resume(self.workflow, thread_id, telemetry=self.telemetry,
+                                           optimizers=self.optimizers, pending_upgrades=self.pending_upgrades)
 
 class WorkflowRunner:
-    """Helper class to manage workflow state and feedback interaction."""
+    """Helper class to manage workflow state and feedback interaction.
+    
+    Each runner owns one checkpointed session identified by ``thread_id``; the
+    checkpoint, not the runner object, is the source of truth, so a session can
+    be picked up again with ``WorkflowRunner.resume``.
+    """
     
-    def __init__(self, workflow, request: SocialMediaRequest):
+    def __init__(self, workflow, request: SocialMediaRequest, thread_id: Optional[str] = None,
+                 telemetry: Optional[Telemetry] = None,
+                 optimizers: Optional[Dict[str, PlatformOptimizer]] = None,
+                 pending_upgrades: Optional[PendingUpgrades] = None):
         self.workflow = workflow
-        self.state = WorkflowState(request=request)
+        self.telemetry = telemetry or default_telemetry()
+        self.optimizers = optimizers or build_optimizers()
+        # The agent's registry of LLM generations that replace local posts (see SocialMediaAgent._within_local_budget)
+        self.pending_upgrades = pending_upgrades if pending_upgrades is not None else PendingUpgrades()
+        self.thread_id = thread_id or uuid.uuid4().hex
+        # One sampling decision per session, so its steps are traced together
+        self.trace_sampled = console_trace.sample()
+        self.config = {"configurable": {"thread_id": self.thread_id}}
+        # Interactive sessions may show local posts first; one-shot runs always wait for the LLM
+        self.state = WorkflowState(request=request, local_posts_budget_ms=settings.local_posts_budget_ms)
         self.current_step = "context_analysis"
-        print(f"🏗️ WorkflowRunner initialized for request: {request.campaign_message[:50]}...")
+        trace(f"🏗️ WorkflowRunner initialized for session {self.thread_id}: {request.campaign_message[:50]}...")
+    
+    @classmethod
+    async def resume(cls, workflow, thread_id: str, telemetry: Optional[Telemetry] = None,
+                     optimizers: Optional[Dict[str, PlatformOptimizer]] = None,
+                     pending_upgrades: Optional[PendingUpgrades] = None) -> 'WorkflowRunner':
+        """Rebuild a runner from the stored checkpoint of a session."""
+        snapshot = await workflow.aget_state({"configurable": {"thread_id": thread_id}})
+        if not snapshot.values:
+            raise ValueError(f"No stored workflow session: {thread_id}")
+        
+        state = WorkflowState(**snapshot.values)
+        runner = cls(workflow, state.request, thread_id=thread_id, telemetry=telemetry, optimizers=optimizers,
+                     pending_upgrades=pending_upgrades)
+        runner.state = state
+        return runner
+    
+    def _run_config(self) -> Dict[str, Any]:
+        """Config for the next run or feedback round: the session's thread plus a fresh request deadline."""
+        return run_config(self.thread_id, self.state.request)
+    
+    async def _run_generation(self, input_state: Optional[WorkflowState]) -> Dict[str, Any]:
+        """Pick up the session from its checkpoint, only running what has not run yet."""
+        snapshot = await self.workflow.aget_state(self.config)
+        if snapshot.values and (not snapshot.next or "await_feedback" in snapshot.next):
+            trace("💾 Generation already completed for this session, using stored checkpoint")
+            return snapshot.values
+        with self.telemetry.span("workflow.run_until_feedback", {"workflow.session_id": self.thread_id,
+                                                                 "workflow.resumed": bool(snapshot.values)}):
+            if snapshot.values:
+                trace(f"♻️ Resuming interrupted run at: {snapshot.next}")
+                return await self.workflow.ainvoke(None, config=self._run_config())
+            return await self.workflow.ainvoke(input_state, config=self._run_config())
+    
+    async def _resume(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer the await_feedback interrupt and run until the next pause or the end.
+        
+        The session's checkpoints and any pending LLM answer for its local
+        posts are dropped once the workflow has finished.
+        """
+        snapshot = await self.workflow.aget_state(self.config)
+        if "await_feedback" not in snapshot.next:
+            raise ValueError("Workflow is not awaiting feedback")
+        with self.telemetry.span(f"workflow.{decision['action']}", {"workflow.session_id": self.thread_id}):
+            result = await self.workflow.ainvoke(Command(resume=decision), config=self._run_config())
+        self.state = WorkflowState(**result)
+        if self.state.final_result is not None:
+            # A finished session cannot be resumed, so its checkpoints would only fill the store
+            self.workflow.checkpointer.delete_thread(self.thread_id)
+            self.discard_upgrade()
+        return result
     
+    @traced_run("trace_sampled")
     async def run_until_feedback(self) -> Dict[str, Any]:
         """Run workflow until feedback is needed."""
-        print("\n" + "⏯️" + "="*78 + "⏯️")
-        print("🎬 RUNNING WORKFLOW UNTIL FEEDBACK NEEDED")
-        print("⏯️" + "="*78 + "⏯️")
+        if tracing():
+            trace("\n" + "⏯️" + "="*78 + "⏯️")
+            trace("🎬 RUNNING WORKFLOW UNTIL FEEDBACK NEEDED")
+            trace("⏯️" + "="*78 + "⏯️")
         
         try:
             # Execute until we need feedback
-            config = {"configurable": {"thread_id": "main"}}
-            print(f"🔧 Using config: {config}")
+            trace(f"🔧 Using config: {self.config}")
             
-            result = await self.workflow.ainvoke(self.state, config=config)
+            result = await self._run_generation(self.state)
             self.state = WorkflowState(**result)
-            
-            print(f"\n📊 WORKFLOW STATE AFTER EXECUTION:")
-            print(f"   • Generated posts: {self.state.generated_posts is not None}")
-            print(f"   • Campaign context: {self.state.campaign_context is not None}")
-            print(f"   • Iteration count: {self.state.iteration_count}")
-            print(f"   • Needs refinement: {self.state.needs_refinement}")
-            
-            if self.state.generated_posts:
-                print("\n✅ Posts generated successfully - ready for feedback!")
-                return {
-                    "status": "awaiting_feedback",
-                    "posts": self.state.generated_posts,
-                    "context": self.state.campaign_context
-                }
-            else:
-                print("\n❌ Failed to generate posts!")
-                return {"status": "error", "message": "Failed to generate posts"}
+            return self._feedback_ready_result()
         except Exception as e:
-            print(f"\n❌ WORKFLOW EXECUTION ERROR: {e}")
+            trace(f"\n❌ WORKFLOW EXECUTION ERROR: {e}")
             logger.error(f"Workflow execution failed: {e}")
             return {"status": "error", "message": str(e)}
     
-    async def provide_feedback(self, feedback: str) -> Dict[str, Any]:
-        """Provide feedback and continue workflow."""
-        print("\n" + "💬" + "="*78 + "💬")
-        print("📝 PROCESSING USER FEEDBACK")
-        print("💬" + "="*78 + "💬")
-        print(f"📩 Feedback received: {feedback}")
+    async def stream_until_feedback(self) -> AsyncIterator[Dict[str, Any]]:
+        """Run workflow until feedback is needed, streaming post text as it is generated.
+        
+        Yields ``post_delta`` events while the posts are written and finishes with a
+        ``{"type": "result", ...}`` event carrying the same payload as run_until_feedback.
+        """
+        if tracing():
+            trace("\n" + "📡" + "="*78 + "📡")
+            trace("🎬 STREAMING WORKFLOW UNTIL FEEDBACK NEEDED")
+            trace("📡" + "="*78 + "📡")
+        
+        try:
+            snapshot = await self.workflow.aget_state(self.config)
+            if snapshot.values:
+                # Nothing left to stream for a session that already has a checkpoint
+                self.state = WorkflowState(**await self._run_generation(None))
+            else:
+                self.state.stream_posts = True
+                final_values = None
+                
+                async for mode, chunk in self.workflow.astream(self.state, config=self._run_config(),
+                                                               stream_mode=["custom", "values"]):
+                    if mode == "custom":
+                        yield chunk
+                    else:
+                        final_values = chunk
+                
+                self.state = WorkflowState(**final_values)
+            self.state.stream_posts = False
+            result = self._feedback_ready_result()
+        except Exception as e:
+            trace(f"\n❌ WORKFLOW EXECUTION ERROR: {e}")
+            logger.error(f"Workflow execution failed: {e}")
+            result = {"status": "error", "message": str(e)}
+        
+        yield {"type": "result", **result}
+    
+    def _feedback_ready_result(self) -> Dict[str, Any]:
+        """Summarize the state after the generation phase for the caller."""
+        if tracing():
+            trace(f"\n📊 WORKFLOW STATE AFTER EXECUTION:")
+            trace(f"   • Generated posts: {self.state.generated_posts is not None}")
+            trace(f"   • Campaign context: {self.state.campaign_context is not None}")
+            trace(f"   • Iteration count: {self.state.iteration_count}")
+            trace(f"   • Needs refinement: {self.state.needs_refinement}")
+        
+        if self.state.generated_posts:
+            trace("\n✅ Posts generated successfully - ready for feedback!")
+            result = {
+                "status": "awaiting_feedback",
+                "posts": self.state.generated_posts,
+                "context": self.state.campaign_context
+            }
+            if self.state.post_variants:
+                result["variants"] = self.state.post_variants
+            if self.state.local_posts:
+                # Template posts shown within the latency budget; upgrade() swaps in the LLM's
+                result["local_posts"] = True
+                result["upgrade_pending"] = self.thread_id in self.pending_upgrades
+            return result
+        else:
+            trace("\n❌ Failed to generate posts!")
+            return {"status": "error", "message": "Failed to generate posts"}
+    
+    @traced_run("trace_sampled")
+    async def provide_feedback(self, feedback: str, platforms: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Provide feedback and continue workflow.
+        
+        ``platforms`` limits the refinement to those posts, so a round only costs
+        tokens for the platforms the feedback is about; by default all are refined.
+        """
+        if tracing():
+            trace("\n" + "💬" + "="*78 + "💬")
+            trace("📝 PROCESSING USER FEEDBACK")
+            trace("💬" + "="*78 + "💬")
+            trace(f"📩 Feedback received: {feedback}")
+        
+        try:
+            platforms = normalize_platforms(platforms)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
         
         try:
             # Update state with feedback
-            print("🔄 Updating workflow state with feedback...")
+            trace("🔄 Updating workflow state with feedback...")
             self.state.user_feedback = feedback
             self.state.needs_refinement = True
             
-            print(f"📊 Updated state:")
-            print(f"   • User feedback: {self.state.user_feedback[:50]}...")
-            print(f"   • Needs refinement: {self.state.needs_refinement}")
-            print(f"   • Current iteration: {self.state.iteration_count}")
+            if tracing():
+                trace(f"📊 Updated state:")
+                trace(f"   • User feedback: {self.state.user_feedback[:50]}...")
+                trace(f"   • Platforms: {', '.join(platforms or PLATFORMS)}")
+                trace(f"   • Needs refinement: {self.state.needs_refinement}")
+                trace(f"   • Current iteration: {self.state.iteration_count}")
             
-            # Continue workflow
-            config = {"configurable": {"thread_id": "main"}}
-            print("🔄 Continuing workflow with feedback...")
+            # Feedback is about the posts on screen, so a late LLM answer must not replace them
+            self.discard_upgrade()
             
-            result = await self.workflow.ainvoke(self.state, config=config)
-            self.state = WorkflowState(**result)
+            # Resume the paused await_feedback node; only refine_posts runs before the next pause
+            trace("🔄 Continuing workflow with feedback...")
+            await self._resume({"action": REFINE_ACTION, "feedback": feedback, "platforms": platforms})
             
-            print(f"\n📊 WORKFLOW STATE AFTER FEEDBACK:")
-            print(f"   • Final result: {self.state.final_result is not None}")
-            print(f"   • Refined posts: {self.state.refined_posts is not None}")
-            print(f"   • Iteration count: {self.state.iteration_count}")
-            print(f"   • Max iterations: {self.state.max_iterations}")
+            if tracing():
+                trace(f"\n📊 WORKFLOW STATE AFTER FEEDBACK:")
+                trace(f"   • Final result: {self.state.final_result is not None}")
+                trace(f"   • Refined posts: {self.state.refined_posts is not None}")
+                trace(f"   • Iteration count: {self.state.iteration_count}")
+                trace(f"   • Max iterations: {self.state.max_iterations}")
             
             if self.state.final_result:
-                print("🏁 Workflow completed with final result!")
+                trace("🏁 Workflow completed with final result!")
                 return {
                     "status": "completed",
                     "result": self.state.final_result
                 }
             elif self.state.refined_posts:
                 can_continue = self.state.iteration_count < self.state.max_iterations
-                print(f"🔄 Posts refined successfully! Can continue: {can_continue}")
+                trace(f"🔄 Posts refined successfully! Can continue: {can_continue}")
                 return {
                     "status": "refined",
                     "posts": self.state.refined_posts,
                     "can_provide_more_feedback": can_continue
                 }
             else:
-                print("❌ Failed to process feedback!")
+                trace("❌ Failed to process feedback!")
                 return {"status": "error", "message": "Failed to process feedback"}
         except Exception as e:
-            print(f"\n❌ FEEDBACK PROCESSING ERROR: {e}")
+            trace(f"\n❌ FEEDBACK PROCESSING ERROR: {e}")
             logger.error(f"Feedback processing failed: {e}")
+            return {"status": "error", "message": str(e)}
+    
+    async def upgrade_ready(self):
+        """Wait until the LLM answer for this session's local posts has arrived (or failed)."""
+        task = self.pending_upgrades.get(self.thread_id)
+        if task is not None:
+            await asyncio.wait({task})
+    
+    @traced_run("trace_sampled")
+    async def upgrade(self) -> Dict[str, Any]:
+        """Replace the local template posts with the LLM's, waiting for its answer if needed.
+        
+        The posts are only replaced while the user has not worked with them
+        yet; after feedback or finalize the answer is dropped as stale.
+        """
+        task = self.pending_upgrades.get(self.thread_id)
+        if task is None:
+            return {"status": "error", "message": "No pending upgrade for this session"}
+        await asyncio.wait({task})
+        if self.pending_upgrades.get(self.thread_id) is not task:
+            return {"status": "stale", "message": "The posts changed while the LLM answer was pending"}
+        del self.pending_upgrades[self.thread_id]
+        
+        if task.cancelled() or task.exception() is not None:
+            error = "cancelled" if task.cancelled() else str(task.exception())
+            trace(f"\n❌ LLM GENERATION FOR LOCAL POSTS FAILED: {error}")
+            logger.error(f"Generation replacing local posts failed: {error}")
+            self.telemetry.local_posts.inc(outcome="failed")
+            return {"status": "error", "message": f"LLM generation failed: {error}"}
+        
+        snapshot = await self.workflow.aget_state(self.config)
+        state = WorkflowState(**snapshot.values)
+        if "await_feedback" not in snapshot.next or not state.local_posts or state.refined_posts:
+            self.telemetry.local_posts.inc(outcome="stale")
+            return {"status": "stale", "message": "The posts changed while the LLM answer was pending"}
+        
+        await self.workflow.aupdate_state(self.config, task.result())
+        self.state = WorkflowState(**(await self.workflow.aget_state(self.config)).values)
+        self.telemetry.local_posts.inc(outcome="upgraded")
+        trace("⬆️ Local posts replaced by the LLM's")
+        return {**self._feedback_ready_result(), "upgraded": True}
+    
+    def discard_upgrade(self):
+        """Drop the pending LLM answer for local posts the user has started working with."""
+        task = self.pending_upgrades.pop(self.thread_id, None)
+        if task is None:
+            return
+        if not task.done():
+            task.cancel()
+            outcome = "stale"
+        else:
+            outcome = "failed" if task.cancelled() or task.exception() is not None else "stale"
+        self.telemetry.local_posts.inc(outcome=outcome)
+    
+    async def select_variant(self, platform: str, index: int) -> Dict[str, Any]:
+        """Show another of the ranked variants of a platform's post.
+        
+        The variants were generated with the posts, so switching costs no LLM
+        call; the choice is stored in the checkpoint and is what finalize and
+        the next feedback round work with. ``index`` 0 is the best-scored one.
+        """
+        try:
+            platform = normalize_platforms([platform])[0]
+            snapshot = await self.workflow.aget_state(self.config)
+            if "await_feedback" not in snapshot.next:
+                raise ValueError("Workflow is not awaiting feedback")
+            state = WorkflowState(**snapshot.values)
+            variants = (state.post_variants or {}).get(platform)
+            if not variants:
+                raise ValueError(f"No variants for {platform}")
+            if not 0 <= index < len(variants):
+                raise ValueError(f"Variant index out of range for {platform}: {index} (0-{len(variants) - 1})")
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        
+        variant = variants[index]
+        # Variants are stored as generated, so the chosen one gets the optimize_posts pass here
+        fitted = self.optimizers[platform].optimize(variant, state.request.use_emojis)
+        post = PlatformPost(**{field: fitted[field] for field in ("text", "hashtags", "image_suggestions")
+                               if field in fitted})
+        field = "refined_posts" if state.refined_posts else "generated_posts"
+        posts = getattr(state, field).model_copy(update={platform: post})
+        selected = {**state.selected_variants, platform: index}
+        await self.workflow.aupdate_state(self.config, {field: posts, "selected_variants": selected})
+        trace(f"🔀 Showing variant {index + 1}/{len(variants)} for {platform} (score {variant.get('score')})")
+        
+        setattr(state, field, posts)
+        state.selected_variants = selected
+        self.state = state
+        return {
+            "status": "awaiting_feedback",
+            "posts": posts,
+            "variants": state.post_variants,
+            "selected_variants": selected
+        }
+    
+    async def next_variant(self, platform: str) -> Dict[str, Any]:
+        """Cycle a platform's post to its next ranked variant (see select_variant)."""
+        snapshot = await self.workflow.aget_state(self.config)
+        state = WorkflowState(**snapshot.values) if snapshot.values else self.state
+        key = platform.strip().lower()
+        count = len((state.post_variants or {}).get(key, []))
+        index = (state.selected_variants.get(key, 0) + 1) % count if count else 0
+        return await self.select_variant(platform, index)
+    
+    @traced_run("trace_sampled")
+    async def finalize(self) -> Dict[str, Any]:
+        """Accept the current posts and finish the workflow without another LLM call."""
+        if tracing():
+            trace("\n" + "🏁" + "="*78 + "🏁")
+            trace("📦 FINALIZING WORKFLOW")
+            trace("🏁" + "="*78 + "🏁")
+        
+        try:
+            self.discard_upgrade()
+            await self._resume({"action": FINALIZE_ACTION})
+            if self.state.final_result and "error" not in self.state.final_result:
+                return {"status": "completed", "result": self.state.final_result}
+            return {"status": "error", "message": (self.state.final_result or {}).get("error", "No result generated")}
+        except Exception as e:
+            trace(f"\n❌ FINALIZATION ERROR: {e}")
+            logger.error(f"Finalization failed: {e}")
             return {"status": "error", "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from config.settings import settings
+
+
+class Saturated(Exception):
+    """No capacity for the request within its wait budget; the caller should retry later."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Draining(Exception):
+    """The server is shutting down and takes no new work."""
+
+
+class AdmissionController:
+    """Bounds the campaigns the API works on at once.
+
+    Each request holds ``weight`` slots (one per campaign it may run
+    concurrently) out of ``max_concurrency``. Requests that do not fit wait
+    in FIFO order, but at most ``max_queue`` of them and for at most
+    ``queue_timeout`` seconds; beyond that they are rejected with
+    ``Saturated``, so overload turns into fast 429s instead of growing
+    latency. ``drain`` stops admitting work and waits for the running
+    requests, for graceful shutdown.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 64, queue_timeout: float = 5.0):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_use = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.draining = False
+        self._condition = asyncio.Condition()
+        self._ticket = 0
+        self._serving = 0
+        self._done_tickets: set = set()
+        self._durations: list = []
+
+    @contextlib.asynccontextmanager
+    async def slot(self, weight: int = 1) -> AsyncIterator[None]:
+        """Hold ``weight`` slots for the duration of the block."""
+        weight = max(1, min(weight, self.max_concurrency))
+        await self._acquire(weight)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record_duration(time.monotonic() - started)
+            async with self._condition:
+                self.in_use -= weight
+                self._condition.notify_all()
+
+    async def _acquire(self, weight: int):
+        async with self._condition:
+            if self.draining:
+                raise Draining("Server is shutting down")
+            if self._fits(weight) and self.waiting == 0:
+                self._admit(weight)
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Saturated("Too many requests in flight", self.retry_after())
+            # Tickets keep the queue FIFO, so a heavy request is not starved by light ones
+            ticket = self._ticket
+            self._ticket += 1
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.draining or (ticket == self._serving and self._fits(weight))),
+                    self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Saturated("Timed out waiting for capacity", self.retry_after()) from None
+            finally:
+                self.waiting -= 1
+                self._leave_line(ticket)
+                self._condition.notify_all()
+            if self.draining:
+                raise Draining("Server is shutting down")
+            self._admit(weight)
+
+    def _fits(self, weight: int) -> bool:
+        return self.in_use + weight <= self.max_concurrency
+
+    def _admit(self, weight: int):
+        self.in_use += weight
+        self.admitted += 1
+
+    def _leave_line(self, ticket: int):
+        """Move the head of the line past every ticket that was admitted or gave up."""
+        self._done_tickets.add(ticket)
+        while self._serving in self._done_tickets:
+            self._done_tickets.discard(self._serving)
+            self._serving += 1
+
+    def _record_duration(self, seconds: float):
+        self._durations.append(seconds)
+        if len(self._durations) > 100:
+            del self._durations[:50]
+
+    def retry_after(self) -> float:
+        """Seconds after which a retry is likely to be admitted, from recent request durations."""
+        if not self._durations:
+            return 1.0
+        recent = sorted(self._durations)
+        return max(round(recent[len(recent) // 2], 1), 1.0)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Reject new work and wait until running requests finish; False if ``timeout`` ran out first."""
+        async with self._condition:
+            self.draining = True
+            self._condition.notify_all()
+            try:
+                await asyncio.wait_for(self._condition.wait_for(lambda: self.in_use == 0), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "draining": self.draining
+        }
+
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_concurrency=settings.api_max_concurrency,
+        max_queue=settings.api_max_queue,
+        queue_timeout=settings.api_queue_timeout
+    )
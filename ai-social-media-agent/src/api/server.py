@@ -0,0 +1,334 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from agents.factory import close_shared_instances, get_agent
+from agents.social_media_agent import SocialMediaAgent, WorkflowRunner, check_generation_mode
+from api.admission import AdmissionController, Draining, Saturated, build_admission_controller
+from config.settings import settings
+from models.request_models import FeedbackRequest, SocialMediaRequest
+from services.telemetry import Telemetry, default_telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class GenerateRequest(SocialMediaRequest):
+    generation_mode: Optional[str] = Field(default=None, description="single, fanout or fused (default: GENERATION_MODE)")
+    session: bool = Field(default=True, description="Keep a feedback session open instead of returning final posts")
+
+
+class BatchRequest(BaseModel):
+    requests: list[SocialMediaRequest] = Field(..., min_length=1)
+    generation_mode: Optional[str] = None
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class VariantRequest(BaseModel):
+    platform: str
+    index: Optional[int] = Field(default=None, ge=0, description="Ranked variant to show (default: the next one)")
+
+
+class SessionStore:
+    """Feedback sessions of this worker, with one lock per session.
+
+    Runners are kept in a bounded LRU; the workflow checkpoint is the source
+    of truth, so a session that was evicted, or started on another worker
+    sharing the checkpoint store, is resumed from its checkpoint.
+    """
+
+    def __init__(self, agent_for: Callable[[Optional[str]], SocialMediaAgent], max_sessions: int = 1024):
+        self._agent_for = agent_for
+        self.max_sessions = max_sessions
+        self._runners: "OrderedDict[str, Tuple[WorkflowRunner, asyncio.Lock]]" = OrderedDict()
+
+    async def create(self, request: SocialMediaRequest, generation_mode: Optional[str]) -> Tuple[WorkflowRunner, asyncio.Lock]:
+        runner = await self._agent_for(generation_mode).process_with_feedback(request)
+        return self._remember(runner)
+
+    async def get(self, session_id: str) -> Tuple[WorkflowRunner, asyncio.Lock]:
+        """The runner of a session; raises KeyError if there is no such session."""
+        if session_id in self._runners:
+            self._runners.move_to_end(session_id)
+            return self._runners[session_id]
+        try:
+            # Feedback and finalize only run nodes every mode has, so any mode's graph can resume a paused session
+            runner = await self._agent_for(None).resume_session(session_id)
+        except ValueError:
+            raise KeyError(session_id) from None
+        return self._remember(runner)
+
+    def _remember(self, runner: WorkflowRunner) -> Tuple[WorkflowRunner, asyncio.Lock]:
+        entry = self._runners.get(runner.thread_id) or (runner, asyncio.Lock())
+        self._runners[runner.thread_id] = entry
+        self._runners.move_to_end(runner.thread_id)
+        while len(self._runners) > self.max_sessions:
+            self._runners.popitem(last=False)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._runners)
+
+
+def to_jsonable(value: Any) -> Any:
+    """Runner results hold pydantic models; turn them into plain JSON values."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+class _InvalidRequest(Exception):
+    def __init__(self, message: str, errors=None):
+        super().__init__(message)
+        self.errors = errors
+
+
+def _invalid(error: Exception) -> JSONResponse:
+    return _error(422, str(error), errors=getattr(error, "errors", None))
+
+
+def _error(status: int, message: str, headers: Optional[Dict[str, str]] = None, **extra) -> JSONResponse:
+    return JSONResponse({"status": "error", "message": message, **extra}, status_code=status, headers=headers)
+
+
+def _result_response(session_id: Optional[str], result: Dict[str, Any]) -> JSONResponse:
+    body = to_jsonable(result)
+    if session_id:
+        body = {"session_id": session_id, **body}
+    # Workflow failures are reported in the body; they are not the client's fault but not server crashes either
+    return JSONResponse(body, status_code=502 if body.get("status") == "error" else 200)
+
+
+def create_app(agent_for: Optional[Callable[[Optional[str]], SocialMediaAgent]] = None,
+               admission: Optional[AdmissionController] = None,
+               telemetry: Optional[Telemetry] = None,
+               shutdown_timeout: Optional[float] = None) -> Starlette:
+    """Build the ASGI application.
+
+    By default the shared agents of ``agents.factory`` serve the requests and
+    are closed on shutdown; tests pass ``agent_for`` to use their own.
+    """
+    owns_agents = agent_for is None
+    agent_for = agent_for or get_agent
+    admission = admission or build_admission_controller()
+    telemetry = telemetry or default_telemetry()
+    shutdown_timeout = settings.api_shutdown_timeout if shutdown_timeout is None else shutdown_timeout
+    sessions = SessionStore(agent_for, settings.api_max_sessions)
+    # Sessions shown local posts (LOCAL_POSTS_BUDGET_MS) get the LLM's in the background
+    upgrades: set = set()
+
+    async def admitted(route: str, request: Request, handler, weight: int = 1) -> Response:
+        """Run ``handler`` inside an admission slot, turning overload into 429 and shutdown into 503."""
+        started = time.perf_counter()
+        try:
+            async with admission.slot(weight):
+                response = await handler()
+        except Saturated as e:
+            telemetry.http_rejected.inc(route=route, reason="saturated")
+            retry_after = str(max(int(e.retry_after + 0.5), 1))
+            response = _error(429, str(e), headers={"Retry-After": retry_after})
+        except Draining as e:
+            telemetry.http_rejected.inc(route=route, reason="draining")
+            response = _error(503, str(e), headers={"Connection": "close"})
+        telemetry.http_requests.inc(route=route, status=str(response.status_code))
+        telemetry.http_request_duration.observe(time.perf_counter() - started, route=route)
+        return response
+
+    async def parse(request: Request, model):
+        try:
+            data = await request.json()
+        except ValueError as e:
+            raise _InvalidRequest(f"Request body is not valid JSON: {e}")
+        if not isinstance(data, dict):
+            raise _InvalidRequest("Request body must be a JSON object")
+        try:
+            return model(**data)
+        except ValidationError as e:
+            raise _InvalidRequest("Invalid request", e.errors(include_url=False, include_context=False))
+
+    async def upgrade_session(runner: WorkflowRunner, lock: asyncio.Lock):
+        """Swap the LLM's posts into the session once they arrive; GET /v1/sessions/{id} shows them."""
+        try:
+            await runner.upgrade_ready()
+        except asyncio.CancelledError:
+            runner.discard_upgrade()
+            raise
+        async with lock:
+            result = await runner.upgrade()
+        if result["status"] == "error":
+            logger.warning(f"Session {runner.thread_id} kept its local posts: {result['message']}")
+
+    async def generate(request: Request) -> Response:
+        try:
+            body = await parse(request, GenerateRequest)
+            check_generation_mode(body.generation_mode)
+        except (_InvalidRequest, ValueError) as e:
+            return _invalid(e)
+        campaign = SocialMediaRequest(**body.model_dump(include=set(SocialMediaRequest.model_fields)))
+
+        async def run():
+            if not body.session:
+                result = await agent_for(body.generation_mode).process_request(campaign)
+                if "error" in result:
+                    return _error(502, result["error"])
+                return JSONResponse({"status": "completed", "result": result})
+            runner, lock = await sessions.create(campaign, body.generation_mode)
+            async with lock:
+                result = await runner.run_until_feedback()
+            if result.get("upgrade_pending"):
+                task = asyncio.create_task(upgrade_session(runner, lock))
+                upgrades.add(task)
+                task.add_done_callback(upgrades.discard)
+            return _result_response(runner.thread_id, result)
+
+        return await admitted("generate", request, run)
+
+    async def feedback(request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        try:
+            body = await parse(request, FeedbackRequest)
+        except _InvalidRequest as e:
+            return _invalid(e)
+
+        async def run():
+            try:
+                runner, lock = await sessions.get(session_id)
+            except KeyError:
+                return _error(404, f"Unknown session: {session_id}")
+            async with lock:
+                result = await runner.provide_feedback(body.feedback, body.specific_platforms)
+            return _result_response(session_id, result)
+
+        return await admitted("feedback", request, run)
+
+    async def finalize(request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+
+        async def run():
+            try:
+                runner, lock = await sessions.get(session_id)
+            except KeyError:
+                return _error(404, f"Unknown session: {session_id}")
+            async with lock:
+                result = await runner.finalize()
+            return _result_response(session_id, result)
+
+        return await admitted("finalize", request, run)
+
+    async def variant(request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        try:
+            body = await parse(request, VariantRequest)
+        except _InvalidRequest as e:
+            return _invalid(e)
+
+        async def run():
+            try:
+                runner, lock = await sessions.get(session_id)
+            except KeyError:
+                return _error(404, f"Unknown session: {session_id}")
+            async with lock:
+                if body.index is None:
+                    result = await runner.next_variant(body.platform)
+                else:
+                    result = await runner.select_variant(body.platform, body.index)
+            # Switching never calls the LLM, so a failure is about the request
+            if result["status"] == "error":
+                return _error(422, result["message"])
+            return _result_response(session_id, result)
+
+        return await admitted("variant", request, run)
+
+    async def session_state(request: Request) -> Response:
+        session_id = request.path_params["session_id"]
+        try:
+            runner, _ = await sessions.get(session_id)
+        except KeyError:
+            return _error(404, f"Unknown session: {session_id}")
+        state = runner.state
+        return JSONResponse(to_jsonable({
+            "session_id": session_id,
+            "status": "completed" if state.final_result else "awaiting_feedback",
+            "iteration_count": state.iteration_count,
+            "max_iterations": state.max_iterations,
+            "posts": state.refined_posts or state.generated_posts,
+            "variants": state.post_variants,
+            "selected_variants": state.selected_variants,
+            "local_posts": state.local_posts,
+            "upgrade_pending": runner.thread_id in runner.pending_upgrades,
+            "result": state.final_result
+        }))
+
+    async def batch(request: Request) -> Response:
+        try:
+            body = await parse(request, BatchRequest)
+            check_generation_mode(body.generation_mode)
+        except (_InvalidRequest, ValueError) as e:
+            return _invalid(e)
+        if len(body.requests) > settings.api_max_batch_size:
+            return _error(413, f"A batch holds at most {settings.api_max_batch_size} campaigns")
+        # The batch holds one slot per campaign it runs concurrently
+        concurrency = min(body.max_concurrency or settings.api_batch_concurrency, settings.api_batch_concurrency,
+                          len(body.requests), admission.max_concurrency)
+
+        async def run():
+            results = await agent_for(body.generation_mode).process_batch(body.requests, max_concurrency=concurrency)
+            succeeded = sum(1 for item in results if item["status"] == "success")
+            return JSONResponse(to_jsonable({"status": "completed", "succeeded": succeeded, "results": results}))
+
+        return await admitted("batch", request, run, weight=concurrency)
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"status": "ok"})
+
+    async def ready(request: Request) -> Response:
+        # The load balancer stops routing here as soon as shutdown begins
+        status = 503 if admission.draining else 200
+        return JSONResponse({"status": "draining" if admission.draining else "ready",
+                             "admission": admission.stats(), "sessions": len(sessions)}, status_code=status)
+
+    async def metrics(request: Request) -> Response:
+        return PlainTextResponse(telemetry.registry.render(), media_type="text/plain; version=0.0.4")
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        logger.info(f"API ready (max {admission.max_concurrency} concurrent campaigns, queue {admission.max_queue})")
+        try:
+            yield
+        finally:
+            logger.info("Draining API requests before shutdown...")
+            if not await admission.drain(shutdown_timeout):
+                logger.warning(f"Shutdown timeout ({shutdown_timeout}s) reached with requests still running")
+            for task in list(upgrades):
+                task.cancel()
+            await asyncio.gather(*upgrades, return_exceptions=True)
+            if owns_agents:
+                await close_shared_instances()
+
+    app = Starlette(routes=[
+        Route("/v1/generate", generate, methods=["POST"]),
+        Route("/v1/batch", batch, methods=["POST"]),
+        Route("/v1/sessions/{session_id}", session_state, methods=["GET"]),
+        Route("/v1/sessions/{session_id}/feedback", feedback, methods=["POST"]),
+        Route("/v1/sessions/{session_id}/finalize", finalize, methods=["POST"]),
+        Route("/v1/sessions/{session_id}/variants", variant, methods=["POST"]),
+        Route("/healthz", health, methods=["GET"]),
+        Route("/readyz", ready, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ], lifespan=lifespan)
+    app.state.admission = admission
+    app.state.sessions = sessions
+    return app
+
@@ -1,7 +1,7 @@
 import streamlit as st
-import asyncio
 import json
 import logging
+import queue
 from typing import Dict, Any, Optional
 import os
 import sys
@@ -12,6 +12,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Import our modules with absolute imports
 from models.request_models import SocialMediaRequest, ToneType
 from agents.social_media_agent import SocialMediaAgent, WorkflowRunner
+from agents.factory import get_agent
+from utils.event_loop import BackgroundEventLoop
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,8 +40,34 @@ if 'workflow_status' not in st.session_state:
 if 'context_analysis' not in st.session_state:
     st.session_state.context_analysis = None
 
+# Checkbox labels for choosing which posts a feedback round refines
+PLATFORM_LABELS = {
+    "facebook": "📘 Facebook",
+    "instagram": "📷 Instagram",
+    "linkedin": "💼 LinkedIn",
+    "x": "🐦 X (Twitter)"
+}
+
+@st.cache_resource
+def get_event_loop() -> BackgroundEventLoop:
+    """One event loop for the whole server process, so pooled connections survive reruns."""
+    return BackgroundEventLoop()
+
+@st.cache_resource
+def get_shared_agent() -> SocialMediaAgent:
+    """Process-wide agent with a warm compiled workflow and shared AI service."""
+    return get_agent()
+
+def run_async(coro):
+    """Run a coroutine on the persistent background event loop and wait for its result."""
+    return get_event_loop().run(coro)
+
 def check_api_key():
-    """Check if Groq API key is configured."""
+    """Check if Groq API key is configured (not needed for the offline fake backend)."""
+    if os.getenv("LLM_BACKEND", "groq").lower() == "fake":
+        st.info("🧪 Using the offline fake LLM backend")
+        return True
+    
     groq_key = os.getenv("GROQ_API_KEY")
     
     # Check for placeholder values (not real keys)
@@ -75,15 +103,110 @@ async def run_workflow_until_feedback(agent: SocialMediaAgent, request: SocialMe
         logger.error(f"Workflow execution failed: {e}")
         return None, {"status": "error", "message": str(e)}
 
-async def provide_feedback_to_workflow(runner: WorkflowRunner, feedback: str):
-    """Provide feedback to the workflow and get refined results."""
+async def stream_workflow_until_feedback(agent: SocialMediaAgent, request: SocialMediaRequest, on_delta):
+    """Run the workflow until feedback is needed, passing post text to on_delta as it streams in."""
+    try:
+        runner = await agent.process_with_feedback(request)
+        result = {"status": "error", "message": "No result received"}
+        async for event in runner.stream_until_feedback():
+            if event["type"] == "post_delta":
+                on_delta(event["platform"], event["text"])
+            elif event["type"] == "result":
+                result = {key: value for key, value in event.items() if key != "type"}
+        return runner, result
+    except Exception as e:
+        logger.error(f"Workflow execution failed: {e}")
+        return None, {"status": "error", "message": str(e)}
+
+async def provide_feedback_to_workflow(runner: WorkflowRunner, feedback: str, platforms=None):
+    """Provide feedback to the workflow and get refined results (only for ``platforms`` when given)."""
     try:
-        result = await runner.provide_feedback(feedback)
+        result = await runner.provide_feedback(feedback, platforms=platforms)
         return result
     except Exception as e:
         logger.error(f"Feedback processing failed: {e}")
         return {"status": "error", "message": str(e)}
 
+async def next_variant_in_workflow(runner: WorkflowRunner, platform: str):
+    """Switch a platform's post to its next generated variant; no LLM call is made."""
+    try:
+        return await runner.next_variant(platform)
+    except Exception as e:
+        logger.error(f"Variant switch failed: {e}")
+        return {"status": "error", "message": str(e)}
+
+def display_variant_switcher(runner: WorkflowRunner):
+    """One "try another" button per platform that has alternative variants."""
+    variants = runner.state.post_variants or {}
+    platforms = [platform for platform in PLATFORM_LABELS if len(variants.get(platform, [])) > 1]
+    if not platforms:
+        return
+    
+    st.markdown("**Alternative versions** (already generated, switching is free):")
+    for column, platform in zip(st.columns(len(platforms)), platforms):
+        index = runner.state.selected_variants.get(platform, 0)
+        variant = variants[platform][index]
+        label = f"🔀 {PLATFORM_LABELS[platform]} ({index + 1}/{len(variants[platform])})"
+        column.caption(f"Score {variant['score']:.2f}" + (f" · {', '.join(variant['issues'])}" if variant["issues"] else ""))
+        if column.button(label, key=f"variant_{platform}", help="Show the next-best version of this post"):
+            result = run_async(next_variant_in_workflow(runner, platform))
+            if result["status"] == "awaiting_feedback":
+                st.session_state.current_posts = result["posts"]
+                st.rerun()
+            else:
+                st.error(f"Could not switch variant: {result.get('message', 'Unknown error')}")
+
+def restore_session_from_url():
+    """Reattach to a checkpointed workflow session named in the URL, e.g. after a server restart."""
+    thread_id = st.query_params.get("session")
+    if not thread_id or st.session_state.workflow_runner is not None:
+        return
+    
+    try:
+        runner = run_async(get_shared_agent().resume_session(thread_id))
+    except Exception as e:
+        logger.warning(f"Could not restore session {thread_id}: {e}")
+        del st.query_params["session"]
+        return
+    
+    state = runner.state
+    st.session_state.workflow_runner = runner
+    st.session_state.current_posts = state.refined_posts or state.generated_posts
+    st.session_state.context_analysis = state.campaign_context
+    st.session_state.workflow_status = "completed" if state.final_result else "awaiting_feedback"
+    st.info("♻️ Restored your previous session.")
+
+async def upgrade_workflow_posts(runner: WorkflowRunner):
+    """Replace the quick local posts with the AI's, waiting for its answer if needed."""
+    try:
+        return await runner.upgrade()
+    except Exception as e:
+        logger.error(f"Upgrade to the AI posts failed: {e}")
+        return {"status": "error", "message": str(e)}
+
+def display_local_posts_notice(runner: WorkflowRunner):
+    """Explain that template posts are shown and offer the AI version once it is on its way."""
+    if not runner.state.local_posts or runner.thread_id not in runner.pending_upgrades:
+        return
+    st.info("⚡ The AI is taking a while, so these are quick template posts. The AI version is on its way.")
+    if st.button("✨ Load the AI version", help="Waits for the AI's answer and replaces the posts above"):
+        with st.spinner("Waiting for the AI's posts..."):
+            result = run_async(upgrade_workflow_posts(runner))
+        if result["status"] == "awaiting_feedback":
+            st.session_state.current_posts = result["posts"]
+            st.session_state.context_analysis = result.get("context")
+            st.rerun()
+        else:
+            st.warning(f"Keeping the template posts: {result.get('message', 'Unknown error')}")
+
+async def finalize_workflow(runner: WorkflowRunner):
+    """Accept the current posts and finish the workflow."""
+    try:
+        return await runner.finalize()
+    except Exception as e:
+        logger.error(f"Finalization failed: {e}")
+        return {"status": "error", "message": str(e)}
+
 def display_posts(posts, title="Generated Posts"):
     """Display posts in a nice format."""
     st.subheader(title)
@@ -124,6 +247,27 @@ def display_posts(posts, title="Generated Posts"):
             if posts.x.hashtags:
                 st.write("**Hashtags:** " + " ".join([f"#{tag}" for tag in posts.x.hashtags]))
 
+def create_streaming_preview():
+    """Lay out one placeholder per platform that fills up while posts are generated."""
+    st.subheader("✍️ Writing Posts...")
+    
+    col1, col2 = st.columns(2)
+    placeholders = {}
+    
+    with col1:
+        st.markdown("### 📘 Facebook")
+        placeholders["facebook"] = st.empty()
+        st.markdown("### 💼 LinkedIn")
+        placeholders["linkedin"] = st.empty()
+    
+    with col2:
+        st.markdown("### 📷 Instagram")
+        placeholders["instagram"] = st.empty()
+        st.markdown("### 🐦 X (Twitter)")
+        placeholders["x"] = st.empty()
+    
+    return placeholders
+
 def display_context_analysis(context):
     """Display context analysis in sidebar."""
     if context and "error" not in context:
@@ -151,6 +295,8 @@ def main():
     if not check_api_key():
         return
     
+    restore_session_from_url()
+    
     # Sidebar for input
     with st.sidebar:
         st.header("📝 Campaign Details")
@@ -205,17 +351,38 @@ def main():
             st.error(f"Invalid input: {e}")
             return
         
-        # Show progress
+        # Show progress, rendering post text as soon as it is generated
+        preview = st.empty()
         with st.spinner("🤖 AI is analyzing your campaign and generating posts..."):
             try:
-                # Initialize agent and run workflow
-                agent = SocialMediaAgent()
+                # Use the shared agent and run workflow
+                agent = get_shared_agent()
+                
+                with preview.container():
+                    placeholders = create_streaming_preview()
+                streamed_text = {}
+                
+                # The workflow runs on the background loop; its deltas are rendered from this thread
+                deltas = queue.Queue()
+                future = get_event_loop().submit(stream_workflow_until_feedback(
+                    agent, request, lambda platform, text: deltas.put((platform, text))
+                ))
                 
-                # Run async workflow
-                runner, result = asyncio.run(run_workflow_until_feedback(agent, request))
+                while not (future.done() and deltas.empty()):
+                    try:
+                        platform, text = deltas.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    streamed_text[platform] = streamed_text.get(platform, "") + text
+                    if platform in placeholders:
+                        placeholders[platform].write(streamed_text[platform])
+                
+                runner, result = future.result()
+                preview.empty()
                 
                 if result["status"] == "awaiting_feedback":
                     st.session_state.workflow_runner = runner
+                    st.query_params["session"] = runner.thread_id
                     st.session_state.current_posts = result["posts"]
                     st.session_state.workflow_status = "awaiting_feedback"
                     st.session_state.context_analysis = result.get("context")
@@ -234,6 +401,8 @@ def main():
         
         # Feedback section
         if st.session_state.workflow_status == "awaiting_feedback":
+            display_local_posts_notice(st.session_state.workflow_runner)
+            display_variant_switcher(st.session_state.workflow_runner)
             st.markdown("---")
             st.subheader("💬 Provide Feedback")
             st.markdown("Review the generated posts above and provide feedback for improvements:")
@@ -244,16 +413,28 @@ def main():
                 help="Describe what you'd like to change or improve in the posts"
             )
             
+            # Only the checked platforms are sent for refinement; the others stay as they are
+            st.markdown("**Apply feedback to:**")
+            platform_columns = st.columns(len(PLATFORM_LABELS))
+            selected_platforms = [
+                platform
+                for column, (platform, label) in zip(platform_columns, PLATFORM_LABELS.items())
+                if column.checkbox(label, value=True, key=f"refine_{platform}")
+            ]
+            
             col1, col2 = st.columns([1, 1])
             
             with col1:
                 if st.button("🔄 Refine Posts", type="primary"):
-                    if feedback_text.strip():
+                    if not selected_platforms:
+                        st.warning("Select at least one platform to refine.")
+                    elif feedback_text.strip():
                         with st.spinner("🤖 Refining posts based on your feedback..."):
                             try:
-                                result = asyncio.run(provide_feedback_to_workflow(
+                                result = run_async(provide_feedback_to_workflow(
                                     st.session_state.workflow_runner, 
-                                    feedback_text
+                                    feedback_text,
+                                    selected_platforms if len(selected_platforms) < len(PLATFORM_LABELS) else None
                                 ))
                                 
                                 if result["status"] == "refined":
@@ -280,10 +461,7 @@ def main():
                 if st.button("✅ Finalize Posts"):
                     try:
                         # Get final result
-                        result = asyncio.run(provide_feedback_to_workflow(
-                            st.session_state.workflow_runner, 
-                            "Finalize current posts"
-                        ))
+                        result = run_async(finalize_workflow(st.session_state.workflow_runner))
                         
                         st.session_state.workflow_status = "completed"
                         st.success("✅ Posts finalized!")
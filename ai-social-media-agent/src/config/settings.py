@@ -29,16 +29,134 @@ class Settings:
         if self.groq_api_key in ["YOUR_NEW_GROQ_API_KEY", "your_groq_api_key_here", None, ""]:
             self.groq_api_key = None
         
-        # Always use Groq
-        if self.groq_api_key:
-            self.use_groq = True
-            self.model_name: str = os.getenv("MODEL_NAME", "llama-3.3-70b-versatile")
-        else:
+        # LLM backend: "groq" (default, needs GROQ_API_KEY) or "fake" (deterministic, offline)
+        self.llm_backend: str = os.getenv("LLM_BACKEND", "groq").lower()
+        if self.llm_backend == "groq" and not self.groq_api_key:
             raise ValueError("GROQ_API_KEY environment variable is required")
-            
+        self.use_groq = self.llm_backend == "groq"
+        default_model = "llama-3.3-70b-versatile" if self.use_groq else "fake-llm"
+        self.model_name: str = os.getenv("MODEL_NAME", default_model)
+
+        # Fake backend behaviour (latencies in milliseconds)
+        self.fake_llm_seed: int = int(os.getenv("FAKE_LLM_SEED", "0"))
+        self.fake_llm_latency_distribution: str = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal").lower()
+        self.fake_llm_latency_ms: float = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+        self.fake_llm_latency_spread: float = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))
+        self.fake_llm_tokens_per_second: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "250"))
+        self.fake_llm_error_rate: float = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.fake_llm_malformed_json_rate: float = float(os.getenv("FAKE_LLM_MALFORMED_JSON_RATE", "0"))
+
         self.temperature: float = float(os.getenv("TEMPERATURE", "0.7"))
         self.max_tokens: int = int(os.getenv("MAX_TOKENS", "1500"))
+
+        # Prompt budget: prompts are compacted down to MAX_PROMPT_TOKENS (0: only the context window limits them)
+        self.llm_context_window: int = int(os.getenv("LLM_CONTEXT_WINDOW", "131072"))
+        self.max_prompt_tokens: int = int(os.getenv("MAX_PROMPT_TOKENS", "2500"))
+
+        # Audience/tone insight store: context analyses are remembered per normalized audience and tone. A stored
+        # insight that INSIGHT_REUSE_CONFIDENCE of the analyses agreed with replaces the analysis call; a less
+        # trusted one is used to generate posts speculatively while a fresh analysis runs
+        self.insight_store_enabled: bool = os.getenv("INSIGHT_STORE_ENABLED", "true").lower() == "true"
+        self.insight_store_path: Optional[str] = os.getenv("INSIGHT_STORE_PATH") or None
+        self.insight_max_entries: int = int(os.getenv("INSIGHT_MAX_ENTRIES", "1024"))
+        self.insight_ttl_seconds: float = float(os.getenv("INSIGHT_TTL_SECONDS", "604800"))
+        self.insight_reuse_confidence: float = float(os.getenv("INSIGHT_REUSE_CONFIDENCE", "0.75"))
+        self.insight_agreement_threshold: float = float(os.getenv("INSIGHT_AGREEMENT_THRESHOLD", "0.5"))
+        self.insight_revalidate_every: int = int(os.getenv("INSIGHT_REVALIDATE_EVERY", "20"))
+
+        # Workflow generation mode: "single" (one call for all platforms), "fanout" (one call per platform, in parallel)
+        # or "fused" (context analysis and all posts in one call)
+        self.generation_mode: str = os.getenv("GENERATION_MODE", "single").lower()
+        
+        # Post variants per platform asked for in one generation call (1 disables variants). They are
+        # ranked by a local rule-based scorer and kept in the session, so trying another costs no LLM call
+        self.post_variants: int = max(int(os.getenv("POST_VARIANTS", "1")), 1)
+        
+        # Workflow checkpoints: "sqlite" (default), "json" (file per session) or "memory"
+        self.checkpoint_backend: str = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+        default_checkpoint_path = ".checkpoints/sessions" if self.checkpoint_backend == "json" else ".checkpoints/workflows.sqlite"
+        self.checkpoint_path: str = os.getenv("CHECKPOINT_PATH", default_checkpoint_path)
+        
+        # Shared HTTP connection pool for LLM calls
+        self.http_max_connections: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.http_max_keepalive_connections: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+        
+        # LLM response cache (memory LRU tier, optional SQLite tier on disk)
+        self.cache_enabled: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.cache_ttl_seconds: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+        self.cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+        self.cache_sqlite_path: Optional[str] = os.getenv("LLM_CACHE_SQLITE_PATH") or None
+        self.cache_sqlite_max_entries: int = int(os.getenv("LLM_CACHE_SQLITE_MAX_ENTRIES", "100000"))
         
+        # Semantic cache in front of post generation: a campaign similar to an earlier one (same tone, emoji setting
+        # and numbers) reuses its posts above SEMANTIC_CACHE_THRESHOLD and is seeded with them above
+        # SEMANTIC_CACHE_SEED_THRESHOLD (0 disables seeding)
+        self.semantic_cache_enabled: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.93"))
+        self.semantic_cache_seed_threshold: float = float(os.getenv("SEMANTIC_CACHE_SEED_THRESHOLD", "0.85"))
+        self.semantic_cache_max_entries: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        self.semantic_cache_ttl_seconds: float = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+        self.semantic_cache_dimensions: int = int(os.getenv("SEMANTIC_CACHE_DIMENSIONS", "256"))
+        
+        # LLM rate limits shared by all workflows of the process (0 disables a limit)
+        self.rate_limit_rpm: float = float(os.getenv("RATE_LIMIT_RPM", "30"))
+        self.rate_limit_tpm: float = float(os.getenv("RATE_LIMIT_TPM", "12000"))
+        # SQLite file through which processes on this host share the limits (multi-process batches use a
+        # temporary one when unset)
+        self.rate_limit_shared_path: Optional[str] = os.getenv("RATE_LIMIT_SHARED_PATH") or None
+
+        # Retries with exponential backoff and the circuit breaker around LLM calls
+        self.llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.llm_retry_base_delay: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        self.llm_retry_max_delay: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+        self.circuit_breaker_failure_threshold: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+        self.circuit_breaker_reset_timeout: float = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT", "30"))
+        
+        # Time limits: REQUEST_DEADLINE_SECONDS bounds one run of the workflow (generation or a feedback round)
+        # and is passed down to every LLM call in it; LLM_CALL_TIMEOUT bounds each round trip (0 disables either)
+        self.request_deadline_seconds: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "0"))
+        self.llm_call_timeout: float = float(os.getenv("LLM_CALL_TIMEOUT", "30"))
+        # Hedged requests: an LLM call still running after the LLM_HEDGE_QUANTILE of recent latencies of its
+        # operation gets a duplicate, and the first valid answer wins (after LLM_HEDGE_MIN_SAMPLES calls)
+        self.llm_hedge_enabled: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+        self.llm_hedge_quantile: float = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+        self.llm_hedge_min_samples: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+        # Telemetry: spans kept in memory (and appended to TELEMETRY_SPANS_PATH as OTLP/JSON lines when set);
+        # the CLI writes the metrics in Prometheus text format to TELEMETRY_METRICS_PATH on exit
+        self.telemetry_enabled: bool = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
+        self.telemetry_span_buffer: int = int(os.getenv("TELEMETRY_SPAN_BUFFER", "1000"))
+        self.telemetry_spans_path: Optional[str] = os.getenv("TELEMETRY_SPANS_PATH") or None
+        self.telemetry_metrics_path: Optional[str] = os.getenv("TELEMETRY_METRICS_PATH") or None
+
+        # Console tracing of workflow steps: "off", "sampled" (TRACE_SAMPLE_RATE of the runs) or "verbose".
+        # Unset means sampled, and batch runs stay silent unless a verbosity is set explicitly.
+        self.trace_verbosity: Optional[str] = os.getenv("TRACE_VERBOSITY", "").lower() or None
+        self.trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+        # HTTP API (src/api): campaigns worked on at once, requests that may wait for a slot and for how long before
+        # a 429, batch limits, feedback sessions kept in memory and the time given to running requests on shutdown
+        self.api_host: str = os.getenv("API_HOST", "0.0.0.0")
+        self.api_port: int = int(os.getenv("API_PORT", "8000"))
+        self.api_max_concurrency: int = int(os.getenv("API_MAX_CONCURRENCY", "32"))
+        self.api_max_queue: int = int(os.getenv("API_MAX_QUEUE", "64"))
+        self.api_queue_timeout: float = float(os.getenv("API_QUEUE_TIMEOUT", "5"))
+        self.api_max_batch_size: int = int(os.getenv("API_MAX_BATCH_SIZE", "100"))
+        self.api_batch_concurrency: int = int(os.getenv("API_BATCH_CONCURRENCY", "5"))
+        self.api_max_sessions: int = int(os.getenv("API_MAX_SESSIONS", "1024"))
+        self.api_shutdown_timeout: float = float(os.getenv("API_SHUTDOWN_TIMEOUT", "30"))
+
+        # Durable job queue (SQLite) and its workers: attempts before a job is dead-lettered, the lease a worker
+        # renews while a job runs, campaigns per worker process, idle polling and the retry backoff
+        self.job_queue_path: str = os.getenv("JOB_QUEUE_PATH", ".jobs/jobs.sqlite")
+        self.job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self.job_worker_concurrency: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "5"))
+        self.job_poll_interval: float = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+        self.job_retry_base_delay: float = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))
+        self.job_retry_max_delay: float = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+
         # Platform-specific constraints
         self.platform_limits = {
             "facebook": {"max_chars": 63206, "hashtag_limit": 30},
@@ -46,6 +164,17 @@ class Settings:
             "linkedin": {"max_chars": 1300, "hashtag_limit": 3},
             "x": {"max_chars": 280, "hashtag_limit": 2}
         }
+        # Posts over these limits are repaired locally (hashtags trimmed, text cut at a word boundary);
+        # only when that would cut more than LOCAL_REPAIR_MAX_CUT of the text is the LLM asked to rewrite it
+        self.local_repair_max_cut: float = float(os.getenv("LOCAL_REPAIR_MAX_CUT", "0.25"))
+        
+        # Interactive sessions show the local template posts when the LLM has not answered the generation
+        # call within LOCAL_POSTS_BUDGET_MS, and swap in the LLM's posts when they arrive (0: always wait)
+        self.local_posts_budget_ms: int = int(os.getenv("LOCAL_POSTS_BUDGET_MS", "0"))
+        # LLM answers waiting to replace local posts: at most LOCAL_POSTS_MAX_PENDING, each dropped after
+        # LOCAL_POSTS_UPGRADE_TTL_SECONDS when its session never asks for it
+        self.local_posts_max_pending: int = int(os.getenv("LOCAL_POSTS_MAX_PENDING", "256"))
+        self.local_posts_upgrade_ttl_seconds: float = float(os.getenv("LOCAL_POSTS_UPGRADE_TTL_SECONDS", "600"))
         
         # Hungarian language preference
         self.primary_language = "hungarian"
@@ -1,7 +1,25 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, List, Any
+from typing_extensions import Annotated
 from enum import Enum
 
+# Platforms in the order they appear in SocialMediaResponse
+PLATFORMS = ["facebook", "instagram", "linkedin", "x"]
+
+def merge_platform_posts(current: Optional[Dict[str, Any]], update: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """State reducer that lets parallel per-platform nodes each contribute their own post."""
+    return {**(current or {}), **(update or {})}
+
+def normalize_platforms(platforms: Optional[List[str]]) -> Optional[List[str]]:
+    """Lower-case, de-duplicate and order a platform selection; None or empty means all platforms."""
+    if not platforms:
+        return None
+    selected = {platform.strip().lower() for platform in platforms}
+    unknown = selected - set(PLATFORMS)
+    if unknown:
+        raise ValueError(f"Unknown platforms: {', '.join(sorted(unknown))}")
+    return [platform for platform in PLATFORMS if platform in selected]
+
 class ToneType(str, Enum):
     FRIENDLY = "friendly"
     PROFESSIONAL = "professional"
@@ -14,6 +32,9 @@ class SocialMediaRequest(BaseModel):
     target_audience: str = Field(..., min_length=5, max_length=200, description="Brief description of target audience")
     tone: ToneType = Field(..., description="Tone of the posts")
     use_emojis: bool = Field(default=True, description="Whether to include emojis")
+    deadline_seconds: Optional[float] = Field(default=None, gt=0, le=600,
+                                              description="Seconds each run or feedback round may take; "
+                                                          "slower LLM calls give way to template posts")
 
 class PlatformPost(BaseModel):
     text: str
@@ -34,11 +55,20 @@ class WorkflowState(BaseModel):
     campaign_context: Optional[Dict[str, Any]] = None  # Changed from str to Dict
     creative_ideas: Optional[List[str]] = None  # Changed from Dict to List
     generated_posts: Optional[SocialMediaResponse] = None
+    platform_posts: Annotated[Dict[str, Any], merge_platform_posts] = Field(default_factory=dict)  # Raw posts from parallel platform nodes
+    speculative_posts: Optional[Dict[str, Any]] = None  # Raw posts generated from stored insights during the analysis
+    insight_decision: Optional[str] = None  # How the insight store shaped the context analysis
     user_feedback: Optional[str] = None
+    refine_platforms: Optional[List[str]] = None  # Platforms the pending feedback applies to (None: all)
     refined_posts: Optional[SocialMediaResponse] = None
+    post_variants: Optional[Dict[str, List[Dict[str, Any]]]] = None  # Ranked alternative posts per platform (variant mode)
+    selected_variants: Dict[str, int] = Field(default_factory=dict)  # Variant shown per platform, when not the best one
+    local_posts: bool = False  # The generated posts are the local templates' until the LLM's answer replaces them
     
     # Control flow
     needs_refinement: bool = False
+    stream_posts: bool = False  # Emit post text deltas through the graph's custom stream
+    local_posts_budget_ms: int = 0  # Wait this long for the generation call before serving local posts (0: no budget)
     iteration_count: int = 0
     max_iterations: int = 3
     
@@ -47,4 +77,9 @@ class WorkflowState(BaseModel):
 
 class FeedbackRequest(BaseModel):
     feedback: str = Field(..., min_length=1, max_length=1000, description="User feedback for refinement")
-    specific_platforms: Optional[List[str]] = Field(default=None, description="Specific platforms to focus on")
\ No newline at end of file
+    specific_platforms: Optional[List[str]] = Field(default=None, description="Specific platforms to focus on")
+
+    @field_validator("specific_platforms")
+    @classmethod
+    def check_platforms(cls, platforms: Optional[List[str]]) -> Optional[List[str]]:
+        return normalize_platforms(platforms)
\ No newline at end of file
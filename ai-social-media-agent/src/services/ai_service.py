@@ -1,31 +1,493 @@
-from langchain_groq import ChatGroq
-from langchain.schema import SystemMessage, HumanMessage
+from langchain_core.messages import SystemMessage, HumanMessage
 from config.settings import settings
+from models.request_models import PLATFORMS
+from services.content_generator import ContentGenerator
+from services.deadline import DeadlineExceeded, call_timeout, remaining, within_deadline
+from services.llm_backends import create_llm
+from services.llm_cache import LLMResponseCache, build_llm_cache, make_cache_key
+from services.post_scorer import rank_variants
+from services.prompt_budget import (
+    PromptBudget, PromptTooLargeError, TokenAccounting, TokenUsage,
+    build_prompt_budget, compact_context, compact_posts
+)
+from services.rate_limiter import RateLimiter, build_rate_limiter, estimate_tokens
+from services.semantic_cache import SemanticCache, SemanticMatch, build_semantic_cache
+from services.telemetry import Telemetry, current_span, default_telemetry
+from services.retry import (
+    CircuitBreaker, HedgePolicy, RetryPolicy, build_circuit_breaker, build_hedge_policy, build_retry_policy,
+    is_retryable, retry_after_seconds, status_code_of
+)
+from utils.json_parser import (
+    JSONExtractionError, ParseResult, coerce_post, coerce_variants, parse_json_response,
+    recover_platform_posts, recover_platform_variants, recover_social_media_response
+)
+from utils.console_trace import trace, tracing
+from utils.streaming_json import IncrementalPostParser
+import asyncio
 import logging
 import json
-from typing import Dict, Any
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Receives (platform, text_delta) while posts are being streamed
+PostDeltaCallback = Callable[[str, str], None]
 
 logger = logging.getLogger(__name__)
 
+# Budget for the posts of a similar earlier campaign quoted as a starting point
+SEMANTIC_SEED_TOKENS = 400
+
+# Display names and platform-specific notes used when prompting for a single platform
+PLATFORM_PROMPT_NOTES = {
+    "facebook": ("Facebook", ""),
+    "instagram": ("Instagram", ", 2 kép ötlet kell"),
+    "linkedin": ("LinkedIn", ", professzionális hangnem"),
+    "x": ("X (Twitter)", "")
+}
+
+def platform_rule(platform: str) -> str:
+    """Constraint line for one platform, e.g. "- X (Twitter): max 280 karakter, max 2 hashtag"."""
+    display_name, note = PLATFORM_PROMPT_NOTES[platform]
+    limits = settings.platform_limits[platform]
+    return f"- {display_name}: max {limits['max_chars']} karakter, max {limits['hashtag_limit']} hashtag{note}"
+
+def post_template(platform: str, variants: int = 1) -> Dict[str, Any]:
+    """Template of one platform's post, or of its ``variation_1``..``variation_N`` posts."""
+    post = {"text": "...", "hashtags": ["tag1", "tag2"]}
+    if platform == "instagram":
+        post["image_suggestions"] = ["kép1", "kép2"]
+    if variants == 1:
+        return post
+    return {f"variation_{index}": post for index in range(1, variants + 1)}
+
+def posts_template(platforms: List[str], variants: int = 1) -> str:
+    """JSON response template listing only the given platforms."""
+    template = {platform: post_template(platform, variants) for platform in platforms}
+    return json.dumps(template, ensure_ascii=False, indent=4).replace("\n", "\n        ")
+
+def variants_instruction(variants: int) -> str:
+    """Prompt sentence asking for several different versions of each post."""
+    if variants == 1:
+        return ""
+    return (f" Minden posztból készíts {variants} egymástól eltérő változatot "
+            f"(variation_1 ... variation_{variants}), más-más megközelítéssel.")
+
 class AIService:
-    def __init__(self):
-        if not settings.groq_api_key:
-            raise ValueError("GROQ_API_KEY environment variable is required")
-        
-        self.llm = ChatGroq(
-            api_key=settings.groq_api_key,
-            model=settings.model_name,
-            temperature=settings.temperature,
-            max_tokens=settings.max_tokens
-        )
-        logger.info(f"Using Groq API with model: {settings.model_name}")
-        print(f"🤖 AI Service initialized with Groq model: {settings.model_name}")
+    def __init__(self, cache: Optional[LLMResponseCache] = None, http_async_client=None, llm=None,
+                 rate_limiter: Optional[RateLimiter] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, prompt_budget: Optional[PromptBudget] = None,
+                 telemetry: Optional[Telemetry] = None, semantic_cache: Optional[SemanticCache] = None,
+                 post_variants: Optional[int] = None, hedge_policy: Optional[HedgePolicy] = None,
+                 call_timeout: Optional[float] = None):
+        # Any chat model with ainvoke/astream works; by default the configured backend is used
+        self.llm = llm if llm is not None else create_llm(http_async_client)
+        self.cache = cache if cache is not None else build_llm_cache()
+        # Near-duplicate campaigns reuse (or start from) earlier generated posts
+        self.semantic_cache = semantic_cache if semantic_cache is not None else build_semantic_cache()
+        # Rate limits apply to the whole API account, so long-lived processes share one limiter (see agents.factory)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else build_rate_limiter()
+        self.retry_policy = retry_policy or build_retry_policy()
+        self.circuit_breaker = circuit_breaker or build_circuit_breaker()
+        # Slow calls get a duplicate after the observed latency quantile (LLM_HEDGE_ENABLED)
+        self.hedge_policy = hedge_policy or build_hedge_policy()
+        # Seconds one round trip may take (None: no limit); the request deadline may cut it shorter
+        self.call_timeout = (call_timeout if call_timeout is not None else settings.llm_call_timeout) or None
+        self.prompt_budget = prompt_budget or build_prompt_budget()
+        # Posts asked for per platform in one call; the local scorer picks the best and keeps the rest ranked
+        self.post_variants = max(post_variants or settings.post_variants, 1)
+        self.token_accounting = TokenAccounting()
+        self.telemetry = telemetry or default_telemetry()
+        self.retries = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+        self.hedges = {"won": 0, "lost": 0, "failed": 0}
+        self.parse_outcomes: Dict[str, int] = {}
+        logger.info(f"Using {settings.llm_backend} LLM backend with model: {settings.model_name}")
+        trace(f"🤖 AI Service initialized with {settings.llm_backend} model: {settings.model_name}")
+    
+    def _cache_key(self, system_prompt: str, human_prompt: str) -> str:
+        return make_cache_key(settings.model_name, settings.temperature, system_prompt, human_prompt)
+    
+    async def _invoke_llm(self, system_prompt: str, human_prompt: str,
+                          on_text: Optional[Callable[[str], None]] = None,
+                          operation: str = "llm", saved_tokens: int = 0) -> str:
+        """Send the prompts to the LLM, answering from the response cache when possible.
+        
+        With ``on_text`` the completion is streamed and every chunk is passed to the
+        callback as it arrives; the full text is still returned at the end.
+        Token usage is recorded under ``operation`` (see token_stats).
+        """
+        prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(human_prompt)
+        usage = TokenUsage(operation, prompt_tokens, saved_tokens=saved_tokens)
+        started = time.perf_counter()
+        outcome = "error"
+        with self.telemetry.span(f"llm.{operation}", {"llm.operation": operation, "llm.model": settings.model_name}) as span:
+            try:
+                key = self._cache_key(system_prompt, human_prompt)
+                if self.cache:
+                    cached = self.cache.get(key)
+                    self.telemetry.llm_cache.inc(operation=operation, result="miss" if cached is None else "hit")
+                    if cached is not None:
+                        trace("\n💾 Response served from cache")
+                        logger.info("LLM response cache hit")
+                        usage.cached = True
+                        outcome = "cached"
+                        if on_text:
+                            on_text(cached)
+                        return cached
+                
+                if prompt_tokens > self.prompt_budget.input_limit:
+                    raise PromptTooLargeError(prompt_tokens, self.prompt_budget.input_limit)
+                messages = [SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)]
+                content = await self._call_with_retries(messages, usage, on_text)
+                outcome = "ok"
+            finally:
+                self._record_call(usage, outcome, time.perf_counter() - started, span)
+        
+        if self.cache:
+            self.cache.set(key, content)
+        return content
+    
+    def _record_call(self, usage: TokenUsage, outcome: str, seconds: float, span):
+        """Account one _invoke_llm call in the token registry, the metrics and its span."""
+        self.token_accounting.record(usage)
+        self.telemetry.llm_duration.observe(seconds, operation=usage.operation, outcome=outcome)
+        if not usage.cached:
+            self.telemetry.llm_tokens.inc(usage.prompt_tokens, operation=usage.operation, kind="prompt")
+            self.telemetry.llm_tokens.inc(usage.completion_tokens, operation=usage.operation, kind="completion")
+        span.set_attributes({
+            "llm.outcome": outcome,
+            "llm.cached": usage.cached,
+            "llm.attempts": usage.attempts,
+            "llm.usage.prompt_tokens": usage.prompt_tokens,
+            "llm.usage.completion_tokens": usage.completion_tokens,
+            "llm.usage.saved_tokens": usage.saved_tokens
+        })
+    
+    def _fit_prompt(self, system_prompt: str, human_prompt: str, section: str,
+                    shrink: Callable[[int], str]) -> Tuple[str, str]:
+        """Compact ``section`` of the human prompt until the prompt meets the budget.
+        
+        ``shrink`` gets the token budget left for the section and returns its
+        compacted text. Returns the human prompt and the section actually used.
+        """
+        overflow = self.prompt_budget.overflow(estimate_tokens(system_prompt) + estimate_tokens(human_prompt))
+        if not overflow:
+            return human_prompt, section
+        compacted = shrink(max(estimate_tokens(section) - overflow, 0))
+        logger.info(f"Prompt over budget by ~{overflow} tokens; compacted a section "
+                    f"from ~{estimate_tokens(section)} to ~{estimate_tokens(compacted)} tokens")
+        return human_prompt.replace(section, compacted, 1), compacted
+    
+    async def _call_with_retries(self, messages, usage: TokenUsage,
+                                 on_text: Optional[Callable[[str], None]]) -> str:
+        """Call the LLM behind the circuit breaker, retrying transient failures with backoff.
+        
+        A streamed call is only retried while nothing has reached ``on_text`` yet,
+        so callers never see the same text twice. Per-call timeouts are retried;
+        the request deadline is not, and no retry is started that could not
+        finish before it.
+        """
+        attempt = 0
+        while True:
+            probe = self.circuit_breaker.before_call()
+            progress = {"streamed": False}
+            try:
+                content = await self._hedged_call(messages, usage, on_text, progress)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self.circuit_breaker.record_failure()
+                error = e
+            else:
+                self.circuit_breaker.record_success()
+                return content
+            finally:
+                if probe:
+                    # Cancelled, out of time or failed for good: the API is still untested, so keep it shut off
+                    self.circuit_breaker.release_probe()
+            if attempt >= self.retry_policy.max_retries or progress["streamed"]:
+                raise error
+            retry_after = retry_after_seconds(error)
+            if status_code_of(error) == 429 and retry_after and self.rate_limiter:
+                # The account is throttled, so every workflow has to hold off, not just this one
+                self.rate_limiter.pause(retry_after)
+            delay = self.retry_policy.delay(attempt, retry_after)
+            left = remaining()
+            if left is not None and left <= delay:
+                raise DeadlineExceeded() from error
+            attempt += 1
+            self.retries += 1
+            self.telemetry.llm_retries.inc(operation=usage.operation)
+            logger.warning(f"LLM call failed ({error}); retry {attempt}/{self.retry_policy.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+    
+    async def _hedged_call(self, messages, usage: TokenUsage, on_text: Optional[Callable[[str], None]],
+                           progress: Dict[str, bool]) -> str:
+        """_rate_limited_call, with a duplicate call when the first one runs past the hedge delay.
+        
+        The first valid (non-empty) answer wins and the other call is
+        cancelled. The delay counts from when the first call got past the
+        rate limiter, so time spent queueing never triggers a duplicate.
+        Streamed calls are never hedged, since their text is already reaching
+        the caller, and neither are circuit breaker probes.
+        """
+        delay = self.hedge_policy.delay(usage.operation) if on_text is None else None
+        if delay is None or self.circuit_breaker.state != CircuitBreaker.CLOSED:
+            return await self._rate_limited_call(messages, usage, on_text, progress)
+        
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._rate_limited_call(messages, usage, None, progress, sent))
+        hedge_usage = TokenUsage(usage.operation, usage.prompt_tokens)
+        calls = [primary]
+        admitted = asyncio.ensure_future(sent.wait())
+        try:
+            await asyncio.wait([primary, admitted], return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait(calls, timeout=delay)
+            if done:
+                return primary.result()
+            trace(f"🏁 LLM call slower than {delay * 1000:.0f} ms, sending a hedged duplicate")
+            calls.append(asyncio.ensure_future(self._rate_limited_call(messages, hedge_usage, None, {"streamed": False})))
+            span = current_span()
+            if span is not None:
+                span.set_attributes({"llm.hedged": True, "llm.hedge_delay_ms": round(delay * 1000, 1)})
+            pending, error = set(calls), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # In call order, so the original answer wins a tie
+                for call in sorted(done, key=calls.index):
+                    failure = call.exception()
+                    if failure is None and call.result().strip():
+                        outcome = "lost" if call is primary else "won"
+                        if call is not primary:
+                            usage.prompt_tokens = hedge_usage.prompt_tokens
+                            usage.completion_tokens = hedge_usage.completion_tokens
+                        self._count_hedge(usage.operation, outcome)
+                        return call.result()
+                    error = error or failure
+            self._count_hedge(usage.operation, "failed")
+            if error is not None:
+                raise error
+            return primary.result()
+        finally:
+            usage.attempts += hedge_usage.attempts
+            admitted.cancel()
+            for call in calls:
+                call.cancel()
+    
+    def _count_hedge(self, operation: str, outcome: str):
+        self.hedges[outcome] += 1
+        self.telemetry.llm_hedges.inc(operation=operation, outcome=outcome)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("llm.hedge_outcome", outcome)
+    
+    async def _rate_limited_call(self, messages, usage: TokenUsage,
+                                 on_text: Optional[Callable[[str], None]], progress: Dict[str, bool],
+                                 sent: Optional[asyncio.Event] = None) -> str:
+        """One round trip to the LLM, accounted against the shared rate limits.
+        
+        The wait for the rate limiter is bounded by the request deadline, and
+        the round trip by the per-call timeout cut to the time left. ``sent``
+        is set once the limiter lets the request go out. A call cancelled
+        after that (e.g. the losing side of a hedge) still pays for its prompt,
+        which the provider has counted; one cancelled before hands back its
+        whole reservation, request included.
+        """
+        # Reserve the worst case up front and hand back what the completion did not use
+        prompt_tokens = usage.prompt_tokens
+        reserved = prompt_tokens + self.prompt_budget.max_output_tokens
+        usage.attempts += 1
+        used = 0
+        acquired = False
+        try:
+            if self.rate_limiter:
+                started = time.perf_counter()
+                await within_deadline(self.rate_limiter.acquire(reserved))
+                self._record_queue_wait(usage.operation, time.perf_counter() - started)
+            acquired = True
+            if sent is not None:
+                sent.set()
+            used = prompt_tokens
+            timeout, deadline_bound = call_timeout(self.call_timeout)
+            started = time.perf_counter()
+            try:
+                content, metadata = await asyncio.wait_for(self._round_trip(messages, on_text, progress), timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self.telemetry.llm_timeouts.inc(operation=usage.operation,
+                                                kind="deadline" if deadline_bound else "call")
+                if deadline_bound:
+                    raise DeadlineExceeded() from None
+                raise
+            self.hedge_policy.observe(usage.operation, time.perf_counter() - started)
+            if metadata:
+                # The provider's own counts replace the estimates
+                usage.prompt_tokens = metadata.get("input_tokens", prompt_tokens)
+                usage.completion_tokens = metadata.get("output_tokens", 0)
+                used = metadata.get("total_tokens", usage.total_tokens)
+            else:
+                usage.completion_tokens = estimate_tokens(content)
+                used = usage.total_tokens
+            return content
+        finally:
+            if self.rate_limiter:
+                self.rate_limiter.settle(reserved, used, sent=acquired)
+    
+    async def _round_trip(self, messages, on_text: Optional[Callable[[str], None]],
+                          progress: Dict[str, bool]) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """The completion text and the provider's usage metadata (if any) for one request."""
+        metadata = None
+        if on_text:
+            chunks = []
+            async for chunk in self.llm.astream(messages):
+                metadata = getattr(chunk, "usage_metadata", None) or metadata
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    progress["streamed"] = True
+                    on_text(chunk.content)
+            return "".join(chunks), metadata
+        response = await self.llm.ainvoke(messages)
+        return response.content, getattr(response, "usage_metadata", None)
+    
+    def _record_queue_wait(self, operation: str, seconds: float):
+        self.telemetry.llm_queue_wait.observe(seconds, operation=operation)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("llm.queue_wait_ms", span.attributes.get("llm.queue_wait_ms", 0.0) + seconds * 1000)
+    
+    def _post_text_streamer(self, on_delta: Optional[PostDeltaCallback], platform: Optional[str] = None,
+                            root: Optional[str] = None) -> Optional[Callable[[str], None]]:
+        """Turn a per-platform delta callback into a raw-chunk callback for _invoke_llm."""
+        if on_delta is None:
+            return None
+        parser = IncrementalPostParser(platform=platform, root=root)
+        
+        def on_text(chunk: str):
+            for delta_platform, delta in parser.feed(chunk):
+                on_delta(delta_platform, delta)
+        
+        return on_text
+    
+    @staticmethod
+    def _saved_tokens(original: Any, compacted_json: str) -> int:
+        """Tokens saved by sending ``compacted_json`` instead of all of ``original``."""
+        full = estimate_tokens(json.dumps(original or {}, ensure_ascii=False))
+        return max(full - estimate_tokens(compacted_json), 0)
+    
+    def _semantic_lookup(self, campaign_message: str, target_audience: str, tone: str,
+                         use_emojis: bool) -> Optional[SemanticMatch]:
+        """Closest earlier campaign from the semantic cache, counted as a hit, seed or miss."""
+        if not self.semantic_cache:
+            return None
+        started = time.perf_counter()
+        match = self.semantic_cache.lookup(campaign_message, target_audience, tone, use_emojis)
+        self.telemetry.semantic_cache_lookup_duration.observe(time.perf_counter() - started)
+        if match is None:
+            result = "miss"
+        else:
+            result = "hit" if match.similarity >= self.semantic_cache.threshold else "seed"
+        self.telemetry.semantic_cache_lookups.inc(result=result)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("semantic_cache.result", result)
+            if match is not None:
+                span.set_attribute("semantic_cache.similarity", round(match.similarity, 4))
+        return match
+    
+    def _discard_cached(self, system_prompt: str, human_prompt: str):
+        """Drop a cached response that turned out to be unusable, so a retry asks the LLM again."""
+        if self.cache:
+            self.cache.delete(self._cache_key(system_prompt, human_prompt))
+    
+    def _parse_response(self, content: str, system_prompt: str, human_prompt: str,
+                        operation: str = "llm") -> ParseResult:
+        """Decode a JSON completion leniently and count how it had to be recovered."""
+        started = time.perf_counter()
+        with self.telemetry.span("llm.parse", {"llm.operation": operation, "llm.response_chars": len(content)}) as span:
+            strategy = "failed"
+            try:
+                result = parse_json_response(content)
+                strategy = result.strategy
+            finally:
+                span.set_attribute("llm.parse_strategy", strategy)
+                self.telemetry.llm_parse.inc(operation=operation, strategy=strategy)
+                self.telemetry.llm_parse_duration.observe(time.perf_counter() - started, operation=operation)
+                self.parse_outcomes[strategy] = self.parse_outcomes.get(strategy, 0) + 1
+        if result.strategy != "direct":
+            logger.info(f"LLM response needed JSON recovery: {result.strategy}")
+        if result.partial:
+            # Usable now, but an identical request later should get a complete answer
+            self._discard_cached(system_prompt, human_prompt)
+        return result
+    
+    def _rank_variants(self, data: Any, use_emojis: bool,
+                       platforms: List[str] = PLATFORMS) -> Dict[str, List[Dict[str, Any]]]:
+        """Every platform's variants in the response, best first (empty unless variant mode is on)."""
+        if self.post_variants == 1:
+            return {}
+        return {platform: rank_variants(platform, variants, use_emojis)
+                for platform, variants in recover_platform_variants(data, platforms).items()}
+    
+    @staticmethod
+    def _attach_variants(posts: Dict[str, Dict], ranked: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict]:
+        """Copy of ``posts`` where each post with alternatives carries them under ``variants``."""
+        return {platform: {**post, "variants": ranked[platform]} if len(ranked.get(platform, [])) > 1 else post
+                for platform, post in posts.items()}
+    
+    def _count_fallback(self, operation: str):
+        self.fallbacks += 1
+        self.telemetry.llm_fallbacks.inc(operation=operation)
+        span = current_span()
+        if span is not None:
+            span.set_attribute("llm.fallback", True)
+    
+    def remember_posts(self, campaign_message: str, target_audience: str, tone: str, use_emojis: bool,
+                       posts: Dict[str, Dict]):
+        """Offer ``posts`` to later, similar campaigns through the semantic cache."""
+        if self.semantic_cache:
+            posts = {platform: {key: value for key, value in post.items() if key != "variants"}
+                     for platform, post in posts.items()}
+            self.semantic_cache.add(campaign_message, target_audience, tone, use_emojis, posts)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the response cache."""
+        return self.cache.stats() if self.cache else {"enabled": False}
+    
+    def token_stats(self, recent: int = 20) -> Dict[str, Any]:
+        """Token totals per operation and the accounting of the most recent calls."""
+        return {
+            "budget": {
+                "context_window": self.prompt_budget.context_window,
+                "max_prompt_tokens": self.prompt_budget.target,
+                "max_output_tokens": self.prompt_budget.max_output_tokens
+            },
+            "by_operation": self.token_accounting.stats(),
+            "recent_calls": self.token_accounting.recent(recent)
+        }
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Rate limiter, retry, timeout, hedging, circuit breaker, fallback and JSON recovery counters."""
+        return {
+            "parse_outcomes": dict(self.parse_outcomes),
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter else {"enabled": False},
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "timeouts": self.timeouts,
+            "hedges": {**self.hedges, "delays": self.hedge_policy.stats()},
+            "circuit_breaker": {
+                "state": self.circuit_breaker.state,
+                "opened": self.circuit_breaker.opened,
+                "rejected": self.circuit_breaker.rejected
+            }
+        }
     
     async def analyze_context(self, campaign_message: str, target_audience: str, tone: str) -> Dict[str, Any]:
         """First step: Analyze campaign context and generate initial ideas."""
         
-        print("\n🔍 AI SERVICE: CONTEXT ANALYSIS")
-        print("-" * 50)
+        if tracing():
+            trace("\n🔍 AI SERVICE: CONTEXT ANALYSIS")
+            trace("-" * 50)
         
         system_prompt = """
         Te egy kreatív magyar marketing szakértő vagy. A feladatod hogy elemezd a kampányüzenetet és célközönséget, 
@@ -63,34 +525,38 @@ class AIService:
         }}
         """
         
-        print("📤 SENDING TO AI:")
-        print(f"   System Prompt: {system_prompt[:100]}...")
-        print(f"   Human Prompt: {human_prompt[:200]}...")
-        print("   Full prompts logged below:")
-        print("\n🔧 FULL SYSTEM PROMPT:")
-        print(system_prompt)
-        print("\n📝 FULL HUMAN PROMPT:")
-        print(human_prompt)
+        if tracing():
+            trace("📤 SENDING TO AI:")
+            trace(f"   System Prompt: {system_prompt[:100]}...")
+            trace(f"   Human Prompt: {human_prompt[:200]}...")
+            trace("   Full prompts logged below:")
+            trace("\n🔧 FULL SYSTEM PROMPT:")
+            trace(system_prompt)
+            trace("\n📝 FULL HUMAN PROMPT:")
+            trace(human_prompt)
         
+        content = ""
         try:
-            messages = [SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)]
-            print("\n⏳ Sending request to Groq API...")
-            response = await self.llm.ainvoke(messages)
+            trace("\n⏳ Sending request to Groq API...")
+            content = await self._invoke_llm(system_prompt, human_prompt, operation="analyze_context")
             
-            print(f"\n📥 RAW AI RESPONSE:")
-            print(f"   Length: {len(response.content)} characters")
-            print(f"   Content: {response.content}")
+            if tracing():
+                trace(f"\n📥 RAW AI RESPONSE:")
+                trace(f"   Length: {len(content)} characters")
+                trace(f"   Content: {content}")
             
-            # Try to parse JSON response
-            parsed_response = json.loads(response.content)
-            print(f"\n✅ PARSED JSON RESPONSE:")
-            print(json.dumps(parsed_response, indent=2, ensure_ascii=False))
+            parsed_response = self._parse_response(content, system_prompt, human_prompt, "analyze_context").data
+            if tracing():
+                trace(f"\n✅ PARSED JSON RESPONSE:")
+                trace(json.dumps(parsed_response, indent=2, ensure_ascii=False))
             return parsed_response
             
         except json.JSONDecodeError as e:
-            print(f"\n❌ JSON PARSE ERROR: {e}")
-            print(f"   Raw content: {response.content}")
-            logger.error(f"Failed to parse context analysis response: {response.content}")
+            if tracing():
+                trace(f"\n❌ JSON PARSE ERROR: {e}")
+                trace(f"   Raw content: {content}")
+            logger.error(f"Failed to parse context analysis response: {content}")
+            self._discard_cached(system_prompt, human_prompt)
             # Return a default structure that matches expected format
             fallback = {
                 "key_messages": ["Kampány üzenet elemzése"],
@@ -103,10 +569,12 @@ class AIService:
                 },
                 "creative_directions": ["Engaging tartalom", "Platform-specifikus optimalizáció", "Célközönség-fókusz"]
             }
-            print(f"🔄 Using fallback response: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            if tracing():
+                trace(f"🔄 Using fallback response: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            self._count_fallback("analyze_context")
             return fallback
         except Exception as e:
-            print(f"\n❌ AI SERVICE ERROR: {e}")
+            trace(f"\n❌ AI SERVICE ERROR: {e}")
             logger.error(f"Context analysis failed: {e}")
             # Return a default structure instead of error dict
             fallback = {
@@ -120,15 +588,42 @@ class AIService:
                 },
                 "creative_directions": ["Kreatív megközelítés"]
             }
-            print(f"🔄 Using fallback response due to error: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            if tracing():
+                trace(f"🔄 Using fallback response due to error: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            self._count_fallback("analyze_context")
             return fallback
     
     async def generate_platform_posts(self, context: Dict, campaign_message: str, 
-                                    target_audience: str, tone: str, use_emojis: bool) -> Dict[str, Dict]:
-        """Second step: Generate platform-specific posts based on context analysis."""
+                                    target_audience: str, tone: str, use_emojis: bool,
+                                    on_delta: Optional[PostDeltaCallback] = None,
+                                    remember: bool = True) -> Dict[str, Dict]:
+        """Second step: Generate platform-specific posts based on context analysis.
+        
+        Pass ``on_delta`` to stream the completion; it is called with each platform's
+        newly generated text while the response is still arriving. In variant mode
+        each post is the best-scored variant and carries the ranked ``variants``.
+        With ``remember=False`` the posts stay out of the semantic cache until
+        passed to remember_posts, as speculative posts may yet be discarded.
+        """
+        
+        if tracing():
+            trace("\n📝 AI SERVICE: PLATFORM POSTS GENERATION")
+            trace("-" * 50)
+        
+        match = self._semantic_lookup(campaign_message, target_audience, tone, use_emojis)
+        if match is not None and match.similarity >= self.semantic_cache.threshold:
+            trace(f"\n🧲 Semantic cache hit ({match.similarity:.3f}), reusing the posts of: {match.campaign_message}")
+            if on_delta:
+                for platform, post in match.posts.items():
+                    on_delta(platform, post.get("text", ""))
+            return match.posts
         
-        print("\n📝 AI SERVICE: PLATFORM POSTS GENERATION")
-        print("-" * 50)
+        seed_section = ""
+        if match is not None:
+            trace(f"\n🌱 Seeding the prompt with a similar campaign ({match.similarity:.3f})")
+            seed_json = json.dumps(compact_posts(match.posts, SEMANTIC_SEED_TOKENS), ensure_ascii=False)
+            seed_section = (f"\n        Egy hasonló korábbi kampány posztjai (kiindulópont, igazítsd az új "
+                            f"kampányüzenethez): {seed_json}")
         
         emoji_instruction = "Használj releváns emojikat" if use_emojis else "Ne használj emojikat"
         
@@ -149,223 +644,422 @@ class AIService:
         FONTOS: Válaszolj CSAK valid JSON formátumban, semmi mással! Ne írj semmilyen szöveget a JSON elé vagy mögé!
         """
         
+        context_json = json.dumps(compact_context(context, PLATFORMS), ensure_ascii=False)
         human_prompt = f"""
-        Kontextus elemzés: {json.dumps(context, ensure_ascii=False)}
+        Kontextus elemzés: {context_json}
         Kampányüzenet: {campaign_message}
         Célközönség: {target_audience}
-        Hangnem: {tone}
+        Hangnem: {tone}{seed_section}
         
-        Készíts egy optimalizált posztot minden platformra. Válaszold CSAK JSON formátumban:
-        {{
-            "facebook": {{
-                "text": "...",
-                "hashtags": ["tag1", "tag2"]
-            }},
-            "instagram": {{
-                "text": "...",
-                "hashtags": ["tag1", "tag2"],
-                "image_suggestions": ["kép1", "kép2"]
-            }},
-            "linkedin": {{
-                "text": "...",
-                "hashtags": ["tag1"]
-            }},
-            "x": {{
-                "text": "...",
-                "hashtags": ["tag1"]
-            }}
-        }}
+        Készíts egy optimalizált posztot minden platformra.{variants_instruction(self.post_variants)} Válaszold CSAK JSON formátumban:
+        {posts_template(list(PLATFORMS), self.post_variants)}
         """
         
-        print("📤 SENDING TO AI:")
-        print(f"   Context: {json.dumps(context, ensure_ascii=False)}")
-        print(f"   Campaign: {campaign_message}")
-        print(f"   Audience: {target_audience}")
-        print(f"   Tone: {tone}")
-        print(f"   Emojis: {use_emojis}")
+        human_prompt, compacted_json = self._fit_prompt(
+            system_prompt, human_prompt, context_json,
+            lambda budget: json.dumps(compact_context(context, PLATFORMS, budget), ensure_ascii=False)
+        )
+        saved_tokens = self._saved_tokens(context, compacted_json)
+        
+        if tracing():
+            trace("📤 SENDING TO AI:")
+            trace(f"   Context: {compacted_json}")
+            trace(f"   Campaign: {campaign_message}")
+            trace(f"   Audience: {target_audience}")
+            trace(f"   Tone: {tone}")
+            trace(f"   Emojis: {use_emojis}")
         
-        print("\n🔧 FULL SYSTEM PROMPT:")
-        print(system_prompt)
-        print("\n📝 FULL HUMAN PROMPT:")
-        print(human_prompt)
+        if tracing():
+            trace("\n🔧 FULL SYSTEM PROMPT:")
+            trace(system_prompt)
+            trace("\n📝 FULL HUMAN PROMPT:")
+            trace(human_prompt)
         
+        content = ""
         try:
-            messages = [SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)]
-            print("\n⏳ Sending request to Groq API...")
-            response = await self.llm.ainvoke(messages)
+            trace("\n⏳ Sending request to Groq API...")
+            content = (await self._invoke_llm(system_prompt, human_prompt, self._post_text_streamer(on_delta),
+                                              operation="generate_posts", saved_tokens=saved_tokens)).strip()
             
-            # Clean the response content to extract JSON
-            content = response.content.strip()
+            if tracing():
+                trace(f"\n📥 RAW AI RESPONSE:")
+                trace(f"   Length: {len(content)} characters")
+                trace(f"   Content: {content}")
             
-            print(f"\n📥 RAW AI RESPONSE:")
-            print(f"   Length: {len(content)} characters")
-            print(f"   Content: {content}")
-            
-            # Try to find JSON in the response
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                json_content = content[json_start:json_end]
-                print(f"\n🔍 EXTRACTED JSON:")
-                print(json_content)
-                
-                parsed_response = json.loads(json_content)
-                print(f"\n✅ PARSED JSON RESPONSE:")
-                print(json.dumps(parsed_response, indent=2, ensure_ascii=False))
-                logger.info("Successfully parsed posts generation response")
-                return parsed_response
-            else:
-                raise json.JSONDecodeError("No JSON found in response", content, 0)
+            result = self._parse_response(content, system_prompt, human_prompt, "generate_posts")
+            ranked = self._rank_variants(result.data, use_emojis)
+            # Keep every valid post; only the missing platforms get fallback content
+            response, missing = recover_social_media_response(
+                {platform: variants[0] for platform, variants in ranked.items()} if ranked else result.data,
+                lambda: self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis)
+            )
+            if missing:
+                trace(f"\n⚠️ Missing from response, using fallback: {', '.join(missing)}")
+                logger.warning(f"Posts generation response lacked: {missing}")
+                self._discard_cached(system_prompt, human_prompt)
+            parsed_response = response.model_dump(exclude_none=True)
+            if tracing():
+                trace(f"\n✅ PARSED JSON RESPONSE:")
+                trace(json.dumps(parsed_response, indent=2, ensure_ascii=False))
+            logger.info("Successfully parsed posts generation response")
+            if remember and not missing:
+                self.remember_posts(campaign_message, target_audience, tone, use_emojis, parsed_response)
+            return self._attach_variants(parsed_response, ranked)
                 
         except json.JSONDecodeError as e:
-            print(f"\n❌ JSON PARSE ERROR: {e}")
-            print(f"   Trying to extract from: {content}")
+            if tracing():
+                trace(f"\n❌ JSON PARSE ERROR: {e}")
+                trace(f"   Trying to extract from: {content}")
             logger.error(f"Failed to parse posts generation response: {content}")
+            self._discard_cached(system_prompt, human_prompt)
             # Return fallback posts with the campaign message
             fallback = self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis)
-            print(f"🔄 Using fallback posts: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            if tracing():
+                trace(f"🔄 Using fallback posts: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            self._count_fallback("generate_posts")
             return fallback
         except Exception as e:
-            print(f"\n❌ AI SERVICE ERROR: {e}")
+            trace(f"\n❌ AI SERVICE ERROR: {e}")
             logger.error(f"Posts generation failed: {e}")
             fallback = self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis)
-            print(f"🔄 Using fallback posts due to error: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            if tracing():
+                trace(f"🔄 Using fallback posts due to error: {json.dumps(fallback, indent=2, ensure_ascii=False)}")
+            self._count_fallback("generate_posts")
             return fallback
     
-    async def refine_posts(self, current_posts: Dict, feedback: str) -> Dict[str, Dict]:
-        """Third step: Refine posts based on user feedback."""
+    async def analyze_and_generate_posts(self, campaign_message: str, target_audience: str, tone: str,
+                                         use_emojis: bool,
+                                         on_delta: Optional[PostDeltaCallback] = None) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+        """Context analysis and platform posts from a single LLM call (the "fused" generation mode).
         
-        print("\n🔧 AI SERVICE: POST REFINEMENT")
-        print("-" * 50)
+        Returns ``(context, posts)`` shaped like the results of analyze_context and
+        generate_platform_posts. The analysis is not sent back as input, so the
+        second round trip and its prompt tokens are saved. Each half falls back on
+        its own: valid posts are kept when the analysis is missing, and vice versa.
+        """
         
-        system_prompt = """
+        if tracing():
+            trace("\n🧠📝 AI SERVICE: FUSED CONTEXT ANALYSIS AND POSTS GENERATION")
+            trace("-" * 50)
+        
+        emoji_instruction = "Használj releváns emojikat" if use_emojis else "Ne használj emojikat"
+        posts_json_template = posts_template(list(PLATFORMS), self.post_variants).replace("\n", "\n    ")
+        platform_rules = "\n        ".join(platform_rule(platform) for platform in PLATFORMS)
+        
+        system_prompt = f"""
+        Te egy kreatív magyar marketing szakértő és közösségi média tartalomkészítő vagy. A feladatod hogy elemezd
+        a kampányüzenetet és célközönséget, majd az elemzésre építve platform-specifikus posztokat generálj.
+        
+        Platform korlátok:
+        {platform_rules}
+        
+        Általános szabályok:
+        - Magyar nyelv használata (angol szavak csak indokolt esetben)
+        - {emoji_instruction}
+        - Hashtag-ek relevancia alapján legyenek rangsorolva
+        
+        FONTOS: Válaszolj CSAK valid JSON formátumban, semmi mással! Ne írj semmilyen szöveget a JSON elé vagy mögé!
+        """
+        
+        human_prompt = f"""
+        Kampányüzenet: {campaign_message}
+        Célközönség: {target_audience}
+        Hangnem: {tone}
+        
+        Először elemezd a kampány kontextusát (kulcsüzenetek, célközönség motivációi, platform stratégiák,
+        kreatív irányok), majd ez alapján készíts egy optimalizált posztot minden platformra.{variants_instruction(self.post_variants)}
+        Válaszold CSAK JSON formátumban:
+        {{
+            "context": {{
+                "key_messages": ["üzenet1", "üzenet2"],
+                "audience_insights": "célközönség elemzése",
+                "platform_strategies": {{
+                    "facebook": "stratégia",
+                    "instagram": "stratégia",
+                    "linkedin": "stratégia",
+                    "x": "stratégia"
+                }},
+                "creative_directions": ["irány1", "irány2", "irány3"]
+            }},
+            "posts": {posts_json_template}
+        }}
+        """
+        
+        if tracing():
+            trace("\n🔧 FULL SYSTEM PROMPT:")
+            trace(system_prompt)
+            trace("\n📝 FULL HUMAN PROMPT:")
+            trace(human_prompt)
+        
+        content = ""
+        try:
+            trace("\n⏳ Sending request to Groq API...")
+            content = (await self._invoke_llm(system_prompt, human_prompt,
+                                              self._post_text_streamer(on_delta, root="posts"),
+                                              operation="analyze_and_generate")).strip()
+            
+            if tracing():
+                trace(f"\n📥 RAW AI RESPONSE:")
+                trace(f"   Length: {len(content)} characters")
+                trace(f"   Content: {content}")
+            
+            data = self._parse_response(content, system_prompt, human_prompt, "analyze_and_generate").data
+            if not isinstance(data, dict):
+                raise JSONExtractionError("Fused response is not a JSON object", content)
+            context = data.get("context")
+            posts_data = data.get("posts")
+            if not isinstance(posts_data, dict):
+                # Models sometimes flatten the answer; platform keys at the top level are posts too
+                posts_data = {platform: data[platform] for platform in PLATFORMS if platform in data}
+            has_context = isinstance(context, dict) and bool(context.get("platform_strategies"))
+            
+            make_fallback = lambda: self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis)
+            ranked = self._rank_variants(posts_data, use_emojis)
+            if ranked:
+                posts_data = {platform: variants[0] for platform, variants in ranked.items()}
+            try:
+                response, missing = recover_social_media_response(posts_data, make_fallback)
+                posts = response.model_dump(exclude_none=True)
+            except JSONExtractionError:
+                if not has_context:
+                    raise
+                posts, missing = make_fallback(), list(PLATFORMS)
+            if missing:
+                trace(f"\n⚠️ Missing from response, using fallback: {', '.join(missing)}")
+                logger.warning(f"Fused response lacked posts for: {missing}")
+            if not has_context:
+                trace("\n⚠️ Context analysis missing from the fused response, using fallback context")
+                logger.warning("Fused response lacked the context analysis")
+                context = self.fallback_context(target_audience)
+            if missing or not has_context:
+                self._discard_cached(system_prompt, human_prompt)
+            if len(missing) == len(PLATFORMS) or not has_context:
+                self._count_fallback("analyze_and_generate")
+            if tracing():
+                trace(f"\n✅ PARSED JSON RESPONSE:")
+                trace(json.dumps({"context": context, "posts": posts}, indent=2, ensure_ascii=False))
+            logger.info("Successfully parsed fused analysis and posts response")
+            if self.semantic_cache and not missing:
+                self.semantic_cache.add(campaign_message, target_audience, tone, use_emojis, posts)
+            return context, self._attach_variants(posts, ranked)
+        
+        except json.JSONDecodeError as e:
+            if tracing():
+                trace(f"\n❌ JSON PARSE ERROR: {e}")
+                trace(f"   Raw content: {content}")
+            logger.error(f"Failed to parse fused analysis and posts response: {content}")
+            self._discard_cached(system_prompt, human_prompt)
+        except Exception as e:
+            trace(f"\n❌ AI SERVICE ERROR: {e}")
+            logger.error(f"Fused analysis and posts generation failed: {e}")
+        
+        trace("🔄 Using fallback context and posts")
+        self._count_fallback("analyze_and_generate")
+        return (self.fallback_context(target_audience),
+                self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis))
+    
+    async def generate_single_platform_post(self, platform: str, context: Dict, campaign_message: str,
+                                            target_audience: str, tone: str, use_emojis: bool,
+                                            on_delta: Optional[PostDeltaCallback] = None) -> Dict[str, Any]:
+        """Generate the post for one platform only, so platforms can be generated concurrently."""
+        
+        if platform not in PLATFORM_PROMPT_NOTES:
+            raise ValueError(f"Unknown platform: {platform}")
+        
+        if tracing():
+            trace(f"\n📝 AI SERVICE: {platform.upper()} POST GENERATION")
+            trace("-" * 50)
+        
+        display_name = PLATFORM_PROMPT_NOTES[platform][0]
+        emoji_instruction = "Használj releváns emojikat" if use_emojis else "Ne használj emojikat"
+        template = json.dumps(post_template(platform, self.post_variants), ensure_ascii=False,
+                              indent=4).replace("\n", "\n        ")
+        
+        system_prompt = f"""
+        Te egy szakértő közösségi média tartalomkészítő vagy. A feladatod hogy egy {display_name} posztot generálj.
+        
+        Platform korlátok:
+        {platform_rule(platform)}
+        
+        Általános szabályok:
+        - Magyar nyelv használata (angol szavak csak indokolt esetben)
+        - {emoji_instruction}
+        - Hashtag-ek relevancia alapján legyenek rangsorolva
+        
+        FONTOS: Válaszolj CSAK valid JSON formátumban, semmi mással! Ne írj semmilyen szöveget a JSON elé vagy mögé!
+        """
+        
+        # Only this platform's strategy is relevant to the prompt
+        context_json = json.dumps(compact_context(context, [platform]), ensure_ascii=False)
+        human_prompt = f"""
+        Kontextus elemzés: {context_json}
+        Kampányüzenet: {campaign_message}
+        Célközönség: {target_audience}
+        Hangnem: {tone}
+        
+        Készíts egy optimalizált {display_name} posztot.{variants_instruction(self.post_variants)} Válaszold CSAK JSON formátumban:
+        {template}
+        """
+        
+        human_prompt, compacted_json = self._fit_prompt(
+            system_prompt, human_prompt, context_json,
+            lambda budget: json.dumps(compact_context(context, [platform], budget), ensure_ascii=False)
+        )
+        
+        content = ""
+        try:
+            trace(f"⏳ Sending {platform} request to Groq API...")
+            content = (await self._invoke_llm(system_prompt, human_prompt,
+                                              self._post_text_streamer(on_delta, platform),
+                                              operation=f"generate_post:{platform}",
+                                              saved_tokens=self._saved_tokens(context, compacted_json))).strip()
+            
+            if tracing():
+                trace(f"\n📥 RAW AI RESPONSE ({platform}):")
+                trace(f"   Length: {len(content)} characters")
+            
+            data = self._parse_response(content, system_prompt, human_prompt, f"generate_post:{platform}").data
+            # Accept both the bare post object and one wrapped in its platform key
+            data = data[platform] if isinstance(data.get(platform), dict) else data
+            ranked = {platform: rank_variants(platform, coerce_variants(data), use_emojis)} if self.post_variants > 1 else {}
+            parsed_response = coerce_post(ranked[platform][0] if ranked.get(platform) else data)
+            if parsed_response is None:
+                raise JSONExtractionError("Post text missing from response", content)
+            
+            logger.info(f"Successfully parsed {platform} post generation response")
+            return self._attach_variants({platform: parsed_response}, ranked)[platform]
+        except json.JSONDecodeError as e:
+            trace(f"\n❌ {platform.upper()} JSON PARSE ERROR: {e}")
+            logger.error(f"Failed to parse {platform} post generation response: {content}")
+            self._discard_cached(system_prompt, human_prompt)
+        except Exception as e:
+            trace(f"\n❌ {platform.upper()} AI SERVICE ERROR: {e}")
+            logger.error(f"{platform} post generation failed: {e}")
+        
+        fallback = self._generate_fallback_posts(campaign_message, target_audience, tone, use_emojis)[platform]
+        if tracing():
+            trace(f"🔄 Using fallback {platform} post: {json.dumps(fallback, ensure_ascii=False)}")
+        self._count_fallback(f"generate_post:{platform}")
+        return fallback
+    
+    async def refine_posts(self, current_posts: Dict, feedback: str,
+                           platforms: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Third step: Refine posts based on user feedback.
+        
+        With ``platforms`` only those posts are sent to the LLM and regenerated;
+        the other posts are returned unchanged.
+        """
+        
+        if tracing():
+            trace("\n🔧 AI SERVICE: POST REFINEMENT")
+            trace("-" * 50)
+        
+        targets = [platform for platform in (platforms or PLATFORMS) if platform in current_posts]
+        posts_to_refine = {platform: current_posts[platform] for platform in targets}
+        platform_rules = "\n        ".join(platform_rule(platform) for platform in targets)
+        
+        system_prompt = f"""
         Te egy szakértő közösségi média tartalomkészítő vagy. A felhasználó visszajelzést adott a meglévő posztokra, 
         és a feladatod hogy javítsd őket a visszajelzés alapján.
         
         Platform korlátok:
-        - Facebook: max 63206 karakter, max 30 hashtag
-        - Instagram: max 2200 karakter, max 30 hashtag, 2 kép ötlet kell
-        - LinkedIn: max 1300 karakter, max 3 hashtag, professzionális hangnem
-        - X (Twitter): max 280 karakter, max 2 hashtag
+        {platform_rules}
         
         FONTOS: Válaszolj CSAK valid JSON formátumban, semmi mással!
         """
         
+        posts_json = json.dumps(posts_to_refine, ensure_ascii=False)
         human_prompt = f"""
-        Jelenlegi posztok: {json.dumps(current_posts, ensure_ascii=False)}
+        Jelenlegi posztok: {posts_json}
         
         Felhasználói visszajelzés: {feedback}
         
         Javítsd a posztokat a visszajelzés alapján. Válaszold CSAK JSON formátumban:
-        {{
-            "facebook": {{
-                "text": "...",
-                "hashtags": ["tag1", "tag2"]
-            }},
-            "instagram": {{
-                "text": "...",
-                "hashtags": ["tag1", "tag2"],
-                "image_suggestions": ["kép1", "kép2"]
-            }},
-            "linkedin": {{
-                "text": "...",
-                "hashtags": ["tag1"]
-            }},
-            "x": {{
-                "text": "...",
-                "hashtags": ["tag1"]
-            }}
-        }}
+        {posts_template(targets)}
         """
         
-        print("📤 SENDING TO AI:")
-        print(f"   Current posts: {json.dumps(current_posts, ensure_ascii=False)}")
-        print(f"   Feedback: {feedback}")
+        human_prompt, compacted_json = self._fit_prompt(
+            system_prompt, human_prompt, posts_json,
+            lambda budget: json.dumps(compact_posts(posts_to_refine, budget), ensure_ascii=False)
+        )
         
-        print("\n🔧 FULL SYSTEM PROMPT:")
-        print(system_prompt)
-        print("\n📝 FULL HUMAN PROMPT:")
-        print(human_prompt)
+        if tracing():
+            trace("📤 SENDING TO AI:")
+            trace(f"   Posts to refine ({', '.join(targets)}): {compacted_json}")
+            trace(f"   Feedback: {feedback}")
         
+        if tracing():
+            trace("\n🔧 FULL SYSTEM PROMPT:")
+            trace(system_prompt)
+            trace("\n📝 FULL HUMAN PROMPT:")
+            trace(human_prompt)
+        
+        content = ""
         try:
-            messages = [SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)]
-            print("\n⏳ Sending refinement request to Groq API...")
-            response = await self.llm.ainvoke(messages)
-            
-            content = response.content.strip()
-            
-            print(f"\n📥 RAW AI RESPONSE:")
-            print(f"   Length: {len(content)} characters")
-            print(f"   Content: {content}")
+            trace("\n⏳ Sending refinement request to Groq API...")
+            content = (await self._invoke_llm(system_prompt, human_prompt, operation="refine_posts",
+                                              saved_tokens=self._saved_tokens(current_posts, compacted_json))).strip()
             
-            # Try to find JSON in the response
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
+            if tracing():
+                trace(f"\n📥 RAW AI RESPONSE:")
+                trace(f"   Length: {len(content)} characters")
+                trace(f"   Content: {content}")
             
-            if json_start != -1 and json_end > json_start:
-                json_content = content[json_start:json_end]
-                print(f"\n🔍 EXTRACTED JSON:")
-                print(json_content)
-                
-                parsed_response = json.loads(json_content)
-                print(f"\n✅ PARSED REFINEMENT RESPONSE:")
-                print(json.dumps(parsed_response, indent=2, ensure_ascii=False))
-                logger.info("Successfully parsed refinement response")
-                return parsed_response
-            else:
-                raise json.JSONDecodeError("No JSON found in refinement response", content, 0)
+            result = self._parse_response(content, system_prompt, human_prompt, "refine_posts")
+            refined, missing = recover_platform_posts(result.data, platforms=targets)
+            if not refined:
+                raise JSONExtractionError("No refined post in the response", content)
+            if missing:
+                trace(f"\n⚠️ Not refined, keeping current posts for: {', '.join(missing)}")
+                self._discard_cached(system_prompt, human_prompt)
+            parsed_response = {**current_posts, **refined}
+            if tracing():
+                trace(f"\n✅ PARSED REFINEMENT RESPONSE:")
+                trace(json.dumps(parsed_response, indent=2, ensure_ascii=False))
+            logger.info("Successfully parsed refinement response")
+            return parsed_response
                 
         except json.JSONDecodeError as e:
-            print(f"\n❌ REFINEMENT JSON PARSE ERROR: {e}")
-            print(f"   Trying to extract from: {content}")
+            if tracing():
+                trace(f"\n❌ REFINEMENT JSON PARSE ERROR: {e}")
+                trace(f"   Trying to extract from: {content}")
             logger.error(f"Failed to parse refinement response: {content}")
-            print("🔄 Returning original posts due to parse error")
+            self._discard_cached(system_prompt, human_prompt)
+            trace("🔄 Returning original posts due to parse error")
+            self._count_fallback("refine_posts")
             return current_posts
         except Exception as e:
-            print(f"\n❌ REFINEMENT AI SERVICE ERROR: {e}")
+            trace(f"\n❌ REFINEMENT AI SERVICE ERROR: {e}")
             logger.error(f"Posts refinement failed: {e}")
-            print("🔄 Returning original posts due to error")
+            trace("🔄 Returning original posts due to error")
+            self._count_fallback("refine_posts")
             return current_posts
     
-    def _generate_fallback_posts(self, campaign_message: str, target_audience: str, 
-                                tone: str, use_emojis: bool) -> Dict[str, Dict]:
-        """Generate fallback posts when AI service fails."""
-        print("\n🔄 GENERATING FALLBACK POSTS")
-        print("-" * 30)
-        
-        emoji = "🎯" if use_emojis else ""
-        
-        tone_prefix = {
-            "friendly": f"Szia {target_audience}! {emoji}",
-            "professional": f"Tisztelt {target_audience}!",
-            "humorous": f"Hahó {target_audience}! 😄" if use_emojis else f"Hahó {target_audience}!",
-            "casual": f"Hey {target_audience}! {emoji}",
-            "formal": f"Tisztelt {target_audience}!"
-        }.get(tone, "")
-        
-        base_text = f"{tone_prefix} {campaign_message}"
-        
-        fallback = {
-            "facebook": {
-                "text": f"{base_text}\n\nKövess minket további frissítésekért!",
-                "hashtags": ["#szakmai", "#fejlődés", "#tréning"]
-            },
-            "instagram": {
-                "text": base_text,
-                "hashtags": ["#szakmai", "#fejlődés", "#tréning", "#workshop"],
-                "image_suggestions": ["Tréning fotó", "Résztvevők képe"]
-            },
-            "linkedin": {
-                "text": f"{base_text}\n\nCsatlakozz szakmai közösségünkhöz!",
-                "hashtags": ["#szakmai", "#fejlődés"]
+    @staticmethod
+    def fallback_context(target_audience: str) -> Dict[str, Any]:
+        """Generic context analysis used when the analysis failed."""
+        return {
+            "key_messages": ["Kampány üzenet"],
+            "audience_insights": f"Célközönség: {target_audience}",
+            "platform_strategies": {
+                "facebook": "Általános stratégia",
+                "instagram": "Vizuális tartalom",
+                "linkedin": "Professzionális tartalom",
+                "x": "Rövid tartalom"
             },
-            "x": {
-                "text": base_text[:250],  # Truncate for Twitter limit
-                "hashtags": ["#szakmai", "#tréning"]
-            }
+            "creative_directions": ["Kreatív megközelítés"]
         }
+    
+    def _generate_fallback_posts(self, campaign_message: str, target_audience: str, 
+                                tone: str, use_emojis: bool) -> Dict[str, Dict]:
+        """Posts from the local template engine, used when the AI service fails."""
+        if tracing():
+            trace("\n🔄 GENERATING FALLBACK POSTS")
+            trace("-" * 30)
         
-        print(f"📋 Generated fallback:")
-        print(json.dumps(fallback, indent=2, ensure_ascii=False))
+        fallback = ContentGenerator(campaign_message, target_audience, tone, use_emojis).generate_content()
+
+        if tracing():
+            trace(f"📋 Generated fallback:")
+            trace(json.dumps(fallback, indent=2, ensure_ascii=False))
         return fallback
\ No newline at end of file
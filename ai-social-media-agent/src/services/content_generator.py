@@ -1,34 +1,169 @@
+import zlib
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.post_constraints import normalize_hashtag, truncate_text, weighted_length
+from utils.helpers import extract_keywords
+
+_VOWELS = "aáeéiíoóöőuúüű"
+# Hashtags per post; the platform limits cap them further
+HASHTAG_COUNTS = {"facebook": 3, "instagram": 6, "linkedin": 3, "x": 2}
+
+# Per tone: greetings, a line about the main keyword, emojis and closing lines per platform. Informal
+# tones address the reader as "te", formal as "Ön". {article}/{Article} is "a" or "az" for {keyword}.
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "friendly": {
+        "greetings": ["Sziasztok, {audience}! {emoji}", "Hahó, {audience}! {emoji}"],
+        "keyword_lines": ["Mindent megtalálsz, amit {article} {keyword} témában keresel. {emoji}",
+                          "{Article} {keyword} témában most tényleg érdemes körülnézned! {emoji}"],
+        "emojis": ["😊", "🎉", "💙"],
+        "closings": {
+            "facebook": "Írd meg kommentben, mit gondolsz, és oszd meg a barátaiddal! {emoji}",
+            "instagram": "Mentsd el a posztot, és jelöld meg, akinek szólna! {emoji}",
+            "linkedin": "Oszd meg a tapasztalataidat kommentben!",
+            "x": "Nézz be hozzánk! {emoji}",
+        },
+    },
+    "casual": {
+        "greetings": ["Hé, {audience}! {emoji}", "Na, {audience}, figyelem! {emoji}"],
+        "keyword_lines": ["{Article} {keyword} téma? Megoldjuk. {emoji}",
+                          "Röviden: {article} {keyword} témában most nálunk a helyed. {emoji}"],
+        "emojis": ["😎", "🔥", "👌"],
+        "closings": {
+            "facebook": "Dobj egy lájkot, ha tetszik! {emoji}",
+            "instagram": "Mentsd el, mielőtt elfelejted! {emoji}",
+            "linkedin": "Mit gondolsz? Írd meg kommentben!",
+            "x": "Csekkold! {emoji}",
+        },
+    },
+    "humorous": {
+        "greetings": ["Figyelem, {audience}, ez nem vicc! {emoji}", "Kedves {audience}, kapaszkodjatok! {emoji}"],
+        "keyword_lines": ["{Article} {keyword} téma komoly dolog, de mi mosolyogva csináljuk. {emoji}",
+                          "Vigyázat: {article} {keyword} témában mostantól nehéz lesz nemet mondani! {emoji}"],
+        "emojis": ["😄", "😂", "🙃"],
+        "closings": {
+            "facebook": "Jelöld meg azt a barátodat, aki ezt biztosan kihagyná! {emoji}",
+            "instagram": "Dupla koppintás, ha te is mosolyogtál! {emoji}",
+            "linkedin": "Egy kis humor a hétköznapokban sosem árt. Mit gondolsz?",
+            "x": "Ne mondd, hogy nem szóltunk! {emoji}",
+        },
+    },
+    "professional": {
+        "greetings": ["Kedves {audience}!", "Kedves {audience}, van egy jó hírünk! {emoji}"],
+        "keyword_lines": ["{Article} {keyword} témában most kézzelfogható előnyt kínálunk. {emoji}",
+                          "{Article} {keyword} területén is a minőség a legfontosabb számunkra."],
+        "emojis": ["🚀", "📈", "💼"],
+        "closings": {
+            "facebook": "Kövess minket további szakmai hírekért!",
+            "instagram": "Kövess minket a további újdonságokért! {emoji}",
+            "linkedin": "Kíváncsiak vagyunk a véleményedre – oszd meg kommentben!",
+            "x": "Részletek a profilunkon.",
+        },
+    },
+    "formal": {
+        "greetings": ["Tisztelt {audience}!", "Tisztelt {audience}, örömmel tájékoztatjuk Önöket!"],
+        "keyword_lines": ["{Article} {keyword} témában megbízható megoldást kínálunk Önnek.",
+                          "{Article} {keyword} területén is számíthat ránk."],
+        "emojis": ["✨"],
+        "closings": {
+            "facebook": "Kövesse oldalunkat további információkért!",
+            "instagram": "Kövesse oldalunkat a további újdonságokért!",
+            "linkedin": "Ossza meg velünk véleményét!",
+            "x": "Várjuk érdeklődését!",
+        },
+    },
+}
+
+
+def article(word: str) -> str:
+    """The Hungarian definite article for ``word``: ``az`` before a vowel, otherwise ``a``."""
+    return "az" if word[:1].lower() in _VOWELS else "a"
+
+
 class ContentGenerator:
-    def __init__(self, campaign_message, target_audience, tone, emoji_usage):
-        self.campaign_message = campaign_message
-        self.target_audience = target_audience
-        self.tone = tone
+    """Posts for every platform from local templates: no LLM call, well under a millisecond per campaign.
+
+    Serves as the AI service's fallback and as the first answer of an
+    interactive session when the LLM is slower than LOCAL_POSTS_BUDGET_MS.
+    The text follows the tone's templates around the campaign message, and
+    the hashtags and image ideas come from its keywords. The same campaign
+    always gets the same posts; different campaigns get different template
+    variants.
+    """
+
+    def __init__(self, campaign_message: str, target_audience: str, tone: str, emoji_usage: bool = True):
+        self.campaign_message = " ".join(campaign_message.split())
+        self.target_audience = " ".join(target_audience.split())
+        self.tone = tone if tone in TEMPLATES else "friendly"
         self.emoji_usage = emoji_usage
+        self.keywords = extract_keywords(self.campaign_message)
+        self.audience_keywords = extract_keywords(self.target_audience)
+        # The two main keywords read as one phrase when they stand together in the message ("gaming laptop")
+        self.topic = " ".join(self.keywords[:1])
+        if len(self.keywords) > 1 and f"{self.keywords[0]} {self.keywords[1]}" in self.campaign_message.lower():
+            self.topic = f"{self.keywords[0]} {self.keywords[1]}"
+        # Stable across processes, unlike hash()
+        self._seed = zlib.crc32(f"{self.campaign_message}|{self.target_audience}".encode("utf-8"))
 
-    def generate_content(self):
-        # Placeholder for content generation logic
-        content = {
-            "facebook": self._generate_facebook_content(),
-            "instagram": self._generate_instagram_content(),
-            "linkedin": self._generate_linkedin_content(),
-            "x": self._generate_x_content()
+    def generate_content(self) -> Dict[str, Dict[str, Any]]:
+        """``{platform: {"text", "hashtags"[, "image_suggestions"]}}`` like the AI service's posts."""
+        message = self.campaign_message
+        if message and message[-1] not in ".!?…":
+            message += "."
+        templates = TEMPLATES[self.tone]
+        greeting = self._fill(self._pick(templates["greetings"]))
+        keyword_line = self._fill(self._pick(templates["keyword_lines"], 1), 1) if self.topic else ""
+        closings = {platform: self._fill(line, 2 + index) for index, (platform, line)
+                    in enumerate(templates["closings"].items())}
+
+        hashtags = {platform: self.hashtags(platform) for platform in HASHTAG_COUNTS}
+        x_budget = settings.platform_limits["x"]["max_chars"] - sum(len(tag) + 1 for tag in hashtags["x"])
+        x_text = f"{message} {closings['x']}".strip()
+        return {
+            "facebook": {"text": self._join(greeting, f"{message} {keyword_line}", closings["facebook"]),
+                         "hashtags": hashtags["facebook"]},
+            "instagram": {"text": self._join(f"{greeting} {message}", closings["instagram"]),
+                          "hashtags": hashtags["instagram"],
+                          "image_suggestions": self.image_suggestions()},
+            "linkedin": {"text": self._join(greeting, message, keyword_line, closings["linkedin"]),
+                         "hashtags": hashtags["linkedin"]},
+            "x": {"text": truncate_text(x_text, x_budget, weighted_length), "hashtags": hashtags["x"]},
         }
-        return content
 
-    def _generate_facebook_content(self):
-        # Logic for generating Facebook content
-        return f"{self.campaign_message} #FacebookPost"
+    def hashtags(self, platform: Optional[str] = None) -> List[str]:
+        """Hashtags from the campaign's keywords, then the audience's; ``platform`` sets how many.
+
+        A two-word topic also makes a compound tag (#gaminglaptop).
+        """
+        candidates = self.keywords[:2] + ([self.topic] if " " in self.topic else [])
+        candidates += self.keywords[2:] + self.audience_keywords
+        tags = []
+        for candidate in candidates:
+            tag = normalize_hashtag(candidate)
+            if tag is not None and tag not in tags:
+                tags.append(tag)
+        if platform is None:
+            return tags
+        limit = min(HASHTAG_COUNTS[platform], settings.platform_limits[platform]["hashtag_limit"])
+        return tags[:limit]
+
+    def image_suggestions(self) -> List[str]:
+        subject = self.topic or self.campaign_message
+        return [f"Termékfotó: {subject}", f"Hangulatkép a célközönségről: {self.target_audience}"]
 
-    def _generate_instagram_content(self):
-        # Logic for generating Instagram content
-        hashtags = "#Instagram #SocialMedia"
-        image_suggestions = ["Image idea 1", "Image idea 2"]
-        return f"{self.campaign_message} {hashtags}, Suggested Images: {image_suggestions}"
+    def _pick(self, options: List[str], offset: int = 0) -> str:
+        return options[(self._seed + offset) % len(options)]
 
-    def _generate_linkedin_content(self):
-        # Logic for generating LinkedIn content
-        return f"{self.campaign_message} (Professional tone)"
+    def _fill(self, template: str, offset: int = 0) -> str:
+        keyword = self.topic
+        emojis = TEMPLATES[self.tone]["emojis"]
+        text = template.format(
+            audience=self.target_audience, keyword=keyword, article=article(keyword),
+            Article=article(keyword).capitalize(),
+            emoji=emojis[(self._seed + offset) % len(emojis)] if self.emoji_usage else ""
+        )
+        return " ".join(text.split())
 
-    def _generate_x_content(self):
-        # Logic for generating content for platform X
-        return f"{self.campaign_message} #PlatformX"
\ No newline at end of file
+    @staticmethod
+    def _join(*paragraphs: str) -> str:
+        return "\n\n".join(paragraph.strip() for paragraph in paragraphs if paragraph.strip())
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import contextvars
+import time
+from typing import Awaitable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Absolute time.monotonic() by which the current request must be answered. The workflow carries it in
+# its run config and each node opens a scope, which every AIService call and task started within sees.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before an LLM call finished; retrying cannot help."""
+
+    def __init__(self, overdue: float = 0.0):
+        super().__init__(f"Request deadline exceeded{f' by {overdue:.2f}s' if overdue > 0 else ''}")
+        self.overdue = overdue
+
+
+def deadline_in(seconds: Optional[float]) -> Optional[float]:
+    """The deadline ``seconds`` from now, or the current one if that ends sooner; None or 0 keeps the current one."""
+    current = _deadline.get()
+    if not seconds:
+        return current
+    deadline = time.monotonic() + seconds
+    return deadline if current is None else min(current, deadline)
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[Optional[float]]:
+    """Run the block under the absolute ``deadline`` (see deadline_in); yields the seconds left.
+
+    An enclosing deadline that ends sooner still applies; None keeps the
+    current deadline (if any) unchanged.
+    """
+    if deadline is None:
+        yield remaining()
+        return
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield remaining()
+    finally:
+        _deadline.reset(token)
+
+
+def without_deadline() -> contextvars.Context:
+    """A copy of the current context without a deadline, for work that may outlive the request."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline (negative once it passed); None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(timeout: Optional[float]) -> Tuple[Optional[float], bool]:
+    """The time one call may take: ``timeout`` cut to the time left, and whether the deadline is the limit.
+
+    Raises DeadlineExceeded when the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout, False
+    if left <= 0:
+        raise DeadlineExceeded(-left)
+    if timeout is None or left < timeout:
+        return left, True
+    return timeout, False
+
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable``, cancelling it with DeadlineExceeded when the deadline passes first."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(left, 0.0))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded() from None
@@ -0,0 +1,186 @@
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from config.settings import settings
+from services.llm_cache import CacheTier, MemoryCacheTier, SQLiteCacheTier
+
+logger = logging.getLogger(__name__)
+
+_DASHES = dict.fromkeys(map(ord, "‐‑‒–—−"), "-")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def normalize_audience(target_audience: str) -> str:
+    """Canonical form of a target audience, e.g. "25–35 éves  Hobby gamerek." -> "25-35 éves hobby gamerek"."""
+    text = unicodedata.normalize("NFKC", target_audience).translate(_DASHES).lower()
+    text = re.sub(r"\s*-\s*", "-", text)
+    text = re.sub(r"[^\w\s%+-]", " ", text)
+    return " ".join(text.split())
+
+
+def insight_key(target_audience: str, tone: str) -> str:
+    return f"{tone.lower()}|{normalize_audience(target_audience)}"
+
+
+def _words(value: Any) -> Set[str]:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return set(re.findall(r"\w+", text.lower()))
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def insight_similarity(stored: Dict[str, Any], fresh: Dict[str, Any]) -> float:
+    """Word overlap (0-1) of the audience insights and each platform strategy of two analyses."""
+    stored_strategies = stored.get("platform_strategies") or {}
+    fresh_strategies = fresh.get("platform_strategies") or {}
+    scores = [_jaccard(_words(stored.get("audience_insights", "")), _words(fresh.get("audience_insights", "")))]
+    for platform in sorted(set(stored_strategies) | set(fresh_strategies)):
+        scores.append(_jaccard(_words(stored_strategies.get(platform, "")), _words(fresh_strategies.get(platform, ""))))
+    return sum(scores) / len(scores)
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, list) else [value]
+
+
+def derive_key_messages(campaign_message: str, limit: int = 3) -> List[str]:
+    """Key messages taken from the campaign message itself: its first sentences."""
+    sentences = [sentence.strip() for sentence in _SENTENCE_END.split(campaign_message.strip())]
+    return [sentence for sentence in sentences if sentence][:limit] or [campaign_message]
+
+
+@dataclass
+class AudienceInsight:
+    """What the context analyses said about one audience and tone.
+
+    ``confidence`` is the share of analyses that agreed with the one before
+    them; the first analysis has nothing to agree with, so a single
+    observation is never trusted.
+    """
+
+    audience_insights: Any
+    platform_strategies: Dict[str, Any]
+    creative_directions: List[Any]
+    key_messages: List[Any] = field(default_factory=list)
+    campaign_message: str = ""
+    observations: int = 1
+    agreements: int = 0
+    reuses_since_check: int = 0
+    updated_at: float = 0.0
+
+    @property
+    def confidence(self) -> float:
+        return self.agreements / self.observations
+
+    def context_for(self, campaign_message: str) -> Dict[str, Any]:
+        """The stored analysis adapted to a campaign: key messages come from its own message."""
+        if campaign_message == self.campaign_message and self.key_messages:
+            key_messages = list(self.key_messages)
+        else:
+            key_messages = derive_key_messages(campaign_message)
+        return {
+            "key_messages": key_messages,
+            "audience_insights": self.audience_insights,
+            "platform_strategies": dict(self.platform_strategies),
+            "creative_directions": list(self.creative_directions)
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, value: str) -> "AudienceInsight":
+        return cls(**json.loads(value))
+
+
+class InsightStore:
+    """Context analyses remembered per normalized target audience and tone.
+
+    The agent skips the analysis call when a stored insight is trusted
+    (``confidence >= reuse_confidence``), and otherwise generates posts from
+    the stored insight while a fresh analysis runs, keeping them if the fresh
+    analysis agrees (``insight_similarity >= agreement_threshold``). Every
+    ``revalidate_every`` reuses, a trusted insight is checked again.
+    """
+
+    def __init__(self, tier: Optional[CacheTier] = None, reuse_confidence: float = 0.75,
+                 agreement_threshold: float = 0.5, revalidate_every: int = 20):
+        self.tier = tier if tier is not None else MemoryCacheTier(max_entries=1024, ttl_seconds=None)
+        self.reuse_confidence = reuse_confidence
+        self.agreement_threshold = agreement_threshold
+        self.revalidate_every = revalidate_every
+        self._lock = threading.Lock()
+
+    def lookup(self, target_audience: str, tone: str) -> Optional[AudienceInsight]:
+        value = self.tier.get(insight_key(target_audience, tone))
+        if value is None:
+            return None
+        try:
+            return AudienceInsight.from_json(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Dropping unreadable audience insight: {e}")
+            self.tier.delete(insight_key(target_audience, tone))
+            return None
+
+    def is_trusted(self, insight: AudienceInsight) -> bool:
+        return insight.confidence >= self.reuse_confidence and insight.reuses_since_check < self.revalidate_every
+
+    def record_reuse(self, target_audience: str, tone: str):
+        with self._lock:
+            insight = self.lookup(target_audience, tone)
+            if insight is not None:
+                insight.reuses_since_check += 1
+                self.tier.set(insight_key(target_audience, tone), insight.to_json())
+
+    def observe(self, target_audience: str, tone: str, campaign_message: str,
+                context: Dict[str, Any]) -> Optional[float]:
+        """Fold a fresh analysis into the store; returns its similarity to the stored one (None if new)."""
+        if not isinstance(context.get("platform_strategies"), dict):
+            return None
+        key = insight_key(target_audience, tone)
+        with self._lock:
+            previous = self.lookup(target_audience, tone)
+            similarity = None
+            insight = AudienceInsight(
+                audience_insights=context.get("audience_insights", ""),
+                platform_strategies=context["platform_strategies"],
+                creative_directions=_as_list(context.get("creative_directions")),
+                key_messages=_as_list(context.get("key_messages")),
+                campaign_message=campaign_message,
+                updated_at=time.time()
+            )
+            if previous is not None:
+                similarity = insight_similarity(asdict(previous), context)
+                insight.observations = previous.observations + 1
+                insight.agreements = previous.agreements + (similarity >= self.agreement_threshold)
+            self.tier.set(key, insight.to_json())
+        return similarity
+
+    def clear(self):
+        self.tier.clear()
+
+
+def build_insight_store() -> Optional[InsightStore]:
+    """Create the insight store described by the settings, or None if disabled."""
+    if not settings.insight_store_enabled:
+        return None
+    if settings.insight_store_path:
+        tier: CacheTier = SQLiteCacheTier(settings.insight_store_path, ttl_seconds=settings.insight_ttl_seconds)
+        logger.info(f"Audience insights persisted to {settings.insight_store_path}")
+    else:
+        tier = MemoryCacheTier(max_entries=settings.insight_max_entries, ttl_seconds=settings.insight_ttl_seconds)
+    return InsightStore(tier, reuse_confidence=settings.insight_reuse_confidence,
+                        agreement_threshold=settings.insight_agreement_threshold,
+                        revalidate_every=settings.insight_revalidate_every)
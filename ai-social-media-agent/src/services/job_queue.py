@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle: queued -> running -> succeeded, or back to queued for a retry, or dead after the last attempt.
+# Queued jobs can be cancelled; dead and cancelled jobs can be queued again.
+JOB_STATUSES = ("queued", "running", "succeeded", "dead", "cancelled")
+
+_COLUMNS = ("id, tenant, priority, status, payload, generation_mode, attempts, max_attempts, created_at, "
+            "available_at, started_at, finished_at, lease_expires_at, worker, result, error")
+
+
+@dataclass
+class Job:
+    id: str
+    tenant: str
+    priority: int
+    status: str
+    request: Dict[str, Any]
+    generation_mode: Optional[str]
+    attempts: int
+    max_attempts: int
+    created_at: float
+    available_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    lease_expires_at: Optional[float] = None
+    worker: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        (job_id, tenant, priority, status, payload, generation_mode, attempts, max_attempts, created_at,
+         available_at, started_at, finished_at, lease_expires_at, worker, result, error) = row
+        return cls(job_id, tenant, priority, status, json.loads(payload), generation_mode, attempts, max_attempts,
+                   created_at, available_at, started_at, finished_at, lease_expires_at, worker,
+                   json.loads(result) if result else None, error)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        if not include_result:
+            data.pop("result")
+        return data
+
+
+class JobQueue:
+    """Durable campaign job queue in one SQLite file.
+
+    Any number of worker processes on the host can share the file: a job is
+    claimed inside an immediate transaction, so exactly one worker gets it,
+    and holds a lease that the worker renews while it runs. A job whose lease
+    ran out (its worker died) is claimed again as a new attempt.
+
+    ``claim`` serves the highest priority first. Within a priority, tenants
+    take turns (the tenant served longest ago goes next) and each tenant's
+    jobs run oldest first, so one tenant's large batch cannot starve others.
+    Failed attempts are retried with exponential backoff until
+    ``max_attempts``; then the job is dead-lettered (status ``dead``) with its
+    last error and stays there until it is requeued.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, lease_seconds: float = 120.0,
+                 retry_base_delay: float = 5.0, retry_max_delay: float = 300.0,
+                 clock: Callable[[], float] = time.time, rng: Optional[random.Random] = None):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode, so claims can take the write lock up front with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, tenant TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+            "payload TEXT NOT NULL, generation_mode TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "max_attempts INTEGER NOT NULL, created_at REAL NOT NULL, available_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, lease_expires_at REAL, worker TEXT, result TEXT, error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, tenant, created_at)")
+        # Dispatch sequence per tenant, for round-robin between tenants
+        self._conn.execute("CREATE TABLE IF NOT EXISTS job_tenants (tenant TEXT PRIMARY KEY, last_served INTEGER NOT NULL)")
+
+    def submit(self, request: Dict[str, Any], tenant: str = "default", priority: int = 0,
+               generation_mode: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+        """Queue one campaign request (SocialMediaRequest fields) and return its job ID."""
+        return self.submit_many([request], tenant, priority, generation_mode, max_attempts)[0]
+
+    def submit_many(self, requests: List[Dict[str, Any]], tenant: str = "default", priority: int = 0,
+                    generation_mode: Optional[str] = None, max_attempts: Optional[int] = None) -> List[str]:
+        now = self._clock()
+        rows = [(uuid.uuid4().hex, tenant, priority, "queued", json.dumps(request, ensure_ascii=False),
+                 generation_mode, max_attempts or self.max_attempts, now, now) for request in requests]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO jobs (id, tenant, priority, status, payload, generation_mode, max_attempts, "
+                    "created_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """Take the next job for ``worker``, or None if nothing is ready."""
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._claim_locked(worker, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def _claim_locked(self, worker: str, now: float) -> Optional[Job]:
+        # Jobs whose worker stopped renewing the lease count as ready again
+        ready = ("(status = 'queued' AND available_at <= :now) "
+                 "OR (status = 'running' AND lease_expires_at <= :now)")
+        params = {"now": now}
+        row = self._conn.execute(f"SELECT MAX(priority) FROM jobs WHERE {ready}", params).fetchone()
+        if row[0] is None:
+            return None
+        params["priority"] = row[0]
+        row = self._conn.execute(
+            f"SELECT j.id FROM jobs j LEFT JOIN job_tenants t ON t.tenant = j.tenant "
+            f"WHERE ({ready}) AND j.priority = :priority "
+            f"ORDER BY COALESCE(t.last_served, 0), j.created_at, j.rowid LIMIT 1", params
+        ).fetchone()
+        job_id = row[0]
+        self._conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, started_at = ?, "
+            "lease_expires_at = ?, error = CASE WHEN status = 'running' THEN 'Lease expired' ELSE error END "
+            "WHERE id = ?", (worker, now, now + self.lease_seconds, job_id))
+        job = self._get_locked(job_id)
+        sequence = self._conn.execute("SELECT COALESCE(MAX(last_served), 0) + 1 FROM job_tenants").fetchone()[0]
+        self._conn.execute(
+            "INSERT INTO job_tenants (tenant, last_served) VALUES (?, ?) "
+            "ON CONFLICT (tenant) DO UPDATE SET last_served = excluded.last_served", (job.tenant, sequence))
+        return job
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Renew the lease; False if the job is no longer this worker's (e.g. it was reclaimed)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (self._clock() + self.lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, finished_at = ?, "
+                "lease_expires_at = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False), self._clock(), job_id, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str, retryable: bool = True) -> Optional[str]:
+        """Record a failed attempt; returns the new status ("queued" for a retry, or "dead")."""
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                    (job_id, worker)).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                attempts, max_attempts = row
+                if retryable and attempts < max_attempts:
+                    status, available_at = "queued", now + self.retry_delay(attempts - 1)
+                else:
+                    status, available_at = "dead", now
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL, "
+                    "finished_at = CASE WHEN ? = 'dead' THEN ? ELSE NULL END WHERE id = ?",
+                    (status, error, available_at, status, now, job_id))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if status == "dead":
+            logger.warning(f"Job {job_id} dead-lettered after {attempts} attempt(s): {error}")
+        return status
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (0-based), with jitter."""
+        delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+        return self._rng.uniform(delay / 2, delay)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (self._clock(), job_id))
+        return cursor.rowcount == 1
+
+    def requeue(self, job_id: Optional[str] = None, status: str = "dead") -> int:
+        """Queue dead (or cancelled) jobs again with fresh attempts: one job, or all with ``status``."""
+        if status not in ("dead", "cancelled"):
+            raise ValueError("Only dead or cancelled jobs can be requeued")
+        query = ("UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, finished_at = NULL, "
+                 "worker = NULL WHERE status = ?")
+        params: List[Any] = [self._clock(), status]
+        if job_id is not None:
+            query += " AND id = ?"
+            params.append(job_id)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._get_locked(job_id)
+
+    def _get_locked(self, job_id: str) -> Optional[Job]:
+        row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def list(self, status: Optional[str] = None, tenant: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """Most recently created jobs first."""
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if tenant:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                (*params, limit)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def pending(self) -> int:
+        """Jobs that are queued (now or for a retry) or running."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Job counts by status, overall and per tenant."""
+        with self._lock:
+            rows = self._conn.execute("SELECT tenant, status, COUNT(*) FROM jobs GROUP BY tenant, status").fetchall()
+        totals = {status: 0 for status in JOB_STATUSES}
+        tenants: Dict[str, Dict[str, int]] = {}
+        for tenant, status, count in rows:
+            totals[status] = totals.get(status, 0) + count
+            tenants.setdefault(tenant, {})[status] = count
+        return {"by_status": totals, "by_tenant": tenants}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_job_queue(path: Optional[str] = None) -> JobQueue:
+    """Open the job queue described by the settings."""
+    return JobQueue(
+        path or settings.job_queue_path,
+        max_attempts=settings.job_max_attempts,
+        lease_seconds=settings.job_lease_seconds,
+        retry_base_delay=settings.job_retry_base_delay,
+        retry_max_delay=settings.job_retry_max_delay
+    )
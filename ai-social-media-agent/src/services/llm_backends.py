@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config.settings import settings
+from models.request_models import PLATFORMS
+from utils.json_parser import find_json_objects
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKENDS = ("groq", "fake")
+
+
+class FakeLLMError(Exception):
+    """Simulated API failure raised by FakeChatModel."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+@dataclass
+class FakeMessage:
+    """Minimal stand-in for a LangChain AIMessage / AIMessageChunk."""
+    content: str
+
+
+@dataclass
+class FakeLLMConfig:
+    """Behaviour of the fake backend. Latencies are in milliseconds."""
+    seed: int = 0
+    latency_distribution: str = "lognormal"  # "fixed", "uniform" or "lognormal"
+    latency_ms: float = 300.0  # median time to first token
+    latency_spread: float = 0.5  # sigma for lognormal, +/- fraction for uniform
+    tokens_per_second: float = 250.0  # 0 disables the generation delay
+    error_rate: float = 0.0
+    malformed_json_rate: float = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "FakeLLMConfig":
+        return cls(
+            seed=settings.fake_llm_seed,
+            latency_distribution=settings.fake_llm_latency_distribution,
+            latency_ms=settings.fake_llm_latency_ms,
+            latency_spread=settings.fake_llm_latency_spread,
+            tokens_per_second=settings.fake_llm_tokens_per_second,
+            error_rate=settings.fake_llm_error_rate,
+            malformed_json_rate=settings.fake_llm_malformed_json_rate
+        )
+
+
+# Approximate post lengths the fake writes per platform
+_FAKE_TEXT_LENGTHS = {"facebook": 600, "instagram": 350, "linkedin": 450, "x": 200}
+_FILLER_SENTENCES = [
+    "Ne maradj le róla!",
+    "Nézd meg most a részleteket.",
+    "Csatlakozz a közösségünkhöz!",
+    "Ez az ajánlat csak rövid ideig érvényes.",
+    "Oszd meg azokkal, akiket érdekelhet!",
+    "Kérdésed van? Írj nekünk bátran.",
+]
+
+
+class FakeChatModel:
+    """Deterministic offline replacement for ChatGroq.
+
+    It answers with JSON shaped like the template at the end of the human
+    prompt, filled with text derived from the campaign message. Latency,
+    token rate, error rate and malformed-JSON rate are configurable. Every
+    outcome is derived from the seed, the prompt and how often that prompt
+    was already sent, so runs are reproducible regardless of scheduling.
+    """
+
+    def __init__(self, config: Optional[FakeLLMConfig] = None):
+        self.config = config or FakeLLMConfig()
+        self.calls = 0
+        self.errors = 0
+        self.malformed = 0
+        self._attempts: Dict[str, int] = defaultdict(int)
+
+    # LangChain-compatible entry points
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> FakeMessage:
+        rng, content = self._prepare(messages)
+        await asyncio.sleep(self._first_token_delay(rng) + self._generation_time(content))
+        return FakeMessage(content=content)
+
+    async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[FakeMessage]:
+        rng, content = self._prepare(messages)
+        await asyncio.sleep(self._first_token_delay(rng))
+        chunk_size = 16  # roughly four tokens
+        chunk_delay = self._generation_time(content[:chunk_size])
+        for start in range(0, len(content), chunk_size):
+            yield FakeMessage(content=content[start:start + chunk_size])
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+
+    # Outcome selection
+
+    def _prepare(self, messages: List[Any]):
+        system_prompt = messages[0].content if len(messages) > 1 else ""
+        human_prompt = messages[-1].content
+        prompt_hash = hashlib.sha256((system_prompt + human_prompt).encode("utf-8")).hexdigest()
+        self._attempts[prompt_hash] += 1
+        rng = random.Random(f"{self.config.seed}:{prompt_hash}:{self._attempts[prompt_hash]}")
+        self.calls += 1
+
+        if rng.random() < self.config.error_rate:
+            self.errors += 1
+            raise FakeLLMError("Simulated LLM API failure", status_code=rng.choice([429, 500, 503]),
+                               retry_after=round(rng.uniform(0.05, 0.5), 3))
+
+        content = json.dumps(self._fill_template(human_prompt, rng), ensure_ascii=False, indent=2)
+        if rng.random() < self.config.malformed_json_rate:
+            self.malformed += 1
+            content = self._corrupt(content, rng)
+        return rng, content
+
+    def _first_token_delay(self, rng: random.Random) -> float:
+        config = self.config
+        if config.latency_distribution == "fixed":
+            latency = config.latency_ms
+        elif config.latency_distribution == "uniform":
+            latency = rng.uniform(config.latency_ms * (1 - config.latency_spread),
+                                  config.latency_ms * (1 + config.latency_spread))
+        elif config.latency_distribution == "lognormal":
+            latency = rng.lognormvariate(0, config.latency_spread) * config.latency_ms
+        else:
+            raise ValueError(f"Unknown latency distribution: {config.latency_distribution}")
+        return max(latency, 0.0) / 1000
+
+    def _generation_time(self, content: str) -> float:
+        if self.config.tokens_per_second <= 0:
+            return 0.0
+        return (len(content) / 4) / self.config.tokens_per_second
+
+    # Response construction
+
+    def _fill_template(self, human_prompt: str, rng: random.Random) -> Any:
+        template = _last_json_object(human_prompt)
+        campaign_message = _prompt_field(human_prompt, "Kampányüzenet") or "Új kampányunk elindult!"
+        target_audience = _prompt_field(human_prompt, "Célközönség") or "általános közönség"
+        if template is None:
+            return {"text": campaign_message}
+
+        def fill(value: Any, path: List[str]) -> Any:
+            if isinstance(value, dict):
+                return {key: fill(item, path + [key]) for key, item in value.items()}
+            if isinstance(value, list):
+                return [fill(item, path) for item in value]
+            if isinstance(value, str):
+                return self._fake_string(path, campaign_message, rng, target_audience)
+            return value
+
+        return fill(template, [])
+
+    def _fake_string(self, path: List[str], campaign_message: str, rng: random.Random,
+                     target_audience: str = "") -> str:
+        field = path[-1] if path else ""
+        platform = next((key for key in path if key in PLATFORMS), None)
+        if "audience_insights" in path or "platform_strategies" in path:
+            # Like a real model, the analysis of an audience barely changes between campaigns
+            audience_words = [word for word in target_audience.split() if len(word) > 3] or ["közönség"]
+            word = audience_words[int(hashlib.sha256(".".join(path).encode("utf-8")).hexdigest(), 16) % len(audience_words)]
+            return f"{field.replace('_', ' ')}: {word}"
+        words = [word.strip(".,!?:;\"'").lower() for word in campaign_message.split()]
+        words = [word for word in words if len(word) > 3] or ["kampány"]
+
+        if field == "text":
+            target = _FAKE_TEXT_LENGTHS.get(platform, 300)
+            parts = [campaign_message]
+            while sum(len(part) + 1 for part in parts) < target:
+                parts.append(rng.choice(_FILLER_SENTENCES))
+            text = " ".join(parts)
+            return text[:target].rsplit(" ", 1)[0] if len(text) > target else text
+        if field == "hashtags":
+            return "#" + rng.choice(words)
+        if field == "image_suggestions":
+            return f"Fotó: {rng.choice(words)}"
+        return f"{field.replace('_', ' ')}: {rng.choice(words)}" if field else rng.choice(words)
+
+    def _corrupt(self, content: str, rng: random.Random) -> str:
+        style = rng.choice(["truncate", "prose", "trailing_comma", "code_fence"])
+        if style == "truncate":
+            return content[:rng.randint(len(content) // 3, len(content) - 2)]
+        if style == "prose":
+            return f"Íme a kért posztok:\n{content}\nRemélem, tetszenek!"
+        if style == "trailing_comma":
+            return re.sub(r'"\s*\n(\s*)}', '",\n\\1}', content, count=1)
+        return f"```json\n{content}\n```"
+
+
+def _prompt_field(prompt: str, label: str) -> Optional[str]:
+    match = re.search(rf"{label}:\s*(.+)", prompt)
+    return match.group(1).strip() if match else None
+
+
+def _last_json_object(text: str) -> Optional[Any]:
+    """Parse the last balanced {...} block of the prompt (the response template)."""
+    blocks = find_json_objects(text)
+    try:
+        return json.loads(blocks[-1]) if blocks else None
+    except json.JSONDecodeError:
+        return None
+
+
+def create_llm(http_async_client=None, backend: Optional[str] = None):
+    """Create the chat model for the configured backend ("groq" or "fake")."""
+    backend = (backend or settings.llm_backend).lower()
+
+    if backend == "fake":
+        logger.info("Using deterministic fake LLM backend")
+        return FakeChatModel(FakeLLMConfig.from_settings())
+
+    if backend == "groq":
+        if not settings.groq_api_key:
+            raise ValueError("GROQ_API_KEY environment variable is required")
+
+        from langchain_groq import ChatGroq
+
+        # Reuse a shared httpx pool when given (see agents.factory), so connections stay warm
+        client_options = {"http_async_client": http_async_client} if http_async_client is not None else {}
+        return ChatGroq(
+            api_key=settings.groq_api_key,
+            model=settings.model_name,
+            temperature=settings.temperature,
+            max_tokens=settings.max_tokens,
+            # AIService retries with backoff behind the shared rate limiter; the SDK must not retry on its own
+            max_retries=0,
+            **client_options
+        )
+
+    raise ValueError(f"Unknown LLM backend: {backend}")
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Any
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(model_name: str, temperature: float, system_prompt: str, human_prompt: str) -> str:
+    """Content-address an LLM call by everything that determines its output."""
+    payload = json.dumps([model_name, temperature, system_prompt, human_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheTier(ABC):
+    """A single storage level of the LLM response cache."""
+
+    name = "tier"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss or expired entry."""
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store a value under the key."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the key if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry."""
+
+
+class MemoryCacheTier(CacheTier):
+    """In-process LRU tier with a TTL and a bounded number of entries."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheTier(CacheTier):
+    """On-disk LRU tier that survives process restarts.
+
+    Like the memory tier it keeps at most ``max_entries`` rows, evicting the
+    least recently used ones, and every write also purges expired rows, so
+    the file stops growing once the cache is full.
+    """
+
+    name = "sqlite"
+    # Recency as a sequence number rather than a timestamp, so ties cannot blur the LRU order
+    _NEXT_USE = "(SELECT COALESCE(MAX(last_used), 0) + 1 FROM llm_cache)"
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = 86400, max_entries: int = 100000,
+                 clock: Callable[[], float] = time.time):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        # Files written before the LRU column existed get it added in place
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(llm_cache)")}
+        if "last_used" not in columns:
+            self._conn.execute("ALTER TABLE llm_cache ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= self._clock():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(f"UPDATE llm_cache SET last_used = {self._NEXT_USE} WHERE key = ?", (key,))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = self._clock()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) "
+                f"VALUES (?, ?, ?, {self._NEXT_USE})",
+                (key, value, expires_at)
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            evicted = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            self.evictions += max(evicted, 0)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class LLMResponseCache:
+    """Tiered cache for raw LLM completions.
+
+    Tiers are checked in order; a hit in a slower tier is promoted into the
+    faster tiers in front of it.
+    """
+
+    def __init__(self, tiers: List[CacheTier]):
+        if not tiers:
+            raise ValueError("LLMResponseCache needs at least one tier")
+        self.tiers = tiers
+        self.hits = 0
+        self.misses = 0
+        self.tier_hits: Dict[str, int] = {tier.name: 0 for tier in tiers}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        for position, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster_tier in self.tiers[:position]:
+                    faster_tier.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.tier_hits[tier.name] += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "tier_hits": dict(self.tier_hits)
+        }
+
+
+def build_llm_cache() -> Optional[LLMResponseCache]:
+    """Create the response cache described by the settings, or None if disabled."""
+    if not settings.cache_enabled:
+        return None
+
+    tiers: List[CacheTier] = [
+        MemoryCacheTier(max_entries=settings.cache_max_entries, ttl_seconds=settings.cache_ttl_seconds)
+    ]
+    if settings.cache_sqlite_path:
+        tiers.append(SQLiteCacheTier(settings.cache_sqlite_path, ttl_seconds=settings.cache_ttl_seconds,
+                                     max_entries=settings.cache_sqlite_max_entries))
+        logger.info(f"LLM response cache persisted to {settings.cache_sqlite_path}")
+    return LLMResponseCache(tiers)
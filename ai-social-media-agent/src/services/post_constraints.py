@@ -0,0 +1,295 @@
+import bisect
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config.settings import settings
+
+# X counts every URL as a t.co link and every emoji sequence as two characters
+URL_WEIGHT = 23
+EMOJI_WEIGHT = 2
+_PICTOGRAPH = "[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF]"
+_EMOJI_MODIFIERS = "(?:\uFE0F|[\U0001F3FB-\U0001F3FF])*"
+_URL = r"https?://\S+|www\.\S+"
+_EMOJI = rf"[\U0001F1E6-\U0001F1FF]{{2}}|{_PICTOGRAPH}{_EMOJI_MODIFIERS}(?:\u200D{_PICTOGRAPH}{_EMOJI_MODIFIERS})*"
+# The lookaheads let most positions fail on one character class instead of every alternative
+URL_PATTERN = re.compile(rf"(?=[hw])(?:{_URL})", re.IGNORECASE)
+# One match per emoji as displayed: flags, skin tones and ZWJ sequences included (flags
+# are within the pictograph range)
+EMOJI_PATTERN = re.compile(rf"(?={_PICTOGRAPH})(?:{_EMOJI})")
+# Code points outside these ranges (CJK and the like) count as two characters on X
+_X_HEAVY = "[^\u0000-\u10FF\u2000-\u200D\u2010-\u201F\u2032-\u2037]"
+# Everything X does not count as one character per code point
+_X_WEIGHTED_PATTERN = re.compile(
+    rf"(?=[hw]|{_X_HEAVY})(?:(?P<url>{_URL})|(?P<emoji>{_EMOJI})|{_X_HEAVY})", re.IGNORECASE
+)
+# The same for text without URLs, where the case-insensitive [hw] lookahead would stop at every h and w
+_X_WEIGHTED_NO_URL_PATTERN = re.compile(rf"(?={_X_HEAVY})(?:(?P<emoji>{_EMOJI})|{_X_HEAVY})")
+_PICTOGRAPH_PATTERN = re.compile(_PICTOGRAPH)
+
+_HASHTAG_JUNK = re.compile(r"[^\w]+", re.UNICODE)
+# Hashtags this long are looked up in the text without their last letter
+_STEM_MIN_LETTERS = 5
+ELLIPSIS = "…"
+_SENTENCE_END = ".!?"
+_SENTENCE_BREAK = re.compile(r"[.!?](?=\s)")
+_WORD_BREAK = re.compile(r"\s+")
+# A cut at the last sentence end is preferred while it keeps this share of the longest cut
+SENTENCE_CUT_SHARE = 0.8
+
+
+def may_contain_url(text: str) -> bool:
+    """False when URL_PATTERN certainly finds nothing in ``text``; far cheaper than the scan."""
+    return "://" in text or "www." in text.lower()
+
+
+def may_contain_emoji(text: str) -> bool:
+    """False when EMOJI_PATTERN certainly finds nothing in ``text``; far cheaper than the scan."""
+    return _PICTOGRAPH_PATTERN.search(text) is not None
+
+
+def _x_weighted_matches(text: str) -> Iterable[re.Match]:
+    pattern = _X_WEIGHTED_PATTERN if may_contain_url(text) else _X_WEIGHTED_NO_URL_PATTERN
+    return pattern.finditer(text)
+
+
+def _x_weight(match: re.Match) -> int:
+    return URL_WEIGHT if match.lastgroup == "url" else EMOJI_WEIGHT if match.lastgroup == "emoji" else 2
+
+
+def weighted_length(text: str) -> int:
+    """Length of ``text`` as X counts it: URLs are 23, emoji sequences and CJK characters 2."""
+    length = len(text)
+    for match in _x_weighted_matches(text):
+        # Correct the plain length of each match to its weight
+        length += _x_weight(match) - (match.end() - match.start())
+    return length
+
+
+_ELLIPSIS_WEIGHT = weighted_length(ELLIPSIS)
+
+
+def weighted_prefix_length(text: str) -> Callable[[str], int]:
+    """weighted_length for prefixes of ``text`` (optionally ending in an ellipsis), from one scan of it.
+
+    truncate_text measures several prefixes of the same text; each is answered
+    from the cumulative corrections of the matches it contains. Only a prefix
+    ending inside a URL, or a URL followed by the ellipsis (which the URL
+    would swallow), is measured in full.
+    """
+    starts, ends, corrections, url_ends = [], [], [0], set()
+    for match in _x_weighted_matches(text):
+        starts.append(match.start())
+        ends.append(match.end())
+        corrections.append(corrections[-1] + _x_weight(match) - (match.end() - match.start()))
+        if match.lastgroup == "url":
+            url_ends.add(match.end())
+
+    def measure(candidate: str) -> int:
+        ellipsis = candidate.endswith(ELLIPSIS)
+        prefix = candidate[:-1] if ellipsis else candidate
+        end = len(prefix)
+        contained = bisect.bisect_right(ends, end)
+        if (not text.startswith(prefix) or (contained < len(starts) and starts[contained] < end)
+                or (ellipsis and end in url_ends)):
+            return weighted_length(candidate)
+        return end + corrections[contained] + (_ELLIPSIS_WEIGHT if ellipsis else 0)
+
+    return measure
+
+
+def text_length(platform: str, text: str) -> int:
+    """Characters of ``text`` as ``platform`` counts them against its limit."""
+    return weighted_length(text) if platform == "x" else len(text)
+
+
+def published_length(platform: str, post: Dict[str, Any]) -> int:
+    """Characters of the post as published: its text followed by the space-separated hashtags."""
+    hashtags = post.get("hashtags") or []
+    return text_length(platform, post.get("text", "")) + sum(len(tag) + 1 for tag in hashtags)
+
+
+def normalize_hashtag(tag: Any) -> Optional[str]:
+    """``#word`` form of a hashtag: spaces and punctuation removed; None when nothing usable is left."""
+    tag = str(tag)
+    if tag.startswith("#") and tag[1:].isalnum() and not tag[1:].isdigit():
+        return tag
+    body = _HASHTAG_JUNK.sub("", tag.lstrip("#"))
+    # Platforms do not link hashtags made of digits only
+    if not body or body.isdigit():
+        return None
+    return f"#{body}"
+
+
+def rank_hashtags(hashtags: Iterable[Any], text: str) -> List[str]:
+    """Normalized hashtags without case-insensitive duplicates, the ones the text mentions first.
+
+    The model is asked to order hashtags by relevance, so apart from moving
+    the tags that echo the post's own words forward the order is kept. A
+    word counts as mentioned in its suffixed forms too; longer tags are
+    matched without their last letter, since Hungarian suffixes can double
+    it (#kedvezmény in "kedvezménnyel").
+    """
+    lowered = text.lower()
+    seen, mentioned, others = set(), [], []
+    for tag in hashtags:
+        normalized = normalize_hashtag(tag)
+        if normalized is None:
+            continue
+        key = normalized.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        stem = key[1:]
+        if len(stem) >= _STEM_MIN_LETTERS:
+            stem = stem[:-1]
+        (mentioned if stem in lowered else others).append(normalized)
+    return mentioned + others
+
+
+def truncate_text(text: str, budget: int, measure: Callable[[str], int] = len,
+                  length: Optional[int] = None) -> str:
+    """Prefix of ``text`` within ``budget``, cut at a word boundary and ending in an ellipsis.
+
+    The longest such prefix is shortened to its last complete sentence when
+    that keeps most of it (SENTENCE_CUT_SHARE), which needs no ellipsis.
+    Words (and so URLs and emoji sequences) are never cut; a single word
+    longer than the budget is the only case that is cut mid-word. ``length``
+    is ``measure(text)`` when the caller has it already.
+    """
+    if length is None or text != text.strip():
+        text = text.strip()
+        length = measure(text)
+    if length <= budget:
+        return text
+
+    def fits(end: int) -> Optional[str]:
+        candidate = text[:end].rstrip(" \t\n,;:-–")
+        if not candidate:
+            return None
+        if candidate[-1] not in _SENTENCE_END:
+            candidate += ELLIPSIS
+        return candidate if measure(candidate) <= budget else None
+
+    # Most characters count one, so the cut is usually close to the budget's share of the text
+    estimate = len(text) * budget / length
+
+    def longest(ends) -> Optional[str]:
+        # Shorter prefixes measure less (give or take the ellipsis), so gallop from the estimate
+        # and bisect: a few measurements instead of log2(words)
+        tried: Dict[int, Optional[str]] = {}
+
+        def fits_at(index: int) -> Optional[str]:
+            if index not in tried:
+                tried[index] = fits(ends[index])
+            return tried[index]
+
+        if not ends:
+            return None
+        # ends[low] fits (or low is -1), ends[high] does not (or high is len(ends))
+        low, high, step = -1, len(ends), 1
+        guess = min(max(bisect.bisect_right(ends, estimate) - 1, 0), len(ends) - 1)
+        if fits_at(guess) is not None:
+            low = guess
+            while low + step < high and fits_at(low + step) is not None:
+                low, step = low + step, step * 2
+            high = min(high, low + step)
+        else:
+            high = guess
+            while high - step > low and fits_at(high - step) is None:
+                high, step = high - step, step * 2
+            low = max(low, high - step)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if fits_at(middle) is not None:
+                low = middle
+            else:
+                high = middle
+        return tried[low] if low >= 0 else None
+
+    # Word breaks well past the estimate cannot be the cut, so a long text is only scanned up to a
+    # margin past it, unless the last break scanned still fits
+    scan_to = min(int(estimate * 1.25) + 16, len(text))
+    ends = [match.start() for match in _WORD_BREAK.finditer(text, 0, scan_to)]
+    if scan_to < len(text) and (not ends or fits(ends[-1]) is not None):
+        ends = [match.start() for match in _WORD_BREAK.finditer(text)]
+    best = longest(ends)
+    if best is None:
+        # Only a first word longer than the budget is cut mid-word
+        return longest(range(1, len(text))) or ""
+    sentence_ends = [match.end() for match in _SENTENCE_BREAK.finditer(best)]
+    if sentence_ends and sentence_ends[-1] >= SENTENCE_CUT_SHARE * len(best):
+        return best[:sentence_ends[-1]]
+    return best
+
+
+@dataclass
+class Enforcement:
+    post: Dict[str, Any]
+    repairs: List[str] = field(default_factory=list)
+    violations: List[str] = field(default_factory=list)  # What local repair could not fix
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+
+def enforce_post(platform: str, post: Dict[str, Any], limits: Optional[Dict[str, Dict[str, int]]] = None,
+                 max_cut: Optional[float] = None, force: bool = False) -> Enforcement:
+    """Repair a post locally so it fits the platform's character and hashtag limits.
+
+    Hashtags are normalized, de-duplicated, ranked and trimmed to the limit;
+    an over-long post then loses its least relevant hashtags (down to one)
+    and finally has its text truncated at a word boundary. Cutting more than
+    ``max_cut`` of the text (LOCAL_REPAIR_MAX_CUT) would change what the post
+    says, so that is reported in ``violations`` for the LLM to rewrite
+    instead, unless ``force`` is set. Keys other than text and hashtags are
+    kept as they are.
+    """
+    limits = (limits or settings.platform_limits)[platform]
+    max_cut = settings.local_repair_max_cut if max_cut is None else max_cut
+    text = str(post.get("text") or "")
+    repairs: List[str] = []
+    violations: List[str] = []
+    if not text.strip():
+        return Enforcement(dict(post), violations=["empty text"])
+
+    original = post.get("hashtags") or []
+    hashtags = rank_hashtags(original, text)
+    if len(hashtags) < len(original) or any(tag != normalized for tag, normalized in zip(original, hashtags)):
+        repairs.append("hashtags normalized")
+    if len(hashtags) > limits["hashtag_limit"]:
+        repairs.append(f"hashtags trimmed to {limits['hashtag_limit']}")
+        hashtags = hashtags[:limits["hashtag_limit"]]
+
+    max_chars = limits["max_chars"]
+    # Truncation measures many prefixes of the text; on X each one would otherwise be a full scan
+    measure = weighted_prefix_length(text) if platform == "x" else len
+    tags_length = lambda tags: sum(len(tag) + 1 for tag in tags)
+    length = measure(text)
+    if length + tags_length(hashtags) > max_chars:
+        # The least relevant hashtags go (down to one) before the text is cut
+        kept = list(hashtags)
+        while len(kept) > 1 and length + tags_length(kept) > max_chars:
+            kept.pop()
+        truncated = truncate_text(text, max_chars - tags_length(kept), measure, length)
+        cut = 1 - len(truncated) / len(text)
+        if cut > max_cut and not force:
+            violations.append(f"{length + tags_length(hashtags)} characters, limit {max_chars}")
+        else:
+            if len(kept) < len(hashtags):
+                repairs.append("hashtags dropped for length")
+            if truncated != text:
+                repairs.append(f"text truncated by {cut:.0%}")
+            text, hashtags = truncated, kept
+
+    repaired = {**post, "text": text}
+    if "hashtags" in post or hashtags:
+        repaired["hashtags"] = hashtags
+    return Enforcement(repaired, repairs, violations)
+
+
+def enforce_posts(posts: Dict[str, Any], platforms: Iterable[str], **options) -> Dict[str, Enforcement]:
+    """enforce_post for each of ``platforms`` that has a post."""
+    return {platform: enforce_post(platform, posts[platform], **options)
+            for platform in platforms if isinstance(posts.get(platform), dict)}
@@ -0,0 +1,104 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.post_constraints import published_length
+
+# Emoji, pictograph, dingbat and flag code points; enough to tell whether a post uses emojis at all
+EMOJI_PATTERN = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F]")
+_WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+_HUNGARIAN_LETTERS = set("áéíóöőúüű")
+_HUNGARIAN_WORDS = frozenset(
+    "a az és hogy nem is egy most meg már csak van lesz vagy de mint minden ez ezt itt még ha "
+    "neked nekünk veled nálunk akár kedvezmény új ingyenes".split()
+)
+_ENGLISH_WORDS = frozenset(
+    "the and to of for with you your our is are this that now new on in at be get it".split()
+)
+
+# Penalties subtracted from a perfect score of 1.0
+OVER_LIMIT_PENALTY = 0.6
+SHORT_TEXT_PENALTY = 0.1
+EXTRA_HASHTAG_PENALTY = 0.1
+NO_HASHTAG_PENALTY = 0.05
+BAD_HASHTAG_PENALTY = 0.05
+MISSING_EMOJI_PENALTY = 0.1
+UNWANTED_EMOJI_PENALTY = 0.3
+LANGUAGE_PENALTY = 0.3
+MIN_TEXT_CHARS = 40
+
+
+@dataclass
+class PostScore:
+    score: float
+    issues: List[str] = field(default_factory=list)
+
+
+def looks_hungarian(text: str) -> bool:
+    """Rough language check: Hungarian letters and function words against English ones."""
+    words = [word.lower() for word in _WORD_PATTERN.findall(text)]
+    if not words:
+        return True
+    hungarian = sum(1 for word in words if word in _HUNGARIAN_WORDS or _HUNGARIAN_LETTERS & set(word))
+    english = sum(1 for word in words if word in _ENGLISH_WORDS)
+    return hungarian >= english
+
+
+def score_post(platform: str, post: Dict[str, Any], use_emojis: bool,
+               limits: Optional[Dict[str, Dict[str, int]]] = None) -> PostScore:
+    """Score a post between 0 and 1 against the platform's limits, the emoji policy and the language.
+
+    Pure string checks, so ranking a handful of variants costs microseconds;
+    ``issues`` names every rule the post broke.
+    """
+    limits = (limits or settings.platform_limits)[platform]
+    text = post.get("text", "")
+    hashtags = post.get("hashtags") or []
+    penalty = 0.0
+    issues: List[str] = []
+
+    length = published_length(platform, post)
+    if length > limits["max_chars"]:
+        penalty += OVER_LIMIT_PENALTY
+        issues.append(f"{length} characters, limit {limits['max_chars']}")
+    elif len(text.strip()) < MIN_TEXT_CHARS:
+        penalty += SHORT_TEXT_PENALTY
+        issues.append("text too short")
+
+    if len(hashtags) > limits["hashtag_limit"]:
+        extra = len(hashtags) - limits["hashtag_limit"]
+        penalty += min(extra * EXTRA_HASHTAG_PENALTY, 0.3)
+        issues.append(f"{len(hashtags)} hashtags, limit {limits['hashtag_limit']}")
+    elif not hashtags:
+        penalty += NO_HASHTAG_PENALTY
+        issues.append("no hashtags")
+    normalized = [tag.lstrip("#").lower() for tag in hashtags]
+    malformed = sum(1 for tag in normalized if not tag or any(char.isspace() for char in tag))
+    duplicates = len(normalized) - len(set(normalized))
+    if malformed or duplicates:
+        penalty += BAD_HASHTAG_PENALTY * (malformed + duplicates)
+        issues.append("duplicate or malformed hashtags")
+
+    has_emoji = bool(EMOJI_PATTERN.search(text))
+    if use_emojis and not has_emoji:
+        penalty += MISSING_EMOJI_PENALTY
+        issues.append("no emojis")
+    elif not use_emojis and has_emoji:
+        penalty += UNWANTED_EMOJI_PENALTY
+        issues.append("emojis were not wanted")
+
+    if not looks_hungarian(text):
+        penalty += LANGUAGE_PENALTY
+        issues.append("not Hungarian")
+
+    return PostScore(round(max(1.0 - penalty, 0.0), 3), issues)
+
+
+def rank_variants(platform: str, variants: List[Dict[str, Any]], use_emojis: bool) -> List[Dict[str, Any]]:
+    """The variants best first, each with its ``score`` and ``issues``; ties keep the response order."""
+    scored = []
+    for variant in variants:
+        result = score_post(platform, variant, use_emojis)
+        scored.append({**variant, "score": result.score, "issues": result.issues})
+    return sorted(scored, key=lambda variant: -variant["score"])
@@ -0,0 +1,198 @@
+import json
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.settings import settings
+from services.rate_limiter import estimate_tokens
+
+# Context keys in the order they are given up when a prompt has to shrink (least useful first)
+_DROPPABLE_CONTEXT_KEYS = ("creative_directions", "audience_insights", "platform_strategies", "key_messages")
+# Longest list and string kept at each compaction step of the context analysis
+_CONTEXT_STEPS = ((3, 300), (2, 120), (1, 60))
+_ELLIPSIS = "…"
+
+
+class PromptTooLargeError(ValueError):
+    """The prompt does not fit the model's context window next to the reserved completion."""
+
+    def __init__(self, prompt_tokens: int, limit: int):
+        super().__init__(f"Prompt of ~{prompt_tokens} tokens exceeds the {limit} token input limit")
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+
+
+@dataclass
+class PromptBudget:
+    """Token limits for one LLM call.
+
+    ``max_prompt_tokens`` is the size prompts are compacted down to;
+    ``input_limit`` is the hard ceiling: whatever the context window leaves
+    after reserving ``max_output_tokens`` for the completion.
+    """
+    context_window: int
+    max_output_tokens: int
+    max_prompt_tokens: int
+
+    @property
+    def input_limit(self) -> int:
+        return max(self.context_window - self.max_output_tokens, 0)
+
+    @property
+    def target(self) -> int:
+        return min(self.max_prompt_tokens, self.input_limit) if self.max_prompt_tokens > 0 else self.input_limit
+
+    def overflow(self, prompt_tokens: int) -> int:
+        """Tokens to cut before a prompt of ``prompt_tokens`` meets the target (0 when it fits)."""
+        return max(prompt_tokens - self.target, 0)
+
+
+@dataclass
+class TokenUsage:
+    """Token accounting of one AIService call.
+
+    ``prompt_tokens`` and ``completion_tokens`` are the provider's counts when
+    it reports usage, estimates otherwise. Cached answers cost nothing.
+    ``saved_tokens`` is how much the prompt was reduced by compaction.
+    """
+    operation: str
+    prompt_tokens: int
+    completion_tokens: int = 0
+    attempts: int = 0
+    cached: bool = False
+    saved_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+
+class TokenAccounting:
+    """Per-operation token totals plus a bounded history of recent calls."""
+
+    def __init__(self, history: int = 256):
+        self._recent = deque(maxlen=history)
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, usage: TokenUsage):
+        with self._lock:
+            self._recent.append(usage)
+            totals = self._totals.setdefault(usage.operation, {
+                "calls": 0, "cached": 0, "prompt_tokens": 0, "completion_tokens": 0, "saved_tokens": 0
+            })
+            totals["calls"] += 1
+            totals["cached"] += usage.cached
+            totals["saved_tokens"] += usage.saved_tokens
+            if not usage.cached:
+                totals["prompt_tokens"] += usage.prompt_tokens
+                totals["completion_tokens"] += usage.completion_tokens
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The most recent calls, oldest first."""
+        with self._lock:
+            calls = list(self._recent)
+        return [usage.as_dict() for usage in calls[-limit if limit else 0:]]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {operation: dict(totals) for operation, totals in self._totals.items()}
+
+
+def shorten_text(text: str, max_chars: int) -> str:
+    """Cut text at a word boundary to at most ``max_chars`` characters, marking the cut."""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= len(_ELLIPSIS):
+        return text[:max(max_chars, 0)]
+    cut = text[:max_chars - len(_ELLIPSIS)]
+    boundary = cut.rfind(" ")
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + _ELLIPSIS
+
+
+def _json_tokens(value: Any) -> int:
+    return estimate_tokens(json.dumps(value, ensure_ascii=False))
+
+
+def _shrink(value: Any, max_items: int, max_chars: int) -> Any:
+    if isinstance(value, str):
+        return shorten_text(value, max_chars)
+    if isinstance(value, list):
+        return [_shrink(item, max_items, max_chars) for item in value[:max_items]]
+    if isinstance(value, dict):
+        return {key: _shrink(item, max_items, max_chars) for key, item in value.items()}
+    return value
+
+
+def compact_context(context: Optional[Dict[str, Any]], platforms: Iterable[str],
+                    max_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Reduce a context analysis to what a prompt for ``platforms`` needs.
+
+    Strategies for other platforms are always dropped. With ``max_tokens`` the
+    result is shrunk further until its JSON fits: lists and strings are
+    shortened step by step, then whole keys are dropped, least useful first.
+    """
+    platforms = set(platforms)
+    compacted = dict(context or {})
+    strategies = compacted.get("platform_strategies")
+    if isinstance(strategies, dict):
+        compacted["platform_strategies"] = {
+            platform: strategy for platform, strategy in strategies.items() if platform in platforms
+        }
+    if max_tokens is None or _json_tokens(compacted) <= max_tokens:
+        return compacted
+
+    for max_items, max_chars in _CONTEXT_STEPS:
+        compacted = _shrink(compacted, max_items, max_chars)
+        if _json_tokens(compacted) <= max_tokens:
+            return compacted
+    for key in _DROPPABLE_CONTEXT_KEYS:
+        compacted.pop(key, None)
+        if _json_tokens(compacted) <= max_tokens:
+            return compacted
+    return {}
+
+
+def compact_posts(posts: Dict[str, Dict[str, Any]], max_tokens: int) -> Dict[str, Dict[str, Any]]:
+    """Shrink posts sent for refinement until their JSON fits ``max_tokens``.
+
+    Image suggestions go first (the model writes new ones anyway), then
+    hashtags are cut to the platform limits, then the longest texts are
+    shortened at word boundaries. Every post keeps its platform key.
+    """
+    compacted = {platform: dict(post) for platform, post in posts.items()}
+    if _json_tokens(compacted) <= max_tokens:
+        return compacted
+
+    for post in compacted.values():
+        post.pop("image_suggestions", None)
+    for platform, post in compacted.items():
+        limit = settings.platform_limits.get(platform, {}).get("hashtag_limit")
+        if limit is not None and isinstance(post.get("hashtags"), list):
+            post["hashtags"] = post["hashtags"][:limit]
+
+    overflow = _json_tokens(compacted) - max_tokens
+    while overflow > 0:
+        longest = max(compacted.values(), key=lambda post: len(post.get("text", "")))
+        text = longest.get("text", "")
+        if len(text) <= 1:
+            break
+        # About four characters per token; cut at least a quarter so this converges quickly
+        longest["text"] = shorten_text(text, min(len(text) - overflow * 4, len(text) * 3 // 4))
+        overflow = _json_tokens(compacted) - max_tokens
+    return compacted
+
+
+def build_prompt_budget() -> PromptBudget:
+    """Budget from settings: LLM_CONTEXT_WINDOW, MAX_TOKENS and MAX_PROMPT_TOKENS."""
+    return PromptBudget(
+        context_window=settings.llm_context_window,
+        max_output_tokens=settings.max_tokens,
+        max_prompt_tokens=settings.max_prompt_tokens
+    )
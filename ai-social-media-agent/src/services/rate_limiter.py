@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate accounting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of polling.
+
+    ``reserve`` always succeeds and returns how long the caller has to wait
+    before its reservation is covered. The balance may go negative, which
+    queues later callers behind earlier ones in arrival order.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` tokens and return the seconds until they are available."""
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= min(amount, self.capacity)
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.refill_per_second
+
+    def refund(self, amount: float):
+        """Give back tokens that were reserved but not used (negative amounts charge extra)."""
+        self._refill(self._clock())
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        self._refill(self._clock())
+        return self._tokens
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter for one API account.
+
+    Share one instance between every workflow of the process (see
+    agents.factory): callers reserve a request and their estimated tokens in
+    ``acquire``, report the real usage with ``settle`` afterwards, and a
+    server-side 429 pauses everyone through ``pause``. A limit of 0 disables
+    that dimension.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60, clock) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock) if tokens_per_minute > 0 else None
+        self._blocked_until = 0.0
+        self.acquired = 0
+        self.delayed = 0
+        self.pauses = 0
+        self.total_wait_seconds = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and ``tokens`` tokens; return how long to wait before sending."""
+        with self._state():
+            wait = max(self._blocked_until - self._clock(), 0.0)
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1))
+            if self._tokens:
+                wait = max(wait, self._tokens.reserve(tokens))
+            self.acquired += 1
+            if wait > 0:
+                self.delayed += 1
+                self.total_wait_seconds += wait
+            return wait
+
+    async def acquire(self, tokens: int) -> float:
+        """Wait until a request with ``tokens`` tokens may be sent. Returns the seconds waited."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.info(f"Rate limiter delaying LLM call by {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def settle(self, reserved_tokens: int, used_tokens: int, sent: bool = True):
+        """Correct a reservation with the tokens the call actually consumed.
+
+        With ``sent=False`` (the call was given up, e.g. cancelled) the
+        request is handed back as well.
+        """
+        refund_request = not sent and self._requests is not None
+        if refund_request or (self._tokens and reserved_tokens != used_tokens):
+            with self._state():
+                if refund_request:
+                    self._requests.refund(1)
+                if self._tokens:
+                    self._tokens.refund(reserved_tokens - used_tokens)
+
+    def pause(self, seconds: float):
+        """Hold back every caller for ``seconds`` (e.g. after a 429 with Retry-After)."""
+        with self._state():
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+            self.pauses += 1
+
+    def _state(self):
+        """Guard around every use of the buckets; SharedRateLimiter also loads and stores them here."""
+        return self._lock
+
+    def stats(self) -> Dict[str, Any]:
+        with self._state():
+            return {
+                "acquired": self.acquired,
+                "delayed": self.delayed,
+                "pauses": self.pauses,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "available_requests": self._requests.available if self._requests else None,
+                "available_tokens": self._tokens.available if self._tokens else None,
+            }
+
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter whose budget is shared by every process using the same SQLite file.
+
+    The bucket levels and the 429 pause live in one row; each reservation,
+    settlement and pause reads it, applies the same token bucket arithmetic
+    as ``RateLimiter`` and writes it back in one immediate transaction, so N
+    worker processes together stay within the account's limits. The
+    ``acquired``/``delayed`` counters remain per process. Wall-clock time is
+    used because the state outlives and crosses processes.
+    """
+
+    def __init__(self, path: str, requests_per_minute: float, tokens_per_minute: float, name: str = "default",
+                 clock: Callable[[], float] = time.time):
+        super().__init__(requests_per_minute, tokens_per_minute, clock)
+        self.path = path
+        self.name = name
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, requests REAL, requests_updated REAL, "
+            "tokens REAL, tokens_updated REAL, blocked_until REAL NOT NULL)"
+        )
+        # The first process starts the buckets full; later ones continue from the stored levels
+        now = clock()
+        self._conn.execute(
+            "INSERT OR IGNORE INTO rate_limits VALUES (?, ?, ?, ?, ?, 0)",
+            (name, self._requests.capacity if self._requests else None, now,
+             self._tokens.capacity if self._tokens else None, now))
+
+    @contextlib.contextmanager
+    def _state(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                requests, requests_updated, tokens, tokens_updated, self._blocked_until = self._conn.execute(
+                    "SELECT requests, requests_updated, tokens, tokens_updated, blocked_until "
+                    "FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+                self._load(self._requests, requests, requests_updated)
+                self._load(self._tokens, tokens, tokens_updated)
+                yield
+                self._conn.execute(
+                    "UPDATE rate_limits SET requests = ?, requests_updated = ?, tokens = ?, tokens_updated = ?, "
+                    "blocked_until = ? WHERE name = ?",
+                    (*self._dump(self._requests), *self._dump(self._tokens), self._blocked_until, self.name))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _load(bucket: Optional[TokenBucket], tokens: Optional[float], updated: Optional[float]):
+        if bucket is not None:
+            # A limit another process did not have starts out full
+            bucket._tokens = bucket.capacity if tokens is None else min(tokens, bucket.capacity)
+            bucket._updated = bucket._clock() if updated is None else updated
+
+    @staticmethod
+    def _dump(bucket: Optional[TokenBucket]) -> tuple:
+        return (bucket._tokens, bucket._updated) if bucket is not None else (None, None)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_rate_limiter() -> Optional[RateLimiter]:
+    """Create the limiter described by the settings, or None if both limits are disabled.
+
+    With RATE_LIMIT_SHARED_PATH set, the limits are shared with every other
+    process using that file (e.g. the workers of a multi-process batch).
+    """
+    if settings.rate_limit_rpm <= 0 and settings.rate_limit_tpm <= 0:
+        return None
+    logger.info(f"LLM rate limits: {settings.rate_limit_rpm} requests/min, {settings.rate_limit_tpm} tokens/min")
+    if settings.rate_limit_shared_path:
+        return SharedRateLimiter(settings.rate_limit_shared_path, settings.rate_limit_rpm, settings.rate_limit_tpm)
+    return RateLimiter(settings.rate_limit_rpm, settings.rate_limit_tpm)
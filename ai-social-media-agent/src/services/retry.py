@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Transport failures raised by the Groq SDK / httpx, matched by name to avoid hard imports
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout",
+                         "ConnectTimeout", "RemoteProtocolError", "TimeoutException"}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"LLM circuit breaker is open; retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+def status_code_of(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed LLM call may succeed when repeated."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = status_code_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the server's Retry-After hint (seconds or HTTP date) from an API error."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, never shorter than the server's Retry-After."""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)."""
+        backoff = self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+class CircuitBreaker:
+    """Stops calling a failing LLM API for a while instead of queueing doomed requests.
+
+    After ``failure_threshold`` consecutive retryable failures the breaker
+    opens and calls fail fast with CircuitOpenError. Once ``reset_timeout``
+    has passed a single probe call is let through (half-open); its success
+    closes the breaker, anything else (a failure, cancellation, the request
+    deadline) opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go out now; True if the call is the half-open probe."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return False
+            elapsed = self._clock() - self._opened_at
+            if self._state == self.OPEN and elapsed >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            raise CircuitOpenError(max(self.reset_timeout - elapsed, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                    logger.warning(f"LLM circuit breaker opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def release_probe(self):
+        """Open the breaker again if the probe ended without recording a success or failure."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probe_in_flight:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+
+class HedgePolicy:
+    """When to send a duplicate ("hedged") request for an LLM call that is taking too long.
+
+    Keeps the latencies of recent round trips per operation. Once
+    ``min_samples`` are known, a call still running after their ``quantile``
+    gets one duplicate and the first valid answer wins. At the 0.9 quantile
+    about one call in ten is duplicated, a small price for cutting off the
+    stragglers that dominate tail latency.
+    """
+
+    def __init__(self, enabled: bool = False, quantile: float = 0.9, min_samples: int = 20, window: int = 200,
+                 min_delay: float = 0.05):
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def observe(self, operation: str, seconds: float):
+        """Record the latency of a successful round trip."""
+        with self._lock:
+            latencies = self._latencies.get(operation)
+            if latencies is None:
+                latencies = self._latencies[operation] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, operation: str) -> Optional[float]:
+        """Seconds after which a call of ``operation`` is hedged; None while hedging is off or still learning."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            latencies = sorted(self._latencies.get(operation, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(math.ceil(self.quantile * len(latencies)) - 1, len(latencies) - 1)
+        return max(latencies[max(index, 0)], self.min_delay)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """The current hedge delay per operation."""
+        with self._lock:
+            operations = list(self._latencies)
+        return {operation: self.delay(operation) for operation in operations}
+
+
+def build_retry_policy() -> RetryPolicy:
+    return RetryPolicy(settings.llm_max_retries, settings.llm_retry_base_delay, settings.llm_retry_max_delay)
+
+
+def build_circuit_breaker() -> CircuitBreaker:
+    return CircuitBreaker(settings.circuit_breaker_failure_threshold, settings.circuit_breaker_reset_timeout)
+
+
+def build_hedge_policy() -> HedgePolicy:
+    return HedgePolicy(settings.llm_hedge_enabled, settings.llm_hedge_quantile, settings.llm_hedge_min_samples)
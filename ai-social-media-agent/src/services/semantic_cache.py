@@ -0,0 +1,263 @@
+import copy
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+class HashingEmbedder:
+    """Offline text embeddings with the hashing trick.
+
+    Words, word bigrams and character n-grams of each word are hashed into
+    ``dimensions`` signed buckets with sublinear term frequency, and the
+    vector is L2-normalized, so the dot product of two embeddings is their
+    cosine similarity. The n-grams make inflected Hungarian forms
+    ("kollekció", "kollekciónk") land close to each other.
+    """
+
+    def __init__(self, dimensions: int = 256, char_ngram: int = 4):
+        if dimensions < 8:
+            raise ValueError("dimensions must be at least 8")
+        self.dimensions = dimensions
+        self.char_ngram = char_ngram
+
+    def features(self, text: str) -> Dict[str, float]:
+        words = _WORD.findall(unicodedata.normalize("NFKC", text).lower())
+        weights: Dict[str, float] = {}
+
+        def add(feature: str, weight: float):
+            weights[feature] = weights.get(feature, 0.0) + weight
+
+        n = self.char_ngram
+        for index, word in enumerate(words):
+            add(f"w:{word}", 1.0)
+            if index:
+                add(f"b:{words[index - 1]} {word}", 0.5)
+            padded = f" {word} "
+            for start in range(max(len(padded) - n + 1, 1)):
+                add(f"c:{padded[start:start + n]}", 0.25)
+        return weights
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self.features(text).items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign * math.log1p(weight)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+# Weight of the audience next to the campaign message, so a shared audience does not hide a different message
+AUDIENCE_WEIGHT = 0.5
+
+
+def embed_campaign(embedder: HashingEmbedder, campaign_message: str, target_audience: str) -> np.ndarray:
+    vector = embedder.embed(campaign_message) + AUDIENCE_WEIGHT * embedder.embed(target_audience)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def campaign_group(campaign_message: str, tone: str, use_emojis: bool) -> int:
+    """Hard partition of the index: only campaigns with the same tone, emoji setting and numbers are compared.
+
+    Wording may differ between near-duplicates, but "20%" and "30%" may not.
+    """
+    numbers = " ".join(sorted(_NUMBER.findall(campaign_message)))
+    return zlib.crc32(f"{tone.lower()}|{use_emojis}|{numbers}".encode("utf-8"))
+
+
+@dataclass
+class SemanticMatch:
+    posts: Dict[str, Any]
+    similarity: float
+    campaign_message: str
+
+
+class VectorIndex:
+    """Bounded nearest-neighbour index over unit vectors with a group filter.
+
+    Vectors live in one contiguous float32 matrix (grown by doubling up to
+    ``max_entries``). A query masks the live entries of its group and scores
+    only those with one matrix-vector product; an insert is O(1) until the
+    index is full. Expired entries are skipped;
+    when full, an expired entry is reused first, otherwise the least
+    recently used one is evicted.
+    """
+
+    def __init__(self, dimensions: int, max_entries: int = 10000, ttl_seconds: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, initial_capacity: int = 1024):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        capacity = min(initial_capacity, max_entries)
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._groups = np.zeros(capacity, dtype=np.int64)
+        self._expires = np.full(capacity, np.inf)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._values: List[Any] = [None] * capacity
+        self._size = 0
+        self._tick = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return int(self._live[:self._size].sum())
+
+    def search(self, vector: np.ndarray, group: int, min_similarity: float = -1.0) -> Optional[Tuple[int, float]]:
+        """Slot and similarity of the most similar live entry of the group, if any reaches ``min_similarity``."""
+        n = self._size
+        if n == 0:
+            return None
+        # Filter first: the group is a small slice of the index, and scoring the whole matrix is memory bound
+        candidates = np.flatnonzero(self._live[:n] & (self._groups[:n] == group) & (self._expires[:n] > self._clock()))
+        if candidates.size == 0:
+            return None
+        if candidates.size * 2 > n:
+            similarities = (self._vectors[:n] @ vector)[candidates]
+        else:
+            similarities = self._vectors[candidates] @ vector
+        best = int(np.argmax(similarities))
+        slot, similarity = int(candidates[best]), float(similarities[best])
+        if similarity < min_similarity:
+            return None
+        self._tick += 1
+        self._last_used[slot] = self._tick
+        return slot, similarity
+
+    def value(self, slot: int) -> Any:
+        return self._values[slot]
+
+    def add(self, vector: np.ndarray, group: int, value: Any) -> int:
+        slot = self._free_slot()
+        self._tick += 1
+        self._vectors[slot] = vector
+        self._groups[slot] = group
+        self._expires[slot] = self._clock() + self.ttl_seconds if self.ttl_seconds else np.inf
+        self._last_used[slot] = self._tick
+        self._live[slot] = True
+        self._values[slot] = value
+        return slot
+
+    def clear(self):
+        self._live[:] = False
+        self._values = [None] * len(self._values)
+        self._size = 0
+
+    def _free_slot(self) -> int:
+        n = self._size
+        if n < len(self._values):
+            self._size += 1
+            return n
+        if n < self.max_entries:
+            self._grow(min(n * 2, self.max_entries))
+            self._size += 1
+            return n
+        # Full: reuse an expired entry, otherwise evict the least recently used one
+        expired = np.flatnonzero(self._expires[:n] <= self._clock())
+        if expired.size:
+            return int(expired[0])
+        self.evictions += 1
+        return int(np.argmin(self._last_used[:n]))
+
+    def _grow(self, capacity: int):
+        extra = capacity - len(self._values)
+        self._vectors = np.vstack([self._vectors, np.zeros((extra, self.dimensions), dtype=np.float32)])
+        self._groups = np.concatenate([self._groups, np.zeros(extra, dtype=np.int64)])
+        self._expires = np.concatenate([self._expires, np.full(extra, np.inf)])
+        self._last_used = np.concatenate([self._last_used, np.zeros(extra, dtype=np.int64)])
+        self._live = np.concatenate([self._live, np.zeros(extra, dtype=bool)])
+        self._values.extend([None] * extra)
+
+
+class SemanticCache:
+    """Generated posts of earlier campaigns, found by embedding similarity.
+
+    Campaigns are embedded from their message and (at half weight) their
+    audience; tone, emoji setting and the numbers of the message must match
+    exactly. ``lookup`` returns the closest earlier campaign if its
+    similarity reaches ``seed_threshold`` (or ``threshold`` when seeding is
+    off). At or above ``threshold`` its posts can be returned as they are;
+    below it they only seed the prompt.
+    """
+
+    def __init__(self, threshold: float = 0.93, seed_threshold: float = 0.85, max_entries: int = 10000,
+                 ttl_seconds: Optional[float] = 86400, dimensions: int = 256,
+                 embedder: Optional[HashingEmbedder] = None, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.seed_threshold = seed_threshold if seed_threshold else threshold
+        self.embedder = embedder or HashingEmbedder(dimensions)
+        self.index = VectorIndex(self.embedder.dimensions, max_entries, ttl_seconds, clock)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.seeds = 0
+        self.misses = 0
+
+    def lookup(self, campaign_message: str, target_audience: str, tone: str,
+               use_emojis: bool) -> Optional[SemanticMatch]:
+        vector = embed_campaign(self.embedder, campaign_message, target_audience)
+        group = campaign_group(campaign_message, tone, use_emojis)
+        with self._lock:
+            found = self.index.search(vector, group, self.seed_threshold)
+            if found is None:
+                self.misses += 1
+                return None
+            slot, similarity = found
+            if similarity >= self.threshold:
+                self.hits += 1
+            else:
+                self.seeds += 1
+            message, posts = self.index.value(slot)
+        return SemanticMatch(copy.deepcopy(posts), similarity, message)
+
+    def add(self, campaign_message: str, target_audience: str, tone: str, use_emojis: bool,
+            posts: Dict[str, Any]):
+        vector = embed_campaign(self.embedder, campaign_message, target_audience)
+        group = campaign_group(campaign_message, tone, use_emojis)
+        with self._lock:
+            self.index.add(vector, group, (campaign_message, copy.deepcopy(posts)))
+
+    def clear(self):
+        with self._lock:
+            self.index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.seeds + self.misses
+        return {
+            "entries": len(self.index),
+            "hits": self.hits,
+            "seeds": self.seeds,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.index.evictions
+        }
+
+
+def build_semantic_cache() -> Optional[SemanticCache]:
+    """Create the semantic cache described by the settings, or None if disabled."""
+    if not settings.semantic_cache_enabled:
+        return None
+    return SemanticCache(
+        threshold=settings.semantic_cache_threshold,
+        seed_threshold=settings.semantic_cache_seed_threshold,
+        max_entries=settings.semantic_cache_max_entries,
+        ttl_seconds=settings.semantic_cache_ttl_seconds,
+        dimensions=settings.semantic_cache_dimensions
+    )
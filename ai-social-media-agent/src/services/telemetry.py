@@ -0,0 +1,449 @@
+import bisect
+import contextvars
+import json
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, dense around typical LLM round trips
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 1.25, 1.5,
+                   2.0, 2.5, 3.0, 4.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation, shaped like an OpenTelemetry span.
+
+    ``status`` is ``UNSET``, ``OK`` or ``ERROR``; spans are exported with
+    OTLP/JSON field names by ``to_otlp``.
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "UNSET"
+    status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def set_status(self, status: str, message: Optional[str] = None):
+        self.status = status
+        self.status_message = message
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self.end_time_ns if self.end_time_ns is not None else time.time_ns()
+        return (end - self.start_time_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or self.start_time_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": f"STATUS_CODE_{self.status}"}
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+class InMemorySpanExporter:
+    """Keeps the most recent finished spans, e.g. for tests or a debug endpoint."""
+
+    def __init__(self, max_spans: int = 1000):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, name: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        return [span for span in spans if name is None or span.name == name]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class JsonLinesSpanExporter:
+    """Appends each finished span to a file as one OTLP/JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_otlp(), ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """Creates spans and hands finished ones to the exporters.
+
+    The active span is kept in a context variable, so spans opened inside
+    it (also in tasks started from it) become its children.
+    """
+
+    def __init__(self, exporters: Sequence[Any] = (), enabled: bool = True):
+        self.exporters = list(exporters)
+        self.enabled = enabled
+
+    @contextmanager
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            attributes=dict(attributes or {})
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            # A status set by the caller (e.g. an expected interrupt) wins
+            if span.status == "UNSET":
+                span.set_status("ERROR", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            if self.enabled:
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(span)
+                    except Exception as e:
+                        logger.warning(f"Span export failed: {e}")
+
+
+def current_span() -> Optional[Span]:
+    """The span active in the current context, if any."""
+    return _current_span.get()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (f'{name}="{_escape_label(value)}"' for name, value in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._format_labels(key)} {_format_number(value)}" for key, value in sorted(values.items())]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {",".join(key): value for key, value in self._values.items()}
+
+
+class Histogram(_Metric):
+    """Bucketed distribution per label set, with ``quantile`` estimates like PromQL's histogram_quantile."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series["count"] if series else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate the ``q`` quantile (0..1) by interpolating within its bucket; None without data."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            if not series or not series["count"]:
+                return None
+            counts = list(series["counts"])
+            total = series["count"]
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # beyond the last bound, like histogram_quantile
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def label_sets(self) -> List[Dict[str, str]]:
+        with self._lock:
+            keys = list(self._series)
+        return [dict(zip(self.labelnames, key)) for key in sorted(keys)]
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series_items = [(key, dict(series, counts=list(series["counts"]))) for key, series in self._series.items()]
+        lines = []
+        for key, series in sorted(series_items):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series["counts"]):
+                cumulative += count
+                labels = self._format_labels(key, ("le", _format_number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_number(series['sum'])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {series['count']}")
+        return lines
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {",".join(key): {"count": series["count"], "sum": series["sum"]}
+                    for key, series in self._series.items()}
+
+
+class MetricsRegistry:
+    """In-process metric registry rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_type, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, *args, **kwargs)
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+class Telemetry:
+    """The tracer and metrics the workflow and AIService report to.
+
+    ``default_telemetry()`` is shared by the whole process; tests and
+    benchmarks pass their own instance to keep measurements separate.
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None, registry: Optional[MetricsRegistry] = None):
+        self.tracer = tracer or Tracer([InMemorySpanExporter()])
+        self.registry = registry or MetricsRegistry()
+        metrics = self.registry
+        self.node_duration = metrics.histogram(
+            "workflow_node_duration_seconds", "Wall time of LangGraph workflow nodes", ["node", "status"])
+        self.llm_duration = metrics.histogram(
+            "llm_call_duration_seconds", "Wall time of AIService LLM calls including retries and queueing",
+            ["operation", "outcome"])
+        self.llm_queue_wait = metrics.histogram(
+            "llm_queue_wait_seconds", "Time LLM calls waited for the rate limiter", ["operation"])
+        self.llm_parse_duration = metrics.histogram(
+            "llm_parse_duration_seconds", "Time spent decoding LLM responses", ["operation"],
+            buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+        self.llm_tokens = metrics.counter(
+            "llm_tokens_total", "Prompt and completion tokens sent to the LLM", ["operation", "kind"])
+        self.llm_cache = metrics.counter(
+            "llm_cache_requests_total", "LLM response cache lookups", ["operation", "result"])
+        self.llm_parse = metrics.counter(
+            "llm_parse_total", "LLM responses by JSON recovery strategy", ["operation", "strategy"])
+        self.llm_retries = metrics.counter(
+            "llm_retries_total", "Retried LLM calls", ["operation"])
+        self.llm_timeouts = metrics.counter(
+            "llm_timeouts_total", "LLM calls cut off by the per-call timeout or the request deadline",
+            ["operation", "kind"])
+        self.llm_hedges = metrics.counter(
+            "llm_hedges_total", "Duplicate LLM calls sent after the observed latency quantile, by which answer won",
+            ["operation", "outcome"])
+        self.llm_fallbacks = metrics.counter(
+            "llm_fallbacks_total", "AIService results replaced by fallback content", ["operation"])
+        self.semantic_cache_lookups = metrics.counter(
+            "semantic_cache_lookups_total", "Semantic cache lookups before post generation", ["result"])
+        self.semantic_cache_lookup_duration = metrics.histogram(
+            "semantic_cache_lookup_seconds", "Embedding and nearest-neighbour search time of semantic cache lookups",
+            buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+        self.context_insights = metrics.counter(
+            "context_insight_decisions_total",
+            "Context analyses run fresh, reused from the insight store or overlapped with speculative generation",
+            ["decision"])
+        self.http_requests = metrics.counter(
+            "http_requests_total", "API requests by route and response status", ["route", "status"])
+        self.http_request_duration = metrics.histogram(
+            "http_request_duration_seconds", "Wall time of API requests including the wait for admission", ["route"])
+        self.http_rejected = metrics.counter(
+            "http_rejected_requests_total", "API requests turned away because the server was saturated or draining",
+            ["route", "reason"])
+        self.post_repairs = metrics.counter(
+            "post_repairs_total", "Posts fitted to platform limits locally or, when that was not possible, by the LLM",
+            ["platform", "method"])
+        self.local_posts = metrics.counter(
+            "local_posts_total",
+            "Sessions shown local template posts within the latency budget, and what became of the LLM's answer",
+            ["outcome"])
+        self.jobs = metrics.counter(
+            "jobs_total", "Job queue attempts finished by workers, by outcome", ["outcome"])
+        self.job_duration = metrics.histogram(
+            "job_duration_seconds", "Wall time of job attempts in a worker", ["outcome"])
+
+    @classmethod
+    def from_settings(cls) -> "Telemetry":
+        exporters: List[Any] = [InMemorySpanExporter(settings.telemetry_span_buffer)]
+        if settings.telemetry_spans_path:
+            exporters.append(JsonLinesSpanExporter(settings.telemetry_spans_path))
+        return cls(Tracer(exporters, enabled=settings.telemetry_enabled))
+
+    def span(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        return self.tracer.span(name, attributes)
+
+    def spans(self, name: Optional[str] = None) -> List[Span]:
+        """Finished spans kept by the in-memory exporter, oldest first."""
+        for exporter in self.tracer.exporters:
+            if isinstance(exporter, InMemorySpanExporter):
+                return exporter.spans(name)
+        return []
+
+    def latency_summary(self) -> List[Dict[str, Any]]:
+        """p50/p95/p99 per workflow node and LLM operation, to see what dominates the tail."""
+        rows = []
+        for kind, histogram, label in (("node", self.node_duration, "node"),
+                                       ("llm", self.llm_duration, "operation"),
+                                       ("queue", self.llm_queue_wait, "operation"),
+                                       ("parse", self.llm_parse_duration, "operation")):
+            for labels in histogram.label_sets():
+                rows.append({
+                    "kind": kind,
+                    "name": labels[label],
+                    "status": labels.get("status") or labels.get("outcome", ""),
+                    "count": histogram.count(**labels),
+                    **{f"p{int(q * 100)}_ms": histogram.quantile(q, **labels) * 1000 for q in (0.5, 0.95, 0.99)}
+                })
+        return rows
+
+
+_default: Optional[Telemetry] = None
+_default_lock = threading.Lock()
+
+
+def default_telemetry() -> Telemetry:
+    """Process-wide telemetry, configured from settings on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Telemetry.from_settings()
+        return _default
@@ -0,0 +1,116 @@
+import contextvars
+import functools
+import random
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from config.settings import settings
+
+# "off": nothing, "sampled": a fraction of workflow runs, "verbose": everything
+VERBOSITY_LEVELS = ("off", "sampled", "verbose")
+
+_verbosity_override: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_verbosity", default=None)
+_run_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("trace_sampled", default=False)
+
+
+class ConsoleTrace:
+    """Decides whether the workflow's step-by-step console output is printed.
+
+    In ``sampled`` mode the decision is made once per workflow run (see
+    ``run``), so a sampled campaign is printed completely and the others
+    not at all. ``batch`` silences a block of work unless a verbosity was
+    configured explicitly.
+    """
+
+    def __init__(self, verbosity: str = "sampled", sample_rate: float = 0.01,
+                 explicit: bool = False, rng: Optional[random.Random] = None):
+        self.set_verbosity(verbosity, explicit)
+        self.sample_rate = sample_rate
+        self._rng = rng or random.Random()
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "ConsoleTrace":
+        return cls(settings.trace_verbosity or "sampled", settings.trace_sample_rate,
+                   explicit=settings.trace_verbosity is not None)
+
+    def set_verbosity(self, verbosity: str, explicit: bool = True):
+        verbosity = verbosity.lower()
+        if verbosity not in VERBOSITY_LEVELS:
+            raise ValueError(f"Unknown trace verbosity: {verbosity} (expected one of {', '.join(VERBOSITY_LEVELS)})")
+        self.level = verbosity
+        self.explicit = explicit
+
+    @property
+    def enabled(self) -> bool:
+        level = _verbosity_override.get() or self.level
+        if level == "verbose":
+            return True
+        return level == "sampled" and _run_sampled.get()
+
+    def sample(self) -> bool:
+        """Draw the sampling decision for one run."""
+        with self._rng_lock:
+            return self._rng.random() < self.sample_rate
+
+    @contextmanager
+    def run(self, sampled: Optional[bool] = None) -> Iterator[bool]:
+        """Scope of one workflow run; in sampled mode it is printed with probability ``sample_rate``."""
+        if sampled is None:
+            sampled = self.sample()
+        token = _run_sampled.set(sampled)
+        try:
+            yield sampled
+        finally:
+            _run_sampled.reset(token)
+
+    @contextmanager
+    def override(self, level: str) -> Iterator[None]:
+        """Use ``level`` for everything inside the block (and tasks started from it)."""
+        if level not in VERBOSITY_LEVELS:
+            raise ValueError(f"Unknown trace verbosity: {level}")
+        token = _verbosity_override.set(level)
+        try:
+            yield
+        finally:
+            _verbosity_override.reset(token)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Batch work is silent unless a verbosity was asked for explicitly."""
+        if self.explicit:
+            yield
+            return
+        with self.override("off"):
+            yield
+
+
+console_trace = ConsoleTrace.from_settings()
+
+
+def traced_run(sampled_attribute: Optional[str] = None) -> Callable:
+    """Decorate an async method so each call is one sampled run.
+
+    With ``sampled_attribute`` the decision stored on the instance is reused,
+    so e.g. all steps of one feedback session are printed or none is.
+    """
+    def decorator(method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            sampled = getattr(self, sampled_attribute) if sampled_attribute else None
+            with console_trace.run(sampled):
+                return await method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace(*args, **kwargs):
+    """``print`` that only writes when console tracing is enabled for the current run."""
+    if console_trace.enabled:
+        print(*args, **kwargs)
+
+
+def tracing() -> bool:
+    """Whether trace output is enabled; guard expensive formatting (e.g. JSON dumps) with it."""
+    return console_trace.enabled
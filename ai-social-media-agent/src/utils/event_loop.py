@@ -0,0 +1,39 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+
+class BackgroundEventLoop:
+    """An asyncio event loop that runs forever in a daemon thread.
+
+    Synchronous callers (such as the Streamlit script, which reruns on every
+    interaction) submit coroutines to it instead of calling ``asyncio.run``,
+    so pooled HTTP connections and other loop-bound resources stay alive
+    between requests.
+    """
+
+    def __init__(self, name: str = "agent-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop and return a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it finishes."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self):
+        """Stop the loop and wait for its thread to exit."""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
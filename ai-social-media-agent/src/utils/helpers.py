@@ -1,11 +1,72 @@
+import re
+from collections import Counter
+
 def generate_slug(text):
     return text.lower().replace(" ", "-").replace("_", "-")
 
 def format_hashtags(hashtags):
     return [f"#{tag.strip()}" for tag in hashtags if tag.strip()]
 
-def extract_keywords(text):
-    return list(set(text.lower().split()))  # Simple keyword extraction
+_WORD = re.compile(r"(?<![\w-])[^\W\d_][\w-]*", re.UNICODE)
+# Hungarian (and the usual English) function words and campaign filler
+STOPWORDS = frozenset(
+    "a az egy és is nem hogy de meg már csak van volt lesz vagy mint minden ez ezt ezzel itt ott még ha "
+    "most kapható akár neked nekünk veled nálunk te ti mi ők ön önök aki ami amely mert így úgy nagyon "
+    "legyen lehet kell sok több éves the and for with you your our this that now new are "
+    # Calls to action open most campaign messages but make poor keywords
+    "szerezz szerezd vedd vegyél nézd próbáld fedezd ismerd csatlakozz jelentkezz regisztrálj rendeld "
+    "rendelj vásárolj töltsd kérd keresd gyere légy legyél iratkozz".split()
+)
+_PLURAL_VOWELS = {"á": "a", "ó": "ó", "ő": "ő", "ú": "ú", "ű": "ű"}
+_DIGRAPHS = ("cs", "dz", "gy", "ly", "ny", "sz", "ty", "zs")
+# Case, possessive and plural endings, longest first
+_SUFFIXES = ("ként", "ban", "ben", "nak", "nek", "ból", "ből", "ról", "ről", "tól", "től", "hoz", "hez", "höz",
+             "val", "vel", "unk", "ünk", "nk", "ok", "ek", "ök", "ak")
+# Endings written after a hyphen (e-book-ot, 5G-vel)
+_HYPHEN_SUFFIXES = frozenset("t ot et öt at ra re ba be ban ben val vel nak nek on en ön hoz hez höz ról ről "
+                             "ból ből tól től ig".split())
+MIN_KEYWORD_LETTERS = 3
+
+
+def _strip_suffix(word):
+    if len(word) > 5 and word[-2:] in ("al", "el"):
+        # -val/-vel after a consonant doubles it: laptoppal, szállítással, kedvezménnyel
+        if word[-3] == word[-4]:
+            return word[:-3]
+        if word[-5] == word[-4] and word[-4:-2] in _DIGRAPHS:
+            return word[:-4] + word[-3]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    # Plural -k after a long vowel (szülők, egyetemisták -> egyetemista); -ék is too often part of the word
+    if word[-1] == "k" and word[-2] in _PLURAL_VOWELS and len(word) > 4:
+        return word[:-2] + _PLURAL_VOWELS[word[-2]]
+    return word
+
+
+def stem_word(word):
+    """Strip up to two common Hungarian suffixes (``laptopokról`` -> ``laptop``).
+
+    A rough rule set for keywords and hashtags, not a morphological analyzer:
+    short stems are left alone and hyphenated words (``e-book-ot``) only lose
+    an ending after their last hyphen.
+    """
+    if "-" in word:
+        head, _, ending = word.rpartition("-")
+        return head if ending in _HYPHEN_SUFFIXES else word
+    return _strip_suffix(_strip_suffix(word))
+
+
+def extract_keywords(text, limit=None):
+    """Content words of ``text``, stemmed and lowercased, the most frequent first (ties in text order).
+
+    Stopwords, numbers and words shorter than MIN_KEYWORD_LETTERS are dropped.
+    """
+    stems = [stem_word(word) for word in (match.lower() for match in _WORD.findall(text))
+             if len(word) >= MIN_KEYWORD_LETTERS and word not in STOPWORDS]
+    counts = Counter(stems)
+    ranked = sorted(dict.fromkeys(stems), key=lambda stem: -counts[stem])
+    return ranked[:limit] if limit else ranked
 
 def validate_input(data):
     if not isinstance(data, dict):
@@ -0,0 +1,383 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models.request_models import PLATFORMS, PlatformPost, SocialMediaResponse
+
+_FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_LITERAL_RE = re.compile(r"true|false|null|True|False|None|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_STRUCTURE_RE = re.compile(r'[{}"\\]')
+# Runs of characters that need no attention inside a string or between tokens
+_STRING_RUN_RE = re.compile(r"[^\"'\\\n\r\t]+")
+_WHITESPACE_RUN_RE = re.compile(r"\s+")
+# The next member's key, when a comma between two members is missing: "a": "x" "b": "y"
+_NEXT_KEY_RE = re.compile(r'"[^"\n]*"[ \t]*:')
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+_PLATFORM_ALIASES = {"twitter": "x", "x (twitter)": "x", "fb": "facebook", "ig": "instagram"}
+
+
+class JSONExtractionError(json.JSONDecodeError):
+    """No usable JSON could be recovered from an LLM response.
+
+    Subclasses JSONDecodeError so existing ``except json.JSONDecodeError``
+    handlers keep working.
+    """
+
+    def __init__(self, message: str, text: str):
+        super().__init__(message, text, 0)
+
+
+@dataclass
+class ParseResult:
+    """A decoded LLM response and how it was obtained.
+
+    ``strategy`` is one of ``direct`` (valid as-is), ``extracted`` (valid JSON
+    surrounded by prose or code fences), ``repaired`` (fixed syntax) or
+    ``partial`` (truncated output; only complete members were kept).
+    """
+    data: Any
+    strategy: str
+
+    @property
+    def partial(self) -> bool:
+        return self.strategy == "partial"
+
+
+def strip_code_fences(text: str) -> str:
+    """Return the content of the first Markdown code fence, or the text unchanged."""
+    match = _FENCE_RE.search(text)
+    if match:
+        return match.group(1)
+    # An opening fence whose closing fence was cut off
+    if text.lstrip().startswith("```"):
+        return text.lstrip()[3:].split("\n", 1)[-1]
+    return text
+
+
+def find_json_objects(text: str) -> List[str]:
+    """Return every balanced top-level ``{...}`` block, skipping braces inside strings."""
+    blocks = []
+    depth = 0
+    start = -1
+    in_string = False
+    skip_to = 0
+    # Only braces, quotes and backslashes matter, so jump between them instead of walking every character
+    for match in _STRUCTURE_RE.finditer(text):
+        index = match.start()
+        if index < skip_to:
+            continue
+        char = text[index]
+        if in_string:
+            if char == "\\":
+                skip_to = index + 2
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = depth > 0
+        elif char == "{":
+            if depth == 0:
+                start = index
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                blocks.append(text[start:index + 1])
+    return blocks
+
+
+def repair_json(text: str) -> Tuple[str, bool]:
+    """Rewrite near-JSON from the first ``{`` into valid JSON.
+
+    Fixes trailing and missing commas, single-quoted strings, unescaped
+    quotes, Python literals, raw newlines in strings and stray characters
+    between tokens. Truncated output is cut back to the last complete
+    member and its open containers are closed.
+    Returns the repaired text and whether anything had to be cut off.
+    """
+    start = text.find("{")
+    if start == -1:
+        return "", False
+
+    out: List[str] = []
+    stack: List[Dict[str, Any]] = []  # {"type": "{" or "[", "expect_key": bool}
+    in_string = False
+    quote = '"'
+    string_is_key = False
+    escape = False
+    value_done = False
+    safe_len, safe_stack = 0, []
+
+    def mark_safe():
+        nonlocal safe_len, safe_stack
+        safe_len, safe_stack = len(out), [frame["type"] for frame in stack]
+
+    def begin_value():
+        # Two values in a row: the model forgot the comma between them
+        nonlocal value_done
+        if value_done:
+            out.append(",")
+            if stack and stack[-1]["type"] == "{":
+                stack[-1]["expect_key"] = True
+            value_done = False
+
+    index = start
+    while index < len(text):
+        char = text[index]
+        if in_string and not escape:
+            run = _STRING_RUN_RE.match(text, index)
+            if run:
+                out.append(run.group(0))
+                index = run.end()
+                continue
+        elif not in_string and char.isspace():
+            run = _WHITESPACE_RUN_RE.match(text, index)
+            out.append(run.group(0))
+            index = run.end()
+            continue
+        if in_string:
+            if escape:
+                escape = False
+                if char == "'":
+                    out[-1] = "'"  # \' is not a JSON escape, replace the backslash
+                else:
+                    out.append(char)
+            elif char == "\\":
+                escape = True
+                out.append(char)
+            elif char == quote and not _closes_string(text, index + 1, string_is_key):
+                out.append('\\"')  # an unescaped quote inside the text, e.g. "egy "idézet" szöveg"
+            elif char == quote:
+                in_string = False
+                out.append('"')
+                if not string_is_key:
+                    value_done = True
+                    mark_safe()
+            elif char == '"':
+                out.append('\\"')  # a double quote inside a single-quoted string
+            elif char == "\n":
+                out.append("\\n")
+            elif char in "\r\t":
+                out.append("\\r" if char == "\r" else "\\t")
+            else:
+                out.append(char)
+        elif char in "\"'":
+            begin_value()
+            in_string = True
+            quote = char
+            string_is_key = bool(stack) and stack[-1]["type"] == "{" and stack[-1]["expect_key"]
+            out.append('"')
+        elif char in "{[":
+            begin_value()
+            stack.append({"type": char, "expect_key": char == "{"})
+            out.append(char)
+            mark_safe()
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            frame = stack.pop()
+            out.append(_CLOSERS[frame["type"]])
+            value_done = True
+            if not stack:
+                return "".join(out), False
+            mark_safe()
+        elif char == ",":
+            if value_done:
+                mark_safe()
+                out.append(",")
+                value_done = False
+                if stack[-1]["type"] == "{":
+                    stack[-1]["expect_key"] = True
+        elif char == ":":
+            if stack[-1]["type"] == "{":
+                out.append(":")
+                stack[-1]["expect_key"] = False
+        else:
+            match = _LITERAL_RE.match(text, index)
+            if match:
+                begin_value()
+                literal = match.group(0)
+                out.append(_LITERALS.get(literal, literal))
+                value_done = True
+                index = match.end()
+                mark_safe()
+                continue
+            # Anything else between tokens (comments, stray prose) is dropped
+        index += 1
+
+    # Truncated: keep everything up to the last complete member and close what is open
+    del out[safe_len:]
+    _drop_trailing_comma(out)
+    out.extend(_CLOSERS[frame_type] for frame_type in reversed(safe_stack))
+    return "".join(out), True
+
+
+def _closes_string(text: str, position: int, is_key: bool) -> bool:
+    """Whether a quote ends the string, judged by the next significant character."""
+    while position < len(text) and text[position] in " \t\r":
+        position += 1
+    if position >= len(text) or text[position] == "\n":
+        return True
+    if is_key:
+        return text[position] == ":"
+    return text[position] in ",}]" or _NEXT_KEY_RE.match(text, position) is not None
+
+
+def _drop_trailing_comma(out: List[str]):
+    position = len(out) - 1
+    while position >= 0 and out[position].isspace():
+        position -= 1
+    if position >= 0 and out[position] == ",":
+        del out[position]
+
+
+def parse_json_response(text: str) -> ParseResult:
+    """Decode the JSON object in an LLM response as leniently as necessary.
+
+    Tries, in order: the text as-is, the span between the outermost
+    braces, balanced ``{...}`` blocks (after stripping code fences), and
+    finally a repaired version of the object. Raises JSONExtractionError when no object can be recovered.
+    """
+    text = text or ""
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return ParseResult(data, "direct")
+    except json.JSONDecodeError:
+        pass
+
+    # Cheap first try: the span between the outermost braces (prose or fences around valid JSON)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(text[start:end + 1], strict=False)
+            if isinstance(data, dict):
+                return ParseResult(data, "extracted")
+        except json.JSONDecodeError:
+            pass
+
+    body = strip_code_fences(text)
+    # The biggest block is the answer; smaller ones tend to be examples in surrounding prose
+    for block in sorted(find_json_objects(body), key=len, reverse=True):
+        try:
+            data = json.loads(block, strict=False)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return ParseResult(data, "extracted")
+
+    repaired, truncated = repair_json(body)
+    if repaired:
+        try:
+            data = json.loads(repaired, strict=False)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict) and data:
+            return ParseResult(data, "partial" if truncated else "repaired")
+
+    raise JSONExtractionError("No JSON object could be recovered from the response", text)
+
+
+def coerce_post(value: Any) -> Optional[Dict[str, Any]]:
+    """Validate one post against PlatformPost, fixing common shape mistakes; None if unusable."""
+    if not isinstance(value, dict):
+        return None
+    if "text" not in value and isinstance(value.get("variation_1"), dict):
+        value = value["variation_1"]
+    post = dict(value)
+    for field in ("hashtags", "image_suggestions"):
+        items = post.get(field)
+        if isinstance(items, str):
+            separator = "," if "," in items else None
+            post[field] = [item.strip() for item in items.split(separator) if item.strip()]
+        elif isinstance(items, list):
+            post[field] = [str(item).strip() for item in items if str(item).strip()]
+        elif items is not None:
+            post.pop(field)
+    try:
+        validated = PlatformPost(**{key: post[key] for key in ("text", "hashtags", "image_suggestions") if key in post})
+    except ValidationError:
+        return None
+    if not validated.text.strip():
+        return None
+    return validated.model_dump(exclude_none=True)
+
+
+def coerce_variants(value: Any) -> List[Dict[str, Any]]:
+    """Every valid post of a platform entry: the variation_N posts in order, or the single post."""
+    if isinstance(value, dict) and "text" not in value:
+        numbered = sorted((int(key.rsplit("_", 1)[1]), item) for key, item in value.items()
+                          if re.fullmatch(r"variation_\d+", str(key)))
+        candidates = [item for _, item in numbered] or [value]
+    elif isinstance(value, list):
+        candidates = value
+    else:
+        candidates = [value]
+    return [post for post in map(coerce_post, candidates) if post]
+
+
+def _platform_entries(data: Any, platforms: List[str]) -> Dict[str, Any]:
+    """Raw entry of each requested platform, unwrapping a single wrapper object and resolving aliases."""
+    if isinstance(data, dict) and not any(_platform_key(key) in platforms for key in data):
+        nested = [value for value in data.values() if isinstance(value, dict)]
+        if len(nested) == 1:
+            data = nested[0]
+    entries: Dict[str, Any] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            platform = _platform_key(key)
+            if platform in platforms:
+                entries.setdefault(platform, []).append(value)
+    return entries
+
+
+def recover_platform_posts(data: Any, platforms: Iterable[str] = PLATFORMS) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Pull every valid platform post out of a decoded response.
+
+    Accepts the expected ``{"facebook": {...}, ...}`` shape as well as a
+    single wrapper object around it (``{"posts": {...}}``), platform name
+    aliases and the variation_1 shape. Returns the valid posts and the
+    requested platforms that are missing or invalid.
+    """
+    platforms = list(platforms)
+    posts: Dict[str, Dict[str, Any]] = {}
+    for platform, values in _platform_entries(data, platforms).items():
+        post = next((post for post in map(coerce_post, values) if post), None)
+        if post:
+            posts[platform] = post
+    return posts, [platform for platform in platforms if platform not in posts]
+
+
+def recover_platform_variants(data: Any, platforms: Iterable[str] = PLATFORMS) -> Dict[str, List[Dict[str, Any]]]:
+    """Like recover_platform_posts, but keeps every valid variation of each platform's post."""
+    variants: Dict[str, List[Dict[str, Any]]] = {}
+    for platform, values in _platform_entries(data, list(platforms)).items():
+        posts = [post for value in values for post in coerce_variants(value)]
+        if posts:
+            variants[platform] = posts
+    return variants
+
+
+def recover_social_media_response(data: Any, make_fallback: Callable[[], Dict[str, Dict[str, Any]]]
+                                  ) -> Tuple[SocialMediaResponse, List[str]]:
+    """Build a complete SocialMediaResponse from whatever valid posts the response holds.
+
+    Platforms that are missing or invalid are taken from ``make_fallback()``,
+    which is only called when needed. Returns the response and the filled-in
+    platforms; raises JSONExtractionError when not a single post is usable.
+    """
+    posts, missing = recover_platform_posts(data)
+    if not posts:
+        raise JSONExtractionError("No valid platform post in the response",
+                                  json.dumps(data, ensure_ascii=False, default=str))
+    if missing:
+        fallback = make_fallback()
+        posts.update({platform: fallback[platform] for platform in missing})
+    return SocialMediaResponse(**posts), missing
+
+
+def _platform_key(key: str) -> str:
+    key = str(key).strip().lower()
+    return _PLATFORM_ALIASES.get(key, key)
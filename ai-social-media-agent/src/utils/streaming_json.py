@@ -0,0 +1,141 @@
+from typing import List, Optional, Tuple
+
+from models.request_models import PLATFORMS
+
+_SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class IncrementalPostParser:
+    """Extract post texts from a JSON completion while it is still being generated.
+
+    Feed raw text chunks as they arrive from the LLM; every call returns the
+    newly decoded characters of each platform's "text" value as
+    ``(platform, delta)`` pairs. Anything around the JSON object (prose, code
+    fences) is ignored. The parser never needs the document to be complete,
+    so it only reports text; the final structure is still parsed from the
+    full response.
+
+    By default the document is expected to be keyed by platform (the shape
+    returned by ``AIService.generate_platform_posts``); pass ``platform`` when
+    the document is a single post object for that platform, and ``root`` when
+    the posts are nested under that top-level key (e.g. ``{"posts": {...}}``).
+    """
+
+    def __init__(self, platform: Optional[str] = None, root: Optional[str] = None):
+        self.platform = platform
+        self.root = root
+        self._stack: List[dict] = []
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._string_is_key = False
+        self._string_target: Optional[str] = None
+        self._buffer: List[str] = []
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[str] = None
+        self.texts = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk of the completion and return newly decoded text deltas."""
+        deltas: List[Tuple[str, str]] = []
+        for char in chunk:
+            if self._finished:
+                break
+            if self._in_string:
+                self._consume_string_char(char, deltas)
+            elif not self._started:
+                if char == '{':
+                    self._started = True
+                    self._stack.append({"type": "object", "key": None, "expect_key": True})
+            else:
+                self._consume_structure_char(char)
+        # Deltas for the same platform within one chunk are merged
+        merged: List[Tuple[str, str]] = []
+        for platform, text in deltas:
+            if merged and merged[-1][0] == platform:
+                merged[-1] = (platform, merged[-1][1] + text)
+            else:
+                merged.append((platform, text))
+        return merged
+
+    def _consume_structure_char(self, char: str):
+        frame = self._stack[-1]
+        if char == '"':
+            self._in_string = True
+            self._string_is_key = frame["type"] == "object" and frame["expect_key"]
+            self._string_target = None if self._string_is_key else self._text_target()
+            self._buffer = []
+        elif char == '{':
+            self._stack.append({"type": "object", "key": None, "expect_key": True})
+        elif char == '[':
+            self._stack.append({"type": "array", "key": None, "expect_key": False})
+        elif char in '}]':
+            self._stack.pop()
+            if not self._stack:
+                self._finished = True
+        elif char == ',' and frame["type"] == "object":
+            frame["expect_key"] = True
+            frame["key"] = None
+        elif char == ':' and frame["type"] == "object":
+            frame["expect_key"] = False
+
+    def _consume_string_char(self, char: str, deltas: List[Tuple[str, str]]):
+        if self._escape is not None:
+            self._escape += char
+            decoded = self._decode_escape()
+            if decoded is None:
+                return
+            self._escape = None
+            if len(decoded) == 1 and 0xD800 <= ord(decoded) <= 0xDBFF:
+                # First half of a \uXXXX\uXXXX surrogate pair (e.g. an escaped emoji)
+                self._high_surrogate = decoded
+                return
+            if self._high_surrogate:
+                if len(decoded) == 1 and 0xDC00 <= ord(decoded) <= 0xDFFF:
+                    decoded = chr(0x10000 + ((ord(self._high_surrogate) - 0xD800) << 10) + (ord(decoded) - 0xDC00))
+                self._high_surrogate = None
+            self._emit(decoded, deltas)
+        elif char == '\\':
+            self._escape = ""
+        elif char == '"':
+            self._in_string = False
+            if self._string_is_key:
+                self._stack[-1]["key"] = "".join(self._buffer)
+        else:
+            self._emit(char, deltas)
+
+    def _decode_escape(self) -> Optional[str]:
+        """Decode the pending escape sequence, or return None while it is incomplete."""
+        if self._escape[0] != 'u':
+            return _SIMPLE_ESCAPES.get(self._escape[0], self._escape[0])
+        if len(self._escape) < 5:
+            return None
+        try:
+            return chr(int(self._escape[1:5], 16))
+        except ValueError:
+            return ""
+
+    def _emit(self, text: str, deltas: List[Tuple[str, str]]):
+        if self._string_is_key:
+            self._buffer.append(text)
+        elif self._string_target:
+            self.texts[self._string_target] = self.texts.get(self._string_target, "") + text
+            deltas.append((self._string_target, text))
+
+    def _text_target(self) -> Optional[str]:
+        """Return the platform whose post text the upcoming string value belongs to."""
+        keys = [frame["key"] for frame in self._stack if frame["type"] == "object"]
+        if len(keys) != len(self._stack) or not keys or keys[-1] != "text":
+            return None
+        if self.root:
+            if keys[0] != self.root:
+                return None
+            keys = keys[1:]
+        if self.platform:
+            return self.platform if len(keys) == 1 else None
+        if keys[0] not in PLATFORMS:
+            return None
+        # Accept both {"x": {"text": ...}} and the {"x": {"variation_1": {"text": ...}}} shape
+        if len(keys) == 2 or (len(keys) == 3 and keys[1] == "variation_1"):
+            return keys[0]
+        return None
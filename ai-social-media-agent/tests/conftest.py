@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The application modules import each other relative to src/ (see src/app.py),
+# so the tests need the same import root.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Settings are read at import time; the tests never reach the real API
+# and keep workflow checkpoints in memory.
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
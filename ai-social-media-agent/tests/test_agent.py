@@ -1,8 +1,11 @@
 import pytest
 import asyncio
+import time
+import json
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
-from src.models.request_models import SocialMediaRequest, ToneType, WorkflowState
-from src.agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType, WorkflowState
+from agents.social_media_agent import SocialMediaAgent
 
 class TestSocialMediaAgent:
     
@@ -124,4 +127,261 @@ class TestSocialMediaAgent:
         
         # Test at limit
         state_at_limit = WorkflowState(iteration_count=3, max_iterations=3)
-        assert agent._check_iteration_limit(state_at_limit) == "finalize"
\ No newline at end of file
+        assert agent._check_iteration_limit(state_at_limit) == "finalize"
+    
+    def test_process_batch_keeps_order_and_reports_failures(self, sample_request):
+        """Test batch processing with bounded concurrency and per-item status."""
+        agent = SocialMediaAgent()
+        in_flight = 0
+        peak = 0
+        
+        async def fake_process_request(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if request.target_audience == "broken audience":
+                return {"error": "generation failed"}
+            return {"x": {"text": request.campaign_message, "hashtags": []}}
+        
+        requests = [
+            sample_request.model_copy(update={"campaign_message": f"Campaign number {i}"})
+            for i in range(6)
+        ]
+        requests[3] = requests[3].model_copy(update={"target_audience": "broken audience"})
+        
+        with patch.object(agent, "process_request", side_effect=fake_process_request):
+            results = asyncio.run(agent.process_batch(requests, max_concurrency=2))
+        
+        assert [item["index"] for item in results] == list(range(6))
+        assert results[0]["result"]["x"]["text"] == "Campaign number 0"
+        assert results[3] == {"index": 3, "status": "error", "error": "generation failed"}
+        assert sum(1 for item in results if item["status"] == "success") == 5
+        assert peak == 2
+    
+    def test_fanout_generation_runs_platforms_concurrently(self, sample_request):
+        """Test that fan-out mode generates platforms in parallel and isolates failures."""
+        agent = SocialMediaAgent(generation_mode="fanout")
+        
+        async def fake_analyze(*args):
+            return {"key_messages": ["Akció"], "creative_directions": ["Gaming"]}
+        
+        async def fake_generate(platform, *args, **kwargs):
+            await asyncio.sleep(0.2)
+            if platform == "instagram":
+                raise RuntimeError("bad JSON")
+            return {"text": f"{platform} post", "hashtags": [f"#{platform}"]}
+        
+        with patch.object(agent.ai_service, "analyze_context", side_effect=fake_analyze), \
+             patch.object(agent.ai_service, "generate_single_platform_post", side_effect=fake_generate):
+            start = time.perf_counter()
+            result = asyncio.run(agent.process_request(sample_request))
+            elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.6
+        assert result["facebook"]["text"] == "facebook post"
+        assert result["linkedin"]["text"] == "linkedin post"
+        assert result["x"]["text"] == "x post"
+        assert sample_request.campaign_message in result["instagram"]["text"]
+    
+    def test_stream_request_emits_post_text_progressively(self, sample_request, mock_ai_response):
+        """Test that streamed generation yields per-platform deltas before the final result."""
+        agent = SocialMediaAgent()
+        document = json.dumps(mock_ai_response, ensure_ascii=False)
+        
+        class StreamingLLM:
+            async def ainvoke(self, messages):
+                return SimpleNamespace(content=json.dumps({"key_messages": ["Akció"]}))
+            
+            async def astream(self, messages):
+                for i in range(0, len(document), 7):
+                    yield SimpleNamespace(content=document[i:i + 7])
+        
+        agent.ai_service.llm = StreamingLLM()
+        
+        async def collect():
+            return [event async for event in agent.stream_request(sample_request)]
+        
+        events = asyncio.run(collect())
+        deltas = [event for event in events if event["type"] == "post_delta"]
+        
+        assert len(deltas) > 4
+        streamed = {}
+        for event in deltas:
+            streamed[event["platform"]] = streamed.get(event["platform"], "") + event["text"]
+        assert streamed["facebook"] == "Test Facebook post"
+        assert streamed["x"] == "Short X post"
+        assert events[-1]["type"] == "result"
+        assert events[-1]["result"]["linkedin"]["text"] == "Professional LinkedIn post"
+    
+    def test_feedback_round_costs_exactly_one_llm_call(self, sample_request):
+        """Regression test: feedback resumes at await_feedback instead of re-running the graph."""
+        agent = SocialMediaAgent()
+        agent.ai_service.cache = None
+        
+        posts = {
+            "facebook": {"text": "Facebook poszt", "hashtags": ["#gaming"]},
+            "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop"]},
+            "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech"]},
+            "x": {"text": "X poszt", "hashtags": ["#gaming"]}
+        }
+        
+        class CountingLLM:
+            def __init__(self):
+                self.calls = 0
+            
+            async def ainvoke(self, messages):
+                self.calls += 1
+                return SimpleNamespace(content=json.dumps(posts, ensure_ascii=False))
+        
+        llm = CountingLLM()
+        agent.ai_service.llm = llm
+        
+        async def run_session():
+            calls_per_step = []
+            runner = await agent.process_with_feedback(sample_request)
+            
+            ready = await runner.run_until_feedback()
+            assert ready["status"] == "awaiting_feedback"
+            calls_per_step.append(llm.calls)
+            
+            for feedback in ["Legyen viccesebb", "Több hashtag kell"]:
+                before = llm.calls
+                refined = await runner.provide_feedback(feedback)
+                assert refined["status"] == "refined"
+                assert refined["can_provide_more_feedback"] is True
+                calls_per_step.append(llm.calls - before)
+            
+            before = llm.calls
+            final = await runner.finalize()
+            calls_per_step.append(llm.calls - before)
+            return calls_per_step, final
+        
+        calls_per_step, final = asyncio.run(run_session())
+        
+        assert calls_per_step == [2, 1, 1, 0]
+        assert final["status"] == "completed"
+        assert final["result"]["x"]["text"] == "X poszt"
+    
+    def test_feedback_for_one_platform_only_sends_that_post(self, sample_request):
+        """Refining X must not send (or pay output tokens for) the other posts."""
+        agent = SocialMediaAgent()
+        agent.ai_service.cache = None
+        
+        posts = {
+            "facebook": {"text": "Hosszú Facebook poszt " * 50, "hashtags": ["#gaming"]},
+            "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop"]},
+            "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech"]},
+            "x": {"text": "X poszt", "hashtags": ["#gaming"]}
+        }
+        
+        class RecordingLLM:
+            def __init__(self):
+                self.prompts = []
+            
+            async def ainvoke(self, messages):
+                self.prompts.append(messages[-1].content)
+                if "Felhasználói visszajelzés" in messages[-1].content:
+                    return SimpleNamespace(content=json.dumps({"x": {"text": "Rövid X poszt", "hashtags": ["#gaming"]}}))
+                return SimpleNamespace(content=json.dumps(posts, ensure_ascii=False))
+        
+        llm = RecordingLLM()
+        agent.ai_service.llm = llm
+        
+        async def run_session():
+            runner = await agent.process_with_feedback(sample_request)
+            generated = await runner.run_until_feedback()
+            rejected = await runner.provide_feedback("Rövidebb legyen", platforms=["tiktok"])
+            refined = await runner.provide_feedback("Rövidebb legyen", platforms=["X"])
+            return generated, rejected, refined
+        
+        generated, rejected, refined = asyncio.run(run_session())
+        
+        assert rejected["status"] == "error"
+        assert refined["status"] == "refined"
+        refine_prompt = llm.prompts[-1]
+        assert "X poszt" in refine_prompt
+        assert "Facebook poszt" not in refine_prompt and '"linkedin"' not in refine_prompt
+        assert refined["posts"].x.text == "Rövid X poszt"
+        assert refined["posts"].facebook.text == generated["posts"].facebook.text
+        assert generated["posts"].facebook.text == posts["facebook"]["text"].strip()
+        assert refined["posts"].instagram.image_suggestions == ["Laptop"]
+    
+    def test_fused_mode_analyzes_and_generates_in_one_call(self, sample_request):
+        """Test that fused mode fills the context and the posts from a single streamed LLM call."""
+        agent = SocialMediaAgent(generation_mode="fused")
+        agent.ai_service.cache = None
+        agent.ai_service.semantic_cache = None
+        
+        context = {
+            "key_messages": ["Gaming laptop akció"],
+            "audience_insights": "Ár-érték arányt kereső gamerek",
+            "platform_strategies": {"facebook": "Közösség", "instagram": "Setup fotók", "linkedin": "Munka", "x": "Rövid"},
+            "creative_directions": ["Setup bemutató"]
+        }
+        posts = {
+            "facebook": {"text": "Facebook poszt", "hashtags": ["#gaming"]},
+            "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop"]},
+            "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech"]},
+            "x": {"text": "X poszt", "hashtags": ["#gaming"]}
+        }
+        document = json.dumps({"context": context, "posts": posts}, ensure_ascii=False)
+        
+        class FusedLLM:
+            def __init__(self):
+                self.prompts = []
+            
+            async def ainvoke(self, messages):
+                self.prompts.append(messages[-1].content)
+                return SimpleNamespace(content=document)
+            
+            async def astream(self, messages):
+                self.prompts.append(messages[-1].content)
+                for i in range(0, len(document), 7):
+                    yield SimpleNamespace(content=document[i:i + 7])
+        
+        llm = FusedLLM()
+        agent.ai_service.llm = llm
+        
+        async def run():
+            runner = await agent.process_with_feedback(sample_request)
+            await runner.run_until_feedback()
+            events = [event async for event in agent.stream_request(sample_request)]
+            return runner.state, events
+        
+        state, events = asyncio.run(run())
+        
+        assert len(llm.prompts) == 2 and '"context"' in llm.prompts[0]
+        assert state.campaign_context == context
+        assert state.creative_ideas == ["Setup bemutató"]
+        assert state.generated_posts.instagram.image_suggestions == ["Laptop"]
+        streamed = {}
+        for event in events[:-1]:
+            streamed[event["platform"]] = streamed.get(event["platform"], "") + event["text"]
+        assert streamed == {platform: post["text"] for platform, post in posts.items()}
+        assert events[-1]["result"]["x"]["text"] == "X poszt"
+    
+    def test_fused_mode_keeps_posts_when_the_analysis_is_missing(self, sample_request):
+        """Test that each half of a fused response falls back on its own."""
+        agent = SocialMediaAgent(generation_mode="fused")
+        agent.ai_service.cache = None
+        agent.ai_service.semantic_cache = None
+        
+        class PostsOnlyLLM:
+            async def ainvoke(self, messages):
+                return SimpleNamespace(content=json.dumps({"posts": {"x": {"text": "X poszt", "hashtags": ["#gaming"]}}}))
+        
+        agent.ai_service.llm = PostsOnlyLLM()
+        
+        async def run():
+            runner = await agent.process_with_feedback(sample_request)
+            await runner.run_until_feedback()
+            return runner.state
+        
+        state = asyncio.run(run())
+        
+        assert state.campaign_context["platform_strategies"]["x"] == "Rövid tartalom"
+        assert state.generated_posts.x.text == "X poszt"
+        assert sample_request.campaign_message in state.generated_posts.facebook.text
+        assert agent.ai_service.fallbacks == 1
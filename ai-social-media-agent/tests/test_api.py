@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from agents.checkpointing import build_checkpointer
+from agents.social_media_agent import SocialMediaAgent
+from api.admission import AdmissionController, Draining, Saturated
+from api.server import create_app
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+
+CAMPAIGN = {
+    "campaign_message": "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+    "target_audience": "25-35 éves hobby gamerek",
+    "tone": "friendly",
+    "use_emojis": True
+}
+
+
+def make_agents(telemetry, latency_ms=0):
+    llm = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=latency_ms, tokens_per_second=0))
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    checkpointer = build_checkpointer()
+    agents = {}
+
+    def agent_for(mode=None):
+        mode = mode or "single"
+        if mode not in agents:
+            agents[mode] = SocialMediaAgent(generation_mode=mode, checkpointer=checkpointer, ai_service=service,
+                                            telemetry=telemetry)
+        return agents[mode]
+
+    return agent_for, llm
+
+
+def make_app(latency_ms=0, **admission):
+    telemetry = Telemetry()
+    agent_for, llm = make_agents(telemetry, latency_ms)
+    app = create_app(agent_for, AdmissionController(**admission), telemetry, shutdown_timeout=5)
+    return app, llm
+
+
+def test_session_lifecycle_over_http():
+    app, llm = make_app()
+    with TestClient(app) as client:
+        generated = client.post("/v1/generate", json={**CAMPAIGN, "generation_mode": "fused"})
+        assert generated.status_code == 200
+        body = generated.json()
+        session_id = body["session_id"]
+        assert body["status"] == "awaiting_feedback" and body["posts"]["x"]["text"]
+        assert body["context"]["platform_strategies"]
+
+        # Another worker sharing the checkpoint store picks the session up from its checkpoint
+        app.state.sessions._runners.clear()
+        refined = client.post(f"/v1/sessions/{session_id}/feedback",
+                              json={"feedback": "Rövidebb legyen", "specific_platforms": ["x"]})
+        assert refined.status_code == 200 and refined.json()["status"] == "refined"
+
+        final = client.post(f"/v1/sessions/{session_id}/finalize")
+        assert final.json()["status"] == "completed" and set(final.json()["result"]) == {"facebook", "instagram", "linkedin", "x"}
+        assert client.get(f"/v1/sessions/{session_id}").json()["status"] == "completed"
+        assert llm.calls == 2
+
+        assert client.post("/v1/sessions/nincs-ilyen/finalize").status_code == 404
+        invalid = client.post("/v1/generate", json={**CAMPAIGN, "tone": "angry"})
+        assert invalid.status_code == 422 and invalid.json()["errors"][0]["loc"] == ["tone"]
+        assert client.post("/v1/generate", json={**CAMPAIGN, "generation_mode": "parallel"}).status_code == 422
+
+        oneshot = client.post("/v1/generate", json={**CAMPAIGN, "session": False})
+        assert oneshot.json()["status"] == "completed" and "session_id" not in oneshot.json()
+
+        metrics = client.get("/metrics").text
+        assert 'http_requests_total{route="generate",status="200"} 2' in metrics
+        assert client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_batch_limits_and_results():
+    app, _ = make_app()
+    with TestClient(app) as client:
+        response = client.post("/v1/batch", json={"requests": [CAMPAIGN, {**CAMPAIGN, "tone": "formal"}]})
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 2
+        assert [item["index"] for item in response.json()["results"]] == [0, 1]
+
+        too_big = client.post("/v1/batch", json={"requests": [CAMPAIGN] * 101})
+        assert too_big.status_code == 413
+        assert client.post("/v1/batch", json={"requests": []}).status_code == 422
+
+
+def test_saturated_server_answers_429_with_retry_after():
+    app, _ = make_app(latency_ms=200, max_concurrency=1, max_queue=1, queue_timeout=5)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await asyncio.gather(*(client.post("/v1/generate", json={**CAMPAIGN, "session": False})
+                                          for _ in range(4)))
+
+    responses = asyncio.run(burst())
+
+    # One runs, one waits for the slot, the rest are turned away at once
+    assert sorted(response.status_code for response in responses) == [200, 200, 429, 429]
+    rejected = next(response for response in responses if response.status_code == 429)
+    assert int(rejected.headers["Retry-After"]) >= 1
+
+
+def test_admission_is_fifo_weighted_and_drains():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=3, max_queue=10, queue_timeout=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold(name, weight):
+            async with admission.slot(weight):
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(hold("first", 2))
+        await asyncio.sleep(0)
+        # "heavy" does not fit yet; "light" would, but must not overtake it
+        heavy = asyncio.create_task(hold("heavy", 3))
+        await asyncio.sleep(0)
+        light = asyncio.create_task(hold("light", 1))
+        await asyncio.sleep(0.05)
+        assert order == ["first"] and admission.waiting == 2
+
+        release.set()
+        await asyncio.gather(first, heavy, light)
+        assert order == ["first", "heavy", "light"]
+
+        release.clear()
+        running = asyncio.create_task(hold("running", 1))
+        await asyncio.sleep(0)
+        draining = asyncio.create_task(admission.drain(timeout=1))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Draining):
+            async with admission.slot():
+                pass
+        assert not draining.done()
+        release.set()
+        assert await draining and await running is None
+
+        timed_out = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        async with timed_out.slot():
+            with pytest.raises(Saturated):
+                async with timed_out.slot():
+                    pass
+        assert timed_out.rejected == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from agents.checkpointing import (
+    JSONFileCheckpointStore,
+    PersistentCheckpointSaver,
+    SQLiteCheckpointStore,
+)
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+
+POSTS = {
+    "facebook": {"text": "Facebook poszt", "hashtags": ["#gaming"]},
+    "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop", "Setup"]},
+    "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech"]},
+    "x": {"text": "X poszt", "hashtags": ["#gaming"]},
+}
+
+
+class CountingAIService:
+    """Replaces AIService on the agent and records which steps were called."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def analyze_context(self, *args, **kwargs):
+        self.calls.append("analyze_context")
+        return {"key_messages": ["Akció"], "creative_directions": ["Gaming"]}
+
+    async def generate_platform_posts(self, *args, **kwargs):
+        self.calls.append("generate_platform_posts")
+        return POSTS
+
+    async def refine_posts(self, current_posts, feedback, *args, **kwargs):
+        self.calls.append("refine_posts")
+        refined = {platform: dict(post) for platform, post in current_posts.items()}
+        refined["x"]["text"] = "Rövidebb X poszt"
+        return refined
+
+
+@pytest.fixture
+def sample_request():
+    return SocialMediaRequest(
+        campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+        target_audience="25-35 éves hobby gamerek",
+        tone=ToneType.FRIENDLY,
+        use_emojis=True
+    )
+
+
+def make_agent(store):
+    agent = SocialMediaAgent(checkpointer=PersistentCheckpointSaver(store))
+    agent.ai_service = CountingAIService()
+    return agent
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda tmp_path: SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite")),
+    lambda tmp_path: JSONFileCheckpointStore(str(tmp_path / "sessions")),
+])
+def test_session_survives_restart_without_rerunning_analysis(tmp_path, sample_request, store_factory):
+    first_agent = make_agent(store_factory(tmp_path))
+
+    async def start_session():
+        runner = await first_agent.process_with_feedback(sample_request)
+        result = await runner.run_until_feedback()
+        return runner.thread_id, result
+
+    thread_id, result = asyncio.run(start_session())
+    assert result["status"] == "awaiting_feedback"
+    assert first_agent.ai_service.calls == ["analyze_context", "generate_platform_posts"]
+
+    # A fresh process: new agent, new saver, same durable store
+    second_agent = make_agent(store_factory(tmp_path))
+
+    async def continue_session():
+        runner = await second_agent.resume_session(thread_id)
+        ready = await runner.run_until_feedback()
+        refined = await runner.provide_feedback("Legyen rövidebb az X poszt")
+        return runner, ready, refined
+
+    runner, ready, refined = asyncio.run(continue_session())
+
+    assert runner.state.request.campaign_message == sample_request.campaign_message
+    assert ready["posts"].x.text == "X poszt"
+    assert second_agent.ai_service.calls == ["refine_posts"]
+    assert runner.state.refined_posts.x.text == "Rövidebb X poszt"
+    assert thread_id in second_agent.checkpointer.list_threads()
+
+
+def test_sessions_use_separate_threads(sample_request):
+    agent = SocialMediaAgent()
+    agent.ai_service = CountingAIService()
+
+    async def start_two():
+        first = await agent.process_with_feedback(sample_request)
+        second = await agent.process_with_feedback(sample_request)
+        return first, second
+
+    first, second = asyncio.run(start_two())
+    assert first.thread_id != second.thread_id
+
+
+def test_resume_unknown_session_fails(tmp_path):
+    agent = make_agent(SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite")))
+
+    with pytest.raises(ValueError):
+        asyncio.run(agent.resume_session("missing"))
+
+
+def test_checkpoints_are_appended_and_deleted_when_the_session_finishes(tmp_path, sample_request):
+    store = SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    agent = make_agent(store)
+
+    async def run_session():
+        runner = await agent.process_with_feedback(sample_request)
+        await runner.run_until_feedback()
+        generated, position = store.load(runner.thread_id)
+        await runner.provide_feedback("Legyen rövidebb az X poszt")
+        # A feedback round appends its own records after the stored ones
+        added, end = store.load(runner.thread_id, position)
+        assert added and store.load(runner.thread_id)[0] == generated + added
+        assert store.load(runner.thread_id, end) == ([], end)
+        return runner, await runner.finalize()
+
+    runner, finalized = asyncio.run(run_session())
+
+    assert finalized["status"] == "completed"
+    assert runner.thread_id not in store.list_threads()
+    assert store.load(runner.thread_id)[0] == []
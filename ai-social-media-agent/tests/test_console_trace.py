@@ -0,0 +1,118 @@
+import asyncio
+import random
+
+import pytest
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.telemetry import Telemetry
+from utils.console_trace import ConsoleTrace, console_trace, trace, tracing
+
+
+@pytest.fixture
+def sample_request():
+    return SocialMediaRequest(
+        campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+        target_audience="25-35 éves hobby gamerek",
+        tone=ToneType.FRIENDLY,
+        use_emojis=True
+    )
+
+
+@pytest.fixture
+def shared_trace():
+    """The process-wide tracer, restored after the test."""
+    saved = (console_trace.level, console_trace.explicit, console_trace.sample_rate)
+    yield console_trace
+    console_trace.level, console_trace.explicit, console_trace.sample_rate = saved
+
+
+def make_agent():
+    llm = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0))
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, telemetry=Telemetry())
+    return SocialMediaAgent(ai_service=service, telemetry=service.telemetry)
+
+
+def test_verbosity_levels_and_per_run_sampling():
+    tracer = ConsoleTrace("sampled", sample_rate=0.5, rng=random.Random(7))
+
+    assert not tracer.enabled
+    decisions = []
+    for _ in range(200):
+        with tracer.run() as sampled:
+            assert tracer.enabled == sampled
+            decisions.append(sampled)
+    assert 60 < sum(decisions) < 140
+    assert not tracer.enabled
+
+    with tracer.run(sampled=True):
+        with tracer.override("off"):
+            assert not tracer.enabled
+        tracer.set_verbosity("off")
+        assert not tracer.enabled
+    tracer.set_verbosity("VERBOSE")
+    assert tracer.enabled
+    with pytest.raises(ValueError):
+        tracer.set_verbosity("loud")
+
+
+def test_batch_is_silent_unless_verbosity_was_explicit():
+    implicit = ConsoleTrace("verbose", explicit=False)
+    with implicit.batch():
+        assert not implicit.enabled
+    assert implicit.enabled
+
+    explicit = ConsoleTrace("verbose", explicit=True)
+    with explicit.batch():
+        assert explicit.enabled
+
+
+def test_trace_only_prints_when_enabled(shared_trace, capsys):
+    shared_trace.set_verbosity("off")
+    trace("hidden")
+    assert not tracing()
+    shared_trace.set_verbosity("verbose")
+    trace("shown")
+
+    assert capsys.readouterr().out == "shown\n"
+
+
+def test_workflow_output_follows_verbosity(shared_trace, sample_request, capsys):
+    agent = make_agent()
+
+    shared_trace.set_verbosity("sampled")
+    shared_trace.sample_rate = 0.0
+    assert "error" not in asyncio.run(agent.process_request(sample_request))
+    assert capsys.readouterr().out == ""
+
+    shared_trace.set_verbosity("verbose")
+    asyncio.run(agent.process_request(sample_request))
+    assert "CONTEXT ANALYSIS NODE" in capsys.readouterr().out
+
+    # A verbosity that was not asked for explicitly does not reach batch runs
+    shared_trace.set_verbosity("verbose", explicit=False)
+    results = asyncio.run(agent.process_batch([sample_request] * 3, max_concurrency=3))
+    assert all(result["status"] == "success" for result in results)
+    assert "NODE" not in capsys.readouterr().out
+
+
+def test_feedback_session_is_sampled_as_a_whole(shared_trace, sample_request, capsys):
+    agent = make_agent()
+    shared_trace.set_verbosity("sampled")
+    shared_trace.sample_rate = 0.0
+
+    async def session(sampled):
+        runner = await agent.process_with_feedback(sample_request)
+        runner.trace_sampled = sampled
+        await runner.run_until_feedback()
+        await runner.provide_feedback("Legyen rövidebb")
+        await runner.finalize()
+
+    asyncio.run(session(False))
+    assert capsys.readouterr().out == ""
+    asyncio.run(session(True))
+    out = capsys.readouterr().out
+    assert "CONTEXT ANALYSIS NODE" in out and "REFINE POSTS NODE" in out
@@ -0,0 +1,157 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agents.social_media_agent import PendingUpgrades, SocialMediaAgent
+from config.settings import settings
+from models.request_models import PLATFORMS, SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.content_generator import ContentGenerator
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.post_constraints import published_length
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+from utils.helpers import extract_keywords
+
+MESSAGE = "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!"
+AUDIENCE = "25-35 éves hobby gamerek"
+
+
+def test_keywords_are_stemmed_content_words():
+    assert extract_keywords(MESSAGE) == ["gaming", "laptop", "kollekció", "kedvezmény"]
+    assert extract_keywords("Szerezz ingyenes e-book-ot kisgyermekes szülőknek, szülők!", limit=3) == [
+        "szülő", "ingyenes", "e-book"]
+
+
+def test_templates_follow_tone_platform_and_limits():
+    friendly = ContentGenerator(MESSAGE, AUDIENCE, "friendly").generate_content()
+    assert set(friendly) == set(PLATFORMS)
+    assert MESSAGE in friendly["facebook"]["text"] and "gaming laptop" in friendly["facebook"]["text"]
+    assert friendly["facebook"]["hashtags"] == ["#gaming", "#laptop", "#gaminglaptop"]
+    assert friendly["instagram"]["image_suggestions"][0] == "Termékfotó: gaming laptop"
+    assert len(friendly["linkedin"]["hashtags"]) == 3 and len(friendly["x"]["hashtags"]) == 2
+    for platform, post in friendly.items():
+        assert published_length(platform, post) <= settings.platform_limits[platform]["max_chars"]
+
+    formal = ContentGenerator(MESSAGE, AUDIENCE, "formal", emoji_usage=False).generate_content()
+    assert formal["facebook"]["text"].startswith("Tisztelt 25-35 éves hobby gamerek")
+    assert "Kövesse" in formal["facebook"]["text"]
+    assert not any(ord(char) > 0x2600 for post in formal.values() for char in post["text"])
+
+    # Same campaign, same posts; the AI service falls back to the same engine
+    assert ContentGenerator(MESSAGE, AUDIENCE, "friendly").generate_content() == friendly
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=object(), rate_limiter=RateLimiter(6000, 0))
+    assert service._generate_fallback_posts(MESSAGE, AUDIENCE, "friendly", True) == friendly
+
+
+class SlowLLM:
+    """Answers only once ``release`` is set, like a Groq call stuck in a queue."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def ainvoke(self, messages, **kwargs):
+        if "Felhasználói visszajelzés" in messages[-1].content:
+            return SimpleNamespace(content=json.dumps({"x": {"text": "Rövid X poszt", "hashtags": ["#gaming"]}}))
+        await self.release.wait()
+        posts = {platform: {"text": f"LLM {platform} poszt a laptopokról.", "hashtags": ["#laptop"]}
+                 for platform in PLATFORMS}
+        return SimpleNamespace(content=json.dumps(posts, ensure_ascii=False))
+
+
+def make_agent(llm, telemetry):
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    return SocialMediaAgent(generation_mode="fused", ai_service=service, telemetry=telemetry)
+
+
+def test_local_posts_within_budget_are_upgraded_when_the_llm_answers(monkeypatch):
+    monkeypatch.setattr(settings, "local_posts_budget_ms", 20)
+    telemetry = Telemetry()
+    agent = make_agent(SlowLLM(), telemetry)
+    request = SocialMediaRequest(campaign_message=MESSAGE, target_audience=AUDIENCE, tone=ToneType.FRIENDLY)
+
+    async def run():
+        runner = await agent.process_with_feedback(request)
+        local = await runner.run_until_feedback()
+        agent.ai_service.llm.release.set()
+        upgraded = await runner.upgrade()
+        finalized = await runner.finalize()
+        return local, upgraded, finalized
+
+    local, upgraded, finalized = asyncio.run(run())
+
+    assert local["local_posts"] and local["upgrade_pending"]
+    assert MESSAGE in local["posts"].facebook.text and local["posts"].instagram.image_suggestions
+    assert upgraded["upgraded"] and upgraded["status"] == "awaiting_feedback" and "local_posts" not in upgraded
+    assert upgraded["posts"].linkedin.text == "LLM linkedin poszt a laptopokról."
+    assert finalized["result"]["x"]["text"] == "LLM x poszt a laptopokról."
+    assert telemetry.local_posts.value(outcome="served") == 1
+    assert telemetry.local_posts.value(outcome="upgraded") == 1
+    assert not agent.pending_upgrades
+
+
+def test_late_llm_answer_does_not_replace_posts_after_feedback(monkeypatch):
+    monkeypatch.setattr(settings, "local_posts_budget_ms", 20)
+    telemetry = Telemetry()
+    agent = make_agent(SlowLLM(), telemetry)
+    request = SocialMediaRequest(campaign_message=MESSAGE, target_audience=AUDIENCE, tone=ToneType.CASUAL)
+
+    async def run():
+        runner = await agent.process_with_feedback(request)
+        local = await runner.run_until_feedback()
+        refined = await runner.provide_feedback("Rövidebb legyen", platforms=["x"])
+        return local, refined, await runner.upgrade()
+
+    local, refined, upgrade = asyncio.run(run())
+
+    assert local["local_posts"]
+    assert refined["posts"].x.text == "Rövid X poszt"
+    assert refined["posts"].facebook.text == local["posts"].facebook.text
+    assert upgrade["status"] == "error" and not agent.pending_upgrades
+    assert telemetry.local_posts.value(outcome="stale") == 1
+
+
+def test_fanout_sessions_wait_for_the_llm_despite_a_local_posts_budget(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "local_posts_budget_ms", 20)
+    telemetry = Telemetry()
+    llm = SlowLLM()
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    agent = SocialMediaAgent(generation_mode="fanout", ai_service=service, telemetry=telemetry)
+    request = SocialMediaRequest(campaign_message=MESSAGE, target_audience=AUDIENCE, tone=ToneType.FRIENDLY)
+
+    async def run():
+        runner = await agent.process_with_feedback(request)
+        asyncio.get_running_loop().call_later(0.1, llm.release.set)
+        return await runner.run_until_feedback()
+
+    result = asyncio.run(run())
+
+    assert "LOCAL_POSTS_BUDGET_MS does not apply to the fanout generation mode" in caplog.text
+    assert result["status"] == "awaiting_feedback" and not result.get("local_posts")
+    assert result["posts"].linkedin.text == "LLM linkedin poszt a laptopokról."
+    assert telemetry.local_posts.value(outcome="served") == 0 and not agent.pending_upgrades
+
+
+def test_pending_upgrades_of_abandoned_sessions_expire():
+    now = [0.0]
+    pending = PendingUpgrades(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+
+    async def run():
+        tasks = [asyncio.ensure_future(asyncio.sleep(60)) for _ in range(4)]
+        pending.add("a", tasks[0])
+        pending.add("b", tasks[1])
+        pending.add("c", tasks[2])
+        now[0] = 61
+        pending.add("d", tasks[3])
+        await asyncio.sleep(0)
+        cancelled = [task.cancelled() for task in tasks]
+        pending.discard("d")
+        return cancelled
+
+    cancelled = asyncio.run(run())
+
+    # "a" went over the cap, then "b" and "c" outlived the TTL
+    assert cancelled == [True, True, True, False]
+    assert not pending
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.content_generator import ContentGenerator
+from services.deadline import DeadlineExceeded, call_timeout, deadline_in, deadline_scope, remaining
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter
+from services.retry import HedgePolicy, RetryPolicy
+from services.telemetry import Telemetry
+
+ANALYSIS = {"key_messages": ["Új gaming laptop"], "audience_insights": "Hobby gamerek",
+            "platform_strategies": {"facebook": "Közösség", "instagram": "Fotók", "linkedin": "Szakma", "x": "Rövid"},
+            "creative_directions": ["Setup bemutató"]}
+
+
+class StragglerLLM:
+    """The first ``stuck`` calls hang until cancelled; later ones answer at once."""
+
+    def __init__(self, stuck=1):
+        self.stuck = stuck
+        self.calls = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= self.stuck:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return SimpleNamespace(content=json.dumps(ANALYSIS, ensure_ascii=False))
+
+
+def make_service(llm, telemetry, **kwargs):
+    return AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                     telemetry=telemetry, **kwargs)
+
+
+def test_hedge_policy_waits_for_samples_and_uses_the_quantile():
+    policy = HedgePolicy(enabled=True, quantile=0.9, min_samples=20, min_delay=0.05)
+    for ms in range(1, 20):
+        policy.observe("generate_posts", ms / 100)
+    assert policy.delay("generate_posts") is None
+    policy.observe("generate_posts", 0.2)
+    assert policy.delay("generate_posts") == 0.18
+    assert policy.delay("refine_posts") is None
+    assert policy.stats() == {"generate_posts": 0.18}
+
+    fast = HedgePolicy(enabled=True, min_samples=1, min_delay=0.05)
+    fast.observe("x", 0.001)
+    assert fast.delay("x") == 0.05
+    assert HedgePolicy(enabled=False, min_samples=0).delay("x") is None
+
+
+def test_deadline_scopes_nest_and_cap_call_timeouts():
+    assert remaining() is None and call_timeout(30) == (30, False)
+    with deadline_scope(deadline_in(10)):
+        assert call_timeout(1) == (1, False)
+        with deadline_scope(deadline_in(60)) as left:
+            # The enclosing, sooner deadline still applies
+            assert left <= 10
+            timeout, binding = call_timeout(30)
+            assert timeout <= 10 and binding
+    with deadline_scope(time.monotonic() - 1):
+        try:
+            call_timeout(30)
+        except DeadlineExceeded as e:
+            assert e.overdue >= 1
+        else:
+            raise AssertionError("DeadlineExceeded not raised")
+
+
+def test_hedged_duplicate_answers_for_a_straggler():
+    telemetry = Telemetry()
+    llm = StragglerLLM()
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.01)
+    policy.observe("analyze_context", 0.02)
+    service = make_service(llm, telemetry, hedge_policy=policy)
+
+    started = time.perf_counter()
+    context = asyncio.run(service.analyze_context("Új gaming laptop kollekció", "Hobby gamerek", "friendly"))
+
+    assert context["audience_insights"] == "Hobby gamerek"
+    assert time.perf_counter() - started < 5
+    assert llm.calls == 2 and llm.cancelled == 1
+    assert telemetry.llm_hedges.value(operation="analyze_context", outcome="won") == 1
+    assert service.resilience_stats()["hedges"]["won"] == 1
+    assert not telemetry.spans("llm.analyze_context")[0].attributes.get("llm.fallback")
+
+
+def test_time_queued_at_the_rate_limiter_does_not_trigger_a_hedge():
+    telemetry = Telemetry()
+    llm = StragglerLLM(stuck=0)
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.01)
+    policy.observe("analyze_context", 0.02)
+    limiter = RateLimiter(600, 0)
+    for _ in range(600):
+        limiter.reserve(0)  # saturated: the next request waits about 0.1 s
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=limiter,
+                        telemetry=telemetry, hedge_policy=policy)
+
+    context = asyncio.run(service.analyze_context("Új gaming laptop kollekció", "Hobby gamerek", "friendly"))
+
+    assert context["audience_insights"] == "Hobby gamerek"
+    assert limiter.delayed == 1 and llm.calls == 1
+    assert not any(service.hedges.values())
+    assert not telemetry.spans("llm.analyze_context")[0].attributes.get("llm.hedged")
+
+
+def test_cancelled_call_hands_back_its_rate_limiter_reservation():
+    limiter = RateLimiter(60, 6000, clock=lambda: 0.0)
+    for _ in range(60):
+        limiter.reserve(100)
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=StragglerLLM(stuck=0),
+                        rate_limiter=limiter, telemetry=Telemetry())
+
+    async def run():
+        call = asyncio.ensure_future(service.analyze_context("Új gaming laptop kollekció", "Hobby gamerek", "friendly"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.wait({call})
+
+    asyncio.run(run())
+
+    stats = limiter.stats()
+    assert stats["available_requests"] == 0 and stats["available_tokens"] == 0
+
+
+def test_call_cancelled_after_it_was_sent_still_pays_for_its_prompt():
+    limiter = RateLimiter(60, 100000, clock=lambda: 0.0)
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=StragglerLLM(), rate_limiter=limiter,
+                        telemetry=Telemetry())
+
+    async def run():
+        call = asyncio.ensure_future(service.analyze_context("Új gaming laptop kollekció", "Hobby gamerek", "friendly"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        await asyncio.wait({call})
+
+    asyncio.run(run())
+
+    stats = limiter.stats()
+    spent = 100000 - stats["available_tokens"]
+    # The prompt the provider has seen stays charged; only the unused output reservation comes back
+    assert stats["available_requests"] == 59
+    assert 0 < spent < service.prompt_budget.max_output_tokens
+
+
+def test_call_timeout_is_retried():
+    telemetry = Telemetry()
+    llm = StragglerLLM()
+    service = make_service(llm, telemetry, call_timeout=0.05, retry_policy=RetryPolicy(max_retries=2, base_delay=0))
+
+    context = asyncio.run(service.analyze_context("Új gaming laptop kollekció", "Hobby gamerek", "friendly"))
+
+    assert context["audience_insights"] == "Hobby gamerek"
+    assert telemetry.llm_timeouts.value(operation="analyze_context", kind="call") == 1
+    assert service.retries == 1 and service.resilience_stats()["timeouts"] == 1
+
+
+def test_request_deadline_falls_back_to_template_posts():
+    telemetry = Telemetry()
+    llm = StragglerLLM(stuck=100)
+    service = make_service(llm, telemetry, retry_policy=RetryPolicy(max_retries=3, base_delay=0))
+    agent = SocialMediaAgent(generation_mode="single", ai_service=service, telemetry=telemetry)
+    request = SocialMediaRequest(campaign_message="Új gaming laptop kollekciónk most kapható!",
+                                 target_audience="25-35 éves hobby gamerek", tone=ToneType.FRIENDLY,
+                                 deadline_seconds=0.2)
+
+    started = time.perf_counter()
+    result = asyncio.run(agent.process_request(request))
+
+    assert time.perf_counter() - started < 5
+    assert "error" not in result
+    local = ContentGenerator(request.campaign_message, request.target_audience, "friendly").generate_content()
+    assert result["linkedin"]["text"] == local["linkedin"]["text"]
+    # The analysis ran into the deadline; generation had no time left to even try
+    assert telemetry.llm_timeouts.value(operation="analyze_context", kind="deadline") == 1
+    assert llm.calls == 1 and service.retries == 0
+    node, = telemetry.spans("node.context_analysis")
+    assert 0 < node.attributes["workflow.deadline_remaining_ms"] <= 200
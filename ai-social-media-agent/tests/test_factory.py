@@ -0,0 +1,37 @@
+import asyncio
+
+from agents import factory
+from utils.event_loop import BackgroundEventLoop
+
+
+def test_agents_and_service_are_shared():
+    try:
+        single = factory.get_agent("single")
+        assert factory.get_agent("single") is single
+        
+        fanout = factory.get_agent("fanout")
+        assert fanout is not single
+        assert fanout.ai_service is single.ai_service
+        assert fanout.checkpointer is single.checkpointer
+        assert single.ai_service is factory.get_ai_service()
+    finally:
+        asyncio.run(factory.close_shared_instances())
+    
+    assert factory.get_agent("single") is not single
+    asyncio.run(factory.close_shared_instances())
+
+
+def test_background_loop_is_reused_between_calls():
+    loop = BackgroundEventLoop()
+    
+    async def current_loop():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop()
+    
+    try:
+        first = loop.run(current_loop())
+        second = loop.run(current_loop())
+        assert first is second is loop.loop
+    finally:
+        loop.stop()
+    assert loop.loop.is_closed()
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.insight_store import InsightStore, insight_key, insight_similarity, normalize_audience
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier, SQLiteCacheTier
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+
+ANALYSIS = {
+    "key_messages": ["Új gaming laptop"],
+    "audience_insights": "Hobby gamerek, akik ár-érték arányt keresnek",
+    "platform_strategies": {
+        "facebook": "Közösségi játékélmények",
+        "instagram": "Látványos setup fotók",
+        "linkedin": "Munka és játék egyensúlya",
+        "x": "Rövid, csattanós ajánlat"
+    },
+    "creative_directions": ["Setup bemutató", "Játékos kihívás"]
+}
+
+
+class ScriptedLLM:
+    """Answers context analyses with ``analysis`` and everything else through the fake backend."""
+
+    def __init__(self, analysis=ANALYSIS):
+        self.analysis = analysis
+        self.analysis_calls = 0
+        self.generation_calls = 0
+        self.fake = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0))
+
+    async def ainvoke(self, messages):
+        if "Elemezd a kampány kontextusát" in messages[-1].content:
+            self.analysis_calls += 1
+            return SimpleNamespace(content=json.dumps(self.analysis, ensure_ascii=False))
+        self.generation_calls += 1
+        return await self.fake.ainvoke(messages)
+
+
+def make_request(index=0, audience="25-35 éves hobby gamerek"):
+    return SocialMediaRequest(
+        campaign_message=f"Új gaming laptop kollekciónk most kedvezménnyel kapható! (#{index})",
+        target_audience=audience,
+        tone=ToneType.FRIENDLY,
+        use_emojis=True
+    )
+
+
+def make_agent(llm, store, generation_mode="single"):
+    telemetry = Telemetry()
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm,
+                        rate_limiter=RateLimiter(6000, 0), telemetry=telemetry)
+    return SocialMediaAgent(generation_mode=generation_mode, ai_service=service, telemetry=telemetry,
+                            insight_store=store)
+
+
+def test_audiences_are_normalized_and_analyses_compared():
+    assert normalize_audience(" 25–35 éves  Hobby gamerek. ") == "25-35 éves hobby gamerek"
+    assert insight_key("25 - 35 éves hobby gamerek", "friendly") == insight_key("25-35 ÉVES hobby gamerek!", "FRIENDLY")
+    assert insight_key("hobby gamerek", "friendly") != insight_key("hobby gamerek", "formal")
+
+    assert insight_similarity(ANALYSIS, ANALYSIS) == 1.0
+    reworded = {**ANALYSIS, "platform_strategies": {**ANALYSIS["platform_strategies"], "x": "Hosszú szál"}}
+    assert 0.5 < insight_similarity(ANALYSIS, reworded) < 1.0
+    assert insight_similarity(ANALYSIS, {"audience_insights": "Nyugdíjasok", "platform_strategies": {}}) < 0.2
+
+
+def test_confidence_grows_with_agreeing_analyses_and_expires_after_reuses():
+    store = InsightStore(reuse_confidence=0.75, revalidate_every=2)
+
+    assert store.observe("hobby gamerek", "friendly", "Első kampány", ANALYSIS) is None
+    assert store.lookup("hobby gamerek", "friendly").confidence == 0
+    for _ in range(3):
+        assert store.observe("hobby gamerek", "friendly", "Kampány", ANALYSIS) == 1.0
+    insight = store.lookup("Hobby gamerek", "friendly")
+    assert insight.confidence == 0.75 and store.is_trusted(insight)
+
+    store.record_reuse("hobby gamerek", "friendly")
+    store.record_reuse("hobby gamerek", "friendly")
+    assert not store.is_trusted(store.lookup("hobby gamerek", "friendly"))
+
+    disagreeing = {**ANALYSIS, "audience_insights": "Teljesen más", "platform_strategies": {"x": "Más"}}
+    store.observe("hobby gamerek", "friendly", "Kampány", disagreeing)
+    insight = store.lookup("hobby gamerek", "friendly")
+    assert insight.observations == 5 and insight.agreements == 3 and insight.reuses_since_check == 0
+    assert insight.audience_insights == "Teljesen más"
+
+
+def test_stored_context_is_adapted_to_the_campaign(tmp_path):
+    store = InsightStore(SQLiteCacheTier(str(tmp_path / "insights.sqlite")))
+    store.observe("hobby gamerek", "friendly", "Régi kampány.", ANALYSIS)
+
+    insight = InsightStore(SQLiteCacheTier(str(tmp_path / "insights.sqlite"))).lookup("hobby gamerek", "friendly")
+    assert insight.context_for("Régi kampány.")["key_messages"] == ANALYSIS["key_messages"]
+    context = insight.context_for("Új okosóra érkezett! Most 20% kedvezménnyel.")
+    assert context["key_messages"] == ["Új okosóra érkezett!", "Most 20% kedvezménnyel."]
+    assert context["platform_strategies"] == ANALYSIS["platform_strategies"]
+
+
+@pytest.mark.parametrize("generation_mode", ["single", "fanout"])
+def test_repeat_audience_drops_the_analysis_from_the_critical_path(generation_mode):
+    llm = ScriptedLLM()
+    agent = make_agent(llm, InsightStore(reuse_confidence=0.75), generation_mode)
+
+    async def run_all():
+        return [await agent.process_request(make_request(index)) for index in range(6)]
+
+    results = asyncio.run(run_all())
+
+    assert all("error" not in result for result in results)
+    decisions = agent.telemetry.context_insights
+    assert decisions.value(decision="fresh") == 1
+    assert decisions.value(decision="speculation_accepted") == 3
+    assert decisions.value(decision="reused") == 2
+    # Reused runs skip the analysis, and accepted speculations need no second generation
+    assert llm.analysis_calls == 4
+    calls_per_campaign = 1 if generation_mode == "single" else 4
+    assert llm.generation_calls == 6 * calls_per_campaign
+    assert agent.telemetry.spans("insights.speculative_generation")
+
+
+def test_disagreeing_analysis_discards_the_speculative_posts():
+    llm = ScriptedLLM()
+    store = InsightStore()
+    store.observe("25-35 éves hobby gamerek", "friendly", "Régi kampány",
+                  {**ANALYSIS, "audience_insights": "Nyugdíjas kertbarátok",
+                   "platform_strategies": {platform: "Kertészkedés" for platform in ANALYSIS["platform_strategies"]}})
+    agent = make_agent(llm, store)
+
+    result = asyncio.run(agent.process_request(make_request()))
+
+    assert "error" not in result
+    assert agent.telemetry.context_insights.value(decision="speculation_discarded") == 1
+    # The discarded speculation is either cancelled or thrown away; the posts come from the fresh context
+    generation, = [span for span in agent.telemetry.spans("llm.generate_posts")
+                   if span.parent_span_id == agent.telemetry.spans("node.generate_posts")[0].span_id]
+    assert generation.attributes["llm.outcome"] == "ok"
+    assert store.lookup("25-35 éves hobby gamerek", "friendly").audience_insights == ANALYSIS["audience_insights"]
+
+
+def test_fallback_analysis_is_not_stored():
+    class ProseLLM:
+        async def ainvoke(self, messages):
+            return SimpleNamespace(content="Sajnos most nem tudok segíteni.")
+
+    store = InsightStore()
+    agent = make_agent(ProseLLM(), store)
+
+    result = asyncio.run(agent.process_request(make_request()))
+
+    assert "error" not in result
+    assert store.lookup("25-35 éves hobby gamerek", "friendly") is None
@@ -0,0 +1,141 @@
+import asyncio
+import multiprocessing
+
+from agents.social_media_agent import SocialMediaAgent
+from agents.job_worker import JobWorker
+from services.ai_service import AIService
+from services.job_queue import JobQueue
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+
+CAMPAIGN = {
+    "campaign_message": "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+    "target_audience": "25-35 éves hobby gamerek",
+    "tone": "friendly",
+    "use_emojis": True
+}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_claims_follow_priority_then_take_turns_between_tenants(tmp_path):
+    clock = Clock()
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), clock=clock)
+    bulk = queue.submit_many([{"n": i} for i in range(3)], tenant="bulk")
+    clock.now += 1
+    small = queue.submit({"n": 0}, tenant="small")
+    urgent = queue.submit({"n": 0}, tenant="small", priority=5)
+
+    claimed = [queue.claim("w").id for _ in range(5)]
+
+    # The urgent job first, then the tenants alternate, each in submission order
+    assert claimed == [urgent, bulk[0], small, bulk[1], bulk[2]]
+    assert queue.claim("w") is None
+    assert queue.stats()["by_tenant"]["bulk"] == {"running": 3}
+
+
+def test_failed_attempts_back_off_then_dead_letter(tmp_path):
+    clock = Clock()
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2, retry_base_delay=10, clock=clock)
+    job_id = queue.submit(CAMPAIGN)
+
+    queue.claim("w")
+    assert queue.fail(job_id, "w", "Rate limited") == "queued"
+    # Not before the backoff has passed
+    assert queue.claim("w") is None
+    clock.now += 10
+    assert queue.claim("w").attempts == 2
+    assert queue.fail(job_id, "w", "Rate limited again") == "dead"
+
+    job = queue.get(job_id)
+    assert job.status == "dead" and job.error == "Rate limited again" and job.finished_at == clock.now
+    assert queue.requeue() == 1
+    assert queue.claim("w").attempts == 1
+
+
+def test_expired_lease_is_reclaimed_and_the_old_worker_loses_the_job(tmp_path):
+    clock = Clock()
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), lease_seconds=30, clock=clock)
+    job_id = queue.submit(CAMPAIGN)
+
+    assert queue.claim("crashed").id == job_id
+    clock.now += 20
+    assert queue.heartbeat(job_id, "crashed")
+    clock.now += 20
+    assert queue.claim("other") is None
+    clock.now += 20
+
+    reclaimed = queue.claim("other")
+    assert reclaimed.id == job_id and reclaimed.attempts == 2 and reclaimed.error == "Lease expired"
+    assert not queue.complete(job_id, "crashed", {"late": True})
+    assert queue.complete(job_id, "other", {"x": {"text": "ok"}})
+    assert queue.get(job_id).result == {"x": {"text": "ok"}}
+    assert not queue.cancel(job_id)
+
+
+def test_worker_runs_campaigns_and_dead_letters_invalid_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2, retry_base_delay=0)
+    telemetry = Telemetry()
+    llm = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0))
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    agents = {}
+
+    def agent_for(mode=None):
+        mode = mode or "single"
+        if mode not in agents:
+            agents[mode] = SocialMediaAgent(generation_mode=mode, ai_service=service, telemetry=telemetry)
+        return agents[mode]
+
+    good = queue.submit_many([CAMPAIGN, {**CAMPAIGN, "tone": "formal"}], generation_mode="fused")
+    bad_request = queue.submit({**CAMPAIGN, "tone": "angry"})
+    bad_mode = queue.submit(CAMPAIGN, generation_mode="parallel")
+
+    worker = JobWorker(queue, agent_for, concurrency=2, poll_interval=0.01, telemetry=telemetry)
+    outcomes = asyncio.run(worker.run(drain=True))
+
+    assert outcomes == {"succeeded": 2, "retried": 0, "dead": 2, "lost": 0}
+    for job_id in good:
+        job = queue.get(job_id)
+        assert job.status == "succeeded" and set(job.result) == {"facebook", "instagram", "linkedin", "x"}
+    assert queue.get(bad_request).error.startswith("Invalid job") and queue.get(bad_request).attempts == 1
+    assert "Unknown generation mode" in queue.get(bad_mode).error
+    assert llm.calls == 2
+    assert 'jobs_total{outcome="succeeded"} 2' in telemetry.registry.render()
+
+
+def _claim_all(path, worker, claimed):
+    queue = JobQueue(path)
+    ids = []
+    while (job := queue.claim(worker)) is not None:
+        queue.complete(job.id, worker, {"worker": worker})
+        ids.append(job.id)
+    claimed.put(ids)
+
+
+def test_processes_sharing_the_queue_never_claim_a_job_twice(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(path)
+    job_ids = queue.submit_many([{"n": i} for i in range(200)])
+
+    context = multiprocessing.get_context("spawn")
+    claimed = context.SimpleQueue()
+    workers = [context.Process(target=_claim_all, args=(path, f"w{i}", claimed)) for i in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    runs = [claimed.get() for _ in workers]
+
+    assert all(process.exitcode == 0 for process in workers)
+    assert sorted(job_id for ids in runs for job_id in ids) == sorted(job_ids)
+    assert queue.stats()["by_status"]["succeeded"] == 200
+    assert {job.attempts for job in queue.list(limit=200)} == {1}
@@ -0,0 +1,130 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.ai_service import AIService
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from utils.json_parser import (
+    JSONExtractionError,
+    find_json_objects,
+    parse_json_response,
+    recover_platform_posts,
+    recover_platform_variants,
+    recover_social_media_response,
+)
+
+POSTS = {
+    "facebook": {"text": "Facebook poszt", "hashtags": ["#gaming"]},
+    "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop", "Setup"]},
+    "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech"]},
+    "x": {"text": "X poszt", "hashtags": ["#gaming"]},
+}
+DOCUMENT = json.dumps(POSTS, ensure_ascii=False, indent=2)
+
+
+class StaticLLM:
+    def __init__(self, content):
+        self.content = content
+
+    async def ainvoke(self, messages):
+        return SimpleNamespace(content=self.content)
+
+
+@pytest.mark.parametrize("text, strategy", [
+    (DOCUMENT, "direct"),
+    (f"Íme a posztok:\n{DOCUMENT}\nRemélem, tetszik!", "extracted"),
+    (f"```json\n{DOCUMENT}\n```", "extracted"),
+    (DOCUMENT.replace("    ]\n  }", "    ],\n  }", 1), "repaired"),
+    (DOCUMENT.replace('"Facebook poszt",', '"Facebook poszt"', 1), "repaired"),
+    (DOCUMENT.replace('"', "'"), "repaired"),
+    (DOCUMENT.replace("Facebook poszt", 'Facebook "legjobb" poszt'), "repaired"),
+])
+def test_recovers_complete_documents(text, strategy):
+    result = parse_json_response(text)
+
+    assert result.strategy == strategy
+    posts, missing = recover_platform_posts(result.data)
+    assert missing == []
+    assert posts["instagram"]["image_suggestions"] == ["Laptop", "Setup"]
+
+
+def test_missing_comma_between_members_on_one_line():
+    result = parse_json_response('{"a": "x" "b": "y", "text": "egy "idézet" szöveg" "hashtags": ["#a"]}')
+
+    assert result.strategy == "repaired"
+    assert result.data == {"a": "x", "b": "y", "text": 'egy "idézet" szöveg', "hashtags": ["#a"]}
+
+
+def test_truncated_output_keeps_complete_members():
+    truncated = DOCUMENT[:DOCUMENT.index('"X poszt"') + 4]
+
+    result = parse_json_response(truncated)
+
+    assert result.partial
+    posts, missing = recover_platform_posts(result.data)
+    assert set(posts) == {"facebook", "instagram", "linkedin"}
+    assert missing == ["x"]
+
+
+def test_unrecoverable_text_raises_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_response("Sajnos most nem tudok segíteni.")
+    assert find_json_objects('prose {"a": "}"} more {"b": 1}') == ['{"a": "}"}', '{"b": 1}']
+
+
+def test_schema_recovery_normalises_shapes():
+    data = {"posts": {
+        "Twitter": {"text": "Rövid poszt", "hashtags": "#a, #b"},
+        "facebook": {"variation_1": {"text": "Facebook poszt"}},
+        "linkedin": {"hashtags": ["#no-text"]},
+    }}
+
+    response, filled = recover_social_media_response(data, lambda: POSTS)
+
+    assert response.x.hashtags == ["#a", "#b"]
+    assert response.facebook.text == "Facebook poszt"
+    assert filled == ["instagram", "linkedin"]
+    assert response.linkedin.text == "LinkedIn poszt"
+    with pytest.raises(JSONExtractionError):
+        recover_social_media_response({"unrelated": 1}, lambda: POSTS)
+
+
+def test_variant_recovery_keeps_every_valid_variation_in_order():
+    data = {"posts": {
+        "x": {"variation_2": {"text": "Második"}, "variation_10": {"text": "Tizedik"},
+              "variation_1": {"text": "Első", "hashtags": "#a #b"}, "variation_3": {"hashtags": ["#no-text"]}},
+        "Twitter": {"text": "Alias"},
+        "linkedin": {"text": "Egyetlen"},
+    }}
+
+    variants = recover_platform_variants(data)
+
+    assert [post["text"] for post in variants["x"]] == ["Első", "Második", "Tizedik", "Alias"]
+    assert variants["x"][0]["hashtags"] == ["#a", "#b"]
+    assert variants["linkedin"] == [{"text": "Egyetlen"}]
+    assert set(variants) == {"x", "linkedin"}
+
+
+def test_truncated_generation_only_falls_back_for_missing_platforms():
+    truncated = DOCUMENT[:DOCUMENT.index('"x"')]
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=StaticLLM(truncated))
+
+    posts = asyncio.run(service.generate_platform_posts({}, "Új gaming laptop akció!", "Gamerek", "friendly", True))
+
+    assert posts["facebook"] == POSTS["facebook"]
+    assert posts["linkedin"] == POSTS["linkedin"]
+    assert "Új gaming laptop akció!" in posts["x"]["text"]
+    assert service.fallbacks == 0
+    assert service.resilience_stats()["parse_outcomes"] == {"partial": 1}
+
+
+def test_unexpected_content_type_surfaces_the_real_error():
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=StaticLLM("{}"))
+
+    # e.g. a provider answering with a list of content blocks
+    with pytest.raises(TypeError):
+        service._parse_response([{"type": "text", "text": "{}"}], "system", "human")
+
+    assert service.resilience_stats()["parse_outcomes"] == {"failed": 1}
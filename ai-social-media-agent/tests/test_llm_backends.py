@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from models.request_models import PLATFORMS
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig, FakeLLMError, create_llm
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+
+
+def instant_config(**overrides):
+    return FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0, **overrides)
+
+
+def make_service(**overrides):
+    return AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=FakeChatModel(instant_config(**overrides)))
+
+
+def test_create_llm_selects_fake_backend():
+    assert isinstance(create_llm(backend="fake"), FakeChatModel)
+    with pytest.raises(ValueError):
+        create_llm(backend="unknown")
+
+
+def test_fake_backend_fills_prompt_templates():
+    service = make_service()
+
+    async def run():
+        context = await service.analyze_context("Új gaming laptop akció!", "Gamerek", "friendly")
+        posts = await service.generate_platform_posts(context, "Új gaming laptop akció!", "Gamerek", "friendly", True)
+        return context, posts
+
+    context, posts = asyncio.run(run())
+
+    assert context["key_messages"]
+    assert set(PLATFORMS) <= set(posts)
+    assert all(posts[platform]["text"].startswith("Új gaming laptop akció!") for platform in PLATFORMS)
+    assert len(posts["x"]["text"]) <= 280
+
+
+def test_fake_backend_is_deterministic_per_seed():
+    async def collect(seed):
+        llm = FakeChatModel(instant_config(seed=seed, malformed_json_rate=0.5))
+        service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm)
+        outputs = []
+        for index in range(5):
+            outputs.append(await service.refine_posts({"x": {"text": f"Poszt {index}"}}, "Rövidebb legyen"))
+        return outputs, llm.malformed
+
+    assert asyncio.run(collect(1)) == asyncio.run(collect(1))
+
+
+def test_fake_backend_simulates_failures_and_malformed_json():
+    failing = FakeChatModel(instant_config(error_rate=1.0))
+    with pytest.raises(FakeLLMError):
+        asyncio.run(failing.ainvoke([SimpleMessage("Kampányüzenet: Teszt {\"text\": \"...\"}")]))
+
+    malformed = FakeChatModel(instant_config(malformed_json_rate=1.0, seed=3))
+    outputs = [asyncio.run(malformed.ainvoke([SimpleMessage(f"Kérés {i}: {{\"text\": \"...\"}}")])).content
+               for i in range(10)]
+    assert malformed.malformed == 10
+    assert any(_is_invalid_json(output) for output in outputs)
+
+
+def test_fake_backend_streams_the_same_content():
+    llm = FakeChatModel(instant_config())
+    messages = [SimpleMessage("Kampányüzenet: Teszt akció {\"x\": {\"text\": \"...\"}}")]
+
+    async def run():
+        chunks = [chunk.content async for chunk in llm.astream(messages)]
+        return "".join(chunks), len(chunks)
+
+    streamed, chunk_count = asyncio.run(run())
+    # A fresh model replays the same outcome for the first attempt of a prompt
+    assert streamed == asyncio.run(FakeChatModel(instant_config()).ainvoke(messages)).content
+    assert chunk_count > 1
+
+
+class SimpleMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+def _is_invalid_json(text):
+    try:
+        json.loads(text)
+        return False
+    except json.JSONDecodeError:
+        return True
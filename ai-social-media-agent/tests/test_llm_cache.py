@@ -0,0 +1,122 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from services.llm_cache import LLMResponseCache, MemoryCacheTier, SQLiteCacheTier, make_cache_key
+from services.ai_service import AIService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLLM:
+    """Stands in for ChatGroq and counts round trips."""
+
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return SimpleNamespace(content=self.content)
+
+
+def test_cache_key_depends_on_every_input():
+    base = make_cache_key("model", 0.7, "system", "human")
+    assert base == make_cache_key("model", 0.7, "system", "human")
+    assert base != make_cache_key("other-model", 0.7, "system", "human")
+    assert base != make_cache_key("model", 0.2, "system", "human")
+    assert base != make_cache_key("model", 0.7, "other system", "human")
+    assert base != make_cache_key("model", 0.7, "system", "other human")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    tier = MemoryCacheTier(max_entries=2, ttl_seconds=None)
+    tier.set("a", "1")
+    tier.set("b", "2")
+    assert tier.get("a") == "1"
+    tier.set("c", "3")
+
+    assert tier.get("b") is None
+    assert tier.get("a") == "1"
+    assert tier.get("c") == "3"
+    assert tier.evictions == 1
+
+
+def test_memory_tier_expires_entries():
+    clock = FakeClock()
+    tier = MemoryCacheTier(max_entries=10, ttl_seconds=60, clock=clock)
+    tier.set("a", "1")
+    clock.now += 59
+    assert tier.get("a") == "1"
+    clock.now += 2
+    assert tier.get("a") is None
+
+
+def test_sqlite_tier_survives_restart_and_promotes_to_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = SQLiteCacheTier(path)
+    first.set("key", "persisted")
+    first.close()
+
+    memory = MemoryCacheTier()
+    cache = LLMResponseCache([memory, SQLiteCacheTier(path)])
+    assert cache.get("key") == "persisted"
+    assert memory.get("key") == "persisted"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["tier_hits"] == {"memory": 0, "sqlite": 1}
+
+
+def test_repeated_context_analysis_hits_cache():
+    content = json.dumps({"key_messages": ["Akció"], "creative_directions": ["Gaming"]})
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]))
+    service.llm = CountingLLM(content)
+
+    async def run_twice():
+        first = await service.analyze_context("Új laptop akció!", "Gamerek", "friendly")
+        second = await service.analyze_context("Új laptop akció!", "Gamerek", "friendly")
+        return first, second
+
+    first, second = asyncio.run(run_twice())
+
+    assert first == second
+    assert service.llm.calls == 1
+    assert service.cache_stats()["hits"] == 1
+
+
+def test_unparseable_response_is_not_kept_in_cache():
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]))
+    service.llm = CountingLLM("not json at all")
+
+    async def run_twice():
+        await service.refine_posts({"x": {"text": "Poszt"}}, "Rövidebb legyen")
+        await service.refine_posts({"x": {"text": "Poszt"}}, "Rövidebb legyen")
+
+    asyncio.run(run_twice())
+
+    assert service.llm.calls == 2
+
+
+def test_sqlite_tier_evicts_least_recently_used_and_purges_expired(tmp_path):
+    clock = FakeClock()
+    tier = SQLiteCacheTier(str(tmp_path / "cache.sqlite"), ttl_seconds=60, max_entries=2, clock=clock)
+    tier.set("a", "1")
+    tier.set("b", "2")
+    assert tier.get("a") == "1"
+    tier.set("c", "3")
+
+    assert tier.get("b") is None
+    assert tier.get("a") == "1" and tier.get("c") == "3"
+    assert tier.evictions == 1
+
+    clock.now += 61
+    tier.set("d", "4")
+    # The expired rows are gone from the file, not just hidden from get
+    assert len(tier) == 1 and tier.get("d") == "4"
@@ -1,44 +1,106 @@
-import pytest
-from src.agents.platform_optimizers.facebook_optimizer import FacebookOptimizer
-from src.agents.platform_optimizers.instagram_optimizer import InstagramOptimizer
-from src.agents.platform_optimizers.linkedin_optimizer import LinkedInOptimizer
-from src.agents.platform_optimizers.x_optimizer import XOptimizer
-
-def test_facebook_optimizer():
-    optimizer = FacebookOptimizer()
-    input_text = "Exciting news about our new product launch!"
-    expected_output = {
-        "text": "Exciting news about our new product launch! Check it out! #NewProduct #Launch",
-        "hashtags": ["#NewProduct", "#Launch"]
-    }
-    assert optimizer.optimize(input_text) == expected_output
-
-def test_instagram_optimizer():
-    optimizer = InstagramOptimizer()
-    input_text = "Check out our latest collection!"
-    expected_output = {
-        "text": "Check out our latest collection! 🌟",
-        "hashtags": ["#LatestCollection", "#Fashion"],
-        "image_suggestions": ["image1.jpg", "image2.jpg"]
-    }
-    assert optimizer.optimize(input_text) == expected_output
-
-def test_linkedin_optimizer():
-    optimizer = LinkedInOptimizer()
-    input_text = "We are proud to announce our new partnership."
-    expected_output = {
-        "text": "We are proud to announce our new partnership. Let's connect!",
-    }
-    assert optimizer.optimize(input_text) == expected_output
-
-def test_x_optimizer():
-    optimizer = XOptimizer()
-    input_text = "Join us for an exciting event!"
-    expected_output = {
-        "text": "Join us for an exciting event! Don't miss out! #Event #JoinUs",
-        "hashtags": ["#Event", "#JoinUs"]
-    }
-    assert optimizer.optimize(input_text) == expected_output
-
-if __name__ == "__main__":
-    pytest.main()
\ No newline at end of file
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agents.platform_optimizers import OPTIMIZERS, build_optimizers
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.post_constraints import published_length
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+
+TEXT = ("Új gaming laptop kollekciónk most 20% kedvezménnyel kapható! 🎮🔥 Nézd meg itt: https://shop.hu/laptop. "
+        "Ez az ajánlat csak rövid ideig érvényes. Csatlakozz a közösségünkhöz! 🙌 Kérdésed van? Írj nekünk bátran. 😎")
+POST = {"text": TEXT, "hashtags": ["gaming", "#Gaming", "#laptop", "# tech news", "#kedvezmény", "#akció", "#újdonság"]}
+
+
+def test_platforms_get_their_own_layout_links_and_emojis():
+    optimizers = build_optimizers()
+    assert set(optimizers) == set(OPTIMIZERS) == {"facebook", "instagram", "linkedin", "x"}
+
+    facebook = optimizers["facebook"].optimize(POST)
+    assert facebook["text"].endswith("\n\nhttps://shop.hu/laptop")
+    assert "Nézd meg itt.\n\nEz az ajánlat" in facebook["text"] and facebook["text"].count("\n\n") == 3
+    assert facebook["hashtags"][:3] == ["#gaming", "#laptop", "#kedvezmény"]
+
+    instagram = optimizers["instagram"].optimize({**POST, "image_suggestions": ["Laptop"]})
+    assert instagram["text"].endswith("\n\n🔗 Link a bióban: https://shop.hu/laptop")
+    assert instagram["text"].count("https://") == 1 and "Nézd meg itt." in instagram["text"]
+    assert instagram["image_suggestions"] == ["Laptop"]
+
+    linkedin = optimizers["linkedin"].optimize(POST)
+    assert linkedin["text"].count("\n\n") == 6 and "😎" not in linkedin["text"]
+    assert len(linkedin["hashtags"]) == 3
+
+    x = optimizers["x"].optimize(POST)
+    assert "\n" not in x["text"] and x["text"].endswith(" https://shop.hu/laptop")
+    assert x["text"].count("🎮") + x["text"].count("🔥") + x["text"].count("🙌") == 2
+    assert x["hashtags"] == ["#gaming", "#laptop"]
+
+    plain = optimizers["facebook"].optimize(POST, use_emojis=False)
+    assert not any(emoji in plain["text"] for emoji in "🎮🔥🙌😎")
+    assert optimizers["instagram"].optimize(POST, use_emojis=False)["text"].endswith(
+        "\n\nLink a bióban: https://shop.hu/laptop")
+
+
+def test_optimized_posts_fit_the_limits_and_keep_their_links():
+    long_post = {"text": "Nagyon hosszú mondat a kedvezményről, ne maradj le róla! " * 20 + "https://shop.hu/laptop",
+                 "hashtags": ["#gaming"]}
+    for platform, optimizer in build_optimizers().items():
+        for post in (POST, long_post):
+            optimized = optimizer.optimize(post)
+            assert published_length(platform, optimized) <= optimizer.limits["max_chars"]
+            assert optimized["text"].count("https://shop.hu/laptop") == 1
+            # A second pass changes nothing, so refinement rounds can re-run the stage freely
+            assert optimizer.optimize(optimized) == optimized
+
+
+def test_instagram_keeps_every_link_for_the_bio():
+    instagram = build_optimizers()["instagram"]
+    post = {"text": "Katalógus: https://shop.hu/katalogus, jelentkezés itt: https://shop.hu/?ref=ig&x=1. Várunk!",
+            "hashtags": ["#akció"]}
+
+    optimized = instagram.optimize(post)
+
+    assert optimized["text"] == ("Katalógus, jelentkezés itt. Várunk!\n\n"
+                                 "🔗 Link a bióban: https://shop.hu/katalogus https://shop.hu/?ref=ig&x=1")
+    assert instagram.optimize(optimized) == optimized
+
+
+def test_workflow_optimizes_generated_and_refined_posts_without_llm_calls():
+    posts = {platform: {"text": TEXT, "hashtags": ["#gaming", "#Gaming"]} for platform in OPTIMIZERS}
+
+    class ScriptedLLM:
+        calls = 0
+
+        async def ainvoke(self, messages, **kwargs):
+            self.calls += 1
+            if "Felhasználói visszajelzés" in messages[-1].content:
+                return SimpleNamespace(content=json.dumps({"x": {"text": "Rövid X poszt 🎮🔥🙌 https://shop.hu",
+                                                                 "hashtags": ["#a"]}}, ensure_ascii=False))
+            return SimpleNamespace(content=json.dumps(posts, ensure_ascii=False))
+
+    llm = ScriptedLLM()
+    telemetry = Telemetry()
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    agent = SocialMediaAgent(generation_mode="fused", ai_service=service, telemetry=telemetry)
+    request = SocialMediaRequest(campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+                                 target_audience="25-35 éves hobby gamerek", tone=ToneType.FRIENDLY)
+
+    async def run():
+        runner = await agent.process_with_feedback(request)
+        generated = await runner.run_until_feedback()
+        refined = await runner.provide_feedback("Rövidebb legyen", platforms=["x"])
+        return generated, refined
+
+    generated, refined = asyncio.run(run())
+
+    assert generated["posts"].instagram.text.endswith("🔗 Link a bióban: https://shop.hu/laptop")
+    assert generated["posts"].x.hashtags == ["#gaming"]
+    assert refined["posts"].x.text == "Rövid X poszt 🎮🔥 https://shop.hu"
+    assert refined["posts"].facebook.text == generated["posts"].facebook.text
+    assert llm.calls == 2
+    assert telemetry.node_duration.count(node="optimize_posts", status="ok") == 2
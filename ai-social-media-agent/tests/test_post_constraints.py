@@ -0,0 +1,89 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.post_constraints import enforce_post, rank_hashtags, truncate_text, weighted_length
+from services.rate_limiter import RateLimiter
+from services.telemetry import Telemetry
+
+SENTENCE = "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható, nézd meg a részleteket! "
+
+
+def test_x_weighting_truncation_and_hashtags():
+    # URL: 23, emoji sequences: 2 each (a ZWJ family too), CJK: 2 per character
+    assert weighted_length("Szia 🎮👨‍👩‍👧 https://example.com/a/very/long/path?x=1 héé 日本") == 42
+    assert weighted_length("árvíztűrő") == 9
+
+    truncated = truncate_text("Első mondat. Második mondat, ami túl hosszú", 30)
+    assert truncated == "Első mondat. Második mondat…" and len(truncated) <= 30
+    assert truncate_text("Ez egy mondat. Itt a vége", 14) == "Ez egy mondat."
+    assert truncate_text("Nézd: https://example.com/" + "x" * 40 + " most", 30, weighted_length) == "Nézd: https://example.com/" + "x" * 40 + "…"
+    # Only a text without any word break is cut mid-word
+    assert truncate_text("Kedvezmény" * 5, 12) == "KedvezményK…"
+    # A cheap URL early on puts the cut far past the length-proportional estimate
+    url = "https://example.com/" + "x" * 980
+    assert truncate_text(url + " " + "日本 " * 100, 100, weighted_length) == url + " " + " ".join(["日本"] * 15) + "…"
+
+    assert rank_hashtags(["#Tech", "laptop", "#tech", "# game day!", "#2024", "#kedvezmény"],
+                         "Laptop akció, kedvezmény mindenkinek") == ["#laptop", "#kedvezmény", "#Tech", "#gameday"]
+
+
+def test_enforce_post_repairs_small_overruns_and_reports_large_ones():
+    post = {"text": SENTENCE * 3 + "Ne maradj le róla!", "hashtags": ["#gaming", "#laptop", "#gaming", "#tech"], "variants": [{"text": "v"}]}
+    result = enforce_post("x", post)
+    assert result.ok and result.post["variants"] == post["variants"]
+    assert weighted_length(result.post["text"]) + sum(len(tag) + 1 for tag in result.post["hashtags"]) <= 280
+    assert result.post["hashtags"] == ["#gaming"] and result.post["text"].endswith("!")
+
+    too_long = enforce_post("x", {"text": SENTENCE * 8, "hashtags": ["#gaming"]})
+    assert not too_long.ok and too_long.violations[0].endswith("limit 280")
+    assert too_long.post["text"] == (SENTENCE * 8)
+    assert weighted_length(enforce_post("x", {"text": SENTENCE * 8}, force=True).post["text"]) <= 280
+
+    fine = {"text": "Rövid poszt ", "hashtags": ["#gaming"]}
+    assert enforce_post("linkedin", fine).post == fine and not enforce_post("linkedin", fine).repairs
+
+
+class ScriptedLLM:
+    def __init__(self, posts, rewrite):
+        self.posts, self.rewrite, self.prompts = posts, rewrite, []
+
+    async def ainvoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        if "Felhasználói visszajelzés" in prompt:
+            return SimpleNamespace(content=json.dumps(self.rewrite, ensure_ascii=False))
+        if "Kontextus elemzés" in prompt:
+            return SimpleNamespace(content=json.dumps(self.posts, ensure_ascii=False))
+        return SimpleNamespace(content=json.dumps({"key_messages": ["akció"], "platform_strategies": {"x": "rövid"}}))
+
+
+def test_workflow_only_asks_the_llm_to_rewrite_what_cannot_be_cut():
+    posts = {
+        "facebook": {"text": SENTENCE, "hashtags": ["#gaming"]},
+        "instagram": {"text": SENTENCE * 27, "hashtags": ["#gaming"], "image_suggestions": ["Laptop"]},
+        "linkedin": {"text": SENTENCE, "hashtags": ["tech", "#Tech", "#laptop", "#gaming", "#akcio"]},
+        "x": {"text": SENTENCE * 8, "hashtags": ["#gaming"]}
+    }
+    llm = ScriptedLLM(posts, {"x": {"text": SENTENCE * 4, "hashtags": ["#gaming"]}})
+    telemetry = Telemetry()
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        telemetry=telemetry)
+    agent = SocialMediaAgent(generation_mode="single", ai_service=service, telemetry=telemetry)
+    request = SocialMediaRequest(campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+                                 target_audience="gamerek", tone=ToneType.FRIENDLY)
+
+    result = asyncio.run(agent.process_request(request))
+
+    # Analysis, generation and one rewrite of the X post only
+    assert len(llm.prompts) == 3 and "limit 280" in llm.prompts[-1] and '"instagram"' not in llm.prompts[-1]
+    assert len(result["instagram"]["text"]) + len(" #gaming") <= 2200
+    assert result["linkedin"]["hashtags"] == ["#laptop", "#gaming", "#tech"]
+    assert weighted_length(result["x"]["text"]) + len(" #gaming") <= 280
+    metrics = telemetry.registry.render()
+    assert 'post_repairs_total{platform="instagram",method="local"} 1' in metrics
+    assert 'post_repairs_total{platform="x",method="llm"} 1' in metrics
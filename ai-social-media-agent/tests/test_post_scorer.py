@@ -0,0 +1,62 @@
+import asyncio
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.post_scorer import rank_variants, score_post
+from services.rate_limiter import RateLimiter
+
+GOOD_X_POST = {
+    "text": "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható! 🎮 Nézd meg, mielőtt elfogy!",
+    "hashtags": ["#gaming", "#laptop"]
+}
+
+
+def test_scorer_penalizes_broken_platform_rules():
+    assert score_post("x", GOOD_X_POST, use_emojis=True).score == 1.0
+
+    too_long = score_post("x", {**GOOD_X_POST, "text": GOOD_X_POST["text"] * 4}, use_emojis=True)
+    assert too_long.score < 0.5 and "limit 280" in too_long.issues[0]
+
+    english = score_post("linkedin", {"text": "Our new gaming laptops are now available for you with a discount",
+                                      "hashtags": ["#a", "#b", "#c", "#a"]}, use_emojis=False)
+    assert english.issues == ["4 hashtags, limit 3", "duplicate or malformed hashtags", "not Hungarian"]
+    assert score_post("x", GOOD_X_POST, use_emojis=False).issues == ["emojis were not wanted"]
+
+    ranked = rank_variants("x", [{"text": "Rövid", "hashtags": ["#a"]}, GOOD_X_POST], use_emojis=True)
+    assert [variant["text"] for variant in ranked] == [GOOD_X_POST["text"], "Rövid"]
+    assert ranked[1]["issues"] == ["text too short", "no emojis"]
+
+
+def test_variant_mode_ranks_variants_and_switching_costs_no_llm_call():
+    llm = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0))
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                        post_variants=3)
+    agent = SocialMediaAgent(generation_mode="fused", ai_service=service)
+    request = SocialMediaRequest(campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+                                 target_audience="25-35 éves hobby gamerek", tone=ToneType.FRIENDLY)
+
+    async def run():
+        runner = await agent.process_with_feedback(request)
+        generated = await runner.run_until_feedback()
+        switched = await runner.next_variant("x")
+        invalid = await runner.select_variant("x", 3)
+        finalized = await runner.finalize()
+        return generated, switched, invalid, finalized
+
+    generated, switched, invalid, finalized = asyncio.run(run())
+
+    variants = generated["variants"]
+    assert set(variants) == {"facebook", "instagram", "linkedin", "x"}
+    for platform, ranked in variants.items():
+        assert len(ranked) == 3
+        assert [variant["score"] for variant in ranked] == sorted((variant["score"] for variant in ranked), reverse=True)
+        assert getattr(generated["posts"], platform).text == ranked[0]["text"]
+    assert switched["selected_variants"] == {"x": 1} and switched["posts"].x.text == variants["x"][1]["text"]
+    assert invalid["status"] == "error"
+    assert finalized["result"]["x"]["text"] == variants["x"][1]["text"]
+    assert finalized["result"]["facebook"]["text"] == variants["facebook"][0]["text"]
+    # One fused call produced every variant; switching and finalizing were local
+    assert llm.calls == 1
@@ -0,0 +1,40 @@
+import pytest
+
+from agents.process_pool import process_batch_in_processes
+from models.request_models import SocialMediaRequest, ToneType
+
+AUDIENCES = ["25-35 éves hobby gamerek", "fiatal szakemberek", "egyetemisták"]
+
+
+@pytest.fixture
+def fake_backend_env(monkeypatch):
+    # Worker processes read their settings from the environment they are spawned with
+    for name, value in {
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_DISTRIBUTION": "fixed",
+        "FAKE_LLM_LATENCY_MS": "0",
+        "FAKE_LLM_TOKENS_PER_SECOND": "0",
+        "RATE_LIMIT_RPM": "6000",
+        "RATE_LIMIT_TPM": "0",
+        "INSIGHT_STORE_ENABLED": "false",
+    }.items():
+        monkeypatch.setenv(name, value)
+
+
+def test_batch_runs_in_worker_processes_and_keeps_input_order(fake_backend_env):
+    requests = [
+        SocialMediaRequest(campaign_message=f"Új termékünk érkezett, most {index + 10}% kedvezménnyel!",
+                           target_audience=AUDIENCES[index % len(AUDIENCES)], tone=ToneType.FRIENDLY)
+        for index in range(7)
+    ]
+
+    results = process_batch_in_processes(requests, processes=2, max_concurrency=3, generation_mode="fused")
+
+    assert [item["index"] for item in results] == list(range(7))
+    assert all(item["status"] == "success" for item in results)
+    for index, item in enumerate(results):
+        assert set(item["result"]) == {"facebook", "instagram", "linkedin", "x"}
+        assert f"{index + 10}%" in item["result"]["facebook"]["text"]
+
+    with pytest.raises(ValueError):
+        process_batch_in_processes(requests, processes=0)
@@ -0,0 +1,139 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from services.ai_service import AIService
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.prompt_budget import (
+    PromptBudget, TokenAccounting, TokenUsage, compact_context, compact_posts, shorten_text
+)
+from services.rate_limiter import estimate_tokens
+
+CONTEXT = {
+    "key_messages": ["Új gaming laptop", "Akciós ár", "Csak egy hétig", "Ingyenes szállítás"],
+    "audience_insights": "A célközönség fiatal, technológia iránt érdeklődő gamerekből áll. " * 20,
+    "platform_strategies": {
+        "facebook": "Részletes termékbemutató",
+        "instagram": "Látványos képek",
+        "linkedin": "Szakmai megközelítés",
+        "x": "Rövid, ütős üzenet",
+    },
+    "creative_directions": ["Teljesítmény", "Stílus", "Közösség", "Versenyek"],
+}
+
+
+class RecordingLLM:
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[-1].content)
+        return SimpleNamespace(content=self.content, usage_metadata={
+            "input_tokens": 900, "output_tokens": 120, "total_tokens": 1020
+        })
+
+
+def make_service(llm, **budget):
+    budget = {"context_window": 8192, "max_output_tokens": 1500, "max_prompt_tokens": 2500, **budget}
+    return AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, prompt_budget=PromptBudget(**budget))
+
+
+def test_context_keeps_only_strategies_of_generated_platforms():
+    compacted = compact_context(CONTEXT, ["x"])
+
+    assert compacted["platform_strategies"] == {"x": "Rövid, ütős üzenet"}
+    assert compacted["audience_insights"] == CONTEXT["audience_insights"]
+    assert len(CONTEXT["platform_strategies"]) == 4
+
+
+def test_context_is_shrunk_to_the_token_budget():
+    for budget in (200, 80, 30, 5):
+        compacted = compact_context(CONTEXT, ["facebook", "x"], max_tokens=budget)
+        assert estimate_tokens(json.dumps(compacted, ensure_ascii=False)) <= budget
+
+    shrunk = compact_context(CONTEXT, ["x"], max_tokens=200)
+    assert shrunk["key_messages"] == CONTEXT["key_messages"][:3]
+    assert shrunk["audience_insights"].endswith("…")
+
+
+def test_posts_are_shrunk_but_keep_every_platform():
+    posts = {
+        "facebook": {"text": "Hosszú Facebook poszt szöveg. " * 400, "hashtags": [f"#tag{i}" for i in range(30)]},
+        "instagram": {"text": "Instagram poszt", "hashtags": ["#gaming"], "image_suggestions": ["Laptop"]},
+        "linkedin": {"text": "LinkedIn poszt", "hashtags": ["#tech", "#karrier", "#it", "#extra"]},
+    }
+
+    compacted = compact_posts(posts, max_tokens=300)
+
+    assert estimate_tokens(json.dumps(compacted, ensure_ascii=False)) <= 300
+    assert set(compacted) == set(posts)
+    assert compacted["instagram"]["text"] == "Instagram poszt"
+    assert len(compacted["linkedin"]["hashtags"]) == 3
+    assert compacted["facebook"]["text"].endswith("…")
+    assert posts["instagram"]["image_suggestions"] == ["Laptop"]
+
+
+def test_shorten_text_cuts_at_word_boundary():
+    assert shorten_text("rövid", 10) == "rövid"
+    assert shorten_text("egy kettő három négy", 12) == "egy kettő…"
+
+
+def test_single_platform_prompt_carries_only_its_strategy_and_is_accounted():
+    llm = RecordingLLM(json.dumps({"text": "X poszt", "hashtags": ["#gaming"]}))
+    service = make_service(llm)
+
+    post = asyncio.run(service.generate_single_platform_post(
+        "x", CONTEXT, "Új gaming laptop akció!", "Gamerek", "friendly", True
+    ))
+
+    assert post["text"] == "X poszt"
+    assert "Rövid, ütős üzenet" in llm.prompts[0]
+    assert "Látványos képek" not in llm.prompts[0]
+    stats = service.token_stats()
+    assert stats["by_operation"]["generate_post:x"]["prompt_tokens"] == 900
+    call = stats["recent_calls"][-1]
+    assert call["completion_tokens"] == 120 and call["attempts"] == 1
+    assert call["saved_tokens"] > 0
+
+
+def test_refinement_prompt_is_compacted_to_the_budget():
+    posts = {
+        "facebook": {"text": "Hosszú Facebook poszt szöveg. " * 400, "hashtags": ["#gaming"]},
+        "x": {"text": "X poszt", "hashtags": ["#gaming"]},
+    }
+    llm = RecordingLLM(json.dumps({"facebook": {"text": "Rövidebb poszt", "hashtags": ["#gaming"]}}))
+    service = make_service(llm, max_prompt_tokens=600)
+
+    refined = asyncio.run(service.refine_posts(posts, "Rövidebb legyen", platforms=["facebook"]))
+
+    assert refined["facebook"]["text"] == "Rövidebb poszt"
+    assert refined["x"] == posts["x"]
+    assert estimate_tokens(llm.prompts[0]) < 600
+    assert service.token_stats()["by_operation"]["refine_posts"]["saved_tokens"] > 2000
+
+
+def test_prompt_over_the_context_window_falls_back_without_calling_the_llm():
+    llm = RecordingLLM("{}")
+    service = make_service(llm, context_window=1600, max_prompt_tokens=0)
+
+    posts = asyncio.run(service.generate_platform_posts(
+        CONTEXT, "Új gaming laptop akció!", "Gamerek", "friendly", True
+    ))
+
+    assert llm.prompts == []
+    assert service.fallbacks == 1
+    assert "Új gaming laptop akció!" in posts["x"]["text"]
+
+
+def test_cached_calls_cost_no_tokens():
+    accounting = TokenAccounting(history=2)
+    accounting.record(TokenUsage("refine_posts", 100, 50, attempts=1))
+    accounting.record(TokenUsage("refine_posts", 100, cached=True))
+    accounting.record(TokenUsage("analyze_context", 80, 40, attempts=2))
+
+    assert accounting.stats()["refine_posts"] == {
+        "calls": 2, "cached": 1, "prompt_tokens": 100, "completion_tokens": 50, "saved_tokens": 0
+    }
+    assert [call["operation"] for call in accounting.recent()] == ["refine_posts", "analyze_context"]
+    assert accounting.recent(1)[0]["total_tokens"] == 120
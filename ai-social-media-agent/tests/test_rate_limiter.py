@@ -0,0 +1,212 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.ai_service import AIService
+from services.llm_backends import FakeLLMError
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter, SharedRateLimiter, TokenBucket
+from services.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyLLM:
+    """Fails with the given errors first, then answers."""
+
+    def __init__(self, errors, content):
+        self.errors = list(errors)
+        self.content = content
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SimpleNamespace(content=self.content, usage_metadata={"total_tokens": 120})
+
+
+def make_service(llm, **overrides):
+    options = dict(
+        cache=LLMResponseCache([MemoryCacheTier()]),
+        llm=llm,
+        rate_limiter=RateLimiter(requests_per_minute=600, tokens_per_minute=100000),
+        retry_policy=RetryPolicy(max_retries=3, base_delay=0.001, max_delay=0.01, rng=random.Random(0)),
+        circuit_breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60)
+    )
+    options.update(overrides)
+    return AIService(**options)
+
+
+def test_token_bucket_queues_reservations_in_order():
+    clock = FakeClock()
+    bucket = TokenBucket(capacity=2, refill_per_second=1, clock=clock)
+
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_rate_limiter_enforces_both_limits_and_pauses():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600, clock=clock)
+
+    assert limiter.reserve(500) == 0
+    # One request per second is available, but only 100 tokens are left of the minute's 600
+    assert limiter.reserve(400) == pytest.approx(30.0)
+    limiter.settle(400, 100)  # the call used far less than reserved, which clears the debt
+    assert limiter.reserve(0) == 0
+
+    limiter.pause(5)
+    assert limiter.reserve(0) >= 5
+    assert limiter.stats()["pauses"] == 1
+
+
+def test_shared_rate_limiter_keeps_one_budget_for_all_instances(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "limits.sqlite")
+    first = SharedRateLimiter(path, requests_per_minute=60, tokens_per_minute=600, clock=clock)
+    second = SharedRateLimiter(path, requests_per_minute=60, tokens_per_minute=600, clock=clock)
+
+    assert first.reserve(500) == 0
+    # The second process sees the tokens the first one took
+    assert second.reserve(400) == pytest.approx(30.0)
+    first.settle(400, 100)
+    assert second.reserve(0) == 0
+
+    second.pause(5)
+    assert first.reserve(0) >= 5
+    clock.now += 60
+    assert SharedRateLimiter(path, 60, 600, clock=clock).stats()["available_tokens"] == 600
+
+
+def _reserve_many(path, count, sends):
+    limiter = SharedRateLimiter(path, requests_per_minute=60, tokens_per_minute=0)
+    # When each request may go out, on the clock all processes share
+    sends.put([(wait, time.time() + wait) for wait in (limiter.reserve(0) for _ in range(count))])
+
+
+def test_processes_sharing_a_rate_limit_queue_behind_each_other(tmp_path):
+    path = str(tmp_path / "limits.sqlite")
+    context = multiprocessing.get_context("spawn")
+    sends = context.SimpleQueue()
+    workers = [context.Process(target=_reserve_many, args=(path, 30, sends)) for _ in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    reservations = [reservation for _ in workers for reservation in sends.get()]
+
+    # 90 requests against 60 per minute: the first 60 go at once, the rest one per second
+    assert sum(1 for wait, _ in reservations if wait == 0) == 60
+    delayed = sorted(send for wait, send in reservations if wait > 0)
+    assert all(later - earlier == pytest.approx(1.0, abs=0.05) for earlier, later in zip(delayed, delayed[1:]))
+
+
+def test_retry_policy_honours_retry_after():
+    policy = RetryPolicy(base_delay=0.1, max_delay=1.0, rng=random.Random(1))
+    assert all(0 <= policy.delay(attempt) <= 1.0 for attempt in range(10))
+    assert policy.delay(0, retry_after=3.0) == 3.0
+
+
+def test_error_classification():
+    assert is_retryable(FakeLLMError("slow down", status_code=429, retry_after=2))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(FakeLLMError("bad request", status_code=400))
+    assert not is_retryable(ValueError("boom"))
+
+    response = SimpleNamespace(status_code=429, headers={"retry-after": "7"})
+    assert retry_after_seconds(SimpleNamespace(response=response)) == 7.0
+
+
+def test_circuit_breaker_opens_and_probes_after_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 10
+    assert breaker.before_call()  # the single half-open probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.release_probe()  # it ended without an outcome, e.g. cancelled
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 10
+    assert breaker.before_call()
+    breaker.record_success()
+    breaker.release_probe()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.opened == 1
+
+
+def test_probe_failing_for_good_opens_the_circuit_again():
+    clock = FakeClock()
+    llm = FlakyLLM([FakeLLMError("unavailable", status_code=503), ValueError("bad request")], "{}")
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+    service = make_service(llm, retry_policy=RetryPolicy(max_retries=0), circuit_breaker=breaker)
+
+    async def refine():
+        await service.refine_posts({"x": {"text": "Poszt"}}, "Rövidebb legyen")
+
+    asyncio.run(refine())
+    clock.now += 60
+    asyncio.run(refine())  # the probe hits a non-retryable error
+    assert breaker.state == CircuitBreaker.OPEN
+    asyncio.run(refine())
+    clock.now += 60
+    asyncio.run(refine())
+
+    assert llm.calls == 3
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.rejected == 1
+
+
+def test_transient_failures_are_retried_instead_of_falling_back():
+    content = json.dumps({"key_messages": ["Akció"], "creative_directions": ["Gaming"]})
+    llm = FlakyLLM([FakeLLMError("rate limited", status_code=429, retry_after=0.01),
+                    FakeLLMError("unavailable", status_code=503)], content)
+    service = make_service(llm)
+
+    result = asyncio.run(service.analyze_context("Új laptop akció!", "Gamerek", "friendly"))
+
+    assert result["key_messages"] == ["Akció"]
+    assert llm.calls == 3
+    stats = service.resilience_stats()
+    assert stats["retries"] == 2
+    assert stats["fallbacks"] == 0
+    assert stats["rate_limiter"]["pauses"] == 1
+
+
+def test_open_circuit_fails_fast_without_calling_the_llm():
+    llm = FlakyLLM([FakeLLMError("unavailable", status_code=503)] * 10, "{}")
+    service = make_service(llm, retry_policy=RetryPolicy(max_retries=0),
+                           circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    async def run():
+        for _ in range(4):
+            await service.refine_posts({"x": {"text": "Poszt"}}, "Rövidebb legyen")
+
+    asyncio.run(run())
+
+    assert llm.calls == 2
+    assert service.resilience_stats()["circuit_breaker"]["rejected"] == 2
+    assert service.resilience_stats()["fallbacks"] == 4
@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter
+from services.semantic_cache import HashingEmbedder, SemanticCache, VectorIndex, embed_campaign
+from services.telemetry import Telemetry
+
+MESSAGE = "Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!"
+AUDIENCE = "25-35 éves hobby gamerek"
+POSTS = {"x": {"text": "Gaming laptopok 20% kedvezménnyel!", "hashtags": ["#gaming"]}}
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.fake = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0))
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages[-1].content)
+        return await self.fake.ainvoke(messages)
+
+
+def make_service(llm, cache):
+    return AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm, rate_limiter=RateLimiter(6000, 0),
+                     telemetry=Telemetry(), semantic_cache=cache)
+
+
+def test_rewordings_are_closer_than_other_campaigns():
+    embedder = HashingEmbedder(256)
+    campaign = embed_campaign(embedder, MESSAGE, AUDIENCE)
+
+    def similarity(message, audience=AUDIENCE):
+        return float(campaign @ embed_campaign(HashingEmbedder(256), message, audience))
+
+    assert np.isclose(np.linalg.norm(campaign), 1.0)
+    assert similarity(MESSAGE.lower() + "  ") > 0.999
+    assert similarity("Most 20% kedvezménnyel kapható az új gaming laptop kollekciónk!") > 0.93
+    assert similarity(MESSAGE, "hobby gamerek 25-35 év között") > 0.93
+    assert similarity("Új okosóra kollekciónk most 20% kedvezménnyel kapható!") < 0.9
+    assert similarity("Nyári futócipő akció a webshopban 20% engedménnyel") < 0.6
+
+
+def test_lookup_respects_thresholds_and_hard_filters():
+    cache = SemanticCache(threshold=0.93, seed_threshold=0.85)
+    cache.add(MESSAGE, AUDIENCE, "friendly", True, POSTS)
+
+    hit = cache.lookup("Most 20% kedvezménnyel kapható az új gaming laptop kollekciónk!", AUDIENCE, "friendly", True)
+    assert hit.similarity >= 0.93 and hit.posts == POSTS and hit.campaign_message == MESSAGE
+    hit.posts["x"]["text"] = "módosítva"
+    assert cache.lookup(MESSAGE, AUDIENCE, "friendly", True).posts == POSTS
+
+    seed = cache.lookup("Új gaming egér kollekciónk most 20% kedvezménnyel kapható!", AUDIENCE, "friendly", True)
+    assert 0.85 <= seed.similarity < 0.93
+
+    assert cache.lookup(MESSAGE.replace("20%", "30%"), AUDIENCE, "friendly", True) is None
+    assert cache.lookup(MESSAGE, AUDIENCE, "formal", True) is None
+    assert cache.lookup(MESSAGE, AUDIENCE, "friendly", False) is None
+    assert cache.stats() == {"entries": 1, "hits": 2, "seeds": 1, "misses": 3, "hit_rate": 2 / 6, "evictions": 0}
+
+
+def test_index_grows_evicts_least_recently_used_and_expires():
+    now = [0.0]
+    index = VectorIndex(4, max_entries=3, ttl_seconds=10, clock=lambda: now[0], initial_capacity=1)
+    vectors = np.eye(4, dtype=np.float32)
+    for slot in range(3):
+        index.add(vectors[slot], 7, slot)
+    assert len(index) == 3
+
+    index.search(vectors[0], 7)
+    index.add(vectors[3], 7, 3)
+    assert index.evictions == 1
+    assert index.search(vectors[1], 7, 0.5) is None
+    assert index.value(index.search(vectors[0], 7, 0.5)[0]) == 0
+    assert index.search(vectors[0], 8) is None
+
+    now[0] = 11
+    assert index.search(vectors[0], 7) is None
+    index.add(vectors[1], 7, 1)
+    assert index.evictions == 1 and index.value(index.search(vectors[1], 7)[0]) == 1
+
+
+def test_generation_reuses_or_seeds_from_similar_campaigns():
+    llm = RecordingLLM()
+    service = make_service(llm, SemanticCache(threshold=0.93, seed_threshold=0.85))
+    context = {"key_messages": [MESSAGE]}
+
+    async def generate(message):
+        return await service.generate_platform_posts(context, message, AUDIENCE, "friendly", True)
+
+    first = asyncio.run(generate(MESSAGE))
+    reworded = asyncio.run(generate("Most 20% kedvezménnyel kapható az új gaming laptop kollekciónk!"))
+    assert reworded == first and len(llm.prompts) == 1
+
+    asyncio.run(generate("Új gaming egér kollekciónk most 20% kedvezménnyel kapható!"))
+    assert len(llm.prompts) == 2
+    assert "hasonló korábbi kampány" in llm.prompts[1] and first["x"]["text"][:30] in llm.prompts[1]
+
+    lookups = service.telemetry.semantic_cache_lookups
+    assert [lookups.value(result=result) for result in ("miss", "hit", "seed")] == [1, 1, 1]
+    assert service.telemetry.semantic_cache_lookup_duration.count() == 3
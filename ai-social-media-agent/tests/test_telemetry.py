@@ -0,0 +1,155 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from agents.social_media_agent import SocialMediaAgent
+from models.request_models import SocialMediaRequest, ToneType
+from services.ai_service import AIService
+from services.llm_backends import FakeChatModel, FakeLLMConfig
+from services.llm_cache import LLMResponseCache, MemoryCacheTier
+from services.rate_limiter import RateLimiter
+from services.telemetry import (
+    InMemorySpanExporter, JsonLinesSpanExporter, MetricsRegistry, Telemetry, Tracer, current_span
+)
+
+
+@pytest.fixture
+def sample_request():
+    return SocialMediaRequest(
+        campaign_message="Új gaming laptop kollekciónk most 20% kedvezménnyel kapható!",
+        target_audience="25-35 éves hobby gamerek",
+        tone=ToneType.FRIENDLY,
+        use_emojis=True
+    )
+
+
+def make_agent(telemetry, generation_mode="single", **config):
+    llm = FakeChatModel(FakeLLMConfig(latency_distribution="fixed", latency_ms=0, tokens_per_second=0, **config))
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=llm,
+                        rate_limiter=RateLimiter(6000, 0), telemetry=telemetry)
+    return SocialMediaAgent(generation_mode=generation_mode, ai_service=service, telemetry=telemetry)
+
+
+def test_spans_nest_and_record_errors():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer([exporter])
+
+    with tracer.span("outer") as outer:
+        with tracer.span("inner", {"key": 1}):
+            assert current_span().name == "inner"
+        with pytest.raises(RuntimeError):
+            with tracer.span("failing"):
+                raise RuntimeError("boom")
+    assert current_span() is None
+
+    inner, failing, finished_outer = exporter.spans()
+    assert inner.parent_span_id == outer.span_id and inner.trace_id == outer.trace_id
+    assert failing.status == "ERROR" and "boom" in failing.status_message
+    assert finished_outer.parent_span_id is None
+    otlp = inner.to_otlp()
+    assert otlp["attributes"] == [{"key": "key", "value": {"intValue": "1"}}]
+    assert otlp["parentSpanId"] == outer.span_id
+
+
+def test_metrics_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, route="/a")
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+    assert latency.quantile(0.5, route="/a") == pytest.approx(0.1 + 0.9 * 0.5)
+    assert latency.quantile(0.99, route="/a") == 1.0
+    with pytest.raises(ValueError):
+        requests.inc(path="/a")
+
+
+def test_workflow_nodes_and_llm_calls_share_one_trace(sample_request):
+    telemetry = Telemetry()
+    agent = make_agent(telemetry)
+
+    result = asyncio.run(agent.process_request(sample_request))
+
+    assert "error" not in result
+    root, = telemetry.spans("workflow.process_request")
+    node_spans = {span.name: span for span in telemetry.spans() if span.name.startswith("node.")}
+    assert {"node.context_analysis", "node.generate_posts", "node.await_feedback", "node.finalize"} <= set(node_spans)
+    assert all(span.trace_id == root.trace_id for span in telemetry.spans())
+
+    generation, = telemetry.spans("llm.generate_posts")
+    assert generation.parent_span_id == node_spans["node.generate_posts"].span_id
+    assert generation.attributes["llm.outcome"] == "ok"
+    assert generation.attributes["llm.usage.completion_tokens"] > 0
+    assert "llm.queue_wait_ms" in generation.attributes
+    parse = [span for span in telemetry.spans("llm.parse") if span.parent_span_id == node_spans["node.generate_posts"].span_id]
+    assert parse[0].attributes["llm.parse_strategy"] == "direct"
+
+    # The feedback pause is part of the normal flow, not an error
+    assert telemetry.node_duration.count(node="await_feedback", status="interrupted") == 1
+    assert telemetry.node_duration.count(node="await_feedback", status="ok") == 1
+    assert telemetry.llm_tokens.value(operation="generate_posts", kind="prompt") > 0
+    assert telemetry.llm_cache.value(operation="analyze_context", result="miss") == 1
+
+
+def test_cache_hits_are_counted_and_cost_no_tokens(sample_request):
+    telemetry = Telemetry()
+    agent = make_agent(telemetry, generation_mode="fanout")
+
+    asyncio.run(agent.process_request(sample_request))
+    tokens = telemetry.llm_tokens.value(operation="generate_post:x", kind="prompt")
+    asyncio.run(agent.process_request(sample_request))
+
+    assert telemetry.llm_cache.value(operation="generate_post:x", result="miss") == 1
+    assert telemetry.llm_cache.value(operation="generate_post:x", result="hit") == 1
+    assert telemetry.llm_duration.count(operation="generate_post:x", outcome="cached") == 1
+    assert telemetry.llm_tokens.value(operation="generate_post:x", kind="prompt") == tokens
+    assert {row["name"] for row in telemetry.latency_summary() if row["kind"] == "node"} >= {
+        "context_analysis", "generate_x", "join_posts"
+    }
+
+
+def test_parse_failures_and_fallbacks_are_counted(sample_request):
+    class ProseLLM:
+        async def ainvoke(self, messages):
+            return SimpleNamespace(content="Sajnos most nem tudok segíteni.")
+
+    telemetry = Telemetry()
+    service = AIService(cache=LLMResponseCache([MemoryCacheTier()]), llm=ProseLLM(), telemetry=telemetry)
+    agent = SocialMediaAgent(ai_service=service, telemetry=telemetry)
+
+    result = asyncio.run(agent.process_request(sample_request))
+
+    assert "error" not in result
+    for operation in ("analyze_context", "generate_posts"):
+        assert telemetry.llm_parse.value(operation=operation, strategy="failed") == 1
+        assert telemetry.llm_fallbacks.value(operation=operation) == 1
+    parse, = [span for span in telemetry.spans("llm.parse") if span.attributes["llm.operation"] == "generate_posts"]
+    assert parse.status == "ERROR" and parse.attributes["llm.parse_strategy"] == "failed"
+    node, = telemetry.spans("node.generate_posts")
+    assert node.status == "UNSET" and node.attributes["llm.fallback"] is True
+
+
+def test_spans_can_be_exported_as_json_lines(tmp_path):
+    path = tmp_path / "spans" / "trace.jsonl"
+    tracer = Tracer([JsonLinesSpanExporter(str(path))])
+
+    with tracer.span("workflow.process_request", {"workflow.mode": "single"}):
+        with tracer.span("node.finalize"):
+            pass
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["node.finalize", "workflow.process_request"]
+    assert lines[0]["parentSpanId"] == lines[1]["spanId"]
+    assert lines[1]["status"] == {"code": "STATUS_CODE_UNSET"}